@@ -10,6 +10,7 @@ __version__ = "0.1.0"
 __author__ = "AI Hub Team"
 
 from .agent import MultiSourceAgent
+from .batch import BatchRunner
 from .config import Config
 from .models import (
     ProjectInfo,
@@ -20,6 +21,7 @@ from .models import (
 
 __all__ = [
     "MultiSourceAgent",
+    "BatchRunner",
     "Config", 
     "ProjectInfo",
     "QueryContext",
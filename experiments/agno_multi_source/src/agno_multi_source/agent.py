@@ -6,14 +6,22 @@ parallel retrieval from multiple sources, and information synthesis to provide
 comprehensive answers to user queries.
 """
 
+import hashlib
+import json
 import logging
+import threading
 import time
-from typing import Dict, List, Optional, Union
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union
 
-from agno import Agent
+from agno.agent import Agent
 from pydantic import BaseModel, Field
 
 from .config import get_config
+from .libs.conversation_memory import get_conversation_memory
+from .libs.prompt_cache import build_agent_model, chat_prefix_for_project
+from .libs.qdrant_clients import get_qdrant_clients
+from .libs.resilience import guard_model_requests, model_deadline, turn_deadline
 from .models import (
     AgentConfig,
     AgentState,
@@ -30,11 +38,56 @@ from .tools.project_tools import (
     identify_project_from_query,
 )
 from .tools.verbali_tools import VerbaliRetriever, retrieve_verbali_for_project
-from .tools.athena_tools import AthenaQueryTool, query_project_details
+from .tools.athena_tools import AthenaQueryTool, get_project_fact_sheet, query_project_details
 
 logger = logging.getLogger(__name__)
 
 
+# Static system prompt, kept identical across requests so the provider can cache it
+SYSTEM_PROMPT = """
+You are an expert AI assistant for company employees, communicating in Italian. 
+Your primary goal is to provide accurate and helpful answers based on the user's 
+question, conversation history, and information retrieved using your available tools.
+
+Your available tools allow you to:
+1. Identify relevant projects from user queries
+2. Retrieve information from multiple sources:
+   - Meeting minutes and verbali
+   - Project catalog (Athena database)
+   - User documents
+   - Installation manuals (MI)
+   - Wiki knowledge base
+3. Synthesize information from multiple sources
+
+Processing Steps:
+1. ALWAYS start by identifying the project context using identify_project_from_query
+2. Based on the query and project context, decide which retrieval tools to use
+3. Call relevant retrieval tools (you can call multiple tools in parallel)
+4. Synthesize the information to provide a comprehensive answer
+5. Always respond in Italian
+6. Cite sources when providing specific information
+
+Guidelines:
+- If Athena/catalog data is available, prioritize it for structured information
+- Use get_project_fact_sheet for an overview of a project (details, contacts, verbali files)
+- Use verbali for meeting decisions and discussions
+- For the latest meetings pass latest (e.g. latest=5) to retrieve_verbali_for_project; for a period pass since/until as ISO dates
+- Provide specific, actionable information when possible
+- If information is not available, clearly state this
+- Maintain conversation context across turns
+- Earlier turns not in the conversation history are in the conversation summary
+"""
+
+# Tools exposed to the agent; their schemas are part of the cached prompt prefix
+AGENT_TOOLS = (
+    identify_project_from_query,
+    retrieve_verbali_for_project,
+    query_project_details,
+    get_project_fact_sheet,
+    # Add more tools as they become available
+)
+
+
 class MultiSourceAgent:
     """
     Main multi-source RAG agent that provides intelligent information retrieval
@@ -65,66 +118,74 @@ class MultiSourceAgent:
         self.verbali_retriever = VerbaliRetriever()
         self.athena_tool = AthenaQueryTool()
         
+        # Load the local embedding model before the first query needs it (remote providers need no warmup)
+        if self.system_config.embedding_warmup and self.system_config.embedding_provider == "Local-embeddings":
+            get_qdrant_clients().warmup_embeddings()
+        
+        # Per-chat memory (recent turns + summary), bounds the prompt size
+        self.memory = get_conversation_memory()
+        
         # State management
         self.current_state: Optional[AgentState] = None
         self.conversation_context: Dict[str, any] = {}
         
-        # Create the underlying Agno agent
+        # Create the underlying Agno agent, plus per-project agents for cached fact sheet prefixes
         self._agent = self._create_agent()
+        self._project_agents: OrderedDict = OrderedDict()
+        self._agents_lock = threading.Lock()
         
         logger.info("MultiSourceAgent initialized")
     
-    def _create_agent(self) -> Agent:
-        """Create the underlying Agno agent with tools"""
+    def _create_agent(self, chat_prefix: Optional[str] = None) -> Agent:
+        """
+        Create the underlying Agno agent with tools.
         
-        # Define the system prompt
-        system_prompt = """
-        You are an expert AI assistant for company employees, communicating in Italian. 
-        Your primary goal is to provide accurate and helpful answers based on the user's 
-        question, conversation history, and information retrieved using your available tools.
-
-        Your available tools allow you to:
-        1. Identify relevant projects from user queries
-        2. Retrieve information from multiple sources:
-           - Meeting minutes and verbali
-           - Project catalog (Athena database)
-           - User documents
-           - Installation manuals (MI)
-           - Wiki knowledge base
-        3. Synthesize information from multiple sources
-
-        Processing Steps:
-        1. ALWAYS start by identifying the project context using identify_project_from_query
-        2. Based on the query and project context, decide which retrieval tools to use
-        3. Call relevant retrieval tools (you can call multiple tools in parallel)
-        4. Synthesize the information to provide a comprehensive answer
-        5. Always respond in Italian
-        6. Cite sources when providing specific information
-
-        Guidelines:
-        - If Athena/catalog data is available, prioritize it for structured information
-        - Use verbali for meeting decisions and discussions
-        - Provide specific, actionable information when possible
-        - If information is not available, clearly state this
-        - Maintain conversation context across turns
+        The static system prompt comes first so it is a stable, cacheable prefix;
+        a chat prefix (the current project's fact sheet) is appended after it.
         """
+        instructions = SYSTEM_PROMPT
+        if chat_prefix:
+            instructions = f"{SYSTEM_PROMPT}\n{chat_prefix}\n"
         
         # Create agent with tools
         agent = Agent(
-            model=self.config.model_id,
-            instructions=system_prompt,
-            tools=[
-                identify_project_from_query,
-                retrieve_verbali_for_project,
-                query_project_details,
-                # Add more tools as they become available
-            ],
-            temperature=self.config.temperature,
-            max_tokens=self.config.max_tokens,
+            model=guard_model_requests(
+                build_agent_model(self.config.model_id, self.config.temperature, self.config.max_tokens)
+            ),
+            instructions=instructions,
+            tools=list(AGENT_TOOLS),
         )
         
         return agent
     
+    def _agent_for_project(self, project: Optional[str]) -> Agent:
+        """
+        Agent whose cached prompt prefix includes the fact sheet of a chat's project.
+        
+        Agents are kept per (project, fact sheet hash), so every turn of a chat
+        about the same project sends a byte-identical system prompt and hits the
+        provider's prompt cache; a changed fact sheet gets a new agent.
+        """
+        if not self.system_config.prompt_caching:
+            return self._agent
+        chat_prefix = chat_prefix_for_project(project)
+        if not chat_prefix:
+            return self._agent
+        
+        key = (project, hashlib.sha256(chat_prefix.encode("utf-8")).hexdigest())
+        with self._agents_lock:
+            agent = self._project_agents.get(key)
+            if agent is not None:
+                self._project_agents.move_to_end(key)
+                return agent
+        
+        agent = self._create_agent(chat_prefix)
+        with self._agents_lock:
+            self._project_agents[key] = agent
+            while len(self._project_agents) > self.system_config.prompt_cache_max_agents:
+                self._project_agents.popitem(last=False)
+        return agent
+    
     def process_query(
         self,
         user_query: str,
@@ -140,8 +201,8 @@ class MultiSourceAgent:
             user_query: The user's question or request
             user_id: Unique identifier for the user
             chat_id: Unique identifier for the chat session
-            conversation_history: Previous conversation turns
-            last_project_context: Project context from the previous turn
+            conversation_history: Previous conversation turns (optional, the chat memory keeps them)
+            last_project_context: Project context from the previous turn (defaults to the remembered one)
             
         Returns:
             SynthesisResult with the complete response and metadata
@@ -150,14 +211,21 @@ class MultiSourceAgent:
         
         logger.info(f"Processing query for user {user_id}: '{user_query[:100]}...'")
         
+        query_context = None
         try:
-            # Step 1: Create query context
+            # Step 1: Load the bounded chat memory and create query context
+            memory = self.memory.load(chat_id, user_id)
+            self.memory.sync_history(memory, conversation_history)
+            if last_project_context:
+                memory.last_project_context = last_project_context
+            memory_context = self.memory.build_context(memory)
+            
             query_context = QueryContext(
                 user_query=user_query,
                 processed_query=user_query,  # Could add query processing here
                 query_type=QueryType.GENERAL,  # Will be determined by tools
-                identified_projects="general",  # Will be determined by tools
-                conversation_history=conversation_history or [],
+                identified_projects=memory.last_project_context or "general",  # Will be determined by tools
+                conversation_history=memory_context["conversation_history"],
                 user_id=user_id,
                 chat_id=chat_id
             )
@@ -169,16 +237,29 @@ class MultiSourceAgent:
             )
             
             # Step 3: Use the Agno agent to process the query
-            # The agent will automatically use tools to identify projects and retrieve information
-            response = self._agent.run(
-                user_query,
-                context={
-                    "user_id": user_id,
-                    "chat_id": chat_id,
-                    "conversation_history": conversation_history,
-                    "last_project_context": last_project_context
-                }
-            )
+            # The agent will automatically use tools to identify projects and retrieve information.
+            # Tool backend calls share the retrieval part of the turn budget, so slow or failing
+            # sources drop out and the model still has time to answer with the others.
+            turn_budget = self.system_config.turn_latency_budget
+            retrieval_budget = turn_budget * self.system_config.retrieval_budget_fraction
+            
+            agent = self._agent_for_project(memory.last_project_context)
+            
+            with model_deadline(turn_budget), turn_deadline(retrieval_budget):
+                # The bounded memory goes into the input messages, ahead of the question
+                response = agent.run(self.memory.build_messages(memory, user_query), user_id=user_id)
+            
+            # Remember this exchange and the project it was about; the memory is
+            # re-read under the chat's lock so concurrent turns are not lost
+            identified_project = _identified_project(response)
+            if identified_project:
+                query_context.identified_projects = identified_project
+            with self.memory.updating(chat_id, user_id) as memory:
+                self.memory.sync_history(memory, conversation_history)
+                if identified_project or last_project_context:
+                    memory.last_project_context = identified_project or last_project_context
+                self.memory.add_turn(memory, "user", user_query)
+                self.memory.add_turn(memory, "assistant", response.content or "")
             
             # Step 4: Create synthesis result
             processing_time = time.time() - start_time
@@ -207,6 +288,15 @@ class MultiSourceAgent:
             
             # Return error result
             processing_time = time.time() - start_time
+            if query_context is None:
+                query_context = QueryContext(
+                    user_query=user_query,
+                    processed_query=user_query,
+                    query_type=QueryType.GENERAL,
+                    identified_projects="general",
+                    user_id=user_id,
+                    chat_id=chat_id
+                )
             return SynthesisResult(
                 query_context=query_context,
                 retrieval_results=[],
@@ -265,6 +355,43 @@ class MultiSourceAgent:
         """Clear conversation context"""
         self.conversation_context.clear()
         logger.debug("Cleared conversation context")
+    
+    def clear_chat_memory(self, chat_id: str) -> None:
+        """Forget the stored turns, summary and project context of a chat"""
+        self.memory.clear(chat_id)
+        logger.debug(f"Cleared memory for chat {chat_id}")
+
+
+def _identified_project(response: Any) -> Optional[str]:
+    """
+    Project identified by the last identify_project_from_query call of a run.
+    
+    Tool executions are read from the run response; only a single specific
+    project (not "general" or a multi-project answer) becomes the chat's
+    project context.
+    """
+    identified = None
+    for execution in getattr(response, "tools", None) or []:
+        if isinstance(execution, dict):
+            name = execution.get("tool_name")
+            result = execution.get("content", execution.get("result"))
+        else:
+            name = getattr(execution, "tool_name", None)
+            result = getattr(execution, "result", None) or getattr(execution, "content", None)
+        if name != "identify_project_from_query" or result is None:
+            continue
+        
+        if isinstance(result, str):
+            try:
+                result = json.loads(result)
+            except ValueError:
+                continue
+        projects = result.get("identified_projects") if isinstance(result, dict) else getattr(result, "identified_projects", None)
+        if isinstance(projects, list) and len(projects) == 1:
+            projects = projects[0]
+        if isinstance(projects, str) and projects != "general":
+            identified = projects
+    return identified
 
 
 class SimpleMultiSourceAgent:
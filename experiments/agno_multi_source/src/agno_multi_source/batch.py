@@ -0,0 +1,381 @@
+"""
+Batch Query Runner for the Multi-Source RAG System
+
+This module runs the agent over a JSONL file of questions, e.g. for
+regression testing or nightly report generation:
+- Projects are identified up front and questions are scheduled grouped by
+  project, so questions about the same project run close together and share
+  retrieval: concurrent identical backend calls are coalesced, and the query
+  embedding cache, fact sheet and cached prompt prefix stay warm.
+- Questions run with bounded concurrency; each worker thread has its own
+  agent instance. Questions sharing a chat_id run in order as one conversation,
+  each sent with the chat's history so far (also when a run is resumed).
+- Every finished question is appended to the output JSONL (SynthesisResult
+  plus per-question metrics), which doubles as the checkpoint: a rerun skips
+  the questions already in the output.
+
+Usage:
+    python -m agno_multi_source.batch questions.jsonl results.jsonl --concurrency 8
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .agent import MultiSourceAgent
+from .config import get_config
+from .models import BatchQuestion, BatchQuestionResult, BatchRunSummary, QuestionMetrics
+from .tools.project_tools import ProjectIdentifier
+
+logger = logging.getLogger(__name__)
+
+
+def load_questions(path: str) -> List[BatchQuestion]:
+    """
+    Read questions from a JSONL file.
+    
+    Lines need at least a query; question_id defaults to the line number.
+    Blank lines are skipped, invalid lines are logged and skipped.
+    """
+    questions = []
+    seen: Set[str] = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                data.setdefault("question_id", str(line_number))
+                data["question_id"] = str(data["question_id"])
+                question = BatchQuestion(**data)
+            except Exception as e:
+                logger.error(f"Skipping invalid question on line {line_number}: {e}")
+                continue
+            if question.question_id in seen:
+                logger.error(f"Skipping duplicate question_id on line {line_number}: {question.question_id}")
+                continue
+            seen.add(question.question_id)
+            questions.append(question)
+    return questions
+
+
+def load_checkpoint(path: str, retry_failed: bool = False) -> Set[str]:
+    """
+    Question ids already answered in an output file.
+    
+    The last line written for a question wins, so a failed question that was
+    answered on a later run counts as completed.
+    """
+    outcomes: Dict[str, bool] = {}
+    if not Path(path).exists():
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                data = json.loads(line)
+                outcomes[str(data["question_id"])] = not data.get("error")
+            except (ValueError, KeyError):
+                # A line cut short by an interrupted run; the question is redone
+                continue
+    return {question_id for question_id, ok in outcomes.items() if ok or not retry_failed}
+
+
+def load_answers(path: str) -> Dict[str, str]:
+    """
+    Answers already written to an output file, by question_id.
+    
+    Used to rebuild the history of a chat resumed part way through; failed
+    questions have no answer.
+    """
+    answers: Dict[str, str] = {}
+    if not Path(path).exists():
+        return answers
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                data = json.loads(line)
+                question_id = str(data["question_id"])
+            except (ValueError, KeyError):
+                continue
+            if data.get("error") or not data.get("result"):
+                answers.pop(question_id, None)
+            else:
+                answers[question_id] = data["result"].get("synthesized_content", "")
+    return answers
+
+
+def _chat_key(question: BatchQuestion) -> str:
+    return question.chat_id or f"batch-{question.question_id}"
+
+
+def _answered_turns(question: BatchQuestion, answer: str) -> List[Dict[str, str]]:
+    return [{"role": "user", "content": question.query}, {"role": "assistant", "content": answer}]
+
+
+def _project_key(identified) -> str:
+    """Group key for an identification result (first project of a multi-project answer)"""
+    if isinstance(identified, list):
+        return identified[0] if identified else "general"
+    return identified or "general"
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class BatchRunner:
+    """
+    Runs MultiSourceAgent over a list of questions with bounded concurrency.
+    
+    Results are appended to the output file as they complete, under a lock,
+    and flushed line by line so an interrupted run can be resumed.
+    """
+    
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        keep_memory: Optional[bool] = None,
+        agent_factory: Callable[[], MultiSourceAgent] = MultiSourceAgent
+    ):
+        config = get_config()
+        self.concurrency = max(1, concurrency or config.batch_concurrency)
+        self.keep_memory = config.batch_keep_memory if keep_memory is None else keep_memory
+        self.agent_factory = agent_factory
+        self._local = threading.local()
+        self._output_lock = threading.Lock()
+    
+    @property
+    def agent(self) -> MultiSourceAgent:
+        """Agent of the current worker thread (agno agents are not thread-safe)"""
+        agent = getattr(self._local, "agent", None)
+        if agent is None:
+            agent = self._local.agent = self.agent_factory()
+        return agent
+    
+    def _identify(self, question: BatchQuestion) -> Tuple[str, float]:
+        if question.project:
+            return question.project, 0.0
+        started = time.perf_counter()
+        try:
+            identified = ProjectIdentifier().identify(question.query).identified_projects
+        except Exception as e:
+            logger.warning(f"Project identification failed for question {question.question_id}: {e}")
+            identified = "general"
+        return _project_key(identified), time.perf_counter() - started
+    
+    def plan(self, questions: List[BatchQuestion], executor: ThreadPoolExecutor) -> Tuple[List[List[BatchQuestion]], Dict[str, Tuple[str, float]]]:
+        """
+        Group questions into ordered units of work.
+        
+        A unit is the list of questions of one chat (a single question unless
+        chat_ids are shared). Units are ordered by project group, groups by
+        first appearance; a chat is grouped by the project of its first question.
+        
+        Returns:
+            Units of work and (project, identification seconds) per question_id
+        """
+        chats: "OrderedDict[str, List[BatchQuestion]]" = OrderedDict()
+        for question in questions:
+            chats.setdefault(_chat_key(question), []).append(question)
+        
+        heads = [chat[0] for chat in chats.values()]
+        identified = dict(zip((q.question_id for q in heads), executor.map(self._identify, heads)))
+        
+        groups: "OrderedDict[str, List[List[BatchQuestion]]]" = OrderedDict()
+        assignments: Dict[str, Tuple[str, float]] = {}
+        for chat in chats.values():
+            project, seconds = identified[chat[0].question_id]
+            groups.setdefault(project, []).append(chat)
+            for question in chat:
+                assignments[question.question_id] = (project, seconds if question is chat[0] else 0.0)
+        
+        logger.info(f"Planned {len(questions)} questions in {len(chats)} chats across {len(groups)} project groups")
+        units = [chat for group in groups.values() for chat in group]
+        return units, assignments
+    
+    def _run_chat(
+        self,
+        chat: List[BatchQuestion],
+        assignments: Dict[str, Tuple[str, float]],
+        group_sizes: Dict[str, int],
+        scheduled_at: float,
+        write: Callable[[BatchQuestionResult], None],
+        history: Optional[List[Dict[str, Any]]] = None
+    ) -> List[BatchQuestionResult]:
+        """
+        Answer the questions of one chat in order.
+        
+        The chat history is built here from the answers so far and sent with
+        every question, so later questions keep their context without a
+        persistent chat memory (the memory only adds turns it has not seen).
+        
+        Args:
+            history: Turns before the first question (its conversation_history
+                and, on resume, the questions already answered)
+        """
+        agent = self.agent
+        chat_id = _chat_key(chat[0])
+        history = list(history if history is not None else chat[0].conversation_history)
+        results = []
+        started = time.perf_counter()
+        queue_time = started - scheduled_at
+        try:
+            for question in chat:
+                project, identification_time = assignments[question.question_id]
+                question_started = time.perf_counter()
+                error = None
+                result = None
+                try:
+                    result = agent.process_query(
+                        user_query=question.query,
+                        user_id=question.user_id,
+                        chat_id=chat_id,
+                        conversation_history=history or None,
+                        last_project_context=project if project != "general" else None
+                    )
+                    if result.confidence_score == 0.0:
+                        error = result.synthesized_content
+                    else:
+                        history.extend(_answered_turns(question, result.synthesized_content))
+                except Exception as e:
+                    logger.error(f"Question {question.question_id} failed: {e}")
+                    error = str(e)
+                
+                outcome = BatchQuestionResult(
+                    question_id=question.question_id,
+                    result=result,
+                    metrics=QuestionMetrics(
+                        project=project,
+                        group_size=group_sizes[project],
+                        identification_time=identification_time,
+                        queue_time=queue_time,
+                        processing_time=time.perf_counter() - question_started,
+                        token_usage=result.token_usage if result else {},
+                        success=error is None
+                    ),
+                    error=error
+                )
+                write(outcome)
+                results.append(outcome)
+                queue_time = 0.0
+        finally:
+            if not self.keep_memory:
+                agent.clear_chat_memory(chat_id)
+        return results
+    
+    def _resumed_histories(self, questions: List[BatchQuestion], done: Set[str], answers: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+        """History of each chat up to its first pending question, from the answers of a previous run"""
+        histories: Dict[str, List[Dict[str, Any]]] = {}
+        started: Set[str] = set()
+        for question in questions:
+            chat_id = _chat_key(question)
+            if chat_id not in histories:
+                histories[chat_id] = list(question.conversation_history)
+            if chat_id in started:
+                continue
+            if question.question_id not in done:
+                started.add(chat_id)
+            elif question.question_id in answers:
+                histories[chat_id].extend(_answered_turns(question, answers[question.question_id]))
+        return histories
+    
+    def run(self, questions_path: str, output_path: str, retry_failed: bool = False) -> BatchRunSummary:
+        """
+        Answer every question of a JSONL file not yet in the output file.
+        
+        Args:
+            questions_path: Input JSONL (one BatchQuestion per line)
+            output_path: Output JSONL (one BatchQuestionResult per line, appended)
+            retry_failed: Also redo questions whose last result was an error
+        
+        Returns:
+            BatchRunSummary for this run
+        """
+        questions = load_questions(questions_path)
+        done = load_checkpoint(output_path, retry_failed)
+        pending = [q for q in questions if q.question_id not in done]
+        histories = self._resumed_histories(questions, done, load_answers(output_path)) if done else {}
+        summary = BatchRunSummary(questions=len(questions), skipped=len(questions) - len(pending), concurrency=self.concurrency)
+        if summary.skipped:
+            logger.info(f"Resuming: {summary.skipped} questions already answered in {output_path}")
+        if not pending:
+            return summary
+        
+        started = time.perf_counter()
+        latencies: List[float] = []
+        with open(output_path, "a", encoding="utf-8") as output, \
+                ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor:
+            
+            def write(outcome: BatchQuestionResult) -> None:
+                line = outcome.json()
+                with self._output_lock:
+                    output.write(line + "\n")
+                    output.flush()
+            
+            units, assignments = self.plan(pending, executor)
+            group_sizes: Dict[str, int] = {}
+            for project, _ in assignments.values():
+                group_sizes[project] = group_sizes.get(project, 0) + 1
+            summary.project_groups = len(group_sizes)
+            
+            scheduled_at = time.perf_counter()
+            futures = [
+                executor.submit(self._run_chat, chat, assignments, group_sizes, scheduled_at, write, histories.get(_chat_key(chat[0])))
+                for chat in units
+            ]
+            for future in as_completed(futures):
+                try:
+                    outcomes = future.result()
+                except Exception as e:
+                    logger.error(f"Batch chat failed: {e}")
+                    continue
+                for outcome in outcomes:
+                    latencies.append(outcome.metrics.processing_time)
+                    if outcome.error:
+                        summary.failed += 1
+                    else:
+                        summary.completed += 1
+        
+        summary.elapsed_time = time.perf_counter() - started
+        answered = summary.completed + summary.failed
+        summary.questions_per_second = answered / summary.elapsed_time if summary.elapsed_time else 0.0
+        summary.latency_p50 = _percentile(latencies, 50)
+        summary.latency_p95 = _percentile(latencies, 95)
+        logger.info(
+            f"Batch finished: {summary.completed} answered, {summary.failed} failed in "
+            f"{summary.elapsed_time:.1f}s ({summary.questions_per_second:.2f} questions/s)"
+        )
+        return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the multi-source agent over a JSONL file of questions")
+    parser.add_argument("questions", help="Input JSONL with one question per line")
+    parser.add_argument("output", help="Output JSONL; existing results are kept and skipped")
+    parser.add_argument("--concurrency", type=int, default=None, help="Questions processed in parallel")
+    parser.add_argument("--retry-failed", action="store_true", help="Redo questions whose last result was an error")
+    parser.add_argument("--keep-memory", action="store_true", help="Keep conversation memory of batch chats")
+    parser.add_argument("--summary", default=None, help="Write the run summary JSON to this path")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO)
+    
+    runner = BatchRunner(concurrency=args.concurrency, keep_memory=args.keep_memory or None)
+    summary = runner.run(args.questions, args.output, retry_failed=args.retry_failed)
+    text = summary.json(indent=2)
+    if args.summary:
+        Path(args.summary).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Offline benchmarks for the Multi-Source RAG System
+
+This package measures retrieval quality and latency without live AWS or Qdrant:
+- Deterministic fake embeddings and stubbed Athena/S3 clients
+- An in-memory Qdrant loaded with a synthetic corpus of configurable size
+- Recall@k, MRR, latency percentiles and peak memory per retrieval tool
+- Ingestion throughput (chunks/s) for cold, unchanged and partially changed runs
+- Memory footprint, latency and recall of the vector storage modes
+- Query embedding latency and throughput per embedding provider
+- Billed input tokens and time-to-first-token with prompt-prefix caching
+
+Run with:
+    python -m agno_multi_source.benchmarks.retrieval --help
+    python -m agno_multi_source.benchmarks.ingestion --help
+    python -m agno_multi_source.benchmarks.storage --help
+    python -m agno_multi_source.benchmarks.embeddings --help
+    python -m agno_multi_source.benchmarks.prompt_cache --help
+"""
+
+from .corpus import SyntheticCorpus, build_corpus, synthetic_source_documents
+from .fakes import FakeEmbeddings, StubAWSClients, offline_environment
+from .metrics import percentile, reciprocal_rank, recall_at_k
+
+__all__ = [
+    "SyntheticCorpus",
+    "build_corpus",
+    "synthetic_source_documents",
+    "FakeEmbeddings",
+    "StubAWSClients",
+    "offline_environment",
+    "percentile",
+    "reciprocal_rank",
+    "recall_at_k",
+]
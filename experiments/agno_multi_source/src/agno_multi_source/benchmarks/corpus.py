@@ -0,0 +1,326 @@
+"""
+Synthetic corpus for the offline retrieval benchmarks
+
+Generates a reproducible catalog of projects plus verbali, MI, wiki and
+project-description documents, together with labelled benchmark queries.
+Each document carries a short key phrase of pseudo-words unique to it, so the
+expected answer of every query is known in advance.
+"""
+
+import random
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, Field
+from qdrant_client import QdrantClient, models
+
+from ..config import Config
+from ..models import IngestionDocument
+
+_CORPUS_NAMESPACE = uuid.UUID("6f1d2a4e-9c0b-4b7e-8a55-2f3c9d7e1b10")
+
+_SYLLABLES = [
+    consonant + vowel
+    for consonant in "bcdfglmnprstvz"
+    for vowel in "aeiou"
+]
+
+# Shared filler vocabulary, so documents are not trivially separable
+_COMMON_WORDS = [
+    "progetto", "riunione", "documento", "sistema", "cliente", "servizio",
+    "installazione", "procedura", "configurazione", "rilascio", "verifica",
+    "ambiente", "utente", "accesso", "server", "database", "report", "modulo",
+    "attivita", "stato", "aggiornamento", "manutenzione", "supporto", "rete",
+]
+
+_WIKI_CATEGORIES = ["processes", "standards", "guidelines", "best_practices", "onboarding"]
+
+
+class SyntheticDocument(BaseModel):
+    """A document to be indexed in one of the collections"""
+    id: str = Field(..., description="Qdrant point id (UUID string)")
+    collection: str = Field(..., description="Collection type, as used by Config.get_collection_name")
+    text: str = Field(..., description="Document text stored as page_content")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Langchain-style metadata payload")
+
+
+class BenchmarkQuery(BaseModel):
+    """A labelled query for one retrieval tool"""
+    tool: str = Field(..., description="Name of the tool under test")
+    arguments: Dict[str, Any] = Field(default_factory=dict, description="Keyword arguments for the tool")
+    relevant_ids: List[str] = Field(..., description="Ids of the expected results")
+
+
+class SyntheticCorpus(BaseModel):
+    """Catalog rows, documents and labelled queries making up a benchmark run"""
+    seed: int
+    catalog: List[Dict[str, Any]] = Field(default_factory=list)
+    documents: List[SyntheticDocument] = Field(default_factory=list)
+    queries: List[BenchmarkQuery] = Field(default_factory=list)
+    
+    def documents_for(self, collection: str) -> List[SyntheticDocument]:
+        """Documents belonging to one collection type"""
+        return [doc for doc in self.documents if doc.collection == collection]
+    
+    def queries_for(self, tool: str) -> List[BenchmarkQuery]:
+        """Queries targeting one tool"""
+        return [query for query in self.queries if query.tool == tool]
+
+
+class _WordGenerator:
+    """Produces unique pronounceable pseudo-words from a seeded RNG"""
+    
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.used = set(_COMMON_WORDS)
+    
+    def word(self) -> str:
+        while True:
+            candidate = "".join(self.rng.choice(_SYLLABLES) for _ in range(self.rng.randint(3, 4)))
+            if candidate not in self.used:
+                self.used.add(candidate)
+                return candidate
+    
+    def words(self, count: int) -> List[str]:
+        return [self.word() for _ in range(count)]
+
+
+def _point_id(collection: str, index: int) -> str:
+    return str(uuid.uuid5(_CORPUS_NAMESPACE, f"{collection}/{index}"))
+
+
+def _document_text(rng: random.Random, key_phrase: Sequence[str], repeats: int = 3, filler: int = 6) -> str:
+    """Title made of the key phrase, followed by the repeated key phrase mixed with filler words"""
+    tokens = list(key_phrase) * repeats + rng.sample(_COMMON_WORDS, filler)
+    rng.shuffle(tokens)
+    return f"{' '.join(key_phrase[:2]).title()}. {' '.join(tokens)}"
+
+
+def build_corpus(
+    num_projects: int = 20,
+    docs_per_project: int = 10,
+    wiki_docs: int = 200,
+    queries_per_tool: int = 50,
+    seed: int = 42
+) -> SyntheticCorpus:
+    """
+    Build a reproducible synthetic corpus.
+    
+    Args:
+        num_projects: Number of catalog projects
+        docs_per_project: Verbali and MI documents generated per project
+        wiki_docs: Number of wiki chunks (not tied to projects)
+        queries_per_tool: Labelled queries generated per tool
+        seed: Random seed; the same seed always yields the same corpus
+    
+    Returns:
+        SyntheticCorpus with catalog rows, documents and queries
+    """
+    rng = random.Random(seed)
+    words = _WordGenerator(rng)
+    corpus = SyntheticCorpus(seed=seed)
+    counters: Dict[str, int] = {}
+    
+    def add_document(collection: str, text: str, metadata: Dict[str, Any]) -> SyntheticDocument:
+        index = counters.get(collection, 0)
+        counters[collection] = index + 1
+        doc_id = _point_id(collection, index)
+        document = SyntheticDocument(
+            id=doc_id,
+            collection=collection,
+            text=text,
+            metadata={**metadata, "doc_id": doc_id}
+        )
+        corpus.documents.append(document)
+        return document
+    
+    projects = []
+    for project_index in range(num_projects):
+        name = "-".join(words.words(2)).upper()
+        description_words = words.words(10)
+        description = " ".join(description_words * 2 + rng.sample(_COMMON_WORDS, 4))
+        contacts = [
+            {"role": role, "name": " ".join(words.words(2)).title()}
+            for role in ("Project Manager", "Service Manager", "Technical Lead")
+        ]
+        corpus.catalog.append({
+            "elemName": name,
+            "elemcode": f"P{project_index:04d}",
+            "descStatus": rng.choice(["Active", "Active", "Active", "Closed"]),
+            "descCustomerService": rng.choice(["Gold", "Silver", "Bronze"]),
+            "descServizio": description,
+            "listContatti": contacts,
+        })
+        
+        desc_doc = add_document("project_desc", description, {"elemName": name, "description": description})
+        
+        verbali_ids = []
+        mi_docs = []
+        for doc_index in range(docs_per_project):
+            date = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00Z"
+            verbale = add_document("verbali", _document_text(rng, words.words(4)), {
+                "project": name,
+                "file_name": f"verbale_{name.lower()}_{doc_index}.docx",
+                "last_modified_time": date,
+                "webViewLink": f"https://docs.example.com/verbali/{name.lower()}/{doc_index}",
+            })
+            verbali_ids.append(verbale.id)
+            
+            key_phrase = words.words(4)
+            mi_doc = add_document("mi", _document_text(rng, key_phrase), {
+                "project": name,
+                "title": " ".join(key_phrase[:2]).title(),
+                "file_name": f"mi_{name.lower()}.xlsx",
+                "sheet_name": f"Sheet{doc_index}",
+                "last_modified_time": date,
+                "webViewLink": f"https://docs.example.com/mi/{name.lower()}",
+            })
+            mi_docs.append((mi_doc, key_phrase))
+        
+        projects.append((name, description_words, desc_doc, verbali_ids, mi_docs))
+    
+    wiki_entries = []
+    for wiki_index in range(wiki_docs):
+        key_phrase = words.words(4)
+        page_title = " ".join(key_phrase[:2]).title()
+        wiki_doc = add_document("wiki", _document_text(rng, key_phrase), {
+            "page_title": page_title,
+            "category": rng.choice(_WIKI_CATEGORIES),
+            "source_filename": f"wiki_{wiki_index // 4}.md",
+            "chunk_number": wiki_index % 4,
+            "total_chunks": 4,
+        })
+        wiki_entries.append((wiki_doc, key_phrase))
+    
+    # Labelled queries
+    for _ in range(queries_per_tool):
+        name, description_words, desc_doc, verbali_ids, mi_docs = rng.choice(projects)
+        
+        shuffled = list(description_words)
+        rng.shuffle(shuffled)
+        corpus.queries.append(BenchmarkQuery(
+            tool="identify_project_from_query",
+            arguments={"user_query": " ".join(shuffled)},
+            relevant_ids=[name]
+        ))
+        corpus.queries.append(BenchmarkQuery(
+            tool="retrieve_verbali_for_project",
+            arguments={"project_name": name},
+            relevant_ids=verbali_ids
+        ))
+        corpus.queries.append(BenchmarkQuery(
+            tool="query_project_details",
+            arguments={"project_name": name},
+            relevant_ids=[name]
+        ))
+        
+        mi_doc, key_phrase = rng.choice(mi_docs)
+        corpus.queries.append(BenchmarkQuery(
+            tool="retrieve_mi_documentation",
+            arguments={"query": " ".join(key_phrase), "project_name": name},
+            relevant_ids=[mi_doc.id]
+        ))
+        
+        if wiki_entries:
+            wiki_doc, key_phrase = rng.choice(wiki_entries)
+            corpus.queries.append(BenchmarkQuery(
+                tool="retrieve_wiki_knowledge",
+                arguments={"query": " ".join(key_phrase)},
+                relevant_ids=[wiki_doc.id]
+            ))
+    
+    return corpus
+
+
+def synthetic_source_documents(
+    count: int = 1000,
+    paragraphs: int = 8,
+    words_per_paragraph: int = 60,
+    seed: int = 42,
+    project_count: int = 20
+) -> List[IngestionDocument]:
+    """
+    Long multi-paragraph documents for ingestion benchmarks.
+    
+    Metadata covers the fields the verbali-style collections expect
+    (project, file_name, last_modified_time, webViewLink).
+    """
+    rng = random.Random(seed)
+    words = _WordGenerator(rng)
+    vocabulary = words.words(2000) + _COMMON_WORDS
+    projects = ["-".join(words.words(2)).upper() for _ in range(project_count)]
+    
+    documents = []
+    for index in range(count):
+        project = rng.choice(projects)
+        text = "\n\n".join(
+            " ".join(rng.choice(vocabulary) for _ in range(words_per_paragraph)) + "."
+            for _ in range(paragraphs)
+        )
+        documents.append(IngestionDocument(
+            source_id=f"synthetic/{index}",
+            text=text,
+            metadata={
+                "project": project,
+                "file_name": f"document_{index}.docx",
+                "last_modified_time": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00Z",
+                "webViewLink": f"https://docs.example.com/{index}",
+            }
+        ))
+    return documents
+
+
+def load_corpus(
+    client: QdrantClient,
+    corpus: SyntheticCorpus,
+    embeddings: Any,
+    config: Config,
+    vector_size: int,
+    batch_size: int = 256,
+    collections: Optional[Sequence[str]] = None
+) -> Dict[str, int]:
+    """
+    Create the collections and upsert the corpus with the langchain payload layout.
+    
+    Args:
+        client: Target Qdrant client (usually in-memory)
+        corpus: Corpus to index
+        embeddings: Embedding model with an embed_documents method
+        config: Configuration used to resolve collection names
+        vector_size: Dimension of the embedding vectors
+        batch_size: Points per upsert request
+        collections: Collection types to load (all if None)
+    
+    Returns:
+        Number of points loaded per collection name
+    """
+    counts: Dict[str, int] = {}
+    collection_types = collections or sorted({doc.collection for doc in corpus.documents})
+    
+    for collection_type in collection_types:
+        collection_name = config.get_collection_name(collection_type)
+        if client.collection_exists(collection_name):
+            client.delete_collection(collection_name)
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
+        )
+        
+        documents = corpus.documents_for(collection_type)
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            vectors = embeddings.embed_documents([doc.text for doc in batch])
+            client.upsert(
+                collection_name=collection_name,
+                points=[
+                    models.PointStruct(
+                        id=doc.id,
+                        vector=vector,
+                        payload={"page_content": doc.text, "metadata": doc.metadata}
+                    )
+                    for doc, vector in zip(batch, vectors)
+                ],
+            )
+        counts[collection_name] = len(documents)
+    
+    return counts
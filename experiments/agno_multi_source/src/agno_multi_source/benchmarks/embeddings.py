@@ -0,0 +1,111 @@
+"""
+Embedding provider latency benchmark
+
+Measures query embedding latency (p50/p95) and document embedding
+throughput for the configured providers, e.g. Bedrock against the local
+ONNX model. Remote providers need valid credentials.
+
+Usage:
+    python -m agno_multi_source.benchmarks.embeddings --provider Local-embeddings --provider Bedrock-embeddings
+"""
+
+import argparse
+import json
+import logging
+import time
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from ..libs.qdrant_clients import QdrantClients
+from .corpus import synthetic_source_documents
+from .metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBenchmarkResult(BaseModel):
+    """Latency and throughput figures for one embedding provider"""
+    provider: str = Field(..., description="EMBEDDING_PROVIDER value")
+    warmup_seconds: float = Field(..., description="Model creation and first inference")
+    query_p50_ms: float = Field(..., description="Median embed_query latency in milliseconds")
+    query_p95_ms: float = Field(..., description="95th percentile embed_query latency in milliseconds")
+    documents_per_second: float = Field(..., description="embed_documents throughput")
+
+
+def run_benchmark(providers: List[str], queries: int = 100, documents: int = 256) -> List[EmbeddingBenchmarkResult]:
+    """
+    Benchmark each provider on the same synthetic texts.
+    
+    Args:
+        providers: Embedding provider names (as accepted by EMBEDDING_PROVIDER)
+        queries: Number of single-query embeddings to time
+        documents: Number of documents embedded in one embed_documents call
+    
+    Returns:
+        One EmbeddingBenchmarkResult per provider
+    """
+    texts = [doc.text for doc in synthetic_source_documents(count=documents, paragraphs=2)]
+    query_texts = [" ".join(text.split()[:12]) for text in texts[:queries]]
+    while len(query_texts) < queries:
+        query_texts.extend(query_texts[:queries - len(query_texts)])
+    
+    qdrant_clients = QdrantClients()
+    results = []
+    for provider in providers:
+        started = time.perf_counter()
+        qdrant_clients.warmup_embeddings(provider)
+        warmup_seconds = time.perf_counter() - started
+        embeddings = qdrant_clients.get_embedding_model(provider)
+        
+        latencies = []
+        for query in query_texts:
+            started = time.perf_counter()
+            embeddings.embed_query(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+        
+        started = time.perf_counter()
+        embeddings.embed_documents(texts)
+        documents_seconds = time.perf_counter() - started
+        
+        results.append(EmbeddingBenchmarkResult(
+            provider=provider,
+            warmup_seconds=warmup_seconds,
+            query_p50_ms=percentile(latencies, 50),
+            query_p95_ms=percentile(latencies, 95),
+            documents_per_second=len(texts) / documents_seconds if documents_seconds else 0.0
+        ))
+    return results
+
+
+def format_results(results: List[EmbeddingBenchmarkResult]) -> str:
+    """Render results as a fixed-width table"""
+    header = f"{'provider':<20} {'warmup s':>9} {'query p50 ms':>13} {'query p95 ms':>13} {'docs/s':>9}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r.provider:<20} {r.warmup_seconds:>9.2f} {r.query_p50_ms:>13.2f} "
+            f"{r.query_p95_ms:>13.2f} {r.documents_per_second:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Embedding provider latency benchmark")
+    parser.add_argument("--provider", action="append", dest="providers", help="Provider to benchmark (repeatable)")
+    parser.add_argument("--queries", type=int, default=100, help="Single-query embeddings to time")
+    parser.add_argument("--documents", type=int, default=256, help="Documents per embed_documents call")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    results = run_benchmark(args.providers or ["Local-embeddings"], args.queries, args.documents)
+    if args.json:
+        print(json.dumps([r.dict() for r in results], indent=2))
+    else:
+        print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Offline stand-ins for the external services used by the retrieval tools
+
+Provides a deterministic hashing embedder, an AWSClients stub serving the
+project catalog from memory (S3) and answering simple catalog lookups (Athena),
+and a context manager that swaps them - together with an in-memory Qdrant -
+into the global client singletons the tools resolve at call time.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from qdrant_client import QdrantClient
+
+from ..libs.aws_clients import S3_PART_SIZE, AWSClients
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_WHERE_PATTERN = re.compile(r"WHERE\s+(\w+)\s*=\s*'((?:[^']|'')*)'", re.IGNORECASE)
+_SELECT_PATTERN = re.compile(r"SELECT\s+(.*?)\s+FROM", re.IGNORECASE | re.DOTALL)
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embedder based on feature hashing.
+    
+    Every token is hashed to a signed bucket, so texts sharing many tokens get
+    a high cosine similarity. Results are stable across processes and machines,
+    which makes recall numbers reproducible without calling Bedrock or OpenAI.
+    """
+    
+    def __init__(self, dimension: int = 256, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency  # Simulated seconds per request, e.g. to model Bedrock round-trips
+    
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        for token in _TOKEN_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        
+        norm = math.sqrt(sum(value * value for value in vector))
+        if norm == 0:
+            return vector
+        return [value / norm for value in vector]
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+
+class StubAWSClients(AWSClients):
+    """
+    AWSClients stand-in that never touches the network.
+    
+    S3 objects live in a dict keyed by (bucket, key). Athena queries are run
+    against the in-memory catalog rows and support the single-column equality
+    lookups issued by the Athena tools.
+    """
+    
+    def __init__(self, catalog_rows: Optional[List[Dict[str, Any]]] = None):
+        super().__init__()
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+        self.catalog_rows: List[Dict[str, Any]] = []
+        self._athena_results: Dict[str, dict] = {}
+        if catalog_rows is not None:
+            self.set_catalog(catalog_rows)
+    
+    def set_catalog(self, catalog_rows: List[Dict[str, Any]]) -> None:
+        """Serve catalog rows both from the configured S3 key and from Athena"""
+        self.catalog_rows = list(catalog_rows)
+        self.put_s3_object(
+            self.config.catalog_s3_bucket,
+            self.config.catalog_s3_key,
+            json.dumps(self.catalog_rows).encode("utf-8")
+        )
+    
+    def put_s3_object(self, bucket: str, key: str, body: bytes) -> None:
+        """Store an object in the in-memory bucket"""
+        self.objects[(bucket, key)] = body
+    
+    def head_s3_object(self, bucket: str, key: str) -> dict:
+        body = self._get_body(bucket, key)
+        return {
+            "ContentLength": len(body),
+            "ETag": f'"{hashlib.md5(body).hexdigest()}"'
+        }
+    
+    def read_s3_range(self, bucket: str, key: str, start: int, end: int, if_match: Optional[str] = None) -> bytes:
+        return self._get_body(bucket, key)[start:end + 1]
+    
+    def download_s3_object(
+        self,
+        bucket: str,
+        key: str,
+        part_size: int = S3_PART_SIZE,
+        max_workers: Optional[int] = None
+    ) -> bytes:
+        return self._get_body(bucket, key)
+    
+    def read_s3_object(self, bucket: str, key: str, use_cache: bool = False) -> bytes:
+        return self._get_body(bucket, key)
+    
+    def _get_body(self, bucket: str, key: str) -> bytes:
+        try:
+            return self.objects[(bucket, key)]
+        except KeyError:
+            raise KeyError(f"No such object: s3://{bucket}/{key}") from None
+    
+    def start_athena_query(self, query: str, database: str, output_location: str) -> Optional[str]:
+        rows = self.catalog_rows
+        where = _WHERE_PATTERN.search(query)
+        if where:
+            column, value = where.group(1).lower(), where.group(2).replace("''", "'")
+            rows = [
+                row for row in rows
+                if str(next((v for k, v in row.items() if k.lower() == column), "")) == value
+            ]
+        
+        select = _SELECT_PATTERN.search(query)
+        columns = [c.strip() for c in select.group(1).split(",")] if select else ["*"]
+        if columns == ["*"]:
+            columns = list(self.catalog_rows[0].keys()) if self.catalog_rows else []
+        
+        query_execution_id = str(uuid.uuid4())
+        self._athena_results[query_execution_id] = _to_athena_result_set(rows, columns)
+        return query_execution_id
+    
+    def get_athena_query_status(self, query_execution_id: str) -> Optional[str]:
+        return "SUCCEEDED" if query_execution_id in self._athena_results else None
+    
+    def get_athena_query_results(self, query_execution_id: str) -> Optional[dict]:
+        return self._athena_results.pop(query_execution_id, None)
+
+
+def _to_athena_result_set(rows: List[Dict[str, Any]], columns: List[str]) -> dict:
+    """Render rows in the shape returned by athena.get_query_results"""
+    def cell(value: Any) -> dict:
+        if value is None:
+            return {}
+        if not isinstance(value, str):
+            value = json.dumps(value)
+        return {"VarCharValue": value}
+    
+    result_rows = [{"Data": [{"VarCharValue": column} for column in columns]}]
+    for row in rows:
+        result_rows.append({"Data": [cell(row.get(column)) for column in columns]})
+    return {"ResultSet": {"Rows": result_rows}}
+
+
+class SerializedClient:
+    """Proxy that runs every method call of a client under one lock"""
+    
+    def __init__(self, client: Any):
+        self._client = client
+        self._lock = threading.RLock()
+    
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+        
+        def call(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+        return call
+
+
+@contextmanager
+def offline_environment(
+    embedding_dimension: int = 256,
+    catalog_rows: Optional[List[Dict[str, Any]]] = None,
+    embedding_latency: float = 0.0
+) -> Iterator[Dict[str, Any]]:
+    """
+    Swap the global AWS, Qdrant, project manager, reranking and fact sheet
+    singletons for offline versions backed by an in-memory Qdrant, an
+    in-memory fact sheet store and a FakeEmbeddings model.
+    
+    The previous singletons are restored on exit.
+    
+    Yields:
+        Dict with the "qdrant_clients", "aws_clients" and "embeddings" in use
+    """
+    from ..libs import aws_clients, fact_sheets, project_manager, qdrant_clients, reranker
+    
+    saved = (
+        aws_clients._aws_clients_instance,
+        qdrant_clients._qdrant_clients_instance,
+        project_manager._project_manager_instance,
+        reranker._reranking_stage_instance,
+        fact_sheets._fact_sheet_store_instance,
+    )
+    
+    embeddings = FakeEmbeddings(embedding_dimension, embedding_latency)
+    stub_aws = StubAWSClients(catalog_rows)
+    offline_qdrant = qdrant_clients.QdrantClients()
+    offline_qdrant._client = QdrantClient(":memory:")
+    # Local mode is not thread-safe; the tools and the ingestion pipeline call it from worker threads
+    offline_qdrant._client._client = SerializedClient(offline_qdrant._client._client)
+    for provider in ("Bedrock-embeddings", "OpenAI-embeddings", offline_qdrant.config.embedding_provider):
+        offline_qdrant._embedding_models[provider] = embeddings
+    
+    aws_clients._aws_clients_instance = stub_aws
+    qdrant_clients._qdrant_clients_instance = offline_qdrant
+    project_manager._project_manager_instance = None  # Rebuilt lazily against the stub
+    reranker._reranking_stage_instance = None
+    fact_sheets._fact_sheet_store_instance = fact_sheets.FactSheetStore(":memory:")
+    
+    logger.info(f"Offline environment ready (embedding dimension {embedding_dimension})")
+    try:
+        yield {
+            "qdrant_clients": offline_qdrant,
+            "aws_clients": stub_aws,
+            "embeddings": embeddings,
+        }
+    finally:
+        (
+            aws_clients._aws_clients_instance,
+            qdrant_clients._qdrant_clients_instance,
+            project_manager._project_manager_instance,
+            reranker._reranking_stage_instance,
+            fact_sheets._fact_sheet_store_instance,
+        ) = saved
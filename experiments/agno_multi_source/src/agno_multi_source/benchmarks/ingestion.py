@@ -0,0 +1,141 @@
+"""
+Ingestion throughput benchmark
+
+Runs the IngestionPipeline against an in-memory Qdrant with the fake embedder
+(optionally with simulated per-request latency) and reports chunks/s for:
+- a cold run into an empty collection
+- a re-run with no changes (every document skipped by content hash)
+- a re-run with a fraction of the documents modified
+
+Usage:
+    python -m agno_multi_source.benchmarks.ingestion --documents 2000 --embedding-latency 0.05
+"""
+
+import argparse
+import json
+import logging
+import random
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from ..config import get_config
+from ..libs.ingestion import IngestionPipeline
+from ..models import IngestionDocument, IngestionStats
+from .corpus import synthetic_source_documents
+from .fakes import offline_environment
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionRunResult(BaseModel):
+    """Throughput figures for one ingestion pass"""
+    run: str = Field(..., description="Name of the pass")
+    stats: IngestionStats = Field(..., description="Pipeline counters")
+    chunks_per_second: float = Field(..., description="Upserted chunks per second")
+
+
+def _modify(documents: List[IngestionDocument], fraction: float, seed: int) -> List[IngestionDocument]:
+    """Copy of the documents with a random fraction of their texts changed"""
+    rng = random.Random(seed)
+    modified = []
+    for document in documents:
+        if rng.random() < fraction:
+            document = document.copy(update={"text": document.text + "\n\nRevisione aggiornata."})
+        modified.append(document)
+    return modified
+
+
+def run_benchmark(
+    documents: List[IngestionDocument],
+    embedding_dimension: int = 256,
+    embedding_latency: float = 0.0,
+    modified_fraction: float = 0.1,
+    seed: int = 42,
+    **pipeline_kwargs
+) -> List[IngestionRunResult]:
+    """
+    Ingest the documents three times and report throughput for each pass.
+    
+    Args:
+        documents: Documents to ingest
+        embedding_dimension: Dimension of the fake embeddings
+        embedding_latency: Simulated seconds per embedding request
+        modified_fraction: Fraction of documents changed before the last pass
+        seed: Seed used to pick the modified documents
+        **pipeline_kwargs: Overrides for IngestionPipeline (batch sizes, concurrency)
+    
+    Returns:
+        One IngestionRunResult per pass
+    """
+    config = get_config()
+    collection_config = config.get_agent_config().collections["verbali"]
+    
+    with offline_environment(embedding_dimension, embedding_latency=embedding_latency) as env:
+        pipeline = IngestionPipeline(collection_config, qdrant_clients=env["qdrant_clients"], **pipeline_kwargs)
+        
+        passes = [
+            ("cold", documents),
+            ("unchanged", documents),
+            (f"{modified_fraction:.0%} modified", _modify(documents, modified_fraction, seed)),
+        ]
+        results = []
+        for name, batch in passes:
+            stats = pipeline.ingest(batch)
+            results.append(IngestionRunResult(run=name, stats=stats, chunks_per_second=stats.chunks_per_second))
+        return results
+
+
+def format_results(results: List[IngestionRunResult]) -> str:
+    """Render results as a fixed-width table"""
+    header = f"{'run':<14} {'docs':>6} {'skipped':>8} {'chunks':>8} {'deleted':>8} {'failed':>7} {'seconds':>8} {'chunks/s':>10}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        s = r.stats
+        lines.append(
+            f"{r.run:<14} {s.documents_seen:>6} {s.documents_skipped:>8} {s.chunks_upserted:>8} "
+            f"{s.chunks_deleted:>8} {s.failed_batches:>7} {s.elapsed_time:>8.2f} {r.chunks_per_second:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingestion throughput benchmark")
+    parser.add_argument("--documents", type=int, default=1000, help="Number of synthetic documents")
+    parser.add_argument("--paragraphs", type=int, default=8, help="Paragraphs per document")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Characters per chunk")
+    parser.add_argument("--embedding-batch-size", type=int, default=None, help="Texts per embedding request")
+    parser.add_argument("--embedding-concurrency", type=int, default=None, help="Embedding requests in flight")
+    parser.add_argument("--upsert-batch-size", type=int, default=None, help="Points per upsert request")
+    parser.add_argument("--upsert-parallelism", type=int, default=None, help="Upsert requests in flight")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Simulated seconds per embedding request")
+    parser.add_argument("--dimension", type=int, default=256, help="Fake embedding dimension")
+    parser.add_argument("--modified-fraction", type=float, default=0.1, help="Documents changed before the last pass")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    documents = synthetic_source_documents(count=args.documents, paragraphs=args.paragraphs, seed=args.seed)
+    results = run_benchmark(
+        documents,
+        embedding_dimension=args.dimension,
+        embedding_latency=args.embedding_latency,
+        modified_fraction=args.modified_fraction,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        embedding_batch_size=args.embedding_batch_size,
+        embedding_concurrency=args.embedding_concurrency,
+        upsert_batch_size=args.upsert_batch_size,
+        upsert_parallelism=args.upsert_parallelism
+    )
+    
+    if args.json:
+        print(json.dumps([r.dict() for r in results], indent=2))
+    else:
+        print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Retrieval metrics for the offline benchmarks
+
+Pure-Python implementations so results are comparable across environments.
+"""
+
+import math
+from typing import Iterable, List, Sequence, Set
+
+
+def recall_at_k(retrieved_ids: Sequence[str], relevant_ids: Set[str], k: int) -> float:
+    """Fraction of relevant ids found in the first k retrieved ids"""
+    if not relevant_ids:
+        return 0.0
+    hits = len(set(retrieved_ids[:k]) & relevant_ids)
+    return hits / min(len(relevant_ids), k)
+
+
+def reciprocal_rank(retrieved_ids: Sequence[str], relevant_ids: Set[str]) -> float:
+    """1 / rank of the first relevant id, or 0 if none was retrieved"""
+    for rank, doc_id in enumerate(retrieved_ids, 1):
+        if doc_id in relevant_ids:
+            return 1.0 / rank
+    return 0.0
+
+
+def percentile(values: Iterable[float], p: float) -> float:
+    """Linearly interpolated percentile (p in [0, 100]) of a list of values"""
+    ordered: List[float] = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * p / 100.0
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def mean(values: Iterable[float]) -> float:
+    """Arithmetic mean, 0 for no values"""
+    values = list(values)
+    return sum(values) / len(values) if values else 0.0
@@ -0,0 +1,340 @@
+"""
+Prompt-prefix caching benchmark
+
+Replays synthetic multi-turn chats against a stubbed model client that
+mimics the provider-side prompt cache: prefixes ending at a cache breakpoint
+are stored for a TTL, later requests starting with a stored prefix read it
+at a discount, and time-to-first-token grows with the uncached input only.
+Request bodies are built by the agent's own model (build_agent_model with
+PROMPT_CACHING on) and carry the history as the agent sends it (bounded chat
+memory), so only the breakpoints and tokens the agent sends are measured.
+Billed input tokens and simulated TTFT are compared with caching on and off,
+with and without the project fact sheet in the system prompt.
+
+Usage:
+    python -m agno_multi_source.benchmarks.prompt_cache --chats 20 --turns 6
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import logging
+import math
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from ..agent import AGENT_TOOLS, SYSTEM_PROMPT
+from ..config import get_config
+from ..libs.conversation_memory import ConversationMemoryStore
+from ..libs.prompt_cache import build_agent_model, format_chat_prefix
+from ..models import ConversationMemory
+from .corpus import synthetic_source_documents
+from .metrics import mean, percentile
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)"""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def _tool_definitions() -> List[Dict[str, Any]]:
+    """Tool definitions of the agent, as agno passes them to the model"""
+    definitions = []
+    for tool in AGENT_TOOLS:
+        function = copy.deepcopy(tool)
+        function.process_entrypoint()
+        definitions.append({"type": "function", "function": function.to_dict()})
+    return definitions
+
+
+def _agent_model(caching: bool) -> Any:
+    """
+    Bedrock Claude model formatting the requests of one layout.
+    
+    With caching, this is the model the agent gets with PROMPT_CACHING on;
+    without it, the same request format carries no cache breakpoints.
+    """
+    from agno.models.aws import Claude
+    
+    config = get_config()
+    if not caching:
+        return Claude(id=config.model_id, aws_region=config.aws_region)
+    enabled = config.prompt_caching
+    config.prompt_caching = True
+    try:
+        model = build_agent_model(config.model_id, config.temperature, config.max_tokens)
+    finally:
+        config.prompt_caching = enabled
+    if not isinstance(model, Claude):
+        raise RuntimeError(f"Prompt caching needs an Anthropic model id, got {config.model_id}")
+    return model
+
+
+def build_request(model: Any, system_prompt: str, tools: List[Dict[str, Any]], messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Request body with the model's tools and system blocks, followed by the conversation"""
+    request = model._prepare_request_kwargs(system_prompt, tools=copy.deepcopy(tools))
+    request["messages"] = [
+        {"role": message["role"], "content": [{"type": "text", "text": message["content"]}]}
+        for message in messages
+    ]
+    return request
+
+
+class StubUsage(BaseModel):
+    """Token usage of one stubbed model call, as reported by the Messages API"""
+    input_tokens: int = Field(0, description="Uncached input tokens")
+    cache_creation_input_tokens: int = Field(0, description="Input tokens written to the cache")
+    cache_read_input_tokens: int = Field(0, description="Input tokens read from the cache")
+    output_tokens: int = Field(0, description="Generated tokens")
+
+
+class StubModelClient:
+    """
+    Model client stand-in with Anthropic-style prompt caching.
+    
+    Requests are split into blocks in processing order (tools, system,
+    messages). A block with cache_control marks a breakpoint where the prefix
+    is written to the cache; the longest cached prefix ending at any block
+    boundary is read from it. Time is simulated, nothing sleeps.
+    """
+    
+    def __init__(
+        self,
+        min_cacheable_tokens: int = 1024,
+        cache_ttl: float = 300.0,
+        write_multiplier: float = 1.25,
+        read_multiplier: float = 0.1,
+        base_latency: float = 0.25,
+        prefill_seconds_per_1k: float = 0.12,
+        cached_seconds_per_1k: float = 0.01
+    ):
+        self.min_cacheable_tokens = min_cacheable_tokens
+        self.cache_ttl = cache_ttl
+        self.write_multiplier = write_multiplier
+        self.read_multiplier = read_multiplier
+        self.base_latency = base_latency
+        self.prefill_seconds_per_1k = prefill_seconds_per_1k
+        self.cached_seconds_per_1k = cached_seconds_per_1k
+        self.clock = 0.0
+        self._cache: Dict[str, float] = {}
+    
+    @staticmethod
+    def _blocks(request: Dict[str, Any]) -> List[Tuple[str, bool]]:
+        blocks = []
+        for tool in request.get("tools", []):
+            blocks.append((json.dumps({k: v for k, v in tool.items() if k != "cache_control"}, sort_keys=True), "cache_control" in tool))
+        for block in request.get("system", []):
+            blocks.append((block["text"], "cache_control" in block))
+        for message in request.get("messages", []):
+            for block in message["content"]:
+                blocks.append((f"{message['role']}:{block.get('text', '')}", "cache_control" in block))
+        return blocks
+    
+    def invoke(self, request: Dict[str, Any], output_tokens: int = 200) -> Tuple[StubUsage, float]:
+        """
+        Process one request.
+        
+        Returns:
+            Usage of the call and its simulated time-to-first-token in seconds
+        """
+        digest = hashlib.sha256()
+        total = 0
+        prefixes: List[Tuple[str, int, bool]] = []
+        for text, is_breakpoint in self._blocks(request):
+            digest.update(text.encode("utf-8"))
+            total += estimate_tokens(text)
+            prefixes.append((digest.hexdigest(), total, is_breakpoint and total >= self.min_cacheable_tokens))
+        
+        # Expire entries, then look for the longest cached prefix at any block boundary
+        self._cache = {key: stored for key, stored in self._cache.items() if self.clock - stored < self.cache_ttl}
+        cached = 0
+        for key, tokens, _ in prefixes:
+            if key in self._cache:
+                cached = tokens
+                self._cache[key] = self.clock
+        written = 0
+        for key, tokens, is_breakpoint in prefixes:
+            if is_breakpoint and tokens > cached:
+                written = tokens - cached
+                self._cache[key] = self.clock
+        
+        usage = StubUsage(
+            input_tokens=total - cached - written,
+            cache_creation_input_tokens=written,
+            cache_read_input_tokens=cached,
+            output_tokens=output_tokens
+        )
+        ttft = (
+            self.base_latency
+            + (total - cached) / 1000 * self.prefill_seconds_per_1k
+            + cached / 1000 * self.cached_seconds_per_1k
+        )
+        return usage, ttft
+    
+    def billed_input_tokens(self, usage: StubUsage) -> float:
+        """Input tokens weighted by the cache write/read price multipliers"""
+        return (
+            usage.input_tokens
+            + usage.cache_creation_input_tokens * self.write_multiplier
+            + usage.cache_read_input_tokens * self.read_multiplier
+        )
+
+
+class PromptCacheBenchmarkResult(BaseModel):
+    """Billing and latency figures for one request layout"""
+    mode: str = Field(..., description="Layout name")
+    requests: int = Field(..., description="Model calls made")
+    input_tokens: int = Field(..., description="Total prompt tokens sent")
+    billed_input_tokens: float = Field(..., description="Input tokens weighted by cache pricing")
+    cache_read_ratio: float = Field(..., description="Share of prompt tokens read from the cache")
+    ttft_mean_ms: float = Field(..., description="Mean simulated time-to-first-token")
+    ttft_p95_ms: float = Field(..., description="95th percentile simulated time-to-first-token")
+
+
+def _synthetic_chats(chats: int, turns: int, projects: int, seed: int) -> Tuple[Dict[str, str], List[Tuple[str, List[Tuple[str, str]]]]]:
+    """Fact sheets per project and (project, [(question, answer)]) per chat"""
+    rng = random.Random(seed)
+    documents = synthetic_source_documents(count=chats * turns * 2 + projects, paragraphs=1, words_per_paragraph=90, seed=seed)
+    fact_sheets = {}
+    for index in range(projects):
+        document = documents[index]
+        fact_sheets[f"PROJECT-{index}"] = format_chat_prefix(
+            f"Project details for: PROJECT-{index}\n" + "=" * 50 + "\n" + (document.text + "\n") * 8
+        )
+    texts = [doc.text for doc in documents[projects:]]
+    conversations = []
+    for chat in range(chats):
+        project = f"PROJECT-{rng.randrange(projects)}"
+        exchanges = []
+        for turn in range(turns):
+            offset = (chat * turns + turn) * 2
+            exchanges.append((" ".join(texts[offset].split()[:25]) + "?", texts[offset + 1]))
+        conversations.append((project, exchanges))
+    return fact_sheets, conversations
+
+
+def run_benchmark(
+    chats: int = 20,
+    turns: int = 6,
+    projects: int = 5,
+    interleave: bool = True,
+    seconds_between_turns: float = 5.0,
+    seed: int = 42
+) -> List[PromptCacheBenchmarkResult]:
+    """
+    Replay the same chats with each request layout.
+    
+    Args:
+        chats: Number of chats
+        turns: Turns per chat
+        projects: Distinct projects the chats are about
+        interleave: Alternate turns between chats (as concurrent users would)
+        seconds_between_turns: Simulated time between two requests
+        seed: Random seed for the synthetic chats
+    
+    Returns:
+        One PromptCacheBenchmarkResult per layout
+    """
+    fact_sheets, conversations = _synthetic_chats(chats, turns, projects, seed)
+    order = [(chat, turn) for turn in range(turns) for chat in range(chats)] if interleave else \
+        [(chat, turn) for chat in range(chats) for turn in range(turns)]
+    
+    modes = {
+        "uncached": (False, True),
+        "cached": (True, False),
+        "cached+fact_sheet": (True, True),
+    }
+    config = get_config()
+    tools = _tool_definitions()
+    results = []
+    for mode, (enabled, with_fact_sheet) in modes.items():
+        model = _agent_model(enabled)
+        client = StubModelClient()
+        # History is sent the way the agent sends it: the bounded chat memory, then the question
+        memory_store = ConversationMemoryStore(
+            recent_turns=config.memory_recent_turns,
+            turn_max_chars=config.memory_turn_max_chars,
+            summary_max_chars=config.memory_summary_max_chars
+        )
+        memories = {chat: ConversationMemory(chat_id=f"chat-{chat}") for chat in range(chats)}
+        input_tokens = 0
+        billed = 0.0
+        cache_read = 0
+        ttfts = []
+        for chat, turn in order:
+            project, exchanges = conversations[chat]
+            question, answer = exchanges[turn]
+            memory = memories[chat]
+            messages = memory_store.build_messages(memory, question)
+            # Without the fact sheet in the prefix it is fetched by a tool in the first turn;
+            # tool results are part of that run only, the memory keeps the question and answer
+            if not with_fact_sheet and turn == 0:
+                messages[-1]["content"] += f"\n\n{fact_sheets[project]}"
+            # The agent appends the chat's fact sheet to the system prompt (see MultiSourceAgent._create_agent)
+            system_prompt = f"{SYSTEM_PROMPT}\n{fact_sheets[project]}\n" if with_fact_sheet else SYSTEM_PROMPT
+            request = build_request(model, system_prompt, tools, messages)
+            usage, ttft = client.invoke(request, output_tokens=estimate_tokens(answer))
+            client.clock += seconds_between_turns
+            
+            prompt_tokens = usage.input_tokens + usage.cache_creation_input_tokens + usage.cache_read_input_tokens
+            input_tokens += prompt_tokens
+            billed += client.billed_input_tokens(usage)
+            cache_read += usage.cache_read_input_tokens
+            ttfts.append(ttft * 1000)
+            memory_store.add_turn(memory, "user", question)
+            memory_store.add_turn(memory, "assistant", answer)
+            memory.last_project_context = project
+        
+        results.append(PromptCacheBenchmarkResult(
+            mode=mode,
+            requests=len(order),
+            input_tokens=input_tokens,
+            billed_input_tokens=billed,
+            cache_read_ratio=cache_read / input_tokens if input_tokens else 0.0,
+            ttft_mean_ms=mean(ttfts),
+            ttft_p95_ms=percentile(ttfts, 95)
+        ))
+    return results
+
+
+def format_results(results: List[PromptCacheBenchmarkResult]) -> str:
+    """Render results as a fixed-width table"""
+    header = (
+        f"{'mode':<18} {'requests':>8} {'input tok':>10} {'billed tok':>11} "
+        f"{'cache read':>10} {'ttft ms':>8} {'ttft p95':>9}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r.mode:<18} {r.requests:>8} {r.input_tokens:>10} {r.billed_input_tokens:>11.0f} "
+            f"{r.cache_read_ratio:>10.1%} {r.ttft_mean_ms:>8.0f} {r.ttft_p95_ms:>9.0f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Prompt-prefix caching benchmark")
+    parser.add_argument("--chats", type=int, default=20, help="Number of chats")
+    parser.add_argument("--turns", type=int, default=6, help="Turns per chat")
+    parser.add_argument("--projects", type=int, default=5, help="Distinct projects")
+    parser.add_argument("--sequential", action="store_true", help="Run each chat to completion before the next")
+    parser.add_argument("--gap", type=float, default=5.0, help="Simulated seconds between requests")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    results = run_benchmark(args.chats, args.turns, args.projects, not args.sequential, args.gap)
+    if args.json:
+        print(json.dumps([r.dict() for r in results], indent=2))
+    else:
+        print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Offline retrieval evaluation and latency benchmark
+
+Loads a synthetic corpus into an in-memory Qdrant, swaps in stubbed AWS
+clients and a deterministic embedder, then runs the labelled queries through
+the real retrieval tools and reports recall@k, MRR, latency percentiles and
+peak traced memory per tool.
+
+Usage:
+    python -m agno_multi_source.benchmarks.retrieval --projects 50 --docs-per-project 20 --k 5
+"""
+
+import argparse
+import gc
+import json
+import logging
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from ..config import get_config
+from .corpus import BenchmarkQuery, SyntheticCorpus, build_corpus, load_corpus
+from .fakes import offline_environment
+from .metrics import mean, percentile, recall_at_k, reciprocal_rank
+
+logger = logging.getLogger(__name__)
+
+
+class ToolBenchmarkResult(BaseModel):
+    """Quality and performance figures for one tool"""
+    tool: str = Field(..., description="Tool name")
+    queries: int = Field(..., description="Number of queries evaluated")
+    recall_at_k: float = Field(..., description="Mean recall@k")
+    mrr: float = Field(..., description="Mean reciprocal rank")
+    p50_ms: float = Field(..., description="Median latency in milliseconds")
+    p95_ms: float = Field(..., description="95th percentile latency in milliseconds")
+    peak_memory_kib: float = Field(..., description="Peak traced allocation during one pass, in KiB")
+    errors: int = Field(default=0, description="Queries that raised an exception")
+
+
+def _entrypoint(tool_fn: Callable) -> Callable:
+    """The plain function behind an agno tool (or the function itself)"""
+    return getattr(tool_fn, "entrypoint", None) or tool_fn
+
+
+def _document_ids(result: Dict) -> List[str]:
+    return [str(doc.get("id")) for doc in result.get("documents", [])]
+
+
+def _verbali_ids(result: Any) -> List[str]:
+    return [doc.metadata.get("doc_id", "") for doc in result.documents]
+
+
+def _identified_projects(result: Any) -> List[str]:
+    identified = result.identified_projects
+    return [identified] if isinstance(identified, str) else list(identified)
+
+
+def _athena_projects(result: Any) -> List[str]:
+    return [row.get("elemName", "") for row in result.results] if result.success else []
+
+
+def _tool_registry() -> Dict[str, tuple]:
+    """Tool name -> (callable, extractor of ranked ids from its result)"""
+    from ..tools.athena_tools import query_project_details
+    from ..tools.mi_tools import retrieve_mi_documentation
+    from ..tools.project_tools import identify_project_from_query
+    from ..tools.verbali_tools import retrieve_verbali_for_project
+    from ..tools.wiki_tools import retrieve_wiki_knowledge
+    
+    return {
+        "retrieve_mi_documentation": (_entrypoint(retrieve_mi_documentation), _document_ids),
+        "retrieve_wiki_knowledge": (_entrypoint(retrieve_wiki_knowledge), _document_ids),
+        "retrieve_verbali_for_project": (_entrypoint(retrieve_verbali_for_project), _verbali_ids),
+        "identify_project_from_query": (_entrypoint(identify_project_from_query), _identified_projects),
+        "query_project_details": (_entrypoint(query_project_details), _athena_projects),
+    }
+
+
+def benchmark_tool(
+    tool_name: str,
+    tool_fn: Callable,
+    extract_ids: Callable[[Any], List[str]],
+    queries: List[BenchmarkQuery],
+    k: int,
+    repeats: int = 1
+) -> ToolBenchmarkResult:
+    """
+    Evaluate one tool over its labelled queries.
+    
+    Latency is measured without tracing; memory is measured in a separate
+    traced pass so tracemalloc overhead does not skew the percentiles.
+    """
+    if queries:
+        tool_fn(**queries[0].arguments)  # Warm up lazy clients and caches
+    
+    latencies = []
+    recalls = []
+    reciprocal_ranks = []
+    errors = 0
+    
+    for repeat in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            try:
+                result = tool_fn(**query.arguments)
+            except Exception as e:
+                logger.error(f"{tool_name} failed on {query.arguments}: {e}")
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            
+            if repeat == 0:
+                retrieved = extract_ids(result)
+                relevant = set(query.relevant_ids)
+                recalls.append(recall_at_k(retrieved, relevant, k))
+                reciprocal_ranks.append(reciprocal_rank(retrieved, relevant))
+    
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for query in queries:
+            try:
+                tool_fn(**query.arguments)
+            except Exception:
+                pass
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    return ToolBenchmarkResult(
+        tool=tool_name,
+        queries=len(queries),
+        recall_at_k=mean(recalls),
+        mrr=mean(reciprocal_ranks),
+        p50_ms=percentile(latencies, 50),
+        p95_ms=percentile(latencies, 95),
+        peak_memory_kib=peak / 1024,
+        errors=errors
+    )
+
+
+def run_benchmark(
+    corpus: Optional[SyntheticCorpus] = None,
+    k: int = 5,
+    repeats: int = 1,
+    embedding_dimension: int = 256,
+    tools: Optional[List[str]] = None
+) -> List[ToolBenchmarkResult]:
+    """
+    Run the retrieval benchmark fully offline.
+    
+    Args:
+        corpus: Corpus to evaluate on (a default-sized one is built if None)
+        k: Cut-off for recall@k
+        repeats: Timed passes over the query set
+        embedding_dimension: Dimension of the fake embeddings
+        tools: Subset of tool names to run (all if None)
+    
+    Returns:
+        One ToolBenchmarkResult per tool
+    """
+    corpus = corpus or build_corpus()
+    config = get_config()
+    
+    with offline_environment(embedding_dimension, corpus.catalog) as env:
+        load_started = time.perf_counter()
+        counts = load_corpus(
+            client=env["qdrant_clients"].client,
+            corpus=corpus,
+            embeddings=env["embeddings"],
+            config=config,
+            vector_size=embedding_dimension
+        )
+        logger.info(f"Loaded {counts} in {time.perf_counter() - load_started:.2f}s")
+        
+        results = []
+        for tool_name, (tool_fn, extract_ids) in _tool_registry().items():
+            if tools and tool_name not in tools:
+                continue
+            results.append(benchmark_tool(
+                tool_name, tool_fn, extract_ids, corpus.queries_for(tool_name), k, repeats
+            ))
+        return results
+
+
+def format_results(results: List[ToolBenchmarkResult], k: int) -> str:
+    """Render results as a fixed-width table"""
+    header = f"{'tool':<30} {'n':>5} {f'recall@{k}':>9} {'MRR':>6} {'p50 ms':>8} {'p95 ms':>8} {'peak KiB':>10} {'err':>4}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r.tool:<30} {r.queries:>5} {r.recall_at_k:>9.3f} {r.mrr:>6.3f} "
+            f"{r.p50_ms:>8.2f} {r.p95_ms:>8.2f} {r.peak_memory_kib:>10.1f} {r.errors:>4}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline retrieval evaluation and latency benchmark")
+    parser.add_argument("--projects", type=int, default=20, help="Number of synthetic projects")
+    parser.add_argument("--docs-per-project", type=int, default=10, help="Verbali and MI documents per project")
+    parser.add_argument("--wiki-docs", type=int, default=200, help="Number of wiki chunks")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per tool")
+    parser.add_argument("--k", type=int, default=5, help="Cut-off for recall@k")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes over the query set")
+    parser.add_argument("--dimension", type=int, default=256, help="Fake embedding dimension")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus random seed")
+    parser.add_argument("--tool", action="append", dest="tools", help="Only run this tool (repeatable)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    corpus = build_corpus(
+        num_projects=args.projects,
+        docs_per_project=args.docs_per_project,
+        wiki_docs=args.wiki_docs,
+        queries_per_tool=args.queries,
+        seed=args.seed
+    )
+    results = run_benchmark(
+        corpus=corpus,
+        k=args.k,
+        repeats=args.repeats,
+        embedding_dimension=args.dimension,
+        tools=args.tools
+    )
+    
+    if args.json:
+        print(json.dumps([r.dict() for r in results], indent=2))
+    else:
+        print(format_results(results, args.k))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Vector storage mode benchmark
+
+Loads the same random vectors into one collection per storage mode
+(float32, on-disk float32, scalar int8, binary, larger HNSW graph) and
+reports memory footprint, query latency and recall@k against exact search.
+
+Memory is estimated from the collection parameters (vectors kept in RAM plus
+HNSW links). The in-memory Qdrant accepts quantization and HNSW settings but
+does not apply them, so run with --url against a Qdrant server to measure the
+latency and recall effect of each mode.
+
+Usage:
+    python -m agno_multi_source.benchmarks.storage --points 20000 --dimension 1536
+    python -m agno_multi_source.benchmarks.storage --url http://localhost:6333
+"""
+
+import argparse
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+from qdrant_client import QdrantClient, models
+
+from ..libs.qdrant_clients import QdrantClients
+from ..models import CollectionConfig
+from .metrics import mean, percentile, recall_at_k
+
+logger = logging.getLogger(__name__)
+
+# Storage modes under test: name -> CollectionConfig overrides
+STORAGE_MODES: Dict[str, Dict[str, Any]] = {
+    "float32": {"quantization": "none", "on_disk": False},
+    "float32-on-disk": {"quantization": "none", "on_disk": True},
+    "scalar-int8": {"quantization": "scalar", "on_disk": True},
+    "binary": {"quantization": "binary", "on_disk": True, "quantization_oversampling": 3.0},
+    "float32-m32": {"quantization": "none", "on_disk": False, "hnsw_m": 32, "hnsw_ef_construct": 200},
+}
+
+_DEFAULT_HNSW_M = 16
+
+
+class StorageModeResult(BaseModel):
+    """Memory and query figures for one storage mode"""
+    mode: str = Field(..., description="Storage mode name")
+    estimated_ram_mib: float = Field(..., description="Vectors and HNSW links kept in RAM, in MiB")
+    load_seconds: float = Field(..., description="Time to upsert all points")
+    p50_ms: float = Field(..., description="Median query latency in milliseconds")
+    p95_ms: float = Field(..., description="95th percentile query latency in milliseconds")
+    recall_at_k: float = Field(..., description="Recall@k against exact float32 search")
+
+
+def estimate_ram_bytes(points: int, dimension: int, settings: Dict[str, Any]) -> int:
+    """Approximate RAM used by vectors and the HNSW graph for a collection"""
+    ram = 0
+    if not settings["on_disk"]:
+        ram += points * dimension * 4
+    if settings["quantization"] == "scalar":
+        ram += points * dimension
+    elif settings["quantization"] == "binary":
+        ram += points * ((dimension + 7) // 8)
+    
+    # Level-0 HNSW links: 2 * m neighbours per point, 4-byte ids
+    m = settings["hnsw_m"] or _DEFAULT_HNSW_M
+    ram += points * 2 * m * 4
+    return ram
+
+
+def _random_vectors(count: int, dimension: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run_benchmark(
+    client: QdrantClient,
+    points: int = 20000,
+    dimension: int = 1536,
+    queries: int = 200,
+    k: int = 10,
+    search_hnsw_ef: Optional[int] = 128,
+    batch_size: int = 512,
+    seed: int = 42,
+    modes: Optional[List[str]] = None
+) -> List[StorageModeResult]:
+    """
+    Compare storage modes on identical data.
+    
+    Args:
+        client: Qdrant client (in-memory or server)
+        points: Number of vectors per collection
+        dimension: Vector dimension (1536 for Titan v1)
+        queries: Number of query vectors
+        k: Results per query and recall cut-off
+        search_hnsw_ef: Search-time ef for approximate queries
+        batch_size: Points per upsert request
+        seed: Random seed for vectors and queries
+        modes: Subset of STORAGE_MODES to run (all if None)
+    
+    Returns:
+        One StorageModeResult per mode
+    """
+    rng = np.random.default_rng(seed)
+    vectors = _random_vectors(points, dimension, rng)
+    # Queries are noisy copies of stored vectors, like paraphrased questions
+    anchors = vectors[rng.integers(0, points, size=queries)]
+    query_vectors = anchors + 0.3 * _random_vectors(queries, dimension, rng)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    
+    qdrant_clients = QdrantClients()
+    qdrant_clients._client = client
+    
+    ground_truth: Optional[List[set]] = None
+    results = []
+    for mode in modes or list(STORAGE_MODES):
+        collection_config = CollectionConfig(
+            collection_name=f"storage_benchmark_{mode.replace('-', '_')}",
+            vector_size=dimension,
+            search_hnsw_ef=search_hnsw_ef,
+            **STORAGE_MODES[mode]
+        )
+        name = collection_config.collection_name
+        if client.collection_exists(name):
+            client.delete_collection(name)
+        qdrant_clients.create_collection(name, collection_config=collection_config)
+        
+        load_started = time.perf_counter()
+        for start in range(0, points, batch_size):
+            batch = vectors[start:start + batch_size]
+            client.upsert(
+                collection_name=name,
+                points=models.Batch(ids=list(range(start, start + len(batch))), vectors=batch.tolist()),
+                wait=True,
+            )
+        load_seconds = time.perf_counter() - load_started
+        
+        if ground_truth is None:
+            exact = models.SearchParams(exact=True)
+            ground_truth = [
+                {point.id for point in client.search(name, query_vector=q.tolist(), limit=k, search_params=exact)}
+                for q in query_vectors
+            ]
+        
+        search_params = qdrant_clients.build_search_params(collection_config)
+        latencies = []
+        recalls = []
+        for query_vector, relevant in zip(query_vectors, ground_truth):
+            started = time.perf_counter()
+            hits = client.search(name, query_vector=query_vector.tolist(), limit=k, search_params=search_params)
+            latencies.append((time.perf_counter() - started) * 1000)
+            recalls.append(recall_at_k([hit.id for hit in hits], relevant, k))
+        
+        settings = qdrant_clients.get_storage_settings(collection_config)
+        results.append(StorageModeResult(
+            mode=mode,
+            estimated_ram_mib=estimate_ram_bytes(points, dimension, settings) / (1024 * 1024),
+            load_seconds=load_seconds,
+            p50_ms=percentile(latencies, 50),
+            p95_ms=percentile(latencies, 95),
+            recall_at_k=mean(recalls)
+        ))
+        client.delete_collection(name)
+    
+    return results
+
+
+def format_results(results: List[StorageModeResult], k: int) -> str:
+    """Render results as a fixed-width table"""
+    header = f"{'mode':<18} {'est. RAM MiB':>13} {'load s':>8} {'p50 ms':>8} {'p95 ms':>8} {f'recall@{k}':>10}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r.mode:<18} {r.estimated_ram_mib:>13.1f} {r.load_seconds:>8.2f} "
+            f"{r.p50_ms:>8.2f} {r.p95_ms:>8.2f} {r.recall_at_k:>10.3f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Vector storage mode benchmark")
+    parser.add_argument("--url", default=None, help="Qdrant server URL (in-memory if omitted)")
+    parser.add_argument("--api-key", default=None, help="Qdrant API key")
+    parser.add_argument("--points", type=int, default=20000, help="Vectors per collection")
+    parser.add_argument("--dimension", type=int, default=1536, help="Vector dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--ef", type=int, default=128, help="Search-time HNSW ef")
+    parser.add_argument("--mode", action="append", dest="modes", choices=list(STORAGE_MODES), help="Only run this mode (repeatable)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    client = QdrantClient(url=args.url, api_key=args.api_key) if args.url else QdrantClient(":memory:")
+    results = run_benchmark(
+        client,
+        points=args.points,
+        dimension=args.dimension,
+        queries=args.queries,
+        k=args.k,
+        search_hnsw_ef=args.ef,
+        seed=args.seed,
+        modes=args.modes
+    )
+    
+    if args.json:
+        print(json.dumps([r.dict() for r in results], indent=2))
+    else:
+        print(format_results(results, args.k))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,8 @@ for the multi-source agent and its components.
 import os
 from typing import Dict, Optional
 
-from pydantic import BaseSettings, Field
+from pydantic import Field
+from pydantic_settings import BaseSettings
 
 from .models import AgentConfig, CollectionConfig, ToolConfig
 
@@ -43,12 +44,15 @@ class Config(BaseSettings):
     # S3 Configuration
     catalog_s3_bucket: str = Field("chatbotaistack-dataextractionstagingbucket31830e92-o4unjfsiz0o2", env="CATALOG_S3_BUCKET")
     catalog_s3_key: str = Field("Catalogo_servizi/catalogo_servizi.json", env="CATALOG_S3_KEY")
+    s3_endpoint_url: Optional[str] = Field(None, env="S3_ENDPOINT_URL")  # e.g. a local S3 stand-in
+    s3_cache_dir: Optional[str] = Field(None, env="S3_CACHE_DIR")  # Local ETag-keyed object cache
     
     # GraphQL Configuration
     graphql_url: Optional[str] = Field(None, env="GRAPHQL_URL")
     
     # DynamoDB Configuration
     table_name: Optional[str] = Field(None, env="TABLE_NAME")
+    dynamodb_endpoint_url: Optional[str] = Field(None, env="DYNAMODB_ENDPOINT_URL")  # e.g. DynamoDB Local
     
     # Collection Names
     verbali_collection: str = Field("verbali", env="VERBALI_COLLECTION")
@@ -61,10 +65,18 @@ class Config(BaseSettings):
     
     # Agent Configuration
     model_id: str = Field("anthropic.claude-3-5-sonnet-20240620-v1:0", env="MODEL_ID")
-    embedding_provider: str = Field("Bedrock-embeddings", env="EMBEDDING_PROVIDER")
+    embedding_provider: str = Field("Bedrock-embeddings", env="EMBEDDING_PROVIDER")  # Bedrock-, OpenAI- or Local-embeddings
     temperature: float = Field(0.2, env="TEMPERATURE")
     max_tokens: int = Field(4000, env="MAX_TOKENS")
     
+    # Local Embeddings Configuration (EMBEDDING_PROVIDER=Local-embeddings)
+    local_embedding_model: str = Field("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", env="LOCAL_EMBEDDING_MODEL")
+    local_embedding_backend: str = Field("onnx", env="LOCAL_EMBEDDING_BACKEND")  # onnx, torch
+    local_embedding_batch_size: int = Field(32, env="LOCAL_EMBEDDING_BATCH_SIZE")
+    local_embedding_threads: int = Field(2, env="LOCAL_EMBEDDING_THREADS")  # Concurrent document batches
+    local_embedding_cache_dir: Optional[str] = Field(None, env="LOCAL_EMBEDDING_CACHE_DIR")  # Model download cache
+    embedding_warmup: bool = Field(True, env="EMBEDDING_WARMUP")  # Load and run the local model at agent startup
+    
     # Parallel Processing
     max_workers: int = Field(5, env="MAX_WORKERS")
     concurrent_requests: int = Field(10, env="CONCURRENT_REQUESTS")
@@ -78,6 +90,70 @@ class Config(BaseSettings):
     
     # Semantic Search Configuration
     description_similarity_threshold: float = Field(0.85, env="DESCRIPTION_SIMILARITY_THRESHOLD")
+    query_embedding_cache_size: int = Field(1024, env="QUERY_EMBEDDING_CACHE_SIZE")  # Query vectors kept per process
+    mmr_lambda: float = Field(0.5, env="MMR_LAMBDA")  # 1.0 = pure relevance, 0.0 = pure diversity
+    
+    # Reranking Configuration
+    reranker_type: str = Field("none", env="RERANKER_TYPE")  # none, lexical, cross-encoder (replaces vector ranking)
+    reranker_model: str = Field("cross-encoder/mmarco-mMiniLMv2-L12-H384-v1", env="RERANKER_MODEL")
+    rerank_overfetch: int = Field(3, env="RERANK_OVERFETCH")  # Candidates fetched per returned result
+    rerank_cache_size: int = Field(4096, env="RERANK_CACHE_SIZE")
+    
+    # Conversation Memory Configuration
+    memory_backend: str = Field("none", env="MEMORY_BACKEND")  # none, sqlite, dynamodb (opt-in: stores chat transcripts)
+    memory_table_name: Optional[str] = Field(None, env="MEMORY_TABLE_NAME")  # DynamoDB table, partition key chat_id
+    memory_sqlite_path: str = Field("conversation_memory.db", env="MEMORY_SQLITE_PATH")
+    memory_recent_turns: int = Field(8, env="MEMORY_RECENT_TURNS")  # Turns kept verbatim in the prompt
+    memory_turn_max_chars: int = Field(2000, env="MEMORY_TURN_MAX_CHARS")
+    memory_summary_max_chars: int = Field(3000, env="MEMORY_SUMMARY_MAX_CHARS")
+    memory_summarizer: str = Field("extractive", env="MEMORY_SUMMARIZER")  # extractive, llm
+    
+    # Project Fact Sheets Configuration
+    fact_sheets_enabled: bool = Field(True, env="FACT_SHEETS_ENABLED")  # Materialize on each catalog refresh
+    fact_sheets_path: str = Field("fact_sheets.db", env="FACT_SHEETS_PATH")  # SQLite store
+    fact_sheets_include_verbali: bool = Field(True, env="FACT_SHEETS_INCLUDE_VERBALI")  # Scan verbali file lists
+    
+    # Prompt Caching Configuration (Anthropic models on Bedrock)
+    prompt_caching: bool = Field(False, env="PROMPT_CACHING")  # Opt-in: Bedrock Claude model with cached tool schemas and system prompt
+    prompt_cache_fact_sheet: bool = Field(True, env="PROMPT_CACHE_FACT_SHEET")  # Current project's fact sheet in the cached prefix
+    prompt_cache_max_agents: int = Field(32, env="PROMPT_CACHE_MAX_AGENTS")  # Per-project agents kept in memory
+    
+    # Resilience Configuration (deadlines, circuit breakers, hedged reads)
+    turn_latency_budget: float = Field(60.0, env="TURN_LATENCY_BUDGET")  # Seconds per agent turn
+    retrieval_budget_fraction: float = Field(0.6, env="RETRIEVAL_BUDGET_FRACTION")  # Share of the turn for tool backend calls
+    backend_default_timeout: float = Field(30.0, env="BACKEND_DEFAULT_TIMEOUT")
+    qdrant_timeout: float = Field(10.0, env="QDRANT_TIMEOUT")
+    athena_timeout: float = Field(20.0, env="ATHENA_TIMEOUT")  # Per API call, not per query run
+    s3_timeout: float = Field(30.0, env="S3_TIMEOUT")
+    dynamodb_timeout: float = Field(5.0, env="DYNAMODB_TIMEOUT")
+    embeddings_timeout: float = Field(10.0, env="EMBEDDINGS_TIMEOUT")
+    llm_timeout: float = Field(90.0, env="LLM_TIMEOUT")
+    circuit_failure_threshold: int = Field(5, env="CIRCUIT_FAILURE_THRESHOLD")  # Consecutive failures before opening
+    circuit_reset_timeout: float = Field(30.0, env="CIRCUIT_RESET_TIMEOUT")  # Seconds before a trial call
+    hedge_requests: bool = Field(False, env="HEDGE_REQUESTS")  # Duplicate idempotent reads slower than p95
+    hedge_min_delay: float = Field(0.05, env="HEDGE_MIN_DELAY")
+    backend_max_workers: int = Field(16, env="BACKEND_MAX_WORKERS")  # Worker threads per backend
+    
+    # Batch Configuration (agno_multi_source.batch)
+    batch_concurrency: int = Field(4, env="BATCH_CONCURRENCY")  # Questions processed in parallel
+    batch_keep_memory: bool = Field(False, env="BATCH_KEEP_MEMORY")  # Keep conversation memory of batch chats
+    
+    # Ingestion Configuration
+    ingestion_chunk_size: int = Field(1000, env="INGESTION_CHUNK_SIZE")  # Characters per chunk
+    ingestion_chunk_overlap: int = Field(200, env="INGESTION_CHUNK_OVERLAP")
+    embedding_batch_size: int = Field(64, env="EMBEDDING_BATCH_SIZE")  # Texts per embedding request
+    embedding_concurrency: int = Field(4, env="EMBEDDING_CONCURRENCY")  # Embedding requests in flight
+    upsert_batch_size: int = Field(256, env="UPSERT_BATCH_SIZE")  # Points per upsert request
+    upsert_parallelism: int = Field(4, env="UPSERT_PARALLELISM")  # Upsert requests in flight
+    
+    # Vector Storage Configuration (defaults for every collection)
+    vector_quantization: str = Field("none", env="VECTOR_QUANTIZATION")  # none, scalar, binary
+    vectors_on_disk: bool = Field(False, env="VECTORS_ON_DISK")
+    hnsw_m: Optional[int] = Field(None, env="HNSW_M")  # Qdrant default (16) if unset
+    hnsw_ef_construct: Optional[int] = Field(None, env="HNSW_EF_CONSTRUCT")  # Qdrant default (100) if unset
+    search_hnsw_ef: Optional[int] = Field(None, env="SEARCH_HNSW_EF")  # Qdrant default if unset
+    quantization_rescore: bool = Field(True, env="QUANTIZATION_RESCORE")
+    quantization_oversampling: float = Field(2.0, env="QUANTIZATION_OVERSAMPLING")
     
     class Config:
         env_file = ".env"
@@ -106,7 +182,8 @@ class Config(BaseSettings):
                 embedding_provider=self.embedding_provider,
                 search_type="scroll",
                 search_kwargs={"k": 20, "fetch_k": 50},
-                metadata_fields=["webViewLink", "last_modified_time", "file_name", "project"]
+                metadata_fields=["webViewLink", "last_modified_time", "file_name", "project"],
+                date_field="last_modified_time"
             ),
             "sa": CollectionConfig(
                 collection_name=self.sa_collection,
@@ -114,7 +191,8 @@ class Config(BaseSettings):
                 embedding_provider=self.embedding_provider,
                 search_type="scroll",
                 search_kwargs={"k": 20, "fetch_k": 50},
-                metadata_fields=["webViewLink", "last_modified_time", "file_name", "project"]
+                metadata_fields=["webViewLink", "last_modified_time", "file_name", "project"],
+                date_field="last_modified_time"
             ),
             "rfc": CollectionConfig(
                 collection_name=self.rfc_collection,
@@ -122,7 +200,8 @@ class Config(BaseSettings):
                 embedding_provider=self.embedding_provider,
                 search_type="scroll",
                 search_kwargs={"k": 20, "fetch_k": 50},
-                metadata_fields=["webViewLink", "last_modified_time", "file_name", "project"]
+                metadata_fields=["webViewLink", "last_modified_time", "file_name", "project"],
+                date_field="last_modified_time"
             ),
             "user_docs": CollectionConfig(
                 collection_name=self.user_docs_collection,
@@ -130,7 +209,8 @@ class Config(BaseSettings):
                 embedding_provider=self.embedding_provider,
                 search_type="mmr",
                 search_kwargs={"k": 5, "fetch_k": 10},
-                metadata_fields=["webViewLink", "last_modified_time", "file_name"]
+                metadata_fields=["webViewLink", "last_modified_time", "file_name", "upload_date"],
+                date_field="upload_date"
             ),
             "mi": CollectionConfig(
                 collection_name=self.mi_collection,
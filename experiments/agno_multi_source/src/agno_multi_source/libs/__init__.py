@@ -5,15 +5,31 @@ This package contains reusable library components:
 - Project management and validation
 - AWS service clients
 - Vector database clients
+- Reranking of retrieval candidates
+- Document ingestion into the collections
+- Bounded per-chat conversation memory
+- Deadlines, circuit breakers and hedged reads for external backends
+- Precomputed per-project fact sheets
+- Prompt-prefix caching for the agent model
 - Utility functions
 """
 
 from .project_manager import ProjectManager
 from .aws_clients import AWSClients
 from .qdrant_clients import QdrantClients
+from .reranker import RerankingStage
+from .ingestion import IngestionPipeline
+from .conversation_memory import ConversationMemoryStore
+from .resilience import ResilienceRegistry
+from .fact_sheets import FactSheetStore
 
 __all__ = [
     "ProjectManager",
     "AWSClients", 
     "QdrantClients",
+    "RerankingStage",
+    "IngestionPipeline",
+    "ConversationMemoryStore",
+    "ResilienceRegistry",
+    "FactSheetStore",
 ] 
\ No newline at end of file
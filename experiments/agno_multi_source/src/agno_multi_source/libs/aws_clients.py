@@ -6,15 +6,31 @@ and connection handling for S3, DynamoDB, Athena, and other AWS services.
 """
 
 import logging
-from typing import Optional
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import boto3
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 from botocore.exceptions import BotoCoreError, ClientError
 
 from ..config import get_config
+from .resilience import ResilientProxy, get_backend
 
 logger = logging.getLogger(__name__)
 
+# DynamoDB service limits for batch operations
+DYNAMODB_BATCH_GET_LIMIT = 100
+DYNAMODB_BATCH_WRITE_LIMIT = 25
+
+# Objects larger than this are downloaded with parallel ranged GETs
+S3_MULTIPART_THRESHOLD = 16 * 1024 * 1024
+S3_PART_SIZE = 8 * 1024 * 1024
+S3_STREAM_CHUNK_SIZE = 1024 * 1024
+
 
 class AWSClients:
     """
@@ -32,6 +48,7 @@ class AWSClients:
         self._athena_client = None
         self._lambda_client = None
         self._session = None
+        self._dynamodb_tables: Dict[str, Any] = {}
     
     @property
     def session(self) -> boto3.Session:
@@ -56,7 +73,12 @@ class AWSClients:
         """Get or create S3 client"""
         if self._s3_client is None:
             try:
-                self._s3_client = self.session.client('s3')
+                self._s3_client = ResilientProxy(
+                    self.session.client('s3', endpoint_url=self.config.s3_endpoint_url),
+                    get_backend("s3"),
+                    methods={"get_object", "head_object", "list_objects_v2", "put_object"},
+                    idempotent={"get_object", "head_object", "list_objects_v2"}
+                )
                 logger.debug("Created S3 client")
             except Exception as e:
                 logger.error(f"Failed to create S3 client: {e}")
@@ -69,7 +91,12 @@ class AWSClients:
         """Get or create DynamoDB client"""
         if self._dynamodb_client is None:
             try:
-                self._dynamodb_client = self.session.client('dynamodb')
+                self._dynamodb_client = ResilientProxy(
+                    self.session.client('dynamodb', endpoint_url=self.config.dynamodb_endpoint_url),
+                    get_backend("dynamodb"),
+                    methods={"get_item", "query", "scan", "batch_get_item", "put_item", "batch_write_item"},
+                    idempotent={"get_item", "query", "scan", "batch_get_item"}
+                )
                 logger.debug("Created DynamoDB client")
             except Exception as e:
                 logger.error(f"Failed to create DynamoDB client: {e}")
@@ -82,7 +109,10 @@ class AWSClients:
         """Get or create DynamoDB resource"""
         if self._dynamodb_resource is None:
             try:
-                self._dynamodb_resource = self.session.resource('dynamodb')
+                self._dynamodb_resource = self.session.resource(
+                    'dynamodb',
+                    endpoint_url=self.config.dynamodb_endpoint_url
+                )
                 logger.debug("Created DynamoDB resource")
             except Exception as e:
                 logger.error(f"Failed to create DynamoDB resource: {e}")
@@ -95,7 +125,12 @@ class AWSClients:
         """Get or create Athena client"""
         if self._athena_client is None:
             try:
-                self._athena_client = self.session.client('athena')
+                self._athena_client = ResilientProxy(
+                    self.session.client('athena'),
+                    get_backend("athena"),
+                    methods={"start_query_execution", "get_query_execution", "get_query_results", "list_query_executions"},
+                    idempotent={"get_query_execution", "get_query_results", "list_query_executions"}
+                )
                 logger.debug("Created Athena client")
             except Exception as e:
                 logger.error(f"Failed to create Athena client: {e}")
@@ -117,15 +152,24 @@ class AWSClients:
         return self._lambda_client
     
     def get_dynamodb_table(self, table_name: Optional[str] = None):
-        """Get a DynamoDB table resource"""
+        """
+        Get a DynamoDB table resource.
+        
+        Table handles are cached per table name, so the DescribeTable round-trip
+        used to verify the table only happens on first access.
+        """
         table_name = table_name or self.config.table_name
         if not table_name:
             raise ValueError("No table name provided and TABLE_NAME not configured")
         
+        if table_name in self._dynamodb_tables:
+            return self._dynamodb_tables[table_name]
+        
         try:
             table = self.dynamodb_resource.Table(table_name)
             # Verify table exists by loading its metadata
             table.load()
+            self._dynamodb_tables[table_name] = table
             logger.debug(f"Connected to DynamoDB table: {table_name}")
             return table
         except ClientError as e:
@@ -136,6 +180,186 @@ class AWSClients:
                 logger.error(f"Error accessing DynamoDB table {table_name}: {e}")
                 raise
     
+    def batch_get_items(
+        self,
+        keys: List[Dict[str, Any]],
+        table_name: Optional[str] = None,
+        projection: Optional[List[str]] = None,
+        consistent_read: bool = False,
+        max_retries: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Read many items with BatchGetItem.
+        
+        Keys are sent in chunks of 100 (the service limit) and any UnprocessedKeys
+        are retried with exponential backoff.
+        
+        Args:
+            keys: Primary keys of the items to read
+            table_name: Table to read from (defaults to TABLE_NAME)
+            projection: Optional list of attribute names to return
+            consistent_read: Whether to use strongly consistent reads
+            max_retries: Maximum retries for unprocessed keys per chunk
+        
+        Returns:
+            List of items found (order is not guaranteed)
+        """
+        table_name = self.get_dynamodb_table(table_name).name
+        items: List[Dict[str, Any]] = []
+        
+        for chunk in _chunked(keys, DYNAMODB_BATCH_GET_LIMIT):
+            request = {'Keys': chunk, 'ConsistentRead': consistent_read}
+            if projection:
+                expression, names = _build_projection_expression(projection)
+                request['ProjectionExpression'] = expression
+                request['ExpressionAttributeNames'] = names
+            
+            request_items = {table_name: request}
+            attempt = 0
+            while request_items:
+                response = get_backend("dynamodb").call(
+                    self.dynamodb_resource.batch_get_item, RequestItems=request_items, idempotent=True
+                )
+                items.extend(response.get('Responses', {}).get(table_name, []))
+                
+                request_items = response.get('UnprocessedKeys') or {}
+                if not request_items:
+                    break
+                
+                attempt += 1
+                if attempt > max_retries:
+                    unprocessed = len(request_items.get(table_name, {}).get('Keys', []))
+                    logger.error(f"Giving up on {unprocessed} unprocessed keys for table {table_name}")
+                    break
+                time.sleep(_backoff_delay(attempt))
+        
+        logger.debug(f"Batch get returned {len(items)} items from {table_name}")
+        return items
+    
+    def batch_write_items(
+        self,
+        items: Optional[List[Dict[str, Any]]] = None,
+        delete_keys: Optional[List[Dict[str, Any]]] = None,
+        table_name: Optional[str] = None,
+        max_retries: int = 5
+    ) -> int:
+        """
+        Put and delete many items with BatchWriteItem.
+        
+        Requests are sent in chunks of 25 (the service limit) and any
+        UnprocessedItems are retried with exponential backoff.
+        
+        Args:
+            items: Items to put
+            delete_keys: Primary keys of items to delete
+            table_name: Table to write to (defaults to TABLE_NAME)
+            max_retries: Maximum retries for unprocessed items per chunk
+        
+        Returns:
+            Number of write requests that were not processed
+        """
+        table_name = self.get_dynamodb_table(table_name).name
+        requests = [{'PutRequest': {'Item': item}} for item in items or []]
+        requests.extend({'DeleteRequest': {'Key': key}} for key in delete_keys or [])
+        failed = 0
+        
+        for chunk in _chunked(requests, DYNAMODB_BATCH_WRITE_LIMIT):
+            request_items = {table_name: chunk}
+            attempt = 0
+            while request_items:
+                response = get_backend("dynamodb").call(
+                    self.dynamodb_resource.batch_write_item, RequestItems=request_items
+                )
+                
+                request_items = response.get('UnprocessedItems') or {}
+                if not request_items:
+                    break
+                
+                attempt += 1
+                if attempt > max_retries:
+                    unprocessed = len(request_items.get(table_name, []))
+                    logger.error(f"Giving up on {unprocessed} unprocessed writes for table {table_name}")
+                    failed += unprocessed
+                    break
+                time.sleep(_backoff_delay(attempt))
+        
+        logger.debug(f"Batch wrote {len(requests) - failed} requests to {table_name}")
+        return failed
+    
+    def parallel_scan(
+        self,
+        table_name: Optional[str] = None,
+        total_segments: int = 4,
+        projection: Optional[List[str]] = None,
+        filter_expression: Optional[ConditionBase] = None,
+        max_workers: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Scan a table using parallel scan segments.
+        
+        Each segment is paginated in its own worker thread through the
+        (thread-safe) low-level client, and items are deserialized to plain
+        Python values.
+        
+        Args:
+            table_name: Table to scan (defaults to TABLE_NAME)
+            total_segments: Number of scan segments
+            projection: Optional list of attribute names to return
+            filter_expression: Optional boto3 condition (e.g. Attr('chat_id').eq(...))
+            max_workers: Worker threads (defaults to the number of segments)
+        
+        Returns:
+            All scanned items
+        """
+        table_name = self.get_dynamodb_table(table_name).name
+        base_params: Dict[str, Any] = {'TableName': table_name, 'TotalSegments': total_segments}
+        names: Dict[str, str] = {}
+        
+        if projection:
+            expression, projection_names = _build_projection_expression(projection)
+            base_params['ProjectionExpression'] = expression
+            names.update(projection_names)
+        
+        if filter_expression is not None:
+            built = ConditionExpressionBuilder().build_expression(filter_expression)
+            serializer = TypeSerializer()
+            base_params['FilterExpression'] = built.condition_expression
+            names.update(built.attribute_name_placeholders)
+            base_params['ExpressionAttributeValues'] = {
+                placeholder: serializer.serialize(value)
+                for placeholder, value in built.attribute_value_placeholders.items()
+            }
+        
+        if names:
+            base_params['ExpressionAttributeNames'] = names
+        
+        # Resolve the client before fanning out so threads share one instance
+        client = self.dynamodb_client
+        
+        def scan_segment(segment: int) -> List[Dict[str, Any]]:
+            deserializer = TypeDeserializer()
+            params = dict(base_params, Segment=segment)
+            segment_items = []
+            while True:
+                response = client.scan(**params)
+                for raw_item in response.get('Items', []):
+                    segment_items.append(
+                        {key: deserializer.deserialize(value) for key, value in raw_item.items()}
+                    )
+                last_key = response.get('LastEvaluatedKey')
+                if not last_key:
+                    break
+                params['ExclusiveStartKey'] = last_key
+            return segment_items
+        
+        items: List[Dict[str, Any]] = []
+        with ThreadPoolExecutor(max_workers=max_workers or total_segments) as executor:
+            for segment_items in executor.map(scan_segment, range(total_segments)):
+                items.extend(segment_items)
+        
+        logger.debug(f"Parallel scan of {table_name} returned {len(items)} items over {total_segments} segments")
+        return items
+    
     def test_s3_connection(self) -> bool:
         """Test S3 connection by listing buckets"""
         try:
@@ -169,11 +393,34 @@ class AWSClients:
             logger.error(f"DynamoDB connection test failed: {e}")
             return False
     
-    def get_s3_object(self, bucket: str, key: str) -> dict:
-        """Get an object from S3 with error handling"""
+    def get_s3_object(
+        self,
+        bucket: str,
+        key: str,
+        byte_range: Optional[Tuple[int, int]] = None,
+        if_match: Optional[str] = None
+    ) -> dict:
+        """
+        Get an object from S3 with error handling.
+        
+        Args:
+            bucket: S3 bucket name
+            key: Object key
+            byte_range: Optional inclusive (start, end) byte range to fetch
+            if_match: Optional ETag the object must still have
+        
+        Returns:
+            The raw get_object response (the body is a streaming object)
+        """
+        params = {'Bucket': bucket, 'Key': key}
+        if byte_range is not None:
+            params['Range'] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        if if_match:
+            params['IfMatch'] = if_match
+        
         try:
-            response = self.s3.get_object(Bucket=bucket, Key=key)
-            logger.debug(f"Retrieved S3 object: s3://{bucket}/{key}")
+            response = self.s3.get_object(**params)
+            logger.debug(f"Retrieved S3 object: s3://{bucket}/{key} {params.get('Range', '')}")
             return response
         except ClientError as e:
             if e.response['Error']['Code'] == 'NoSuchKey':
@@ -183,6 +430,135 @@ class AWSClients:
                 logger.error(f"Error retrieving S3 object s3://{bucket}/{key}: {e}")
                 raise
     
+    def head_s3_object(self, bucket: str, key: str) -> dict:
+        """Get object metadata (size, ETag, ...) without downloading the body"""
+        try:
+            return self.s3.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                logger.error(f"S3 object not found: s3://{bucket}/{key}")
+                raise FileNotFoundError(f"S3 object not found: s3://{bucket}/{key}")
+            logger.error(f"Error reading metadata for s3://{bucket}/{key}: {e}")
+            raise
+    
+    def read_s3_range(self, bucket: str, key: str, start: int, end: int, if_match: Optional[str] = None) -> bytes:
+        """Read the inclusive byte range [start, end] of an S3 object"""
+        response = self.get_s3_object(bucket, key, byte_range=(start, end), if_match=if_match)
+        return response['Body'].read()
+    
+    def iter_s3_chunks(
+        self,
+        bucket: str,
+        key: str,
+        chunk_size: int = S3_STREAM_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """Stream an S3 object in chunks without loading it fully into memory"""
+        body = self.get_s3_object(bucket, key)['Body']
+        try:
+            for chunk in body.iter_chunks(chunk_size=chunk_size):
+                yield chunk
+        finally:
+            body.close()
+    
+    def iter_s3_lines(self, bucket: str, key: str, encoding: str = 'utf-8') -> Iterator[str]:
+        """Stream an S3 object line by line (e.g. JSONL or CSV documents)"""
+        body = self.get_s3_object(bucket, key)['Body']
+        try:
+            for line in body.iter_lines(chunk_size=S3_STREAM_CHUNK_SIZE):
+                yield line.decode(encoding)
+        finally:
+            body.close()
+    
+    def download_s3_object(
+        self,
+        bucket: str,
+        key: str,
+        part_size: int = S3_PART_SIZE,
+        max_workers: Optional[int] = None
+    ) -> bytes:
+        """
+        Download a whole S3 object.
+        
+        Small objects use a single GET; objects above S3_MULTIPART_THRESHOLD are
+        fetched as parallel ranged GETs pinned to the same ETag, so a concurrent
+        overwrite fails the download instead of mixing versions.
+        """
+        head = self.head_s3_object(bucket, key)
+        size = head['ContentLength']
+        
+        if size <= S3_MULTIPART_THRESHOLD:
+            return self.get_s3_object(bucket, key, if_match=head.get('ETag'))['Body'].read()
+        
+        return b"".join(self._iter_s3_parts(bucket, key, head, part_size, max_workers))
+    
+    def _iter_s3_parts(
+        self,
+        bucket: str,
+        key: str,
+        head: dict,
+        part_size: int = S3_PART_SIZE,
+        max_workers: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Fetch an object as parallel ranged GETs, yielding the parts in order"""
+        size = head['ContentLength']
+        ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+        logger.info(f"Downloading s3://{bucket}/{key} ({size} bytes) in {len(ranges)} parts")
+        
+        # Resolve the client before fanning out so threads share one instance
+        _ = self.s3
+        with ThreadPoolExecutor(max_workers=max_workers or self.config.max_workers) as executor:
+            yield from executor.map(
+                lambda byte_range: self.read_s3_range(bucket, key, *byte_range, if_match=head.get('ETag')),
+                ranges
+            )
+    
+    def get_s3_object_cached_path(self, bucket: str, key: str) -> str:
+        """
+        Return a local path holding the object's content, downloading it if needed.
+        
+        The local cache under S3_CACHE_DIR is content-addressed by ETag: an
+        unchanged object costs a single HEAD request, and a changed object gets
+        a new cache entry.
+        """
+        cache_dir = self.config.s3_cache_dir
+        if not cache_dir:
+            raise ValueError("S3_CACHE_DIR not configured")
+        
+        head = self.head_s3_object(bucket, key)
+        etag = head['ETag'].strip('"')
+        path = os.path.join(cache_dir, etag[:2], etag)
+        
+        if os.path.exists(path):
+            logger.debug(f"S3 cache hit for s3://{bucket}/{key} (etag {etag})")
+            return path
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".partial-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if head['ContentLength'] > S3_MULTIPART_THRESHOLD:
+                    for part in self._iter_s3_parts(bucket, key, head):
+                        f.write(part)
+                else:
+                    body = self.get_s3_object(bucket, key, if_match=head['ETag'])['Body']
+                    for chunk in body.iter_chunks(chunk_size=S3_STREAM_CHUNK_SIZE):
+                        f.write(chunk)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        logger.debug(f"Cached s3://{bucket}/{key} (etag {etag}) at {path}")
+        return path
+    
+    def read_s3_object(self, bucket: str, key: str, use_cache: bool = False) -> bytes:
+        """Read a whole S3 object, optionally through the local ETag cache"""
+        if use_cache and self.config.s3_cache_dir:
+            with open(self.get_s3_object_cached_path(bucket, key), 'rb') as f:
+                return f.read()
+        return self.download_s3_object(bucket, key)
+    
     def start_athena_query(self, query: str, database: str, output_location: str) -> Optional[str]:
         """Start an Athena query execution"""
         try:
@@ -250,6 +626,27 @@ class AWSClients:
         return all_passed
 
 
+def _chunked(values: List[Any], size: int) -> Iterable[List[Any]]:
+    """Yield consecutive chunks of at most `size` elements"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _backoff_delay(attempt: int, base: float = 0.05, cap: float = 2.0) -> float:
+    """Exponential backoff delay for retrying unprocessed batch requests"""
+    return min(cap, base * (2 ** attempt))
+
+
+def _build_projection_expression(attributes: List[str]) -> Tuple[str, Dict[str, str]]:
+    """
+    Build a ProjectionExpression with name placeholders.
+    
+    Placeholders avoid clashes with DynamoDB reserved words (e.g. "name", "date").
+    """
+    names = {f"#p{i}": attribute for i, attribute in enumerate(attributes)}
+    return ", ".join(names.keys()), names
+
+
 # Global singleton instance
 _aws_clients_instance: Optional[AWSClients] = None
 
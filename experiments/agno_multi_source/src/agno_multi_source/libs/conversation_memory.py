@@ -0,0 +1,378 @@
+"""
+Conversation Memory for Multi-Source RAG System
+
+This module keeps a bounded memory per chat_id so the prompt does not grow
+with the length of the conversation. The most recent turns are kept verbatim
+(rolling window); older turns are folded into a running summary, updated
+incrementally as turns leave the window. The project identified in the latest
+turn is tracked as well, so follow-up questions keep their project context
+without the caller having to pass it back.
+
+Memories are persisted (opt-in, MEMORY_BACKEND) to DynamoDB through
+AWSClients or, for local runs, to a SQLite file with the same
+one-row-per-chat layout. Without a backend, each turn starts from the
+history the caller passes in.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ..config import get_config
+from ..models import ConversationMemory
+from .aws_clients import AWSClients, get_aws_clients
+from .resilience import get_backend, guard_model_requests
+
+logger = logging.getLogger(__name__)
+
+# (previous summary, turns leaving the window) -> updated summary
+Summarizer = Callable[[str, List[Dict[str, Any]]], str]
+
+_ROLE_LABELS = {"user": "Utente", "assistant": "Assistente"}
+
+
+def normalize_turn(turn: Dict[str, Any], max_chars: int) -> Dict[str, Any]:
+    """Reduce a history entry to {role, content}, truncating long contents"""
+    role = turn.get("role") or turn.get("sender") or "user"
+    content = turn.get("content") or turn.get("text") or turn.get("message") or ""
+    content = str(content)
+    if len(content) > max_chars:
+        content = content[:max_chars].rstrip() + " [...]"
+    return {"role": str(role), "content": content}
+
+
+def extractive_summary(previous_summary: str, turns: List[Dict[str, Any]], line_chars: int = 240) -> str:
+    """
+    Append one short line per evicted turn to the summary.
+    
+    Costs no model call; the store trims the oldest lines once the summary
+    exceeds MEMORY_SUMMARY_MAX_CHARS.
+    """
+    lines = [previous_summary] if previous_summary else []
+    for turn in turns:
+        label = _ROLE_LABELS.get(turn["role"], turn["role"])
+        text = " ".join(turn["content"].split())
+        if len(text) > line_chars:
+            text = text[:line_chars].rstrip() + "..."
+        lines.append(f"- {label}: {text}")
+    return "\n".join(lines)
+
+
+def model_summarizer(model_id: str, max_chars: int) -> Summarizer:
+    """
+    Summarizer that asks the LLM to merge the evicted turns into the summary.
+    
+    Falls back to the extractive summary if the model call fails.
+    """
+    from agno.agent import Agent
+    from agno.models.aws import AwsBedrock
+    from agno.run.base import RunStatus
+    
+    agent = None
+    lock = threading.Lock()
+    
+    def summarize(previous_summary: str, turns: List[Dict[str, Any]]) -> str:
+        nonlocal agent
+        try:
+            with lock:
+                if agent is None:
+                    agent = Agent(
+                        model=guard_model_requests(
+                            AwsBedrock(id=model_id, aws_region=get_config().aws_region, temperature=0.0)
+                        ),
+                        instructions=(
+                            "Aggiorna il riassunto di una conversazione integrando i nuovi messaggi. "
+                            "Conserva progetti, nomi, decisioni e domande aperte. "
+                            f"Rispondi solo con il riassunto, in italiano, in meno di {max_chars} caratteri."
+                        ),
+                    )
+            transcript = "\n".join(
+                f"{_ROLE_LABELS.get(turn['role'], turn['role'])}: {turn['content']}" for turn in turns
+            )
+            response = agent.run(
+                f"Riassunto attuale:\n{previous_summary or '(vuoto)'}\n\nNuovi messaggi:\n{transcript}"
+            )
+            # agno reports a failed model call in the run status instead of raising
+            if response.status == RunStatus.error:
+                raise RuntimeError(response.content)
+            return (response.content or "").strip() or extractive_summary(previous_summary, turns)
+        except Exception as e:
+            logger.warning(f"Model summarization failed, using extractive summary: {e}")
+            return extractive_summary(previous_summary, turns)
+    
+    return summarize
+
+
+class MemoryBackend:
+    """Base class for conversation memory persistence (one record per chat_id)"""
+    
+    name = "none"
+    
+    def load(self, chat_id: str) -> Optional[ConversationMemory]:
+        return None
+    
+    def save(self, memory: ConversationMemory) -> None:
+        pass
+    
+    def delete(self, chat_id: str) -> None:
+        pass
+
+
+class SQLiteMemoryBackend(MemoryBackend):
+    """Local stand-in for the DynamoDB table, one JSON row per chat"""
+    
+    name = "sqlite"
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_memory ("
+            "chat_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        self._connection.commit()
+    
+    def load(self, chat_id: str) -> Optional[ConversationMemory]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM conversation_memory WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        return ConversationMemory(**json.loads(row[0])) if row else None
+    
+    def save(self, memory: ConversationMemory) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO conversation_memory (chat_id, data, updated_at) VALUES (?, ?, ?)",
+                (memory.chat_id, memory.json(), memory.updated_at.isoformat())
+            )
+    
+    def delete(self, chat_id: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM conversation_memory WHERE chat_id = ?", (chat_id,))
+
+
+class DynamoDBMemoryBackend(MemoryBackend):
+    """Stores memories in a DynamoDB table with partition key chat_id"""
+    
+    name = "dynamodb"
+    
+    def __init__(self, table_name: Optional[str] = None, aws_clients: Optional[AWSClients] = None):
+        self.table_name = table_name
+        self.aws_clients = aws_clients or get_aws_clients()
+    
+    @property
+    def table(self):
+        return self.aws_clients.get_dynamodb_table(self.table_name)
+    
+    def load(self, chat_id: str) -> Optional[ConversationMemory]:
+        item = get_backend("dynamodb").call(self.table.get_item, Key={"chat_id": chat_id}, idempotent=True).get("Item")
+        if not item:
+            return None
+        item["total_turns"] = int(item.get("total_turns", 0))
+        return ConversationMemory(**item)
+    
+    def save(self, memory: ConversationMemory) -> None:
+        item = json.loads(memory.json())
+        get_backend("dynamodb").call(
+            self.table.put_item, Item={key: value for key, value in item.items() if value is not None}
+        )
+    
+    def delete(self, chat_id: str) -> None:
+        get_backend("dynamodb").call(self.table.delete_item, Key={"chat_id": chat_id})
+
+
+class ConversationMemoryStore:
+    """
+    Keeps per-chat memory bounded: a window of recent turns plus a summary.
+    
+    When the window overflows, the oldest turns (down to half the window) are
+    folded into the summary in one summarizer call, so a model summarizer runs
+    at most once every few turns. Each turn is also capped in length, so the
+    memory handed to the agent never exceeds roughly
+    recent_turns * turn_max_chars + summary_max_chars characters.
+    
+    Updates go through updating(), which holds a per-chat lock from load to
+    save, so concurrent turns of one chat (in this process) do not overwrite
+    each other's turns.
+    """
+    
+    # Chat ids are hashed onto a fixed set of locks, so memory stays bounded
+    LOCK_STRIPES = 64
+    
+    def __init__(
+        self,
+        backend: Optional[MemoryBackend] = None,
+        recent_turns: int = 8,
+        turn_max_chars: int = 2000,
+        summary_max_chars: int = 3000,
+        summarizer: Optional[Summarizer] = None
+    ):
+        self.backend = backend or MemoryBackend()
+        self.recent_turns = max(2, recent_turns)
+        self.turn_max_chars = turn_max_chars
+        self.summary_max_chars = summary_max_chars
+        self.summarizer = summarizer or extractive_summary
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+    
+    def _lock_for(self, chat_id: str) -> threading.Lock:
+        return self._locks[hash(chat_id) % self.LOCK_STRIPES]
+    
+    def load(self, chat_id: str, user_id: Optional[str] = None) -> ConversationMemory:
+        """Load the memory of a chat, or start an empty one"""
+        try:
+            memory = self.backend.load(chat_id)
+        except Exception as e:
+            logger.error(f"Error loading conversation memory for chat {chat_id}: {e}")
+            memory = None
+        if memory is None:
+            memory = ConversationMemory(chat_id=chat_id, user_id=user_id)
+        return memory
+    
+    def save(self, memory: ConversationMemory) -> None:
+        """Persist a memory; failures are logged, not raised"""
+        memory.updated_at = datetime.now()
+        try:
+            self.backend.save(memory)
+        except Exception as e:
+            logger.error(f"Error saving conversation memory for chat {memory.chat_id}: {e}")
+    
+    @contextmanager
+    def updating(self, chat_id: str, user_id: Optional[str] = None) -> Iterator[ConversationMemory]:
+        """
+        Load a chat's memory for modification and save it on exit.
+        
+        The chat's lock is held throughout, so keep the block short (no model
+        calls other than the summarizer).
+        """
+        with self._lock_for(chat_id):
+            memory = self.load(chat_id, user_id)
+            yield memory
+            self.save(memory)
+    
+    def clear(self, chat_id: str) -> None:
+        """Forget a chat"""
+        with self._lock_for(chat_id):
+            try:
+                self.backend.delete(chat_id)
+            except Exception as e:
+                logger.error(f"Error deleting conversation memory for chat {chat_id}: {e}")
+    
+    def add_turn(self, memory: ConversationMemory, role: str, content: str) -> None:
+        """Append a turn, compacting older turns into the summary if needed"""
+        memory.recent_turns.append(normalize_turn({"role": role, "content": content}, self.turn_max_chars))
+        memory.total_turns += 1
+        self._compact(memory)
+    
+    def sync_history(self, memory: ConversationMemory, conversation_history: Optional[List[Dict]]) -> None:
+        """
+        Record turns from a caller-supplied full history that the memory has not seen.
+        
+        Callers that send the whole history every turn only add its new tail;
+        shorter histories are ignored since the memory already covers them.
+        """
+        if not conversation_history or len(conversation_history) <= memory.total_turns:
+            return
+        for turn in conversation_history[memory.total_turns:]:
+            memory.recent_turns.append(normalize_turn(turn, self.turn_max_chars))
+            memory.total_turns += 1
+        self._compact(memory)
+    
+    def build_context(self, memory: ConversationMemory) -> Dict[str, Any]:
+        """Bounded context entries for the agent prompt"""
+        return {
+            "conversation_summary": memory.summary,
+            "conversation_history": list(memory.recent_turns),
+            "last_project_context": memory.last_project_context,
+        }
+    
+    def build_messages(self, memory: ConversationMemory, user_query: str) -> List[Dict[str, str]]:
+        """
+        Input messages for the agent run: the bounded memory, then the new question.
+        
+        The summary and the remembered project open the conversation; the
+        recent turns follow verbatim. Roles other than assistant count as user,
+        consecutive turns of one role are merged and leading assistant turns
+        are dropped, so the messages alternate starting with the user as the
+        Messages API expects.
+        """
+        context = []
+        if memory.summary:
+            context.append(f"Riassunto dei messaggi precedenti di questa chat:\n{memory.summary}")
+        if memory.last_project_context:
+            context.append(f"Progetto di cui si parlava: {memory.last_project_context}")
+        
+        entries = [("user", "\n\n".join(context))] if context else []
+        entries += [
+            ("assistant" if turn["role"] == "assistant" else "user", turn["content"])
+            for turn in memory.recent_turns
+        ]
+        entries.append(("user", user_query))
+        
+        messages: List[Dict[str, str]] = []
+        for role, content in entries:
+            if not content or (role == "assistant" and not messages):
+                continue
+            if messages and messages[-1]["role"] == role:
+                messages[-1]["content"] += f"\n\n{content}"
+            else:
+                messages.append({"role": role, "content": content})
+        return messages
+    
+    def _compact(self, memory: ConversationMemory) -> None:
+        if len(memory.recent_turns) <= self.recent_turns:
+            return
+        keep = self.recent_turns // 2
+        evicted = memory.recent_turns[:-keep]
+        memory.recent_turns = memory.recent_turns[-keep:]
+        memory.summary = self._trim_summary(self.summarizer(memory.summary, evicted))
+        logger.debug(f"Folded {len(evicted)} turns into the summary of chat {memory.chat_id}")
+    
+    def _trim_summary(self, summary: str) -> str:
+        """Drop the oldest summary lines until it fits summary_max_chars"""
+        if len(summary) <= self.summary_max_chars:
+            return summary
+        lines = summary.splitlines()
+        while len(lines) > 1 and len("\n".join(lines)) > self.summary_max_chars:
+            lines.pop(0)
+        return "\n".join(lines)[-self.summary_max_chars:]
+
+
+def create_memory_backend(backend_type: str) -> MemoryBackend:
+    """Create the persistence backend named by MEMORY_BACKEND"""
+    config = get_config()
+    backend_type = (backend_type or "none").lower()
+    if backend_type == "none":
+        return MemoryBackend()
+    if backend_type == "sqlite":
+        return SQLiteMemoryBackend(config.memory_sqlite_path)
+    if backend_type == "dynamodb":
+        return DynamoDBMemoryBackend(config.memory_table_name)
+    raise ValueError(f"Unsupported memory backend: {backend_type}")
+
+
+# Global singleton instance
+_conversation_memory_instance: Optional[ConversationMemoryStore] = None
+
+
+def get_conversation_memory() -> ConversationMemoryStore:
+    """Get or create the global conversation memory store singleton"""
+    global _conversation_memory_instance
+    if _conversation_memory_instance is None:
+        config = get_config()
+        summarizer = None
+        if config.memory_summarizer == "llm":
+            summarizer = model_summarizer(config.model_id, config.memory_summary_max_chars)
+        _conversation_memory_instance = ConversationMemoryStore(
+            backend=create_memory_backend(config.memory_backend),
+            recent_turns=config.memory_recent_turns,
+            turn_max_chars=config.memory_turn_max_chars,
+            summary_max_chars=config.memory_summary_max_chars,
+            summarizer=summarizer
+        )
+    return _conversation_memory_instance
@@ -0,0 +1,374 @@
+"""
+Project Fact Sheets for Multi-Source RAG System
+
+This module materializes one fact sheet per project - formatted catalog
+details, contacts grouped by role and the list of verbali files with their
+links - every time the project catalog is refreshed. Sheets are stored in a
+local SQLite file keyed by canonical project name and kept in memory once
+read, so the project tools answer detail and contact questions with a
+dictionary lookup instead of an Athena query.
+
+Materialization is incremental: each sheet records a hash of the catalog row
+and verbali file list it was built from, and only projects whose hash changed
+are rebuilt and rewritten.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from qdrant_client import models
+
+from ..config import get_config
+from ..models import ProjectFactSheet
+from .qdrant_clients import QdrantClients, get_qdrant_clients
+
+logger = logging.getLogger(__name__)
+
+# Athena column names; catalog JSON keys are matched case-insensitively
+_ATHENA_COLUMNS = [
+    "elemName",
+    "elemCode",
+    "descStatus",
+    "descCustomerService",
+    "descServizio",
+    "dataUltimoAggiornamento",
+    "listContatti",
+]
+_COLUMN_BY_LOWER = {column.lower(): column for column in _ATHENA_COLUMNS}
+
+_VERBALI_FIELDS = ["file_name", "webViewLink", "last_modified_time"]
+
+
+def parse_contacts(value: Any) -> List[Dict[str, Any]]:
+    """Contacts from a listContatti value (JSON string as returned by Athena, or a list)"""
+    if isinstance(value, list):
+        return value
+    if not value:
+        return []
+    try:
+        contacts = json.loads(value)
+    except (TypeError, json.JSONDecodeError):
+        return []
+    return contacts if isinstance(contacts, list) else []
+
+
+def format_project_details(project_data: Dict, project_name: str) -> str:
+    """Format project details for context"""
+    sections = [
+        f"Project Details for: {project_name}",
+        "=" * 50,
+        ""
+    ]
+    
+    # Basic information
+    if 'elemCode' in project_data:
+        sections.append(f"Project Code: {project_data['elemCode']}")
+    if 'descStatus' in project_data:
+        sections.append(f"Status: {project_data['descStatus']}")
+    if 'descCustomerService' in project_data:
+        sections.append(f"Customer Service: {project_data['descCustomerService']}")
+    if 'descServizio' in project_data:
+        sections.append(f"Description: {project_data['descServizio']}")
+    if 'dataUltimoAggiornamento' in project_data:
+        sections.append(f"Last Updated: {project_data['dataUltimoAggiornamento']}")
+    
+    sections.append("")
+    
+    # Contacts
+    if 'listContatti' in project_data:
+        contacts = parse_contacts(project_data['listContatti'])
+        if contacts:
+            sections.append("Contacts:")
+            for contact in contacts:
+                name = contact.get('name', 'N/A')
+                role = contact.get('role', 'N/A')
+                email = contact.get('email', 'N/A')
+                sections.append(f"  - {role}: {name} ({email})")
+    
+    return "\n".join(sections)
+
+
+def format_project_contacts(contacts: List[Dict], project_name: str) -> str:
+    """Format project contacts for context"""
+    sections = [
+        f"Contacts for Project: {project_name}",
+        "=" * 50,
+        ""
+    ]
+    
+    if not contacts:
+        sections.append("No contacts found for this project.")
+    else:
+        for contact in contacts:
+            name = contact.get('name', 'N/A')
+            role = contact.get('role', 'N/A')
+            email = contact.get('email', 'N/A')
+            sections.append(f"Role: {role}")
+            sections.append(f"Name: {name}")
+            sections.append(f"Email: {email}")
+            sections.append("")
+    
+    return "\n".join(sections)
+
+
+def athena_row(catalog_row: Dict[str, Any]) -> Dict[str, Any]:
+    """Catalog JSON row with the column names and value types Athena returns"""
+    row = {}
+    for key, value in catalog_row.items():
+        column = _COLUMN_BY_LOWER.get(key.lower(), key)
+        if column == "listContatti" and not isinstance(value, str):
+            value = json.dumps(value or [], ensure_ascii=False)
+        row[column] = value
+    return row
+
+
+def build_fact_sheet(
+    canonical_name: str,
+    catalog_row: Dict[str, Any],
+    verbali_files: Optional[List[Dict[str, Any]]] = None,
+    source_hash: Optional[str] = None
+) -> ProjectFactSheet:
+    """Build the fact sheet of one project"""
+    details = athena_row(catalog_row)
+    contacts = parse_contacts(details.get("listContatti"))
+    contacts_by_role: Dict[str, List[Dict[str, Any]]] = {}
+    for contact in contacts:
+        contacts_by_role.setdefault(str(contact.get("role", "N/A")).upper(), []).append(contact)
+    
+    return ProjectFactSheet(
+        canonical_name=canonical_name,
+        source_hash=source_hash or fact_sheet_hash(catalog_row, verbali_files),
+        details=details,
+        formatted_details=format_project_details(details, canonical_name),
+        contacts=contacts,
+        contacts_by_role=contacts_by_role,
+        formatted_contacts=format_project_contacts(contacts, canonical_name),
+        verbali_files=verbali_files or []
+    )
+
+
+def fact_sheet_hash(catalog_row: Dict[str, Any], verbali_files: Optional[List[Dict[str, Any]]]) -> str:
+    """Hash of everything a fact sheet is built from"""
+    source = json.dumps([catalog_row, verbali_files or []], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class FactSheetStore:
+    """
+    SQLite store of fact sheets keyed by canonical project name.
+    
+    Sheets are cached in memory after the first read, so repeated lookups are
+    plain dictionary hits; writes replace the cached entries.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Optional[ProjectFactSheet]] = {}
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS fact_sheets ("
+            "canonical_name TEXT PRIMARY KEY, source_hash TEXT NOT NULL, data TEXT NOT NULL)"
+        )
+        self._connection.commit()
+    
+    def get(self, canonical_name: str) -> Optional[ProjectFactSheet]:
+        """Fact sheet of a project, or None if it has not been materialized"""
+        if canonical_name in self._cache:
+            return self._cache[canonical_name]
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM fact_sheets WHERE canonical_name = ?", (canonical_name,)
+            ).fetchone()
+        sheet = ProjectFactSheet(**json.loads(row[0])) if row else None
+        self._cache[canonical_name] = sheet
+        return sheet
+    
+    def hashes(self) -> Dict[str, str]:
+        """Source hash of every stored sheet"""
+        with self._lock:
+            return dict(self._connection.execute("SELECT canonical_name, source_hash FROM fact_sheets"))
+    
+    def write(self, sheets: Iterable[ProjectFactSheet], deleted: Iterable[str] = ()) -> None:
+        """Replace and delete sheets in one transaction"""
+        sheets = list(sheets)
+        deleted = list(deleted)
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO fact_sheets (canonical_name, source_hash, data) VALUES (?, ?, ?)",
+                [(sheet.canonical_name, sheet.source_hash, sheet.json()) for sheet in sheets]
+            )
+            self._connection.executemany(
+                "DELETE FROM fact_sheets WHERE canonical_name = ?", [(name,) for name in deleted]
+            )
+        for sheet in sheets:
+            self._cache[sheet.canonical_name] = sheet
+        for name in deleted:
+            self._cache.pop(name, None)
+
+
+class FactSheetBuilder:
+    """Materializes fact sheets from the catalog, rebuilding changed projects only"""
+    
+    def __init__(
+        self,
+        store: FactSheetStore,
+        qdrant_clients: Optional[QdrantClients] = None,
+        include_verbali: bool = True
+    ):
+        self.config = get_config()
+        self.store = store
+        self.qdrant_clients = qdrant_clients or get_qdrant_clients()
+        self.include_verbali = include_verbali
+    
+    def list_verbali_files(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Verbali files per project, newest first, from one scroll over the collection.
+        
+        Only the metadata fields are fetched (no text, no vectors).
+        """
+        verbali_config = self.config.get_agent_config().collections.get("verbali")
+        if not verbali_config or not verbali_config.enabled:
+            return {}
+        
+        files: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        selector = models.PayloadSelectorInclude(
+            include=[f"metadata.{field}" for field in ["project"] + _VERBALI_FIELDS]
+        )
+        offset = None
+        while True:
+            points, offset = self.qdrant_clients.guarded_client.scroll(
+                collection_name=verbali_config.collection_name,
+                limit=1000,
+                offset=offset,
+                with_payload=selector,
+                with_vectors=False,
+            )
+            for point in points:
+                metadata = (point.payload or {}).get("metadata") or {}
+                project = metadata.get("project")
+                file_name = metadata.get("file_name")
+                if not project or not file_name:
+                    continue
+                entry = {field: metadata.get(field) for field in _VERBALI_FIELDS if metadata.get(field)}
+                known = files.setdefault(project, {}).get(file_name)
+                if known is None or str(entry.get("last_modified_time", "")) > str(known.get("last_modified_time", "")):
+                    files[project][file_name] = entry
+            if offset is None:
+                break
+        
+        return {
+            project: sorted(by_name.values(), key=lambda f: str(f.get("last_modified_time", "")), reverse=True)
+            for project, by_name in files.items()
+        }
+    
+    def materialize(self, catalog_rows: List[Dict[str, Any]], force: bool = False) -> Dict[str, Any]:
+        """
+        Bring the store in line with a catalog snapshot.
+        
+        Args:
+            catalog_rows: Catalog entries (as fetched from S3)
+            force: Rebuild every sheet even if its sources did not change
+        
+        Returns:
+            Counters: projects, built, unchanged, deleted, elapsed_time
+        """
+        start_time = time.time()
+        verbali_files: Optional[Dict[str, List[Dict[str, Any]]]] = {}
+        if self.include_verbali:
+            try:
+                verbali_files = self.list_verbali_files()
+            except Exception as e:
+                # Keep the lists of the stored sheets rather than rebuilding every sheet without verbali
+                logger.warning(f"Could not list verbali files for fact sheets, keeping the stored lists: {e}")
+                verbali_files = None
+        
+        stored_hashes = self.store.hashes()
+        changed = []
+        seen = set()
+        for row in catalog_rows:
+            canonical_name = row.get("elemName")
+            if not canonical_name or canonical_name in seen:
+                continue
+            seen.add(canonical_name)
+            if verbali_files is not None:
+                files = verbali_files.get(canonical_name, [])
+            else:
+                stored = self.store.get(canonical_name) if canonical_name in stored_hashes else None
+                files = stored.verbali_files if stored else []
+            source_hash = fact_sheet_hash(row, files)
+            if force or stored_hashes.get(canonical_name) != source_hash:
+                changed.append(build_fact_sheet(canonical_name, row, files, source_hash))
+        
+        deleted = [name for name in stored_hashes if name not in seen]
+        self.store.write(changed, deleted)
+        
+        stats = {
+            "projects": len(seen),
+            "built": len(changed),
+            "unchanged": len(seen) - len(changed),
+            "deleted": len(deleted),
+            "elapsed_time": time.time() - start_time,
+        }
+        logger.info(
+            f"Materialized fact sheets: {stats['built']} built, {stats['unchanged']} unchanged, "
+            f"{stats['deleted']} deleted in {stats['elapsed_time']:.2f}s"
+        )
+        return stats
+
+
+# Global singleton instances
+_fact_sheet_store_instance: Optional[FactSheetStore] = None
+_materialization_lock = threading.Lock()
+
+
+def get_fact_sheet_store() -> FactSheetStore:
+    """Get or create the global fact sheet store singleton"""
+    global _fact_sheet_store_instance
+    if _fact_sheet_store_instance is None:
+        _fact_sheet_store_instance = FactSheetStore(get_config().fact_sheets_path)
+    return _fact_sheet_store_instance
+
+
+def get_fact_sheet(canonical_name: str) -> Optional[ProjectFactSheet]:
+    """Fact sheet of a project if fact sheets are enabled and materialized"""
+    if not get_config().fact_sheets_enabled:
+        return None
+    try:
+        return get_fact_sheet_store().get(canonical_name)
+    except Exception as e:
+        logger.warning(f"Could not read fact sheet for {canonical_name}: {e}")
+        return None
+
+
+def schedule_fact_sheet_refresh(catalog_rows: List[Dict[str, Any]]) -> bool:
+    """
+    Materialize fact sheets for a catalog snapshot on a background thread.
+    
+    Returns False (and does nothing) if a materialization is already running;
+    the next catalog refresh will pick up any remaining changes.
+    """
+    if not _materialization_lock.acquire(blocking=False):
+        logger.debug("Fact sheet materialization already running, skipping")
+        return False
+    
+    def run():
+        try:
+            config = get_config()
+            FactSheetBuilder(
+                get_fact_sheet_store(),
+                include_verbali=config.fact_sheets_include_verbali
+            ).materialize(catalog_rows)
+        except Exception as e:
+            logger.error(f"Fact sheet materialization failed: {e}")
+        finally:
+            _materialization_lock.release()
+    
+    threading.Thread(target=run, name="fact-sheets", daemon=True).start()
+    return True
@@ -0,0 +1,414 @@
+"""
+Document Ingestion Pipeline for Multi-Source RAG System
+
+This module populates the Qdrant collections read by the retrieval tools.
+Documents are chunked, embedded in large batches with a bounded number of
+concurrent embedding requests (with retry), and upserted in parallel batches
+without waiting for indexing.
+
+Every chunk stores a content hash of its source document, so re-running an
+ingestion only re-embeds documents that actually changed. The first chunk
+only gets its hash once all of the document's chunks are stored, so
+documents hit by a failed batch are retried on the next run. Payloads follow the
+langchain layout ({"page_content", "metadata"}) and carry the metadata fields
+the target CollectionConfig expects.
+"""
+
+import hashlib
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from qdrant_client import models
+
+from ..config import get_config
+from ..models import CollectionConfig, IngestionDocument, IngestionStats
+from .qdrant_clients import QdrantClients, get_qdrant_clients
+
+logger = logging.getLogger(__name__)
+
+# Namespace for deterministic chunk point ids (source_id + chunk number)
+_CHUNK_NAMESPACE = uuid.UUID("3b0c1d8e-5f4a-4c2b-9e6d-7a8b9c0d1e2f")
+
+# Bookkeeping fields stored alongside the collection's metadata_fields
+SOURCE_ID_FIELD = "source_id"
+CONTENT_HASH_FIELD = "content_hash"
+CHUNK_NUMBER_FIELD = "chunk_number"
+TOTAL_CHUNKS_FIELD = "total_chunks"
+
+
+def chunk_point_id(source_id: str, chunk_number: int) -> str:
+    """Deterministic point id, so re-ingesting a document overwrites its chunks"""
+    return str(uuid.uuid5(_CHUNK_NAMESPACE, f"{source_id}#{chunk_number}"))
+
+
+class IngestionPipeline:
+    """
+    Chunks, embeds and upserts documents into one collection.
+    
+    Embedding requests and upserts run on separate bounded thread pools, so a
+    slow embedding provider never has more than `embedding_concurrency`
+    requests in flight and Qdrant never more than `upsert_parallelism`.
+    """
+    
+    def __init__(
+        self,
+        collection_config: CollectionConfig,
+        qdrant_clients: Optional[QdrantClients] = None,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        embedding_batch_size: Optional[int] = None,
+        embedding_concurrency: Optional[int] = None,
+        upsert_batch_size: Optional[int] = None,
+        upsert_parallelism: Optional[int] = None,
+        document_batch_size: int = 200,
+        max_retries: int = 3
+    ):
+        config = get_config()
+        self.collection_config = collection_config
+        self.collection_name = collection_config.collection_name
+        self.qdrant_clients = qdrant_clients or get_qdrant_clients()
+        self.chunk_size = chunk_size or config.ingestion_chunk_size
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else config.ingestion_chunk_overlap
+        self.embedding_batch_size = embedding_batch_size or config.embedding_batch_size
+        self.embedding_concurrency = embedding_concurrency or config.embedding_concurrency
+        self.upsert_batch_size = upsert_batch_size or config.upsert_batch_size
+        self.upsert_parallelism = upsert_parallelism or config.upsert_parallelism
+        self.document_batch_size = document_batch_size
+        self.max_retries = max_retries
+        
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap
+        )
+        self._collection_ready = False
+        
+        logger.info(f"Initialized IngestionPipeline for collection: {self.collection_name}")
+    
+    @property
+    def embeddings(self):
+        """Embedding model configured for the collection"""
+        return self.qdrant_clients.get_embedding_model(self.collection_config.embedding_provider)
+    
+    def ensure_collection(self) -> None:
+        """Create the collection and the payload indexes used for change detection and pre-filters"""
+        if self._collection_ready:
+            return
+        
+        client = self.qdrant_clients.client
+        self.qdrant_clients.create_collection(self.collection_name, collection_config=self.collection_config)
+        
+        for field, schema in (
+            (SOURCE_ID_FIELD, models.PayloadSchemaType.KEYWORD),
+            (CHUNK_NUMBER_FIELD, models.PayloadSchemaType.INTEGER),
+        ):
+            try:
+                client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=f"metadata.{field}",
+                    field_schema=schema
+                )
+            except Exception as e:
+                logger.debug(f"Payload index metadata.{field} on {self.collection_name} not created: {e}")
+        self.qdrant_clients.ensure_payload_indexes(self.collection_config)
+        
+        self._collection_ready = True
+    
+    def content_hash(self, document: IngestionDocument) -> str:
+        """Hash of the text, stored metadata and chunking parameters of a document"""
+        digest = hashlib.sha256()
+        digest.update(document.text.encode("utf-8"))
+        digest.update(json.dumps(self._select_metadata(document), sort_keys=True, default=str).encode("utf-8"))
+        digest.update(f"{self.chunk_size}:{self.chunk_overlap}".encode("utf-8"))
+        return digest.hexdigest()
+    
+    def ingest(
+        self,
+        documents: Iterable[IngestionDocument],
+        force: bool = False,
+        progress_callback: Optional[Callable[[IngestionStats], None]] = None
+    ) -> IngestionStats:
+        """
+        Ingest documents into the collection.
+        
+        Args:
+            documents: Documents to ingest (consumed lazily, in groups)
+            force: Re-embed documents even if their content hash is unchanged
+            progress_callback: Called with the running stats after each group
+        
+        Returns:
+            IngestionStats for the run
+        """
+        start_time = time.time()
+        stats = IngestionStats(collection_name=self.collection_name)
+        self.ensure_collection()
+        
+        with ThreadPoolExecutor(max_workers=self.embedding_concurrency) as embed_pool, \
+                ThreadPoolExecutor(max_workers=self.upsert_parallelism) as upsert_pool:
+            for group in _batched(documents, self.document_batch_size):
+                self._ingest_group(group, force, stats, embed_pool, upsert_pool)
+                stats.elapsed_time = time.time() - start_time
+                if progress_callback:
+                    progress_callback(stats)
+        
+        stats.elapsed_time = time.time() - start_time
+        logger.info(
+            f"Ingested {stats.documents_ingested}/{stats.documents_seen} documents into {self.collection_name} "
+            f"({stats.documents_skipped} unchanged, {stats.chunks_upserted} chunks, "
+            f"{stats.chunks_per_second:.1f} chunks/s, {stats.failed_batches} failed batches, "
+            f"{stats.documents_failed} documents to retry)"
+        )
+        return stats
+    
+    def _ingest_group(
+        self,
+        group: List[IngestionDocument],
+        force: bool,
+        stats: IngestionStats,
+        embed_pool: ThreadPoolExecutor,
+        upsert_pool: ThreadPoolExecutor
+    ) -> None:
+        """Chunk, embed and upsert one group of documents"""
+        stats.documents_seen += len(group)
+        
+        # Last occurrence wins if a source appears twice in the same group
+        group = list({document.source_id: document for document in group}.values())
+        existing = {} if force else self._fetch_existing(group)
+        
+        chunks: List[Tuple[str, str, Dict[str, Any]]] = []
+        # Per changed document: content hash and stale trailing chunk ids, applied once all its chunks are stored
+        changed: Dict[str, Tuple[str, List[str]]] = {}
+        for document in group:
+            content_hash = self.content_hash(document)
+            previous_hash, previous_total = existing.get(document.source_id, (None, 0))
+            if previous_hash == content_hash:
+                stats.documents_skipped += 1
+                continue
+            
+            texts = self._splitter.split_text(document.text) or [""]
+            metadata = self._select_metadata(document)
+            for chunk_number, text in enumerate(texts):
+                chunk_metadata = dict(metadata)
+                chunk_metadata.update({
+                    SOURCE_ID_FIELD: document.source_id,
+                    # Chunk 0's hash marks the document as complete, so it is only set after all chunks are stored
+                    CONTENT_HASH_FIELD: content_hash if chunk_number else None,
+                    CHUNK_NUMBER_FIELD: chunk_number,
+                    TOTAL_CHUNKS_FIELD: len(texts),
+                })
+                chunks.append((chunk_point_id(document.source_id, chunk_number), text, chunk_metadata))
+            
+            # Trailing chunks left over from a longer previous version
+            stale_ids = [
+                chunk_point_id(document.source_id, chunk_number)
+                for chunk_number in range(len(texts), previous_total)
+            ]
+            changed[document.source_id] = (content_hash, stale_ids)
+        
+        if not chunks:
+            return
+        
+        # Documents with a chunk in a failed batch; retried on the next run
+        failed_sources = set()
+        
+        # Embed in batches; as each batch completes, hand its points to the upsert pool
+        embed_futures = {
+            embed_pool.submit(self._embed_with_retry, [text for _, text, _ in batch]): batch
+            for batch in _batched(chunks, self.embedding_batch_size)
+        }
+        upsert_futures = {}
+        pending_points: List[models.PointStruct] = []
+        
+        while embed_futures:
+            done, _ = wait(embed_futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = embed_futures.pop(future)
+                try:
+                    vectors = future.result()
+                except Exception as e:
+                    logger.error(f"Embedding batch of {len(batch)} chunks failed for {self.collection_name}: {e}")
+                    stats.failed_batches += 1
+                    failed_sources.update(metadata[SOURCE_ID_FIELD] for _, _, metadata in batch)
+                    continue
+                
+                pending_points.extend(
+                    models.PointStruct(
+                        id=point_id,
+                        vector=vector,
+                        payload={"page_content": text, "metadata": metadata}
+                    )
+                    for (point_id, text, metadata), vector in zip(batch, vectors)
+                )
+                while len(pending_points) >= self.upsert_batch_size:
+                    points, pending_points = pending_points[:self.upsert_batch_size], pending_points[self.upsert_batch_size:]
+                    upsert_futures[upsert_pool.submit(self._upsert_with_retry, points)] = points
+        
+        if pending_points:
+            upsert_futures[upsert_pool.submit(self._upsert_with_retry, pending_points)] = pending_points
+        
+        for future, points in upsert_futures.items():
+            try:
+                stats.chunks_upserted += future.result()
+            except Exception as e:
+                logger.error(f"Upsert batch failed for {self.collection_name}: {e}")
+                stats.failed_batches += 1
+                failed_sources.update(point.payload["metadata"][SOURCE_ID_FIELD] for point in points)
+        
+        completed = {source_id: entry for source_id, entry in changed.items() if source_id not in failed_sources}
+        stats.documents_failed += len(changed) - len(completed)
+        if not completed:
+            return
+        
+        # Mark completed documents with their content hash (one request for the group)
+        try:
+            self._with_retry(
+                lambda: self.qdrant_clients.client.batch_update_points(
+                    collection_name=self.collection_name,
+                    update_operations=[
+                        models.SetPayloadOperation(set_payload=models.SetPayload(
+                            payload={CONTENT_HASH_FIELD: content_hash},
+                            points=[chunk_point_id(source_id, 0)],
+                            key="metadata"
+                        ))
+                        for source_id, (content_hash, _) in completed.items()
+                    ],
+                    wait=False
+                )
+            )
+        except Exception as e:
+            logger.error(f"Failed to mark {len(completed)} documents as ingested in {self.collection_name}: {e}")
+            stats.failed_batches += 1
+            stats.documents_failed += len(completed)
+            return
+        stats.documents_ingested += len(completed)
+        
+        stale_ids = [point_id for _, ids in completed.values() for point_id in ids]
+        if stale_ids:
+            try:
+                self._with_retry(
+                    lambda: self.qdrant_clients.client.delete(
+                        collection_name=self.collection_name,
+                        points_selector=models.PointIdsList(points=stale_ids),
+                        wait=False
+                    )
+                )
+                stats.chunks_deleted += len(stale_ids)
+            except Exception as e:
+                logger.error(f"Failed to delete {len(stale_ids)} stale chunks from {self.collection_name}: {e}")
+    
+    def _fetch_existing(self, group: List[IngestionDocument]) -> Dict[str, Tuple[str, int]]:
+        """Content hash and chunk count already stored for each source id in the group"""
+        source_ids = [document.source_id for document in group]
+        scroll_filter = models.Filter(must=[
+            models.FieldCondition(key=f"metadata.{SOURCE_ID_FIELD}", match=models.MatchAny(any=source_ids)),
+            models.FieldCondition(key=f"metadata.{CHUNK_NUMBER_FIELD}", match=models.MatchValue(value=0)),
+        ])
+        
+        existing: Dict[str, Tuple[str, int]] = {}
+        offset = None
+        try:
+            while True:
+                points, offset = self.qdrant_clients.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=scroll_filter,
+                    limit=len(source_ids),
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=False,
+                )
+                for point in points:
+                    metadata = (point.payload or {}).get("metadata", {})
+                    existing[metadata.get(SOURCE_ID_FIELD)] = (
+                        metadata.get(CONTENT_HASH_FIELD),
+                        int(metadata.get(TOTAL_CHUNKS_FIELD) or 0)
+                    )
+                if offset is None:
+                    break
+        except Exception as e:
+            # Without hashes every document is treated as changed
+            logger.warning(f"Could not fetch existing content hashes from {self.collection_name}: {e}")
+        
+        return existing
+    
+    def _select_metadata(self, document: IngestionDocument) -> Dict[str, Any]:
+        """Keep the metadata fields the collection expects, in its declared order"""
+        metadata = {}
+        missing = []
+        for field in self.collection_config.metadata_fields:
+            if field in (CHUNK_NUMBER_FIELD, TOTAL_CHUNKS_FIELD):
+                continue  # Filled in per chunk
+            if field in document.metadata:
+                metadata[field] = document.metadata[field]
+            else:
+                metadata[field] = None
+                missing.append(field)
+        
+        if missing:
+            logger.debug(f"Document {document.source_id} is missing metadata fields {missing}")
+        return metadata
+    
+    def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        return self._with_retry(lambda: self.embeddings.embed_documents(texts))
+    
+    def _upsert_with_retry(self, points: List[models.PointStruct]) -> int:
+        self._with_retry(
+            lambda: self.qdrant_clients.client.upsert(
+                collection_name=self.collection_name,
+                points=points,
+                wait=False
+            )
+        )
+        return len(points)
+    
+    def _with_retry(self, operation: Callable[[], Any]) -> Any:
+        """Run an operation, retrying with exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return operation()
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(5.0, 0.5 * (2 ** attempt))
+                logger.warning(f"Attempt {attempt + 1} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+def _batched(values: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield consecutive lists of at most `size` elements from any iterable"""
+    batch = []
+    for value in values:
+        batch.append(value)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_jsonl_documents(path: str) -> Iterator[IngestionDocument]:
+    """
+    Stream documents from a JSONL file.
+    
+    Each line is an object with "source_id", "text" and an optional "metadata" dict.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield IngestionDocument(**json.loads(line))
+            except Exception as e:
+                logger.error(f"Skipping invalid document on line {line_number} of {path}: {e}")
+
+
+def get_ingestion_pipeline(collection_type: str, **kwargs) -> IngestionPipeline:
+    """Create an ingestion pipeline for a configured collection type (e.g. "verbali", "wiki")"""
+    collection_config = get_config().get_agent_config().collections.get(collection_type)
+    if collection_config is None:
+        raise ValueError(f"Unknown collection type: {collection_type}")
+    return IngestionPipeline(collection_config, **kwargs)
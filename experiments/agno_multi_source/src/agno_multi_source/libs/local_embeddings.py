@@ -0,0 +1,125 @@
+"""
+Local CPU Embeddings for Multi-Source RAG System
+
+This module provides an in-process embedding model (EMBEDDING_PROVIDER=Local-embeddings)
+backed by sentence-transformers (optional, see requirements-local.txt), with
+either the ONNX runtime or PyTorch as inference backend. It removes the Bedrock/OpenAI round-trip from every search:
+query embeddings take a few milliseconds instead of hundreds.
+
+Models are loaded once per process and shared between instances. Large
+document batches are split and encoded on a small thread pool, and a warmup
+hook loads the model and runs a first inference ahead of the first request.
+
+Note that vectors from a local model are not compatible with collections
+built with a remote model; re-ingest the collections after switching.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Loaded models shared across instances, keyed by (model name, backend)
+_model_cache: Dict[Tuple[str, str], Any] = {}
+_model_cache_lock = threading.Lock()
+
+
+def load_sentence_transformer(model_name: str, backend: str = "onnx", cache_folder: Optional[str] = None):
+    """Load a sentence-transformers model on CPU, reusing an already loaded instance"""
+    key = (model_name, backend)
+    if key not in _model_cache:
+        with _model_cache_lock:
+            if key not in _model_cache:
+                from sentence_transformers import SentenceTransformer
+                
+                _model_cache[key] = SentenceTransformer(
+                    model_name,
+                    device="cpu",
+                    backend=backend,
+                    cache_folder=cache_folder
+                )
+                logger.info(f"Loaded local embedding model: {model_name} ({backend})")
+    return _model_cache[key]
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Langchain-compatible embeddings computed locally on CPU.
+    
+    Queries are encoded directly on the calling thread; document lists larger
+    than one batch are split and encoded concurrently on a thread pool.
+    """
+    
+    def __init__(
+        self,
+        model_name: str,
+        backend: str = "onnx",
+        batch_size: int = 32,
+        max_workers: int = 2,
+        cache_folder: Optional[str] = None,
+        normalize: bool = True
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_workers = max(1, max_workers)
+        self.cache_folder = cache_folder
+        self.normalize = normalize
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+    
+    @property
+    def model(self):
+        """Get or load the sentence-transformers model"""
+        return load_sentence_transformer(self.model_name, self.backend, self.cache_folder)
+    
+    @property
+    def dimension(self) -> int:
+        """Output dimension of the model"""
+        return self.model.get_sentence_embedding_dimension()
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Thread pool for batched document encoding"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="local-embeddings"
+                    )
+        return self._executor
+    
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=self.normalize,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return vectors.tolist()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if len(texts) <= self.batch_size or self.max_workers == 1:
+            return self._encode(texts)
+        
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        vectors = []
+        for batch_vectors in self.executor.map(self._encode, batches):
+            vectors.extend(batch_vectors)
+        return vectors
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
+    
+    def warmup(self) -> None:
+        """Load the model and run one inference so the first real query is fast"""
+        self._encode(["warmup"])
+        logger.info(f"Local embedding model warmed up: {self.model_name}")
@@ -12,10 +12,11 @@ import logging
 from functools import lru_cache
 from typing import Dict, List, Optional, Set, Tuple
 
-import boto3
 from pydantic import BaseModel
 
 from ..config import get_config
+from .aws_clients import get_aws_clients
+from .fact_sheets import schedule_fact_sheet_refresh
 from ..models import ProjectInfo, ProjectNameField
 
 logger = logging.getLogger(__name__)
@@ -31,7 +32,7 @@ class ProjectManager:
         self.config = get_config()
         self._projects: Dict[str, ProjectInfo] = {}
         self._name_to_canonical: Dict[str, str] = {}  # Maps any name/alias to canonical name
-        self._s3_client = boto3.client("s3")
+        self._aws_clients = get_aws_clients()
         self._catalog_cache_ttl = 3600  # Cache catalog for 1 hour
         self._last_catalog_fetch = 0
     
@@ -39,11 +40,12 @@ class ProjectManager:
         """Fetch the project catalog from S3"""
         try:
             logger.info(f"Fetching project catalog from s3://{self.config.catalog_s3_bucket}/{self.config.catalog_s3_key}")
-            response = self._s3_client.get_object(
-                Bucket=self.config.catalog_s3_bucket, 
-                Key=self.config.catalog_s3_key
+            # With S3_CACHE_DIR set, an unchanged catalog costs a single HEAD request
+            body = self._aws_clients.read_s3_object(
+                self.config.catalog_s3_bucket,
+                self.config.catalog_s3_key,
+                use_cache=True
             )
-            body = response['Body'].read()
             catalog_data = json.loads(body.decode('utf-8'))
             
             if not isinstance(catalog_data, list):
@@ -52,7 +54,7 @@ class ProjectManager:
             
             logger.info(f"Successfully fetched {len(catalog_data)} project entries from catalog")
             return catalog_data
-            
+        
         except Exception as e:
             logger.error(f"Error fetching catalog from S3: {e}")
             return []
@@ -113,6 +115,10 @@ class ProjectManager:
         
         self._build_project_mappings(catalog_data)
         self._last_catalog_fetch = current_time
+        
+        # Rebuild the fact sheets of changed projects in the background
+        if self.config.fact_sheets_enabled:
+            schedule_fact_sheet_refresh(catalog_data)
         return True
     
     def get_canonical_name(self, project_name: str) -> Optional[str]:
@@ -0,0 +1,75 @@
+"""
+Prompt-Prefix Caching for Multi-Source RAG System
+
+This module builds the agent's model so that the provider-side prompt cache
+(Anthropic models on Bedrock) can reuse the parts that repeat between turns.
+With caching on, agno's Bedrock Claude model marks cache breakpoints after:
+1. Tool schemas - identical for every request of the agent
+2. System prompt - the static prompt, optionally followed by the fact sheet
+   of the chat's current project (one agent per project and fact sheet)
+
+Cached prefix tokens are billed at a fraction of the input price and skip
+prefill, which lowers time-to-first-token for multi-turn chats. A prefix
+shorter than the provider minimum (about 1024 tokens) is not cached.
+Conversation history is not cached.
+"""
+
+import logging
+from typing import Any, Optional
+
+from ..config import get_config
+from .fact_sheets import get_fact_sheet
+
+logger = logging.getLogger(__name__)
+
+
+def format_chat_prefix(fact_sheet_text: str) -> str:
+    """Wrap the current project's fact sheet for the chat prefix"""
+    return f"Scheda del progetto corrente di questa chat (dal catalogo):\n{fact_sheet_text}"
+
+
+def chat_prefix_for_project(project: Optional[str]) -> Optional[str]:
+    """
+    Chat prefix for a chat's current project, or None.
+    
+    Only built for a single specific project with a materialized fact sheet;
+    the text only changes when the catalog refresh changes the fact sheet, so
+    it stays cacheable across the turns of a chat.
+    """
+    config = get_config()
+    if not config.prompt_cache_fact_sheet or not project or project == "general":
+        return None
+    fact_sheet = get_fact_sheet(project)
+    if fact_sheet is None:
+        return None
+    return format_chat_prefix(fact_sheet.render())
+
+
+def build_agent_model(model_id: str, temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> Any:
+    """
+    Bedrock model for the agno Agent.
+    
+    Returns agno's AwsBedrock model. Prompt caching is opt-in: with
+    PROMPT_CACHING on and an Anthropic model id, agno's Bedrock Claude model
+    is used instead, with the tool schemas and system prompt cached.
+    
+    Args:
+        model_id: Bedrock model id
+        temperature: Sampling temperature (model default if None)
+        max_tokens: Maximum output tokens (model default if None)
+    """
+    from agno.models.aws import AwsBedrock, Claude
+    
+    config = get_config()
+    settings = {"id": model_id, "aws_region": config.aws_region}
+    if temperature is not None:
+        settings["temperature"] = temperature
+    if max_tokens is not None:
+        settings["max_tokens"] = max_tokens
+    
+    if config.prompt_caching and "anthropic" in model_id:
+        try:
+            return Claude(**settings, cache_system_prompt=True, cache_tools=True)
+        except ImportError as e:
+            logger.warning(f"Bedrock Claude model not available, prompt caching disabled: {e}")
+    return AwsBedrock(**settings)
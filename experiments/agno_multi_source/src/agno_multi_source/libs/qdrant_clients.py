@@ -6,17 +6,41 @@ and connection handling for vector database operations.
 """
 
 import logging
-from typing import Dict, List, Optional
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
 
+import numpy as np
 from langchain_core.documents import Document
 from langchain_qdrant import Qdrant
 from qdrant_client import QdrantClient, models
 
 from ..config import get_config
 from ..models import CollectionConfig
+from .resilience import ResilientProxy, get_backend
 
 logger = logging.getLogger(__name__)
 
+# Output dimensions of known embedding models, keyed by model id
+EMBEDDING_DIMENSIONS = {
+    "amazon.titan-embed-text-v1": 1536,
+    "amazon.titan-embed-g1-text-02": 1536,
+    "amazon.titan-embed-text-v2:0": 1024,
+    "cohere.embed-multilingual-v3": 1024,
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2": 384,
+    "intfloat/multilingual-e5-small": 384,
+}
+
+# A date bound: datetime, date or ISO 8601 string (None = open)
+DateBound = Optional[Union[datetime, date, str]]
+
+# Inclusive (since, until) bounds per metadata date field
+DateRanges = Dict[str, Tuple[DateBound, DateBound]]
+
 
 class QdrantClients:
     """
@@ -29,8 +53,15 @@ class QdrantClients:
     def __init__(self):
         self.config = get_config()
         self._client = None
+        self._guarded_client = None
         self._vectorstores: Dict[str, Qdrant] = {}
         self._embedding_models: Dict[str, any] = {}
+        self._vector_sizes: Dict[str, int] = {}
+        self._warmed_up: Set[str] = set()
+        self._collection_configs: Optional[Dict[str, CollectionConfig]] = None
+        self._query_embeddings: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._query_embeddings_lock = threading.Lock()
+        self._indexed_collections: set = set()
     
     @property
     def client(self) -> QdrantClient:
@@ -48,6 +79,19 @@ class QdrantClients:
         
         return self._client
     
+    @property
+    def guarded_client(self) -> QdrantClient:
+        """
+        The Qdrant client with read calls bounded by the qdrant backend policy.
+        
+        Searches and scrolls get a deadline, go through the circuit breaker
+        and may be hedged; other methods are passed through unchanged.
+        """
+        if self._guarded_client is None or self._guarded_client._target is not self.client:
+            read_methods = {"search", "scroll", "query_points", "retrieve", "count"}
+            self._guarded_client = ResilientProxy(self.client, get_backend("qdrant"), read_methods, read_methods)
+        return self._guarded_client
+    
     def get_embedding_model(self, embeddings_type: str = "Bedrock-embeddings"):
         """Get or create an embedding model"""
         if embeddings_type not in self._embedding_models:
@@ -61,6 +105,15 @@ class QdrantClients:
                 elif embeddings_type == "OpenAI-embeddings":
                     from langchain_openai import OpenAIEmbeddings
                     self._embedding_models[embeddings_type] = OpenAIEmbeddings()
+                elif embeddings_type == "Local-embeddings":
+                    from .local_embeddings import LocalEmbeddings
+                    self._embedding_models[embeddings_type] = LocalEmbeddings(
+                        model_name=self.config.local_embedding_model,
+                        backend=self.config.local_embedding_backend,
+                        batch_size=self.config.local_embedding_batch_size,
+                        max_workers=self.config.local_embedding_threads,
+                        cache_folder=self.config.local_embedding_cache_dir
+                    )
                 else:
                     raise ValueError(f"Unsupported embeddings type: {embeddings_type}")
                 
@@ -71,20 +124,196 @@ class QdrantClients:
         
         return self._embedding_models[embeddings_type]
     
-    def create_collection(self, collection_name: str, vector_size: int = 1024):
-        """Create a collection if it doesn't exist"""
+    def embed_query(self, query: str, embeddings_type: Optional[str] = None) -> List[float]:
+        """
+        Embed a query, reusing the vector of a recent identical query.
+        
+        Keeps an LRU cache of QUERY_EMBEDDING_CACHE_SIZE vectors keyed by
+        (provider, query), so several tools searching for the same question
+        pay for a single embedding request.
+        """
+        embeddings_type = embeddings_type or self.config.embedding_provider
+        key = (embeddings_type, query)
+        with self._query_embeddings_lock:
+            vector = self._query_embeddings.get(key)
+            if vector is not None:
+                self._query_embeddings.move_to_end(key)
+                return vector
+        
+        vector = get_backend("embeddings").call(
+            self.get_embedding_model(embeddings_type).embed_query, query, idempotent=True
+        )
+        with self._query_embeddings_lock:
+            self._query_embeddings[key] = vector
+            while len(self._query_embeddings) > self.config.query_embedding_cache_size:
+                self._query_embeddings.popitem(last=False)
+        return vector
+    
+    def warmup_embeddings(self, embeddings_type: Optional[str] = None) -> None:
+        """Create the embedding model and run a first inference ahead of user traffic (once per model)"""
+        embeddings_type = embeddings_type or self.config.embedding_provider
+        if embeddings_type in self._warmed_up:
+            return
+        try:
+            embeddings = self.get_embedding_model(embeddings_type)
+            if hasattr(embeddings, "warmup"):
+                embeddings.warmup()
+            else:
+                embeddings.embed_query("warmup")
+            self._warmed_up.add(embeddings_type)
+            logger.info(f"Warmed up embedding model: {embeddings_type}")
+        except Exception as e:
+            logger.warning(f"Embedding warmup failed for {embeddings_type}: {e}")
+    
+    def get_vector_size(self, embeddings_type: Optional[str] = None) -> int:
+        """
+        Get the output dimension of an embedding model.
+        
+        Known model ids are looked up without calling the model; anything else
+        is probed once with a short text and cached.
+        """
+        embeddings_type = embeddings_type or self.config.embedding_provider
+        if embeddings_type not in self._vector_sizes:
+            embeddings = self.get_embedding_model(embeddings_type)
+            model_id = (
+                getattr(embeddings, "model_id", None)
+                or getattr(embeddings, "model_name", None)
+                or getattr(embeddings, "model", None)
+            )
+            vector_size = EMBEDDING_DIMENSIONS.get(model_id)
+            if vector_size is None:
+                vector_size = len(embeddings.embed_query("vector size probe"))
+            self._vector_sizes[embeddings_type] = vector_size
+            logger.debug(f"Vector size for {embeddings_type} ({model_id}): {vector_size}")
+        
+        return self._vector_sizes[embeddings_type]
+    
+    def create_collection(
+        self,
+        collection_name: str,
+        vector_size: Optional[int] = None,
+        collection_config: Optional[CollectionConfig] = None
+    ):
+        """
+        Create a collection if it doesn't exist.
+        
+        The vector size defaults to the collection's embedding model dimension.
+        Quantization, on-disk vectors and HNSW parameters come from the
+        collection config, falling back to the global defaults.
+        """
         try:
+            if self.client.collection_exists(collection_name):
+                logger.debug(f"Collection {collection_name} already exists")
+                return
+            
+            settings = self.get_storage_settings(collection_config)
+            if vector_size is None:
+                vector_size = settings["vector_size"] or self.get_vector_size(
+                    collection_config.embedding_provider if collection_config else None
+                )
+            
             self.client.create_collection(
                 collection_name=collection_name,
                 vectors_config=models.VectorParams(
                     size=vector_size, 
-                    distance=models.Distance.COSINE
+                    distance=models.Distance.COSINE,
+                    on_disk=settings["on_disk"]
                 ),
+                hnsw_config=_build_hnsw_config(settings),
+                quantization_config=build_quantization_config(settings["quantization"]),
+            )
+            logger.info(
+                f"Created collection: {collection_name} (size={vector_size}, "
+                f"quantization={settings['quantization']}, on_disk={settings['on_disk']})"
             )
-            logger.info(f"Created collection: {collection_name}")
         except Exception as e:
-            # Collection might already exist
-            logger.debug(f"Collection {collection_name} might already exist: {e}")
+            # Collection might have been created concurrently
+            logger.warning(f"Could not create collection {collection_name}: {e}")
+    
+    def apply_storage_settings(self, collection_config: CollectionConfig) -> bool:
+        """Apply quantization, on-disk and HNSW settings to an existing collection"""
+        try:
+            settings = self.get_storage_settings(collection_config)
+            quantization_config = build_quantization_config(settings["quantization"])
+            self.client.update_collection(
+                collection_name=collection_config.collection_name,
+                vectors_config={"": models.VectorParamsDiff(on_disk=settings["on_disk"])},
+                hnsw_config=_build_hnsw_config(settings),
+                quantization_config=quantization_config or models.Disabled.DISABLED,
+            )
+            logger.info(f"Updated storage settings for collection: {collection_config.collection_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update storage settings for {collection_config.collection_name}: {e}")
+            return False
+    
+    def get_storage_settings(self, collection_config: Optional[CollectionConfig] = None) -> Dict[str, Any]:
+        """Resolve storage and search settings for a collection against the global defaults"""
+        def resolve(field: str, default: Any) -> Any:
+            value = getattr(collection_config, field, None) if collection_config else None
+            return default if value is None else value
+        
+        return {
+            "vector_size": resolve("vector_size", None),
+            "quantization": resolve("quantization", self.config.vector_quantization).lower(),
+            "on_disk": resolve("on_disk", self.config.vectors_on_disk),
+            "hnsw_m": resolve("hnsw_m", self.config.hnsw_m),
+            "hnsw_ef_construct": resolve("hnsw_ef_construct", self.config.hnsw_ef_construct),
+            "search_hnsw_ef": resolve("search_hnsw_ef", self.config.search_hnsw_ef),
+            "quantization_rescore": resolve("quantization_rescore", self.config.quantization_rescore),
+            "quantization_oversampling": resolve("quantization_oversampling", self.config.quantization_oversampling),
+        }
+    
+    def get_collection_config(self, collection_name: str) -> Optional[CollectionConfig]:
+        """Find the configured CollectionConfig for a collection name"""
+        if self._collection_configs is None:
+            self._collection_configs = {
+                collection_config.collection_name: collection_config
+                for collection_config in self.config.get_agent_config().collections.values()
+            }
+        return self._collection_configs.get(collection_name)
+    
+    def ensure_payload_indexes(self, collection_config: Optional[CollectionConfig]) -> None:
+        """
+        Create the payload indexes used by pre-filters, once per collection and process.
+        
+        The collection's date_field gets a datetime index (needed for range
+        filters on large collections and for ordered scrolls), and the project
+        field a keyword index. Existing indexes are left as they are.
+        """
+        if collection_config is None or collection_config.collection_name in self._indexed_collections:
+            return
+        
+        indexes = []
+        if collection_config.date_field:
+            indexes.append((collection_config.date_field, models.PayloadSchemaType.DATETIME))
+        if "project" in collection_config.metadata_fields:
+            indexes.append(("project", models.PayloadSchemaType.KEYWORD))
+        for field, schema in indexes:
+            try:
+                self.client.create_payload_index(
+                    collection_name=collection_config.collection_name,
+                    field_name=f"metadata.{field}",
+                    field_schema=schema
+                )
+            except Exception as e:
+                logger.debug(f"Payload index metadata.{field} on {collection_config.collection_name} not created: {e}")
+        self._indexed_collections.add(collection_config.collection_name)
+    
+    def build_search_params(self, collection_config: Optional[CollectionConfig]) -> Optional[models.SearchParams]:
+        """Search-time HNSW ef and quantization rescoring options for a collection"""
+        settings = self.get_storage_settings(collection_config)
+        quantization = None
+        if settings["quantization"] != "none":
+            quantization = models.QuantizationSearchParams(
+                ignore=False,
+                rescore=settings["quantization_rescore"],
+                oversampling=settings["quantization_oversampling"],
+            )
+        
+        if settings["search_hnsw_ef"] is None and quantization is None:
+            return None
+        return models.SearchParams(hnsw_ef=settings["search_hnsw_ef"], quantization=quantization)
     
     def get_vectorstore(self, collection_config: CollectionConfig) -> Qdrant:
         """Get or create a vectorstore for a collection"""
@@ -93,7 +322,7 @@ class QdrantClients:
         if collection_name not in self._vectorstores:
             try:
                 # Ensure collection exists
-                self.create_collection(collection_name)
+                self.create_collection(collection_name, collection_config=collection_config)
                 
                 # Get embedding model
                 embeddings = self.get_embedding_model(collection_config.embedding_provider)
@@ -114,38 +343,144 @@ class QdrantClients:
         
         return self._vectorstores[collection_name]
     
+    def build_metadata_filter(
+        self,
+        filter_dict: Optional[Dict[str, Any]],
+        date_ranges: Optional[DateRanges] = None
+    ) -> Optional[models.Filter]:
+        """
+        Build a Qdrant filter on the nested metadata payload.
+        
+        Every key/value pair of filter_dict must match, and every date field
+        in date_ranges must fall within its (since, until) bounds.
+        """
+        filter_conditions = []
+        for key, value in (filter_dict or {}).items():
+            filter_conditions.append(
+                models.FieldCondition(
+                    key=f"metadata.{key}",  # Access nested metadata field
+                    match=models.MatchValue(value=value)
+                )
+            )
+        for field, (since, until) in (date_ranges or {}).items():
+            condition = date_range_condition(field, since, until)
+            if condition is not None:
+                filter_conditions.append(condition)
+        
+        if not filter_conditions:
+            return None
+        return models.Filter(must=filter_conditions)
+    
+    def search_points(
+        self,
+        collection_name: str,
+        query: str,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        embeddings_type: Optional[str] = None,
+        search_params: Optional[models.SearchParams] = None,
+        date_ranges: Optional[DateRanges] = None
+    ) -> List[models.ScoredPoint]:
+        """
+        Run a vector search on a collection and return the raw scored points.
+        
+        Used by retrievers that build their own result dicts from the payload
+        and rerank the candidates afterwards. Unless given, search params
+        (HNSW ef, quantization rescoring) come from the collection's config.
+        Date ranges are applied by Qdrant as pre-filters.
+        """
+        collection_config = self.get_collection_config(collection_name)
+        if search_params is None:
+            search_params = self.build_search_params(collection_config)
+        if date_ranges:
+            self.ensure_payload_indexes(collection_config)
+        points = self.guarded_client.search(
+            collection_name=collection_name,
+            query_vector=self.embed_query(query, embeddings_type),
+            query_filter=self.build_metadata_filter(filter_dict, date_ranges),
+            limit=limit,
+            score_threshold=score_threshold,
+            search_params=search_params,
+            with_payload=True,
+        )
+        logger.debug(f"Found {len(points)} points in {collection_name}")
+        return points
+    
+    def mmr_search_points(
+        self,
+        collection_name: str,
+        query: str,
+        k: int = 5,
+        fetch_k: int = 20,
+        lambda_mult: Optional[float] = None,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        score_threshold: Optional[float] = None,
+        embeddings_type: Optional[str] = None,
+        search_params: Optional[models.SearchParams] = None,
+        date_ranges: Optional[DateRanges] = None
+    ) -> List[models.ScoredPoint]:
+        """
+        Maximal marginal relevance search returning the selected points in MMR order.
+        
+        The fetch_k candidates come back with their vectors in a single search
+        request, and the diversity selection runs on them in memory, so no
+        extra round-trips or query re-embedding are needed.
+        """
+        collection_config = self.get_collection_config(collection_name)
+        if search_params is None:
+            search_params = self.build_search_params(collection_config)
+        if date_ranges:
+            self.ensure_payload_indexes(collection_config)
+        query_vector = self.embed_query(query, embeddings_type)
+        candidates = self.guarded_client.search(
+            collection_name=collection_name,
+            query_vector=query_vector,
+            query_filter=self.build_metadata_filter(filter_dict, date_ranges),
+            limit=max(fetch_k, k),
+            score_threshold=score_threshold,
+            search_params=search_params,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if not candidates:
+            return []
+        
+        selected = maximal_marginal_relevance(
+            query_vector,
+            [point.vector for point in candidates],
+            k=k,
+            lambda_mult=self.config.mmr_lambda if lambda_mult is None else lambda_mult
+        )
+        logger.debug(f"MMR selected {len(selected)} of {len(candidates)} candidates in {collection_name}")
+        return [candidates[i] for i in selected]
+    
     def scroll_all_documents_for_project(
         self, 
         collection_name: str, 
-        project_filter_dict: Dict[str, str]
+        project_filter_dict: Dict[str, str],
+        date_ranges: Optional[DateRanges] = None
     ) -> List[Document]:
         """
         Retrieve ALL documents for a project using Qdrant scroll.
         This is the unified approach for MI, SA, RFC, and Verbali collections.
+        Optional date ranges restrict the scroll on the Qdrant side.
         """
         if not project_filter_dict:
             logger.warning(f"No project filter provided for collection {collection_name}")
             return []
         
         try:
-            # Build the filter conditions from the project_filter_dict
-            filter_conditions = []
-            for key, value in project_filter_dict.items():
-                filter_conditions.append(
-                    models.FieldCondition(
-                        key=f"metadata.{key}",  # Access nested metadata field
-                        match=models.MatchValue(value=value)
-                    )
-                )
-            
-            scroll_filter = models.Filter(must=filter_conditions)
+            if date_ranges:
+                self.ensure_payload_indexes(self.get_collection_config(collection_name))
+            scroll_filter = self.build_metadata_filter(project_filter_dict, date_ranges)
             
             # Scroll through all points with the filter
             all_points = []
             offset = None
             
             while True:
-                result = self.client.scroll(
+                result = self.guarded_client.scroll(
                     collection_name=collection_name,
                     scroll_filter=scroll_filter,
                     limit=100,  # Process in batches of 100
@@ -183,34 +518,119 @@ class QdrantClients:
             logger.error(f"Error scrolling documents from {collection_name}: {e}")
             return []
     
+    def scroll_latest_documents(
+        self,
+        collection_name: str,
+        filter_dict: Optional[Dict[str, Any]],
+        date_field: str,
+        limit: int = 10,
+        date_ranges: Optional[DateRanges] = None
+    ) -> List[Document]:
+        """
+        Retrieve the newest documents (chunks) matching a filter, newest first.
+        
+        Qdrant orders the scroll by the datetime index on date_field, so only
+        `limit` points are read, e.g. for "last meeting" questions. If the
+        server cannot order by the field, all matching points are scrolled and
+        sorted here instead.
+        """
+        try:
+            self.ensure_payload_indexes(self.get_collection_config(collection_name))
+            scroll_filter = self.build_metadata_filter(filter_dict, date_ranges)
+            try:
+                points, _ = self.guarded_client.scroll(
+                    collection_name=collection_name,
+                    scroll_filter=scroll_filter,
+                    limit=limit,
+                    order_by=models.OrderBy(key=f"metadata.{date_field}", direction=models.Direction.DESC),
+                    with_payload=True,
+                    with_vectors=False,
+                )
+            except Exception as e:
+                logger.warning(f"Ordered scroll on {collection_name}.{date_field} failed, sorting client-side: {e}")
+                points = []
+                offset = None
+                while True:
+                    batch, offset = self.guarded_client.scroll(
+                        collection_name=collection_name,
+                        scroll_filter=scroll_filter,
+                        limit=100,
+                        offset=offset,
+                        with_payload=True,
+                        with_vectors=False,
+                    )
+                    points.extend(batch)
+                    if offset is None:
+                        break
+                points.sort(
+                    key=lambda point: str(((point.payload or {}).get("metadata") or {}).get(date_field) or ""),
+                    reverse=True
+                )
+                points = points[:limit]
+            
+            documents = [
+                Document(
+                    page_content=(point.payload or {}).get("page_content", ""),
+                    metadata=(point.payload or {}).get("metadata", {})
+                )
+                for point in points
+            ]
+            logger.info(f"Retrieved {len(documents)} latest documents from {collection_name} by {date_field}")
+            return documents
+        
+        except Exception as e:
+            logger.error(f"Error scrolling latest documents from {collection_name}: {e}")
+            return []
+    
     def similarity_search(
         self, 
         collection_config: CollectionConfig, 
         query: str, 
         k: int = 5,
-        filter_dict: Optional[Dict[str, str]] = None
+        filter_dict: Optional[Dict[str, str]] = None,
+        date_ranges: Optional[DateRanges] = None
     ) -> List[Document]:
-        """Perform similarity search on a collection"""
+        """Perform similarity search on a collection (date ranges are Qdrant pre-filters)"""
         try:
             vectorstore = self.get_vectorstore(collection_config)
             
             search_kwargs = {"k": k}
-            if filter_dict:
+            if date_ranges:
+                self.ensure_payload_indexes(collection_config)
+                search_kwargs["filter"] = self.build_metadata_filter(filter_dict, date_ranges)
+            elif filter_dict:
                 search_kwargs["filter"] = filter_dict
             
             # Merge with collection-specific search kwargs
             search_kwargs.update(collection_config.search_kwargs)
             
+            search_params = self.build_search_params(collection_config)
+            if search_params is not None:
+                search_kwargs["search_params"] = search_params
+            
             # Perform search based on search type
             if collection_config.search_type == "mmr":
-                documents = vectorstore.max_marginal_relevance_search(
-                    query, 
+                points = self.mmr_search_points(
+                    collection_config.collection_name,
+                    query,
                     k=search_kwargs.get("k", k),
-                    fetch_k=search_kwargs.get("fetch_k", k * 2)
+                    fetch_k=search_kwargs.get("fetch_k", k * 2),
+                    lambda_mult=search_kwargs.get("lambda_mult"),
+                    filter_dict=filter_dict,
+                    score_threshold=search_kwargs.get("score_threshold"),
+                    embeddings_type=collection_config.embedding_provider,
+                    search_params=search_params,
+                    date_ranges=date_ranges
                 )
+                documents = [
+                    document_from_point(point, collection_config.collection_name)
+                    for point in points
+                ]
             elif collection_config.search_type == "similarity_score_threshold":
-                documents = vectorstore.similarity_search_with_score_threshold(
+                documents = get_backend("qdrant").call(
+                    vectorstore.similarity_search_with_score_threshold,
                     query,
+                    idempotent=True,
                     score_threshold=search_kwargs.get("score_threshold", 0.5),
                     k=search_kwargs.get("k", k)
                 )
@@ -218,7 +638,9 @@ class QdrantClients:
                 documents = [doc for doc, score in documents] if documents else []
             else:
                 # Default similarity search
-                documents = vectorstore.similarity_search(query, **search_kwargs)
+                documents = get_backend("qdrant").call(
+                    vectorstore.similarity_search, query, idempotent=True, **search_kwargs
+                )
             
             logger.debug(f"Found {len(documents)} documents in {collection_config.collection_name}")
             return documents
@@ -245,7 +667,13 @@ class QdrantClients:
             # Merge with collection-specific search kwargs
             search_kwargs.update(collection_config.search_kwargs)
             
-            results = vectorstore.similarity_search_with_score(query, **search_kwargs)
+            search_params = self.build_search_params(collection_config)
+            if search_params is not None:
+                search_kwargs["search_params"] = search_params
+            
+            results = get_backend("qdrant").call(
+                vectorstore.similarity_search_with_score, query, idempotent=True, **search_kwargs
+            )
             logger.debug(f"Found {len(results)} documents with scores in {collection_config.collection_name}")
             return results
             
@@ -313,6 +741,163 @@ class QdrantClients:
         return True
 
 
+def build_quantization_config(quantization: str) -> Optional[models.QuantizationConfig]:
+    """
+    Build a Qdrant quantization config ("none", "scalar" or "binary").
+    
+    Quantized vectors are kept in RAM so candidate search stays fast even when
+    the original float32 vectors live on disk.
+    """
+    quantization = (quantization or "none").lower()
+    if quantization == "none":
+        return None
+    if quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True
+            )
+        )
+    if quantization == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    raise ValueError(f"Unsupported quantization: {quantization}")
+
+
+def _build_hnsw_config(settings: Dict[str, Any]) -> Optional[models.HnswConfigDiff]:
+    """HNSW overrides from resolved storage settings, None if Qdrant defaults apply"""
+    if settings["hnsw_m"] is None and settings["hnsw_ef_construct"] is None:
+        return None
+    return models.HnswConfigDiff(m=settings["hnsw_m"], ef_construct=settings["hnsw_ef_construct"])
+
+
+def parse_date_bound(value: DateBound, end_of_day: bool = False) -> Optional[datetime]:
+    """
+    Datetime for a date bound; ISO strings may end in Z.
+    
+    Plain dates mean midnight, or the last instant of the day with end_of_day
+    (so an inclusive "until 2024-05-31" covers that whole day).
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        text = value.strip()
+        if len(text) > 10:
+            return datetime.fromisoformat(text.replace("Z", "+00:00"))
+        value = date.fromisoformat(text)
+    if end_of_day:
+        return datetime.combine(value, time.max)
+    return datetime.combine(value, time.min)
+
+
+def date_range_condition(field: str, since: DateBound = None, until: DateBound = None) -> Optional[models.FieldCondition]:
+    """
+    Inclusive datetime range condition on a metadata field (None if both bounds are open).
+    
+    The payload values must be RFC 3339 / ISO 8601 strings; naive datetimes
+    are interpreted as UTC by Qdrant.
+    """
+    since, until = parse_date_bound(since), parse_date_bound(until, end_of_day=True)
+    if since is None and until is None:
+        return None
+    return models.FieldCondition(
+        key=f"metadata.{field}",
+        range=models.DatetimeRange(gte=since, lte=until)
+    )
+
+
+def date_ranges_for(
+    collection_config: Optional[CollectionConfig],
+    since: DateBound = None,
+    until: DateBound = None,
+    default_field: str = "last_modified_time"
+) -> Optional[DateRanges]:
+    """
+    Date ranges on a collection's date field, or None if both bounds are open.
+    
+    Raises:
+        ValueError: A bound is not a valid ISO date
+    """
+    if not since and not until:
+        return None
+    parse_date_bound(since)
+    parse_date_bound(until)
+    field = (collection_config.date_field if collection_config else None) or default_field
+    return {field: (since, until)}
+
+
+def maximal_marginal_relevance(
+    query_vector: Sequence[float],
+    candidate_vectors: Sequence[Sequence[float]],
+    k: int = 4,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    Pick k candidate indices balancing similarity to the query and diversity.
+    
+    Same selection (and tie-breaking) as langchain's maximal_marginal_relevance,
+    but each step is a single vectorized update: the highest cosine similarity
+    of every candidate to the selected set is kept as a running maximum
+    instead of being recomputed against the whole set.
+    """
+    if k <= 0 or len(candidate_vectors) == 0:
+        return []
+    
+    candidates = _normalize_rows(np.asarray(candidate_vectors, dtype=np.float64))
+    query = _normalize_rows(np.asarray(query_vector, dtype=np.float64).reshape(1, -1))[0]
+    similarity_to_query = candidates @ query
+    
+    best = int(np.argmax(similarity_to_query))
+    selected = [best]
+    available = np.ones(len(candidates), dtype=bool)
+    available[best] = False
+    redundancy = candidates @ candidates[best]
+    
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * similarity_to_query - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, candidates @ candidates[best], out=redundancy)
+    
+    return selected
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def document_from_point(point: models.ScoredPoint, collection_name: str) -> Document:
+    """Build a langchain Document from a point, with the same metadata the Qdrant vectorstore adds"""
+    payload = point.payload or {}
+    metadata = dict(payload.get("metadata") or {})
+    metadata["_id"] = point.id
+    metadata["_collection_name"] = collection_name
+    return Document(page_content=payload.get("page_content") or "", metadata=metadata)
+
+
+def flatten_point_payload(payload: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Flatten a point payload into a single dict of fields.
+    
+    Langchain stores the text under "page_content" and the fields under a nested
+    "metadata" dict; top-level keys win, and "content" falls back to "page_content".
+    """
+    payload = payload or {}
+    fields = dict(payload.get("metadata") or {})
+    fields.update({key: value for key, value in payload.items() if key != "metadata"})
+    if not fields.get("content"):
+        fields["content"] = fields.get("page_content", "")
+    return fields
+
+
 # Global singleton instance
 _qdrant_clients_instance: Optional[QdrantClients] = None
 
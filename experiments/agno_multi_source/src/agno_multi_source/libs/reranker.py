@@ -0,0 +1,267 @@
+"""
+Reranking Stage for Multi-Source RAG System
+
+This module provides a pluggable reranking stage applied to retriever outputs.
+Retrievers over-fetch candidates from Qdrant and the stage reorders them with
+either a fast lexical scorer or a CPU-friendly cross-encoder, so fewer (but
+more relevant) chunks are sent to the LLM.
+
+Scores are cached per (query, document id), so repeated tool calls within a
+turn - and identical follow-up questions - do not rescore the same chunks.
+"""
+
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..config import get_config
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, ignoring single characters"""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if len(token) > 1]
+
+
+def default_document_text(document: Any) -> str:
+    """Extract rerankable text from a langchain Document or a retriever result dict"""
+    if isinstance(document, dict):
+        title = document.get("title") or document.get("page_title") or ""
+        content = document.get("content") or document.get("page_content") or ""
+        return f"{title}\n{content}" if title else content
+    return getattr(document, "page_content", "") or ""
+
+
+def default_document_id(document: Any) -> str:
+    """Stable identifier for a candidate: its point id if known, else a content hash"""
+    if isinstance(document, dict):
+        doc_id = document.get("id")
+    else:
+        metadata = getattr(document, "metadata", None) or {}
+        doc_id = metadata.get("_id") or getattr(document, "id", None)
+    if doc_id:
+        return str(doc_id)
+    return hashlib.sha1(default_document_text(document).encode("utf-8")).hexdigest()
+
+
+class Reranker:
+    """
+    Base class for rerankers.
+    
+    Subclasses score (query, text) pairs; higher scores are more relevant.
+    Scores must only depend on the pair itself so they can be cached.
+    """
+    
+    name = "base"
+    
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        raise NotImplementedError
+
+
+class LexicalReranker(Reranker):
+    """
+    Fast pure-Python lexical scorer.
+    
+    Uses BM25-style term-frequency saturation with a fixed reference document
+    length, weighted by the fraction of query terms the candidate covers.
+    """
+    
+    name = "lexical"
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75, reference_length: int = 200):
+        self.k1 = k1
+        self.b = b
+        self.reference_length = reference_length
+    
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        query_terms = set(_tokenize(query))
+        if not query_terms:
+            return [0.0] * len(texts)
+        
+        scores = []
+        for text in texts:
+            tokens = _tokenize(text)
+            if not tokens:
+                scores.append(0.0)
+                continue
+            
+            frequencies = Counter(tokens)
+            length_norm = 1 - self.b + self.b * len(tokens) / self.reference_length
+            saturation = 0.0
+            covered = 0
+            for term in query_terms:
+                tf = frequencies.get(term, 0)
+                if tf:
+                    covered += 1
+                    saturation += tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+            
+            coverage = covered / len(query_terms)
+            scores.append(coverage * math.log1p(saturation))
+        
+        return scores
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    Cross-encoder reranker running locally on CPU.
+    
+    The model is loaded lazily on first use; sentence-transformers is an
+    optional dependency (requirements-local.txt) only needed when
+    RERANKER_TYPE=cross-encoder.
+    """
+    
+    name = "cross-encoder"
+    
+    def __init__(self, model_name: str, batch_size: int = 32, max_length: int = 512):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self._model = None
+        self._lock = threading.Lock()
+    
+    @property
+    def model(self):
+        """Get or load the cross-encoder model"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+                    logger.info(f"Loaded cross-encoder reranker: {self.model_name}")
+        return self._model
+    
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        if not texts:
+            return []
+        pairs = [(query, text) for text in texts]
+        return [float(score) for score in self.model.predict(pairs, batch_size=self.batch_size)]
+
+
+class RerankingStage:
+    """
+    Reranks over-fetched retrieval candidates with a pluggable Reranker.
+    
+    Keeps an LRU cache of scores keyed by (query, document id) and scores all
+    uncached candidates in a single batch.
+    """
+    
+    def __init__(
+        self,
+        reranker: Optional[Reranker] = None,
+        overfetch: int = 3,
+        cache_size: int = 4096
+    ):
+        self.reranker = reranker
+        self.overfetch = max(1, overfetch)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether a reranker is configured"""
+        return self.reranker is not None
+    
+    def candidate_count(self, top_k: int) -> int:
+        """Number of candidates a retriever should fetch to return top_k results"""
+        return top_k * self.overfetch if self.enabled else top_k
+    
+    def rerank(
+        self,
+        query: str,
+        candidates: List[Any],
+        top_k: Optional[int] = None,
+        text_fn: Callable[[Any], str] = default_document_text,
+        id_fn: Callable[[Any], str] = default_document_id
+    ) -> List[Any]:
+        """
+        Rerank candidates from a single source.
+        
+        Args:
+            query: The user query
+            candidates: Candidate documents (langchain Documents or result dicts)
+            top_k: Number of results to keep (all if None)
+            text_fn: Extracts the text to score from a candidate
+            id_fn: Extracts a stable identifier from a candidate
+        
+        Returns:
+            The top_k candidates ordered by reranker score
+        """
+        if not self.enabled:
+            return candidates[:top_k] if top_k is not None else list(candidates)
+        
+        # Collect cached scores and the candidates that still need scoring
+        keys = [(query, id_fn(candidate)) for candidate in candidates]
+        scores: Dict[Tuple[str, str], float] = {}
+        pending_keys: List[Tuple[str, str]] = []
+        pending_texts: List[str] = []
+        
+        with self._lock:
+            for key, candidate in zip(keys, candidates):
+                if key in scores:
+                    continue
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    scores[key] = cached
+                else:
+                    # Placeholder so duplicates are scored once
+                    scores[key] = 0.0
+                    pending_keys.append(key)
+                    pending_texts.append(text_fn(candidate))
+        
+        if pending_keys:
+            new_scores = self.reranker.score(query, pending_texts)
+            with self._lock:
+                for key, score in zip(pending_keys, new_scores):
+                    scores[key] = score
+                    self._cache[key] = score
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        
+        logger.debug(f"Reranked {len(candidates)} candidates ({len(pending_keys)} scored, rest cached)")
+        
+        ranked = sorted(zip(keys, candidates), key=lambda pair: scores[pair[0]], reverse=True)
+        ranked_candidates = [candidate for _, candidate in ranked]
+        return ranked_candidates[:top_k] if top_k is not None else ranked_candidates
+    
+    def clear_cache(self) -> None:
+        """Drop all cached scores"""
+        with self._lock:
+            self._cache.clear()
+
+
+def create_reranker(reranker_type: str, model_name: Optional[str] = None) -> Optional[Reranker]:
+    """Create a reranker from its configured type ("none", "lexical" or "cross-encoder")"""
+    reranker_type = (reranker_type or "none").lower()
+    if reranker_type == "none":
+        return None
+    if reranker_type == "lexical":
+        return LexicalReranker()
+    if reranker_type == "cross-encoder":
+        return CrossEncoderReranker(model_name)
+    raise ValueError(f"Unsupported reranker type: {reranker_type}")
+
+
+# Global singleton instance
+_reranking_stage_instance: Optional[RerankingStage] = None
+
+
+def get_reranking_stage() -> RerankingStage:
+    """Get or create the global reranking stage singleton"""
+    global _reranking_stage_instance
+    if _reranking_stage_instance is None:
+        config = get_config()
+        _reranking_stage_instance = RerankingStage(
+            reranker=create_reranker(config.reranker_type, config.reranker_model),
+            overfetch=config.rerank_overfetch,
+            cache_size=config.rerank_cache_size
+        )
+    return _reranking_stage_instance
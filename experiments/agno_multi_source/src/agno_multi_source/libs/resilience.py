@@ -0,0 +1,396 @@
+"""
+Backend Resilience for Multi-Source RAG System
+
+This module bounds the latency of calls to external backends (Qdrant, Athena,
+S3, DynamoDB, the embedding model and the LLM):
+- Per-backend deadlines: a call is abandoned once the backend timeout or the
+  remaining turn latency budget runs out, whichever comes first. Model
+  requests are guarded one at a time, so the tool loop of a turn is never
+  counted against the LLM backend.
+- Circuit breakers: after consecutive failures a backend is skipped for a
+  cool-down period, so tools fail fast instead of waiting on a source that is
+  down; a single trial call then decides whether to close the circuit again.
+- Hedged requests (optional): an idempotent read still running after the
+  backend's recent p95 latency is duplicated and the first answer wins.
+
+Tools already turn exceptions into empty results, so a skipped or timed out
+source simply drops out of the answer while the others are still used.
+
+Timed out calls cannot be interrupted and finish in the backend's worker pool;
+their results are discarded.
+"""
+
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from ..config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Absolute time.monotonic() deadline of the current agent turn's tool calls, if any
+_turn_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("turn_deadline", default=None)
+
+# Absolute deadline of the current turn's model requests (the whole turn), if any
+_model_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("model_deadline", default=None)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is skipped because the backend's circuit is open"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a backend call does not finish within its deadline"""
+
+
+@contextlib.contextmanager
+def turn_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Bound every backend call made inside the block by a shared latency budget"""
+    token = _turn_deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _turn_deadline.reset(token)
+
+
+@contextlib.contextmanager
+def model_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Bound the model requests made inside the block (see guard_model_requests)"""
+    token = _model_deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _model_deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left in the current turn's budget (None if unbounded)"""
+    deadline = _turn_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    
+    closed: calls go through. open: calls fail fast until reset_timeout has
+    elapsed. half-open: one trial call is let through; its outcome closes or
+    re-opens the circuit.
+    """
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+    
+    def allow(self) -> bool:
+        """Whether a call may go through now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+    
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Circuit closed for backend: {self.name}")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+    
+    def release(self) -> None:
+        """End a call that says nothing about backend health"""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Circuit opened for backend {self.name} after {self._failures} failures")
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies"""
+    
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, pct: float, min_samples: int = 20) -> Optional[float]:
+        """Latency percentile, or None until enough samples were recorded"""
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _default_is_failure(error: BaseException) -> bool:
+    """
+    Whether an error says something about backend health.
+    
+    Client-side errors (missing keys, validation, 4xx responses other than
+    throttling) do not count towards opening the circuit.
+    """
+    if isinstance(error, (FileNotFoundError, KeyError, ValueError)):
+        return False
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        code = response.get("Error", {}).get("Code", "")
+        if status is not None and status < 500 and "Throttl" not in code:
+            return False
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int) and status_code < 500:
+        return False
+    return True
+
+
+class Backend:
+    """Deadline, circuit breaker and hedging policy for one external backend"""
+    
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        hedge: bool = False,
+        hedge_min_delay: float = 0.05,
+        max_workers: int = 16,
+        is_failure: Callable[[BaseException], bool] = _default_is_failure
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.latency = LatencyTracker()
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.is_failure = is_failure
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"backend-{name}")
+        self.hedged = 0
+    
+    def _deadline(self, timeout: Optional[float]) -> float:
+        budget = timeout if timeout is not None else self.timeout
+        remaining = remaining_time()
+        if remaining is not None:
+            budget = min(budget, remaining)
+        return budget
+    
+    def _submit(self, fn: Callable[..., Any], args: tuple, kwargs: dict):
+        # Carry the turn deadline (and other context) into the worker thread
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, fn, *args, **kwargs)
+    
+    def call(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        idempotent: bool = False,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Run fn(*args, **kwargs) against this backend.
+        
+        Args:
+            fn: The backend call
+            idempotent: Whether the call may be duplicated (hedged) safely
+            timeout: Override of the backend timeout for this call
+        
+        Raises:
+            CircuitOpenError: The backend is failing and is being skipped
+            DeadlineExceeded: The call did not finish in time
+        """
+        budget = self._deadline(timeout)
+        if budget <= 0:
+            raise DeadlineExceeded(f"No latency budget left for backend {self.name}")
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Backend {self.name} is unavailable (circuit open)")
+        
+        started = time.monotonic()
+        futures = [self._submit(fn, args, kwargs)]
+        try:
+            hedge_delay = self._hedge_delay() if idempotent else None
+            if hedge_delay is not None and hedge_delay < budget:
+                done, _ = wait(futures, timeout=hedge_delay)
+                if not done:
+                    self.hedged += 1
+                    logger.debug(f"Hedging slow {self.name} call after {hedge_delay * 1000:.0f}ms")
+                    futures.append(self._submit(fn, args, kwargs))
+            
+            result = self._first_result(futures, started + budget, budget)
+        except DeadlineExceeded:
+            # Only the backend's own timeout counts; a call cut short by the turn budget does not
+            if budget >= (timeout if timeout is not None else self.timeout):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        except Exception as e:
+            if self.is_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+        
+        self.latency.record(time.monotonic() - started)
+        self.breaker.record_success()
+        return result
+    
+    def _first_result(self, futures: list, deadline: float, budget: float) -> Any:
+        """Result of the first attempt to succeed; the last error if all attempts fail"""
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=deadline - time.monotonic(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"Backend {self.name} did not answer within {budget:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        p95 = self.latency.percentile(95)
+        return None if p95 is None else max(p95, self.hedge_min_delay)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "timeout": self.timeout,
+            "p95": self.latency.percentile(95),
+            "hedged": self.hedged,
+        }
+
+
+class ResilientProxy:
+    """
+    Wraps a client object so that selected methods go through a Backend.
+    
+    Other attributes are passed through unchanged, so long-running calls
+    (e.g. multipart downloads) are not bounded by the backend timeout.
+    """
+    
+    def __init__(self, target: Any, backend: Backend, methods: Iterable[str], idempotent: Iterable[str] = ()):
+        self._target = target
+        self._backend = backend
+        self._methods = frozenset(methods)
+        self._idempotent = frozenset(idempotent)
+    
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if name not in self._methods or not callable(attribute):
+            return attribute
+        idempotent = name in self._idempotent
+        
+        def guarded(*args, **kwargs):
+            return self._backend.call(attribute, *args, idempotent=idempotent, **kwargs)
+        
+        return guarded
+
+
+class ResilienceRegistry:
+    """Backends created on first use from the resilience settings in Config"""
+    
+    def __init__(self):
+        self.config = get_config()
+        self._backends: Dict[str, Backend] = {}
+        self._lock = threading.Lock()
+    
+    def backend(self, name: str) -> Backend:
+        """Get or create the Backend for a name (qdrant, athena, s3, dynamodb, embeddings, llm)"""
+        if name not in self._backends:
+            with self._lock:
+                if name not in self._backends:
+                    config = self.config
+                    self._backends[name] = Backend(
+                        name,
+                        timeout=getattr(config, f"{name}_timeout", config.backend_default_timeout),
+                        failure_threshold=config.circuit_failure_threshold,
+                        reset_timeout=config.circuit_reset_timeout,
+                        hedge=config.hedge_requests,
+                        hedge_min_delay=config.hedge_min_delay,
+                        max_workers=config.backend_max_workers
+                    )
+        return self._backends[name]
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: backend.stats() for name, backend in self._backends.items()}
+
+
+def guard_model_requests(model: Any) -> Any:
+    """
+    Send each request of an agno model through the "llm" backend.
+    
+    Only the provider call is bounded and counted by the circuit breaker, not
+    the agent's tool loop around it. Requests are bounded by the llm timeout
+    and the model_deadline of the turn rather than the tools' budget; running
+    out of turn budget does not count as a backend failure. Model ids given
+    as strings are returned unchanged.
+    """
+    invoke = getattr(model, "invoke", None)
+    if invoke is None:
+        return model
+    
+    def guarded_invoke(*args, **kwargs):
+        token = _turn_deadline.set(_model_deadline.get())
+        try:
+            return get_backend("llm").call(invoke, *args, **kwargs)
+        finally:
+            _turn_deadline.reset(token)
+    
+    model.invoke = guarded_invoke
+    return model
+
+
+# Global singleton instance
+_resilience_instance: Optional[ResilienceRegistry] = None
+
+
+def get_resilience() -> ResilienceRegistry:
+    """Get or create the global resilience registry singleton"""
+    global _resilience_instance
+    if _resilience_instance is None:
+        _resilience_instance = ResilienceRegistry()
+    return _resilience_instance
+
+
+def get_backend(name: str) -> Backend:
+    """Shortcut for get_resilience().backend(name)"""
+    return get_resilience().backend(name)
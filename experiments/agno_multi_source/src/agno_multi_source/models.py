@@ -158,6 +158,123 @@ class CollectionConfig(BaseModel):
     search_type: str = Field(default="similarity", description="Search type (similarity, mmr, etc.)")
     search_kwargs: Dict[str, Any] = Field(default_factory=dict, description="Search parameters")
     metadata_fields: List[str] = Field(default_factory=list, description="Metadata fields to include")
+    date_field: Optional[str] = Field(None, description="Metadata datetime field for date-range pre-filters and recency ordering")
+    
+    # Storage and index settings (None = use the global defaults from Config)
+    vector_size: Optional[int] = Field(None, description="Vector dimension (read from the embedding model if None)")
+    quantization: Optional[str] = Field(None, description="Vector quantization: none, scalar or binary")
+    on_disk: Optional[bool] = Field(None, description="Keep original vectors on disk instead of in RAM")
+    hnsw_m: Optional[int] = Field(None, description="HNSW edges per node")
+    hnsw_ef_construct: Optional[int] = Field(None, description="HNSW candidate list size at build time")
+    search_hnsw_ef: Optional[int] = Field(None, description="HNSW candidate list size at search time")
+    quantization_rescore: Optional[bool] = Field(None, description="Rescore quantized candidates with original vectors")
+    quantization_oversampling: Optional[float] = Field(None, description="Candidate oversampling factor for quantized search")
+
+
+class IngestionDocument(BaseModel):
+    """A source document to be chunked, embedded and stored in a collection"""
+    source_id: str = Field(..., description="Stable identifier of the source (file id, path, URL)")
+    text: str = Field(..., description="Full document text")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Source metadata (filtered by metadata_fields)")
+
+
+class IngestionStats(BaseModel):
+    """Counters reported by an ingestion run"""
+    collection_name: str = Field(..., description="Target collection")
+    documents_seen: int = Field(default=0, description="Documents read from the input")
+    documents_skipped: int = Field(default=0, description="Documents unchanged since the last ingestion")
+    documents_ingested: int = Field(default=0, description="Documents (re)written")
+    documents_failed: int = Field(default=0, description="Documents left incomplete by failed batches (retried next run)")
+    chunks_upserted: int = Field(default=0, description="Chunks sent to Qdrant")
+    chunks_deleted: int = Field(default=0, description="Stale chunks removed from shrunk documents")
+    failed_batches: int = Field(default=0, description="Embedding or upsert batches that failed after retries")
+    elapsed_time: float = Field(default=0.0, description="Wall-clock time in seconds")
+    
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks_upserted / self.elapsed_time if self.elapsed_time else 0.0
+
+
+class ProjectFactSheet(BaseModel):
+    """Precomputed per-project answers, materialized on each catalog refresh"""
+    canonical_name: str = Field(..., description="Canonical project name (store key)")
+    source_hash: str = Field(..., description="Hash of the catalog row and verbali list it was built from")
+    details: Dict[str, Any] = Field(default_factory=dict, description="Catalog row with Athena column names")
+    formatted_details: str = Field(default="", description="Details formatted for context")
+    contacts: List[Dict[str, Any]] = Field(default_factory=list, description="Project contacts")
+    contacts_by_role: Dict[str, List[Dict[str, Any]]] = Field(default_factory=dict, description="Contacts grouped by upper-cased role")
+    formatted_contacts: str = Field(default="", description="Contacts formatted for context")
+    verbali_files: List[Dict[str, Any]] = Field(default_factory=list, description="Verbali files (file_name, webViewLink, last_modified_time), newest first")
+    built_at: datetime = Field(default_factory=datetime.now, description="Materialization time")
+    
+    def render(self) -> str:
+        """Full fact sheet text: details, contacts and verbali file list"""
+        sections = [self.formatted_details, "", self.formatted_contacts]
+        if self.verbali_files:
+            sections.extend(["", f"Verbali files for: {self.canonical_name}", "=" * 50])
+            for file in self.verbali_files:
+                line = f"- {file.get('file_name', 'Unknown')}"
+                if file.get("last_modified_time"):
+                    line += f" ({file['last_modified_time']})"
+                if file.get("webViewLink"):
+                    line += f": {file['webViewLink']}"
+                sections.append(line)
+        return "\n".join(sections)
+
+
+class ConversationMemory(BaseModel):
+    """Bounded memory of a chat: recent turns verbatim, older turns folded into a summary"""
+    chat_id: str = Field(..., description="Chat session identifier")
+    user_id: Optional[str] = Field(None, description="User identifier")
+    summary: str = Field(default="", description="Running summary of the turns no longer kept verbatim")
+    recent_turns: List[Dict[str, Any]] = Field(default_factory=list, description="Most recent turns ({role, content})")
+    total_turns: int = Field(default=0, description="Turns recorded since the chat started")
+    last_project_context: Optional[str] = Field(None, description="Project identified in the latest turn")
+    updated_at: datetime = Field(default_factory=datetime.now, description="Last update time")
+
+
+class BatchQuestion(BaseModel):
+    """One line of a batch questions file"""
+    question_id: str = Field(..., description="Unique identifier, used for checkpointing")
+    query: str = Field(..., description="User question")
+    user_id: str = Field(default="batch", description="User identifier")
+    chat_id: Optional[str] = Field(None, description="Chat session; questions sharing it run in order as one conversation")
+    project: Optional[str] = Field(None, description="Known project, skips identification")
+    conversation_history: List[Dict[str, Any]] = Field(default_factory=list, description="Prior turns before the first question of a chat")
+
+
+class QuestionMetrics(BaseModel):
+    """Per-question measurements from a batch run"""
+    project: str = Field(..., description="Project group the question ran in")
+    group_size: int = Field(..., description="Questions in the same project group")
+    identification_time: float = Field(default=0.0, description="Seconds spent identifying the project before scheduling")
+    queue_time: float = Field(default=0.0, description="Seconds between scheduling and start")
+    processing_time: float = Field(default=0.0, description="Seconds spent in process_query")
+    token_usage: Dict[str, int] = Field(default_factory=dict, description="Token usage reported by the model")
+    success: bool = Field(..., description="Whether the agent produced an answer")
+
+
+class BatchQuestionResult(BaseModel):
+    """Output line of a batch run: the agent result and metrics for one question"""
+    question_id: str = Field(..., description="Question identifier")
+    result: Optional[SynthesisResult] = Field(None, description="Agent result")
+    metrics: QuestionMetrics = Field(..., description="Per-question metrics")
+    error: Optional[str] = Field(None, description="Error if the question failed")
+    completed_at: datetime = Field(default_factory=datetime.now, description="Completion time")
+
+
+class BatchRunSummary(BaseModel):
+    """Aggregate figures of a batch run"""
+    questions: int = Field(..., description="Questions in the input file")
+    skipped: int = Field(default=0, description="Questions already completed by an earlier run")
+    completed: int = Field(default=0, description="Questions answered in this run")
+    failed: int = Field(default=0, description="Questions that failed in this run")
+    project_groups: int = Field(default=0, description="Distinct project groups")
+    concurrency: int = Field(..., description="Questions processed in parallel")
+    elapsed_time: float = Field(default=0.0, description="Wall-clock time in seconds")
+    questions_per_second: float = Field(default=0.0, description="Throughput of this run")
+    latency_p50: float = Field(default=0.0, description="Median processing time in seconds")
+    latency_p95: float = Field(default=0.0, description="95th percentile processing time in seconds")
 
 
 class AgentConfig(BaseModel):
@@ -4,7 +4,7 @@ Tools for the Multi-Source RAG System
 This package contains all the tools used by the agent to:
 - Identify and validate projects
 - Retrieve information from multiple sources in parallel
-- Synthesize information from different sources
+- Coalesce identical in-flight backend calls (single-flight)
 """
 
 from .project_tools import ProjectIdentifier, ProjectValidator
@@ -13,7 +13,7 @@ from .athena_tools import AthenaQueryTool
 from .mi_tools import MIRetriever
 from .wiki_tools import WikiRetriever
 from .user_docs_tools import UserDocsRetriever
-from .synthesis_tools import InformationSynthesizer
+from .single_flight import SingleFlight, get_single_flight
 
 __all__ = [
     "ProjectIdentifier",
@@ -23,5 +23,6 @@ __all__ = [
     "MIRetriever",
     "WikiRetriever",
     "UserDocsRetriever",
-    "InformationSynthesizer",
+    "SingleFlight",
+    "get_single_flight",
 ] 
\ No newline at end of file
@@ -8,15 +8,19 @@ to retrieve structured information about projects, contacts, and services.
 import json
 import logging
 import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from typing import Dict, List, Optional, Union
 
-from agno import tool
+from agno.tools import tool
 from pydantic import BaseModel, Field
 
 from ..config import get_config
 from ..libs.aws_clients import get_aws_clients
+from ..libs.fact_sheets import format_project_contacts, format_project_details, get_fact_sheet, parse_contacts
 from ..libs.project_manager import get_project_manager
+from ..libs.resilience import remaining_time
 from ..models import RetrievalResult, SourceType
+from .single_flight import call_key, get_single_flight
 
 logger = logging.getLogger(__name__)
 
@@ -55,10 +59,15 @@ def query_project_details(
     Args:
         project_name: Name of the project to query
         specific_fields: Optional list of specific fields to retrieve
-        
+    
     Returns:
         AthenaQueryResult with project details
     """
+    return _query_project_details(project_name, specific_fields)
+
+
+def _query_project_details(project_name: str, specific_fields: Optional[List[str]] = None) -> AthenaQueryResult:
+    """Project details lookup shared by the tools (agno tools are not callable directly)"""
     start_time = time.time()
     config = get_config()
     aws_clients = get_aws_clients()
@@ -78,6 +87,18 @@ def query_project_details(
                 execution_time=time.time() - start_time
             )
         
+        # Answer from the materialized fact sheet when the whole row is wanted
+        if not specific_fields:
+            sheet = get_fact_sheet(canonical_project)
+            if sheet is not None:
+                return AthenaQueryResult(
+                    success=True,
+                    results=[sheet.details],
+                    formatted_content=sheet.formatted_details,
+                    execution_time=time.time() - start_time,
+                    row_count=1
+                )
+        
         # Build SQL query
         if specific_fields:
             fields = ", ".join(_sql_safe_quote(field) for field in specific_fields)
@@ -95,7 +116,7 @@ def query_project_details(
         
         if result.success and result.results:
             # Format the results
-            formatted_content = _format_project_details(result.results[0], canonical_project)
+            formatted_content = format_project_details(result.results[0], canonical_project)
             
             return AthenaQueryResult(
                 success=True,
@@ -134,7 +155,7 @@ def query_project_contacts(
     Args:
         project_name: Name of the project
         contact_types: Optional list of contact types to filter (e.g., ['CHANGE MANAGER', 'SPONSOR'])
-        
+    
     Returns:
         AthenaQueryResult with contact information
     """
@@ -155,6 +176,20 @@ def query_project_contacts(
                 execution_time=time.time() - start_time
             )
         
+        # Answer from the materialized fact sheet if available
+        sheet = get_fact_sheet(canonical_project)
+        if sheet is not None:
+            contacts = sheet.contacts
+            if contact_types:
+                contacts = [contact for contact in contacts if contact.get('role') in contact_types]
+            return AthenaQueryResult(
+                success=True,
+                results=[{"contacts": contacts}],
+                formatted_content=sheet.formatted_contacts if not contact_types else format_project_contacts(contacts, canonical_project),
+                execution_time=time.time() - start_time,
+                row_count=len(contacts)
+            )
+        
         # Build SQL query to get contacts
         query = f"""
         SELECT elemName, elemCode, listContatti
@@ -168,12 +203,7 @@ def query_project_contacts(
         if result.success and result.results:
             # Parse and format contacts
             project_data = result.results[0]
-            contacts_str = project_data.get('listContatti', '[]')
-            
-            try:
-                contacts = json.loads(contacts_str) if contacts_str else []
-            except json.JSONDecodeError:
-                contacts = []
+            contacts = parse_contacts(project_data.get('listContatti', '[]'))
             
             # Filter by contact types if specified
             if contact_types:
@@ -182,7 +212,7 @@ def query_project_contacts(
                     if contact.get('role') in contact_types
                 ]
             
-            formatted_content = _format_project_contacts(contacts, canonical_project)
+            formatted_content = format_project_contacts(contacts, canonical_project)
             
             return AthenaQueryResult(
                 success=True,
@@ -210,6 +240,43 @@ def query_project_contacts(
         )
 
 
+@tool
+def get_project_fact_sheet(project_name: str) -> AthenaQueryResult:
+    """
+    Get the precomputed fact sheet of a project: catalog details, contacts
+    by role and the list of verbali files with their links.
+    
+    Args:
+        project_name: Name of the project
+    
+    Returns:
+        AthenaQueryResult with the fact sheet as formatted content
+    """
+    start_time = time.time()
+    project_manager = get_project_manager()
+    
+    canonical_project = project_manager.get_canonical_name(project_name)
+    if not canonical_project:
+        return AthenaQueryResult(
+            success=False,
+            error_message=f"Project '{project_name}' not found",
+            execution_time=time.time() - start_time
+        )
+    
+    sheet = get_fact_sheet(canonical_project)
+    if sheet is None:
+        # Not materialized yet: fall back to the live catalog query
+        return _query_project_details(canonical_project)
+    
+    return AthenaQueryResult(
+        success=True,
+        results=[sheet.dict()],
+        formatted_content=sheet.render(),
+        execution_time=time.time() - start_time,
+        row_count=1
+    )
+
+
 @tool
 def find_projects_by_person(
     person_name: str,
@@ -221,7 +288,7 @@ def find_projects_by_person(
     Args:
         person_name: Name of the person to search for
         role: Optional specific role to filter by
-        
+    
     Returns:
         AthenaQueryResult with projects where the person is involved
     """
@@ -304,7 +371,7 @@ def find_projects_by_status(status: str) -> AthenaQueryResult:
     
     Args:
         status: Status to search for (e.g., 'ATTIVO', 'DISMESSO')
-        
+    
     Returns:
         AthenaQueryResult with projects matching the status
     """
@@ -353,7 +420,26 @@ def find_projects_by_status(status: str) -> AthenaQueryResult:
 
 
 def _execute_athena_query(query: str) -> AthenaQueryResult:
-    """Execute an Athena query and return formatted results"""
+    """
+    Execute an Athena query and return formatted results.
+    
+    Concurrent executions of the same query share a single Athena run; each
+    caller waits for it only as long as its own turn's latency budget allows.
+    """
+    start_time = time.time()
+    future = get_single_flight().submit(call_key("athena_query", {"query": query}), _run_athena_query, query)
+    try:
+        return future.result(timeout=remaining_time())
+    except FutureTimeoutError:
+        return AthenaQueryResult(
+            success=False,
+            error_message="Query exceeded the latency budget",
+            execution_time=time.time() - start_time
+        )
+
+
+def _run_athena_query(query: str) -> AthenaQueryResult:
+    """Start an Athena query, poll it to completion and parse its results"""
     start_time = time.time()
     config = get_config()
     aws_clients = get_aws_clients()
@@ -456,68 +542,6 @@ def _sql_safe_quote(value: str) -> str:
     return value.replace("'", "''")
 
 
-def _format_project_details(project_data: Dict, project_name: str) -> str:
-    """Format project details for context"""
-    sections = [
-        f"Project Details for: {project_name}",
-        "=" * 50,
-        ""
-    ]
-    
-    # Basic information
-    if 'elemCode' in project_data:
-        sections.append(f"Project Code: {project_data['elemCode']}")
-    if 'descStatus' in project_data:
-        sections.append(f"Status: {project_data['descStatus']}")
-    if 'descCustomerService' in project_data:
-        sections.append(f"Customer Service: {project_data['descCustomerService']}")
-    if 'descServizio' in project_data:
-        sections.append(f"Description: {project_data['descServizio']}")
-    if 'dataUltimoAggiornamento' in project_data:
-        sections.append(f"Last Updated: {project_data['dataUltimoAggiornamento']}")
-    
-    sections.append("")
-    
-    # Contacts
-    if 'listContatti' in project_data:
-        try:
-            contacts = json.loads(project_data['listContatti'])
-            if contacts:
-                sections.append("Contacts:")
-                for contact in contacts:
-                    name = contact.get('name', 'N/A')
-                    role = contact.get('role', 'N/A')
-                    email = contact.get('email', 'N/A')
-                    sections.append(f"  - {role}: {name} ({email})")
-        except json.JSONDecodeError:
-            pass
-    
-    return "\n".join(sections)
-
-
-def _format_project_contacts(contacts: List[Dict], project_name: str) -> str:
-    """Format project contacts for context"""
-    sections = [
-        f"Contacts for Project: {project_name}",
-        "=" * 50,
-        ""
-    ]
-    
-    if not contacts:
-        sections.append("No contacts found for this project.")
-    else:
-        for contact in contacts:
-            name = contact.get('name', 'N/A')
-            role = contact.get('role', 'N/A')
-            email = contact.get('email', 'N/A')
-            sections.append(f"Role: {role}")
-            sections.append(f"Name: {name}")
-            sections.append(f"Email: {email}")
-            sections.append("")
-    
-    return "\n".join(sections)
-
-
 def _format_person_projects(projects: List[Dict], person_name: str, role: Optional[str]) -> str:
     """Format projects where a person is involved"""
     sections = [
@@ -575,7 +599,7 @@ class AthenaQueryTool:
     
     def query_project(self, project_name: str) -> AthenaQueryResult:
         """Query details for a specific project"""
-        return query_project_details(project_name)
+        return _query_project_details(project_name)
     
     def query_contacts(self, project_name: str, contact_types: Optional[List[str]] = None) -> AthenaQueryResult:
         """Query contacts for a project"""
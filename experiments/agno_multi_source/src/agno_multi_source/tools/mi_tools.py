@@ -7,13 +7,15 @@ and operational guidelines.
 """
 
 import logging
-from typing import Dict, List, Optional
+import time
+from typing import Dict, Optional
 
-from agno import tool
+from agno.tools import tool
 from pydantic import BaseModel, Field
 
 from ..config import get_config
-from ..libs.qdrant_clients import QdrantClientManager
+from ..libs.qdrant_clients import flatten_point_payload, get_qdrant_clients
+from ..libs.reranker import get_reranking_stage
 from ..models import RetrievalResult, SourceType
 
 logger = logging.getLogger(__name__)
@@ -34,8 +36,9 @@ class MIRetriever:
     def __init__(self):
         """Initialize the MI retriever"""
         self.config = get_config()
-        self.collection_name = self.config.qdrant_config.mi_collection
-        self.client_manager = QdrantClientManager()
+        self.collection_name = self.config.mi_collection
+        self.qdrant_clients = get_qdrant_clients()
+        self.reranking = get_reranking_stage()
         
         logger.info(f"Initialized MIRetriever for collection: {self.collection_name}")
     
@@ -58,6 +61,8 @@ class MIRetriever:
         Returns:
             RetrievalResult containing retrieved documents
         """
+        start_time = time.time()
+        
         try:
             logger.info(f"Retrieving MI docs for query: '{query}', project: {project_name}")
             
@@ -66,53 +71,47 @@ class MIRetriever:
             if project_name:
                 filters["project"] = project_name
             
-            # Get client and perform search
-            client = self.client_manager.get_client()
-            if not client:
-                logger.error("Failed to get Qdrant client")
-                return RetrievalResult(
-                    source_type=SourceType.MI_DOCUMENTATION,
-                    query=query,
-                    documents=[],
-                    metadata={
-                        "error": "Failed to connect to Qdrant",
-                        "collection": self.collection_name
-                    }
-                )
-            
-            # Perform semantic search
-            search_results = client.search(
+            # Perform semantic search, over-fetching candidates for the reranker
+            search_results = self.qdrant_clients.search_points(
                 collection_name=self.collection_name,
-                query_vector=self._get_query_embedding(query),
-                query_filter=filters if filters else None,
-                limit=limit,
+                query=query,
+                filter_dict=filters,
+                limit=self.reranking.candidate_count(limit),
                 score_threshold=score_threshold
             )
             
             # Process results
             documents = []
             for result in search_results:
-                if hasattr(result, 'payload') and result.payload:
+                if result.payload:
+                    fields = flatten_point_payload(result.payload)
                     doc_content = {
-                        "content": result.payload.get("content", ""),
-                        "title": result.payload.get("title", ""),
-                        "document_type": result.payload.get("document_type", "manual"),
-                        "project": result.payload.get("project", ""),
-                        "version": result.payload.get("version", ""),
-                        "section": result.payload.get("section", ""),
+                        "id": str(result.id),
+                        "content": fields.get("content", ""),
+                        "title": fields.get("title", ""),
+                        "document_type": fields.get("document_type", "manual"),
+                        "project": fields.get("project", ""),
+                        "version": fields.get("version", ""),
+                        "section": fields.get("section", ""),
                         "score": float(result.score),
-                        "source_file": result.payload.get("source_file", ""),
-                        "last_updated": result.payload.get("last_updated", "")
+                        "source_file": fields.get("source_file", ""),
+                        "last_updated": fields.get("last_updated", "")
                     }
                     documents.append(doc_content)
             
+            # Rerank candidates and keep the best `limit`
+            documents = self.reranking.rerank(query, documents, top_k=limit)
+            
             logger.info(f"Retrieved {len(documents)} MI documents")
             
             return RetrievalResult(
-                source_type=SourceType.MI_DOCUMENTATION,
-                query=query,
-                documents=documents,
+                source=SourceType.MI_DOCUMENTS,
+                success=True,
+                raw_documents=documents,
+                retrieval_time=time.time() - start_time,
                 metadata={
+                    "query": query,
+                    "reranked": self.reranking.enabled,
                     "total_results": len(documents),
                     "collection": self.collection_name,
                     "project_filter": project_name,
@@ -123,27 +122,15 @@ class MIRetriever:
         except Exception as e:
             logger.error(f"Error retrieving MI docs: {str(e)}")
             return RetrievalResult(
-                source_type=SourceType.MI_DOCUMENTATION,
-                query=query,
-                documents=[],
+                source=SourceType.MI_DOCUMENTS,
+                success=False,
+                error_message=str(e),
+                retrieval_time=time.time() - start_time,
                 metadata={
-                    "error": str(e),
+                    "query": query,
                     "collection": self.collection_name
                 }
             )
-    
-    def _get_query_embedding(self, query: str) -> List[float]:
-        """Get embedding for query using the configured embedding model"""
-        try:
-            embedding_model = self.client_manager.get_embedding_model()
-            if embedding_model:
-                return embedding_model.embed_query(query)
-            else:
-                logger.warning("No embedding model available, using dummy embedding")
-                return [0.0] * 384  # Default embedding size
-        except Exception as e:
-            logger.error(f"Error getting query embedding: {str(e)}")
-            return [0.0] * 384
 
 
 @tool
@@ -176,8 +163,8 @@ def retrieve_mi_documentation(
     return {
         "source": "MI Documentation",
         "query": query,
-        "documents": result.documents,
-        "total_results": len(result.documents),
+        "documents": result.raw_documents,
+        "total_results": len(result.raw_documents),
         "metadata": result.metadata
     }
 
@@ -212,7 +199,7 @@ def search_installation_procedures(
     
     # Filter for installation-related documents
     installation_docs = [
-        doc for doc in result.documents 
+        doc for doc in result.raw_documents 
         if any(keyword in doc.get("content", "").lower() or 
                keyword in doc.get("title", "").lower() 
                for keyword in ["install", "setup", "deploy", "configuration", "procedure"])
@@ -260,8 +247,8 @@ def get_technical_manual_sections(
         "source": "MI Documentation - Technical Manuals",
         "project": project_name,
         "section_type": section_type,
-        "documents": result.documents,
-        "total_results": len(result.documents),
+        "documents": result.raw_documents,
+        "total_results": len(result.raw_documents),
         "metadata": result.metadata
     }
 
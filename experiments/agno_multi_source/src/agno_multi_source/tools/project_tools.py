@@ -10,7 +10,7 @@ import logging
 import time
 from typing import Dict, List, Optional, Union
 
-from agno import tool
+from agno.tools import tool
 from pydantic import BaseModel, Field
 
 from ..config import get_config
@@ -0,0 +1,166 @@
+"""
+Single-Flight Request Coalescing for Tools
+
+This module lets concurrent identical backend calls share one execution.
+When several users ask about the same project at the same time, the first
+caller (the leader) runs the Qdrant scroll or Athena query and every other
+caller with the same tool name and normalized arguments waits on the
+leader's future instead of hitting the backend again.
+
+Nothing is cached: once the leader finishes, the next call runs again. Results
+are shared between the coalesced callers and must be treated as read-only.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_argument(value: Any) -> Any:
+    """
+    Canonical form of an argument for keying in-flight calls.
+    
+    Dict keys are sorted and sets become sorted lists. Strings are kept as
+    they are: whitespace inside SQL string literals changes the result.
+    """
+    if isinstance(value, dict):
+        return {str(key): normalize_argument(value[key]) for key in sorted(value, key=str)}
+    if isinstance(value, (list, tuple)):
+        return [normalize_argument(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((normalize_argument(item) for item in value), key=repr)
+    return value
+
+
+def call_key(name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+    """Key identifying a call by tool name and normalized arguments"""
+    return name, json.dumps(normalize_argument(arguments), sort_keys=True, default=str)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key onto one in-flight future.
+    
+    The leader's exception is re-raised in every waiting caller, so error
+    handling at the call sites is unchanged.
+    """
+    
+    def __init__(self, max_workers: int = 8):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.executed = 0
+        self.coalesced = 0
+    
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) unless an identical call is in flight, then wait for its result"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            logger.debug(f"Coalesced in-flight call: {key[0] if isinstance(key, tuple) else key}")
+            return future.result()
+        
+        self._run(key, future, fn, args, kwargs)
+        return future.result()
+    
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Start fn(*args, **kwargs) in the background unless an identical call is in flight.
+        
+        Returns the shared future, so every caller can wait with its own
+        timeout; the call keeps running for the others when one stops waiting.
+        The background run does not inherit the caller's turn deadline.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                logger.debug(f"Coalesced in-flight call: {key[0] if isinstance(key, tuple) else key}")
+                return future
+            future = Future()
+            self._calls[key] = future
+            self.executed += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="single-flight")
+        
+        self._executor.submit(self._run, key, future, fn, args, kwargs)
+        return future
+    
+    def _run(self, key: Hashable, future: Future, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        """Run the leader's call and publish its outcome to the shared future"""
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+    
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running"""
+        with self._lock:
+            return len(self._calls)
+    
+    def stats(self) -> Dict[str, int]:
+        """Executed and coalesced call counters"""
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+# Global single-flight group shared by all tools
+_single_flight_instance: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Get or create the global single-flight group"""
+    global _single_flight_instance
+    if _single_flight_instance is None:
+        with _single_flight_lock:
+            if _single_flight_instance is None:
+                _single_flight_instance = SingleFlight()
+    return _single_flight_instance
+
+
+def coalesced_call(name: str, fn: Callable[..., Any], **kwargs) -> Any:
+    """Call fn(**kwargs), sharing the execution with identical in-flight calls named `name`"""
+    return get_single_flight().do(call_key(name, kwargs), fn, **kwargs)
+
+
+def single_flight(name: Optional[str] = None) -> Callable:
+    """
+    Decorator coalescing concurrent calls of a function with equal arguments.
+    
+    Arguments are bound to the signature (defaults applied) before keying, so
+    positional and keyword spellings of the same call coalesce.
+    """
+    def decorator(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+        call_name = name or f"{fn.__module__}.{fn.__qualname__}"
+        
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return get_single_flight().do(call_key(call_name, dict(bound.arguments)), fn, *args, **kwargs)
+        
+        return wrapper
+    
+    return decorator
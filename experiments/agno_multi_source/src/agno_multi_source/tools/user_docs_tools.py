@@ -7,13 +7,16 @@ and custom documentation.
 """
 
 import logging
-from typing import Dict, List, Optional
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
 
-from agno import tool
+from agno.tools import tool
 from pydantic import BaseModel, Field
 
 from ..config import get_config
-from ..libs.qdrant_clients import QdrantClientManager
+from ..libs.qdrant_clients import date_ranges_for, flatten_point_payload, get_qdrant_clients
+from ..libs.reranker import get_reranking_stage
 from ..models import RetrievalResult, SourceType
 
 logger = logging.getLogger(__name__)
@@ -35,8 +38,9 @@ class UserDocsRetriever:
     def __init__(self):
         """Initialize the User Documents retriever"""
         self.config = get_config()
-        self.collection_name = self.config.qdrant_config.user_docs_collection
-        self.client_manager = QdrantClientManager()
+        self.collection_name = self.config.user_docs_collection
+        self.qdrant_clients = get_qdrant_clients()
+        self.reranking = get_reranking_stage()
         
         logger.info(f"Initialized UserDocsRetriever for collection: {self.collection_name}")
     
@@ -47,7 +51,9 @@ class UserDocsRetriever:
         document_type: Optional[str] = None,
         project_name: Optional[str] = None,
         limit: int = 10,
-        score_threshold: float = 0.7
+        score_threshold: float = 0.7,
+        uploaded_since: Optional[str] = None,
+        uploaded_until: Optional[str] = None
     ) -> RetrievalResult:
         """
         Retrieve user documents based on query and optional filters.
@@ -59,10 +65,14 @@ class UserDocsRetriever:
             project_name: Optional project name to filter results
             limit: Maximum number of results to return
             score_threshold: Minimum similarity score for results
-            
+            uploaded_since: Only documents uploaded on or after this date (ISO format)
+            uploaded_until: Only documents uploaded on or before this date (ISO format)
+        
         Returns:
             RetrievalResult containing retrieved documents
         """
+        start_time = time.time()
+        
         try:
             logger.info(f"Retrieving user docs for query: '{query}', user: {user_id}, type: {document_type}")
             
@@ -74,91 +84,83 @@ class UserDocsRetriever:
                 filters["document_type"] = document_type
             if project_name:
                 filters["project"] = project_name
+            date_ranges = date_ranges_for(
+                self.qdrant_clients.get_collection_config(self.collection_name),
+                uploaded_since,
+                uploaded_until,
+                default_field="upload_date"
+            )
             
-            # Get client and perform search
-            client = self.client_manager.get_client()
-            if not client:
-                logger.error("Failed to get Qdrant client")
-                return RetrievalResult(
-                    source_type=SourceType.USER_DOCUMENTS,
-                    query=query,
-                    documents=[],
-                    metadata={
-                        "error": "Failed to connect to Qdrant",
-                        "collection": self.collection_name
-                    }
-                )
-            
-            # Perform semantic search
-            search_results = client.search(
+            # Perform semantic search, over-fetching candidates for the reranker;
+            # upload date bounds are Qdrant pre-filters, not post-filters
+            search_results = self.qdrant_clients.search_points(
                 collection_name=self.collection_name,
-                query_vector=self._get_query_embedding(query),
-                query_filter=filters if filters else None,
-                limit=limit,
-                score_threshold=score_threshold
+                query=query,
+                filter_dict=filters,
+                limit=self.reranking.candidate_count(limit),
+                score_threshold=score_threshold,
+                date_ranges=date_ranges
             )
             
             # Process results
             documents = []
             for result in search_results:
-                if hasattr(result, 'payload') and result.payload:
+                if result.payload:
+                    fields = flatten_point_payload(result.payload)
                     doc_content = {
-                        "content": result.payload.get("content", ""),
-                        "title": result.payload.get("title", ""),
-                        "filename": result.payload.get("filename", ""),
-                        "document_type": result.payload.get("document_type", ""),
-                        "user_id": result.payload.get("user_id", ""),
-                        "project": result.payload.get("project", ""),
-                        "upload_date": result.payload.get("upload_date", ""),
-                        "file_size": result.payload.get("file_size", 0),
-                        "file_path": result.payload.get("file_path", ""),
+                        "id": str(result.id),
+                        "content": fields.get("content", ""),
+                        "title": fields.get("title", ""),
+                        "filename": fields.get("filename", ""),
+                        "document_type": fields.get("document_type", ""),
+                        "user_id": fields.get("user_id", ""),
+                        "project": fields.get("project", ""),
+                        "upload_date": fields.get("upload_date", ""),
+                        "file_size": fields.get("file_size", 0),
+                        "file_path": fields.get("file_path", ""),
                         "score": float(result.score),
-                        "tags": result.payload.get("tags", []),
-                        "description": result.payload.get("description", ""),
-                        "access_level": result.payload.get("access_level", "private")
+                        "tags": fields.get("tags", []),
+                        "description": fields.get("description", ""),
+                        "access_level": fields.get("access_level", "private")
                     }
                     documents.append(doc_content)
             
+            # Rerank candidates and keep the best `limit`
+            documents = self.reranking.rerank(query, documents, top_k=limit)
+            
             logger.info(f"Retrieved {len(documents)} user documents")
             
             return RetrievalResult(
-                source_type=SourceType.USER_DOCUMENTS,
-                query=query,
-                documents=documents,
+                source=SourceType.USER_DOCUMENTS,
+                success=True,
+                raw_documents=documents,
+                retrieval_time=time.time() - start_time,
                 metadata={
+                    "query": query,
+                    "reranked": self.reranking.enabled,
                     "total_results": len(documents),
                     "collection": self.collection_name,
                     "user_filter": user_id,
                     "document_type_filter": document_type,
                     "project_filter": project_name,
+                    "uploaded_since": uploaded_since,
+                    "uploaded_until": uploaded_until,
                     "score_threshold": score_threshold
                 }
             )
-            
+        
         except Exception as e:
             logger.error(f"Error retrieving user documents: {str(e)}")
             return RetrievalResult(
-                source_type=SourceType.USER_DOCUMENTS,
-                query=query,
-                documents=[],
+                source=SourceType.USER_DOCUMENTS,
+                success=False,
+                error_message=str(e),
+                retrieval_time=time.time() - start_time,
                 metadata={
-                    "error": str(e),
+                    "query": query,
                     "collection": self.collection_name
                 }
             )
-    
-    def _get_query_embedding(self, query: str) -> List[float]:
-        """Get embedding for query using the configured embedding model"""
-        try:
-            embedding_model = self.client_manager.get_embedding_model()
-            if embedding_model:
-                return embedding_model.embed_query(query)
-            else:
-                logger.warning("No embedding model available, using dummy embedding")
-                return [0.0] * 384  # Default embedding size
-        except Exception as e:
-            logger.error(f"Error getting query embedding: {str(e)}")
-            return [0.0] * 384
 
 
 @tool
@@ -166,7 +168,9 @@ def retrieve_user_documents(
     query: str,
     user_id: Optional[str] = None,
     document_type: Optional[str] = None,
-    limit: int = 10
+    limit: int = 10,
+    uploaded_since: Optional[str] = None,
+    uploaded_until: Optional[str] = None
 ) -> Dict:
     """
     Retrieve information from user-uploaded documents and project-specific files.
@@ -179,7 +183,11 @@ def retrieve_user_documents(
         user_id: Optional user ID to filter results to specific user's documents
         document_type: Optional document type filter (e.g., "pdf", "word", "presentation")
         limit: Maximum number of results to return (default: 10)
-        
+        uploaded_since: Only documents uploaded on or after this date (ISO format, e.g. "2024-05-01")
+        uploaded_until: Only documents uploaded on or before this date (ISO format)
+    
+    Documents without an upload date are left out when a date bound is given.
+    
     Returns:
         Dictionary containing retrieved documents and metadata
     """
@@ -188,14 +196,16 @@ def retrieve_user_documents(
         query=query,
         user_id=user_id,
         document_type=document_type,
-        limit=limit
+        limit=limit,
+        uploaded_since=uploaded_since,
+        uploaded_until=uploaded_until
     )
     
     return {
         "source": "User Documents",
         "query": query,
-        "documents": result.documents,
-        "total_results": len(result.documents),
+        "documents": result.raw_documents,
+        "total_results": len(result.raw_documents),
         "metadata": result.metadata
     }
 
@@ -213,7 +223,7 @@ def search_project_attachments(
         project_name: Name of the project
         attachment_type: Optional attachment type (e.g., "specification", "design", "report")
         limit: Maximum number of results to return
-        
+    
     Returns:
         Dictionary containing project attachments
     """
@@ -230,7 +240,7 @@ def search_project_attachments(
     
     # Filter for project-specific documents
     project_docs = [
-        doc for doc in result.documents 
+        doc for doc in result.raw_documents 
         if doc.get("project", "").lower() == project_name.lower() or
            project_name.lower() in doc.get("content", "").lower() or
            project_name.lower() in doc.get("title", "").lower()
@@ -260,8 +270,9 @@ def get_user_uploaded_files(
         user_id: User ID to search for
         file_type: Optional file type filter (e.g., "pdf", "docx", "pptx")
         recent_days: Optional filter for files uploaded in the last N days
+            (files without an upload date are left out)
         limit: Maximum number of results to return
-        
+    
     Returns:
         Dictionary containing user's uploaded files
     """
@@ -269,34 +280,22 @@ def get_user_uploaded_files(
     if file_type:
         query += f" {file_type}"
     
+    # The recency cutoff is pushed into the Qdrant search, so the limit applies
+    # to recent files only instead of to all files before filtering
+    uploaded_since = None
+    if recent_days:
+        uploaded_since = (datetime.now(timezone.utc) - timedelta(days=recent_days)).isoformat()
+    
     retriever = UserDocsRetriever()
     result = retriever.retrieve_user_documents(
         query=query,
         user_id=user_id,
         document_type=file_type,
-        limit=limit
+        limit=limit,
+        uploaded_since=uploaded_since
     )
     
-    documents = result.documents
-    
-    # Filter by recent days if specified
-    if recent_days:
-        from datetime import datetime, timedelta
-        cutoff_date = datetime.now() - timedelta(days=recent_days)
-        
-        recent_docs = []
-        for doc in documents:
-            upload_date_str = doc.get("upload_date", "")
-            if upload_date_str:
-                try:
-                    upload_date = datetime.fromisoformat(upload_date_str.replace('Z', '+00:00'))
-                    if upload_date >= cutoff_date:
-                        recent_docs.append(doc)
-                except ValueError:
-                    # Include documents with unparseable dates
-                    recent_docs.append(doc)
-        
-        documents = recent_docs
+    documents = result.raw_documents
     
     return {
         "source": "User Documents - User Uploads",
@@ -324,7 +323,7 @@ def search_document_by_filename(
         user_id: Optional user ID to filter results
         exact_match: Whether to search for exact filename match
         limit: Maximum number of results to return
-        
+    
     Returns:
         Dictionary containing matching documents
     """
@@ -342,7 +341,7 @@ def search_document_by_filename(
     
     # Filter by filename matching
     matching_docs = []
-    for doc in result.documents:
+    for doc in result.raw_documents:
         doc_filename = doc.get("filename", "")
         if exact_match:
             if doc_filename == filename:
@@ -375,7 +374,7 @@ def get_shared_documents(
         project_name: Optional project name to filter results
         access_level: Access level filter ("shared", "public", "team")
         limit: Maximum number of results to return
-        
+    
     Returns:
         Dictionary containing shared documents
     """
@@ -392,7 +391,7 @@ def get_shared_documents(
     
     # Filter by access level
     shared_docs = [
-        doc for doc in result.documents 
+        doc for doc in result.raw_documents 
         if doc.get("access_level", "private") in ["shared", "public", "team"]
     ]
     
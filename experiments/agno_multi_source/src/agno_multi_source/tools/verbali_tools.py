@@ -9,14 +9,16 @@ import logging
 import time
 from typing import Dict, List, Optional, Union
 
-from agno import tool
+from agno.tools import tool
 from langchain_core.documents import Document
 from pydantic import BaseModel, Field
 
 from ..config import get_config
 from ..libs.project_manager import get_project_manager
-from ..libs.qdrant_clients import get_qdrant_clients
+from ..libs.qdrant_clients import date_ranges_for, get_qdrant_clients
+from ..libs.reranker import get_reranking_stage
 from ..models import ProjectNameField, RetrievalResult, SourceType
+from .single_flight import coalesced_call
 
 logger = logging.getLogger(__name__)
 
@@ -36,19 +38,26 @@ class VerbaliRetrievalResult(BaseModel):
 def retrieve_verbali_for_project(
     project_name: str,
     user_query: Optional[str] = None,
-    max_documents: int = 20
+    max_documents: int = 20,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    latest: Optional[int] = None
 ) -> VerbaliRetrievalResult:
     """
     Retrieve meeting minutes and verbali documents for a specific project.
     
     Uses scroll-based retrieval to get ALL documents for the project instead of
-    similarity search, providing comprehensive context.
+    similarity search, providing comprehensive context. Date bounds and the
+    latest limit are applied by Qdrant, so only matching chunks are fetched.
     
     Args:
         project_name: Name of the project to retrieve verbali for
         user_query: User's original query (for logging/context)
         max_documents: Maximum number of documents to retrieve (for safety)
-        
+        since: Only verbali modified on or after this date (ISO format, e.g. "2024-05-01")
+        until: Only verbali modified on or before this date (ISO format)
+        latest: Only the newest N chunks, newest first (e.g. for "last meeting" questions)
+    
     Returns:
         VerbaliRetrievalResult with retrieval results and formatted content
     """
@@ -123,11 +132,26 @@ def retrieve_verbali_for_project(
                 project_filter=project_filter_dict
             )
         
-        # Retrieve documents using scroll
-        documents = qdrant_clients.scroll_all_documents_for_project(
-            collection_name=verbali_config.collection_name,
-            project_filter_dict=project_filter_dict
-        )
+        # Retrieve documents using scroll, sharing identical in-flight scrolls
+        date_ranges = date_ranges_for(verbali_config, since, until)
+        if latest:
+            documents = coalesced_call(
+                "qdrant_scroll_latest",
+                qdrant_clients.scroll_latest_documents,
+                collection_name=verbali_config.collection_name,
+                filter_dict=project_filter_dict,
+                date_field=verbali_config.date_field or "last_modified_time",
+                limit=min(latest, max_documents),
+                date_ranges=date_ranges
+            )
+        else:
+            documents = coalesced_call(
+                "qdrant_scroll",
+                qdrant_clients.scroll_all_documents_for_project,
+                collection_name=verbali_config.collection_name,
+                project_filter_dict=project_filter_dict,
+                date_ranges=date_ranges
+            )
         
         # Apply safety limit
         if len(documents) > max_documents:
@@ -147,7 +171,7 @@ def retrieve_verbali_for_project(
             retrieval_time=time.time() - start_time,
             project_filter=project_filter_dict
         )
-        
+    
     except Exception as e:
         error_msg = f"Error retrieving verbali for project {project_name}: {str(e)}"
         logger.error(error_msg, exc_info=True)
@@ -166,7 +190,9 @@ def retrieve_verbali_for_project(
 def retrieve_verbali_for_multiple_projects(
     project_names: List[str],
     user_query: Optional[str] = None,
-    max_documents_per_project: int = 15
+    max_documents_per_project: int = 15,
+    since: Optional[str] = None,
+    until: Optional[str] = None
 ) -> VerbaliRetrievalResult:
     """
     Retrieve verbali documents for multiple projects.
@@ -175,7 +201,9 @@ def retrieve_verbali_for_multiple_projects(
         project_names: List of project names to retrieve verbali for
         user_query: User's original query (for logging/context)
         max_documents_per_project: Maximum documents per project
-        
+        since: Only verbali modified on or after this date (ISO format)
+        until: Only verbali modified on or before this date (ISO format)
+    
     Returns:
         VerbaliRetrievalResult with combined results from all projects
     """
@@ -191,7 +219,9 @@ def retrieve_verbali_for_multiple_projects(
         result = retrieve_verbali_for_project(
             project_name=project_name,
             user_query=user_query,
-            max_documents=max_documents_per_project
+            max_documents=max_documents_per_project,
+            since=since,
+            until=until
         )
         
         if result.success:
@@ -227,7 +257,9 @@ def retrieve_verbali_for_multiple_projects(
 def search_verbali_by_keywords(
     keywords: str,
     project_filter: Optional[str] = None,
-    max_results: int = 10
+    max_results: int = 10,
+    since: Optional[str] = None,
+    until: Optional[str] = None
 ) -> VerbaliRetrievalResult:
     """
     Search verbali documents using keyword similarity search.
@@ -236,7 +268,9 @@ def search_verbali_by_keywords(
         keywords: Keywords to search for
         project_filter: Optional project name to filter results
         max_results: Maximum number of results to return
-        
+        since: Only verbali modified on or after this date (ISO format)
+        until: Only verbali modified on or before this date (ISO format)
+    
     Returns:
         VerbaliRetrievalResult with search results
     """
@@ -272,13 +306,16 @@ def search_verbali_by_keywords(
                     ProjectNameField.VERBALI_PROJECT
                 )
         
-        # Perform similarity search
+        # Perform similarity search, over-fetching candidates for the reranker
+        reranking = get_reranking_stage()
         documents = qdrant_clients.similarity_search(
             collection_config=verbali_config,
             query=keywords,
-            k=max_results,
-            filter_dict=filter_dict
+            k=reranking.candidate_count(max_results),
+            filter_dict=filter_dict,
+            date_ranges=date_ranges_for(verbali_config, since, until)
         )
+        documents = reranking.rerank(keywords, documents, top_k=max_results)
         
         # Format the content
         project_context = project_filter or "multiple projects"
@@ -294,7 +331,7 @@ def search_verbali_by_keywords(
             retrieval_time=time.time() - start_time,
             project_filter=filter_dict
         )
-        
+    
     except Exception as e:
         error_msg = f"Error searching verbali: {str(e)}"
         logger.error(error_msg, exc_info=True)
@@ -315,7 +352,7 @@ def _format_verbali_documents(documents: List[Document], project_context: str) -
     Args:
         documents: List of retrieved documents
         project_context: Project context for the header
-        
+    
     Returns:
         Formatted string ready for LLM context
     """
@@ -373,12 +410,18 @@ class VerbaliRetriever:
     def retrieve_for_project(
         self, 
         project_name: str, 
-        user_query: Optional[str] = None
+        user_query: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        latest: Optional[int] = None
     ) -> VerbaliRetrievalResult:
-        """Retrieve verbali for a single project"""
+        """Retrieve verbali for a single project, optionally by date range or the newest N"""
         return retrieve_verbali_for_project(
             project_name=project_name,
-            user_query=user_query
+            user_query=user_query,
+            since=since,
+            until=until,
+            latest=latest
         )
     
     def retrieve_for_projects(
@@ -6,13 +6,15 @@ which contains organizational processes, standards, guidelines, and institutiona
 """
 
 import logging
-from typing import Dict, List, Optional
+import time
+from typing import Dict, Optional
 
-from agno import tool
+from agno.tools import tool
 from pydantic import BaseModel, Field
 
 from ..config import get_config
-from ..libs.qdrant_clients import QdrantClientManager
+from ..libs.qdrant_clients import flatten_point_payload, get_qdrant_clients
+from ..libs.reranker import get_reranking_stage
 from ..models import RetrievalResult, SourceType
 
 logger = logging.getLogger(__name__)
@@ -33,8 +35,9 @@ class WikiRetriever:
     def __init__(self):
         """Initialize the Wiki retriever"""
         self.config = get_config()
-        self.collection_name = self.config.qdrant_config.wiki_collection
-        self.client_manager = QdrantClientManager()
+        self.collection_name = self.config.wiki_collection
+        self.qdrant_clients = get_qdrant_clients()
+        self.reranking = get_reranking_stage()
         
         logger.info(f"Initialized WikiRetriever for collection: {self.collection_name}")
     
@@ -57,6 +60,8 @@ class WikiRetriever:
         Returns:
             RetrievalResult containing retrieved Wiki articles
         """
+        start_time = time.time()
+        
         try:
             logger.info(f"Retrieving Wiki content for query: '{query}', category: {topic_category}")
             
@@ -65,55 +70,49 @@ class WikiRetriever:
             if topic_category:
                 filters["category"] = topic_category
             
-            # Get client and perform search
-            client = self.client_manager.get_client()
-            if not client:
-                logger.error("Failed to get Qdrant client")
-                return RetrievalResult(
-                    source_type=SourceType.WIKI_KNOWLEDGE_BASE,
-                    query=query,
-                    documents=[],
-                    metadata={
-                        "error": "Failed to connect to Qdrant",
-                        "collection": self.collection_name
-                    }
-                )
-            
-            # Perform semantic search
-            search_results = client.search(
+            # Perform semantic search, over-fetching candidates for the reranker
+            search_results = self.qdrant_clients.search_points(
                 collection_name=self.collection_name,
-                query_vector=self._get_query_embedding(query),
-                query_filter=filters if filters else None,
-                limit=limit,
+                query=query,
+                filter_dict=filters,
+                limit=self.reranking.candidate_count(limit),
                 score_threshold=score_threshold
             )
             
             # Process results
             documents = []
             for result in search_results:
-                if hasattr(result, 'payload') and result.payload:
+                if result.payload:
+                    fields = flatten_point_payload(result.payload)
                     doc_content = {
-                        "content": result.payload.get("content", ""),
-                        "title": result.payload.get("title", ""),
-                        "category": result.payload.get("category", ""),
-                        "tags": result.payload.get("tags", []),
-                        "author": result.payload.get("author", ""),
-                        "last_modified": result.payload.get("last_modified", ""),
-                        "version": result.payload.get("version", ""),
-                        "wiki_url": result.payload.get("wiki_url", ""),
+                        "id": str(result.id),
+                        "content": fields.get("content", ""),
+                        "title": fields.get("title", ""),
+                        "category": fields.get("category", ""),
+                        "tags": fields.get("tags", []),
+                        "author": fields.get("author", ""),
+                        "last_modified": fields.get("last_modified", ""),
+                        "version": fields.get("version", ""),
+                        "wiki_url": fields.get("wiki_url", ""),
                         "score": float(result.score),
-                        "section": result.payload.get("section", ""),
-                        "related_topics": result.payload.get("related_topics", [])
+                        "section": fields.get("section", ""),
+                        "related_topics": fields.get("related_topics", [])
                     }
                     documents.append(doc_content)
             
+            # Rerank candidates and keep the best `limit`
+            documents = self.reranking.rerank(query, documents, top_k=limit)
+            
             logger.info(f"Retrieved {len(documents)} Wiki articles")
             
             return RetrievalResult(
-                source_type=SourceType.WIKI_KNOWLEDGE_BASE,
-                query=query,
-                documents=documents,
+                source=SourceType.WIKI_DOCUMENTS,
+                success=True,
+                raw_documents=documents,
+                retrieval_time=time.time() - start_time,
                 metadata={
+                    "query": query,
+                    "reranked": self.reranking.enabled,
                     "total_results": len(documents),
                     "collection": self.collection_name,
                     "topic_filter": topic_category,
@@ -124,27 +123,15 @@ class WikiRetriever:
         except Exception as e:
             logger.error(f"Error retrieving Wiki content: {str(e)}")
             return RetrievalResult(
-                source_type=SourceType.WIKI_KNOWLEDGE_BASE,
-                query=query,
-                documents=[],
+                source=SourceType.WIKI_DOCUMENTS,
+                success=False,
+                error_message=str(e),
+                retrieval_time=time.time() - start_time,
                 metadata={
-                    "error": str(e),
+                    "query": query,
                     "collection": self.collection_name
                 }
             )
-    
-    def _get_query_embedding(self, query: str) -> List[float]:
-        """Get embedding for query using the configured embedding model"""
-        try:
-            embedding_model = self.client_manager.get_embedding_model()
-            if embedding_model:
-                return embedding_model.embed_query(query)
-            else:
-                logger.warning("No embedding model available, using dummy embedding")
-                return [0.0] * 384  # Default embedding size
-        except Exception as e:
-            logger.error(f"Error getting query embedding: {str(e)}")
-            return [0.0] * 384
 
 
 @tool
@@ -177,8 +164,8 @@ def retrieve_wiki_knowledge(
     return {
         "source": "Wiki Knowledge Base",
         "query": query,
-        "documents": result.documents,
-        "total_results": len(result.documents),
+        "documents": result.raw_documents,
+        "total_results": len(result.raw_documents),
         "metadata": result.metadata
     }
 
@@ -213,7 +200,7 @@ def search_organizational_processes(
     
     # Filter for process-related documents
     process_docs = [
-        doc for doc in result.documents 
+        doc for doc in result.raw_documents 
         if any(keyword in doc.get("content", "").lower() or 
                keyword in doc.get("title", "").lower() 
                for keyword in ["process", "procedure", "workflow", "guideline", "policy"])
@@ -261,8 +248,8 @@ def get_standards_and_guidelines(
         "source": "Wiki Knowledge Base - Standards & Guidelines",
         "standards_type": standards_type,
         "domain": domain,
-        "documents": result.documents,
-        "total_results": len(result.documents),
+        "documents": result.raw_documents,
+        "total_results": len(result.raw_documents),
         "metadata": result.metadata
     }
 
@@ -297,7 +284,7 @@ def search_best_practices(
     
     # Filter for best practices content
     best_practices_docs = [
-        doc for doc in result.documents 
+        doc for doc in result.raw_documents 
         if any(keyword in doc.get("content", "").lower() or 
                keyword in doc.get("title", "").lower() 
                for keyword in ["best practice", "recommendation", "guideline", "pattern", "approach"])
@@ -345,8 +332,8 @@ def get_institutional_knowledge(
         "source": "Wiki Knowledge Base - Institutional Knowledge",
         "knowledge_area": knowledge_area,
         "historical": historical,
-        "documents": result.documents,
-        "total_results": len(result.documents),
+        "documents": result.raw_documents,
+        "total_results": len(result.raw_documents),
         "metadata": result.metadata
     }
 
@@ -0,0 +1,283 @@
+import calendar
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Ordinal form choices mapped to numbers (higher is better, or more severe for severity)
+ORDINAL_SCALES = {
+    "mood": {"very poor": 1, "poor": 2, "okay": 3, "good": 4, "great": 5},
+    "energy_level": {"very low": 1, "low": 2, "normal": 3, "high": 4, "very high": 5},
+    "sleep_quality": {"very poor": 1, "poor": 2, "fair": 3, "good": 4, "excellent": 5},
+    "severity": {"mild": 1, "moderate": 2, "severe": 3, "very severe": 4},
+}
+
+# Free-text metadata fields holding one "name: value unit" measurement per line
+MEASUREMENT_FIELDS = ("results",)
+
+# Text fields whose leading number is the measurement ("100mg", "$200", "30 min walk");
+# other text fields only count when they hold a bare number
+LEADING_NUMBER_FIELDS = ("dosage", "cost", "exercise", "duration")
+
+_LEADING_NUMBER = re.compile(r"^\s*[$€£]?\s*(-?\d+(?:[.,]\d+)?)(?![\d.,/-])")
+_BARE_NUMBER = re.compile(r"^\s*(-?\d+(?:[.,]\d+)?)\s*$")
+
+# "Glucose: 110 mg/dL", "HbA1c = 6.1 %", "LDL 130"
+_MEASUREMENT_LINE = re.compile(r"^\s*([A-Za-z][A-Za-z0-9 ()/\-]*?)(?:\s*[:=]\s*|\s+)(-?\d+(?:[.,]\d+)?)(?![\d.,])")
+
+# Per-category record counts (one point per record), e.g. for medication adherence
+COUNT_SERIES_PREFIX = "records."
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", "."))
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.strip().lower()).strip("_")
+
+
+def record_timestamp(date: str) -> Optional[int]:
+    """Seconds since the epoch (UTC) of an ISO date or datetime string"""
+    if not date:
+        return None
+    try:
+        dt = datetime.fromisoformat(date.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return calendar.timegm(dt.timetuple())
+
+
+def extract_values(record: Any) -> List[Tuple[str, float]]:
+    """
+    Numeric values of a record as (series name, value) pairs.
+    
+    Series are named "<category>.<field>": numeric metadata values, numbers
+    in text values (leading ones for dosage, cost, ...), ordinal choices (mood, severity, ...) mapped to
+    their rank, and one series per measurement line of lab results
+    ("analysis.glucose"). Every record also counts 1 in "records.<category>".
+    """
+    values = [(f"{COUNT_SERIES_PREFIX}{record.category}", 1.0)]
+    for field, value in (record.metadata or {}).items():
+        if value is None or value == "":
+            continue
+        name = f"{record.category}.{field}"
+        if isinstance(value, bool):
+            values.append((name, float(value)))
+        elif isinstance(value, (int, float)):
+            values.append((name, float(value)))
+        elif isinstance(value, str):
+            if field in ORDINAL_SCALES:
+                rank = ORDINAL_SCALES[field].get(value.strip().lower())
+                if rank is not None:
+                    values.append((name, float(rank)))
+            elif field in MEASUREMENT_FIELDS:
+                for line in value.splitlines():
+                    match = _MEASUREMENT_LINE.match(line)
+                    if match:
+                        values.append((f"{record.category}.{_slug(match.group(1))}", _number(match.group(2))))
+            else:
+                pattern = _LEADING_NUMBER if field in LEADING_NUMBER_FIELDS else _BARE_NUMBER
+                match = pattern.match(value)
+                if match:
+                    values.append((name, _number(match.group(1))))
+    return values
+
+
+class _Series:
+    """
+    One time series as growable NumPy columns (timestamps, values, record ids).
+    
+    Appends are amortized O(1) and keep the columns sorted when points arrive
+    in time order; removals are recorded and applied in one vectorized pass
+    (as is re-sorting) the next time the series is read.
+    """
+    
+    COLUMNS = ("times", "values", "ids", "sequence")
+    
+    def __init__(self, capacity: int = 64):
+        self.times = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.ids = np.empty(capacity, dtype=object)
+        # Append order, so a removal only drops the points added before it
+        self.sequence = np.empty(capacity, dtype=np.int64)
+        self.size = 0
+        self._next_sequence = 0
+        self._sorted = True
+        # Pending removals: record id -> sequence number at removal
+        self._removed: Dict[str, int] = {}
+    
+    def append(self, record_id: str, timestamp: int, value: float) -> None:
+        if self.size == len(self.times):
+            capacity = 2 * len(self.times)
+            for column in self.COLUMNS:
+                grown = np.empty(capacity, dtype=getattr(self, column).dtype)
+                grown[:self.size] = getattr(self, column)[:self.size]
+                setattr(self, column, grown)
+        if self.size and timestamp < self.times[self.size - 1]:
+            self._sorted = False
+        self.times[self.size] = timestamp
+        self.values[self.size] = value
+        self.ids[self.size] = record_id
+        self.sequence[self.size] = self._next_sequence
+        self._next_sequence += 1
+        self.size += 1
+    
+    def remove(self, record_id: str) -> None:
+        self._removed[record_id] = self._next_sequence
+    
+    def _compact(self) -> None:
+        ids, sequence = self.ids[:self.size], self.sequence[:self.size]
+        keep = np.ones(self.size, dtype=bool)
+        # Points of replaced records may sit next to the new ones; check their sequence
+        for position in np.flatnonzero(np.isin(ids, list(self._removed))):
+            if sequence[position] < self._removed[ids[position]]:
+                keep[position] = False
+        count = int(keep.sum())
+        for column in self.COLUMNS:
+            data = getattr(self, column)
+            data[:count] = data[:self.size][keep]
+        self.ids[count:self.size] = None
+        self.size = count
+        self._removed = {}
+    
+    def columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Timestamps and values in time order (views, do not modify)"""
+        if self._removed:
+            self._compact()
+        if not self._sorted:
+            order = np.argsort(self.times[:self.size], kind="stable")
+            for column in self.COLUMNS:
+                data = getattr(self, column)
+                data[:self.size] = data[:self.size][order]
+            self._sorted = True
+        return self.times[:self.size], self.values[:self.size]
+
+
+class TimeSeriesStore:
+    """
+    Columnar time series extracted from health record metadata.
+    
+    Records are added, replaced and removed one at a time; only the series a
+    record contributes to are touched. Reads slice time windows by binary
+    search and aggregate with NumPy/pandas, so charts over years of daily
+    data only process the points in view.
+    """
+    
+    def __init__(self):
+        self._series: Dict[str, _Series] = {}
+        # Series each record has points in
+        self._record_series: Dict[str, Tuple[str, ...]] = {}
+    
+    def add_record(self, record: Any) -> None:
+        """Add (or replace) the points of a record"""
+        self.remove_record(record.id)
+        timestamp = record_timestamp(record.date)
+        if timestamp is None:
+            return
+        names = []
+        for name, value in extract_values(record):
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = _Series()
+            series.append(record.id, timestamp, value)
+            names.append(name)
+        self._record_series[record.id] = tuple(dict.fromkeys(names))
+    
+    def add_records(self, records: Iterable[Any]) -> None:
+        for record in records:
+            self.add_record(record)
+    
+    def remove_record(self, record_id: str) -> None:
+        for name in self._record_series.pop(record_id, ()):
+            self._series[name].remove(record_id)
+    
+    def series_names(self) -> Dict[str, int]:
+        """Series with at least one point, and their number of points"""
+        counts = {}
+        for name, series in self._series.items():
+            size = len(series.columns()[0])
+            if size:
+                counts[name] = size
+        return dict(sorted(counts.items()))
+    
+    def span(self, name: str) -> Optional[Tuple[str, str]]:
+        """First and last date (ISO) of a series, None if it has no points"""
+        series = self._series.get(name)
+        if series is None:
+            return None
+        times, _ = series.columns()
+        if not len(times):
+            return None
+        first, last = (datetime.fromtimestamp(int(t), timezone.utc).date().isoformat() for t in (times[0], times[-1]))
+        return first, last
+    
+    def _window(self, name: str, start: Optional[str], end: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+        series = self._series.get(name)
+        if series is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        times, values = series.columns()
+        low = 0 if start is None else np.searchsorted(times, record_timestamp(start), side="left")
+        if end is None:
+            high = len(times)
+        else:
+            # A bare end date includes the whole day
+            end_time = record_timestamp(end) + (86399 if len(end) == 10 else 0)
+            high = np.searchsorted(times, end_time, side="right")
+        return times[low:high], values[low:high]
+    
+    def series(self, name: str, start: Optional[str] = None, end: Optional[str] = None) -> pd.Series:
+        """Raw points of a series between two ISO dates (inclusive), indexed by time"""
+        times, values = self._window(name, start, end)
+        return pd.Series(values.copy(), index=pd.to_datetime(times, unit="s"), name=name)
+    
+    def aggregate(self, name: str, freq: str = "W", how: str = "mean", start: Optional[str] = None, end: Optional[str] = None) -> pd.Series:
+        """
+        Series aggregated per calendar window.
+        
+        Args:
+            name: Series name
+            freq: pandas offset alias ("D", "W", "MS", "QS", "YS")
+            how: Aggregation ("mean", "sum", "count", "min", "max", "median")
+            start: First date (ISO), optional
+            end: Last date (ISO), optional
+        """
+        return self.series(name, start, end).resample(freq).agg(how)
+    
+    def rolling(self, name: str, window: str = "30D", how: str = "mean", start: Optional[str] = None, end: Optional[str] = None) -> pd.Series:
+        """Trailing time-window aggregate at each point (e.g. 30-day average)"""
+        return getattr(self.series(name, start, end).rolling(window), how)()
+    
+    def downsample(self, name: str, max_points: int = 500, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+        """
+        At most `max_points` equal-time buckets for plotting.
+        
+        Each bucket keeps the mean, min and max of its points (so spikes stay
+        visible), indexed by the time of its first point. Series that already
+        fit are returned point by point.
+        """
+        times, values = self._window(name, start, end)
+        if len(times) <= max_points:
+            frame = pd.DataFrame({"mean": values, "min": values, "max": values})
+            frame.index = pd.to_datetime(times, unit="s")
+            return frame
+        
+        span = int(times[-1] - times[0]) + 1
+        buckets = (times - times[0]) * max_points // span
+        # Times are sorted, so each bucket is a contiguous run of points
+        starts = np.flatnonzero(np.r_[True, np.diff(buckets) != 0])
+        counts = np.diff(np.r_[starts, len(values)])
+        frame = pd.DataFrame({
+            "mean": np.add.reduceat(values, starts) / counts,
+            "min": np.minimum.reduceat(values, starts),
+            "max": np.maximum.reduceat(values, starts),
+        })
+        frame.index = pd.to_datetime(times[starts], unit="s")
+        return frame
+    
+    def __len__(self) -> int:
+        return len(self._record_series)
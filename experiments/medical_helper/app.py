@@ -1,14 +1,19 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, date
+import math
 import os
+import shutil
+import tempfile
 from pathlib import Path
 
 # Import our custom modules
-from models import HealthRecord, FileAttachment, HealthRecordManager, Condition
+from models import HealthRecord, HealthRecordManager, Condition
+from bulk_io import import_file, export_jsonl, export_zip
+from encryption import DecryptionError, encryption_enabled
 from utils import (
-    generate_id, get_current_timestamp, format_date, format_date_only, save_uploaded_file,
-    get_file_size, get_file_type, format_file_size, parse_tags, tags_to_string,
+    generate_id, get_current_timestamp, format_date, format_date_only,
+    get_file_size, format_file_size, parse_tags, tags_to_string,
     display_category_badge, display_condition_status_badge, display_severity_badge,
     display_linked_badge, display_unlinked_badge, get_record_type_info,
     format_condition_name, get_condition_categories, truncate_text, ensure_upload_directory
@@ -21,9 +26,37 @@ st.set_page_config(
     layout="wide"
 )
 
+DATA_DIR = "health_data"
+
 # Initialize session state
 if 'health_manager' not in st.session_state:
-    st.session_state.health_manager = HealthRecordManager()
+    if encryption_enabled(DATA_DIR) or os.environ.get("MEDICAL_HELPER_ENCRYPT") == "1":
+        # Encrypted data: the key is derived from the passphrase once per session
+        creating = not encryption_enabled(DATA_DIR)
+        st.title("🔒 Medical Helper")
+        with st.form("unlock"):
+            if creating:
+                st.info("Your health data will be encrypted. Choose a passphrase: it cannot be recovered if lost.")
+            passphrase = st.text_input("Passphrase", type="password")
+            confirmation = st.text_input("Repeat passphrase", type="password") if creating else passphrase
+            unlocked = st.form_submit_button("Encrypt my data" if creating else "Unlock")
+        if unlocked:
+            if not passphrase:
+                st.error("Please enter a passphrase")
+            elif passphrase != confirmation:
+                st.error("The passphrases do not match")
+            else:
+                try:
+                    with st.spinner("Unlocking..."):
+                        st.session_state.health_manager = HealthRecordManager(DATA_DIR, passphrase=passphrase)
+                except DecryptionError:
+                    st.error("Wrong passphrase")
+                except RuntimeError as e:
+                    st.error(str(e))
+                else:
+                    st.rerun()
+        st.stop()
+    st.session_state.health_manager = HealthRecordManager(DATA_DIR)
 
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "Dashboard"
@@ -34,6 +67,68 @@ if 'editing_record' not in st.session_state:
 if 'editing_condition' not in st.session_state:
     st.session_state.editing_condition = None
 
+RECORDS_PER_PAGE = 20
+
+# Points drawn per trend chart at "Auto" resolution
+TREND_MAX_POINTS = 500
+
+TREND_RESOLUTIONS = {
+    "Auto": None,
+    "Daily": "D",
+    "Weekly": "W",
+    "Monthly": "MS",
+    "Yearly": "YS",
+}
+
+SORT_OPTIONS = {
+    "Date (newest first)": ("date", True),
+    "Date (oldest first)": ("date", False),
+    "Title": ("title", False),
+    "Category": ("category", False),
+}
+
+# Cached views: keyed on the manager instance and its data version, so any change
+# to the data invalidates them while plain reruns reuse them
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_summary(_manager, instance_id: str, version: int):
+    return _manager.get_summary()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def cached_records_page(_manager, instance_id: str, version: int, page: int, page_size: int,
+                        sort: str, descending: bool, category: str = None, unlinked: bool = False):
+    return _manager.get_records_page(page, page_size, sort, descending, category=category, unlinked=unlinked)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_trend(_manager, instance_id: str, version: int, name: str, resolution: str,
+                 start: str = None, end: str = None):
+    analytics = _manager.get_analytics()
+    if resolution == "Auto":
+        return analytics.downsample(name, TREND_MAX_POINTS, start, end)
+    # Counts add up per window, measurements are averaged
+    how = "sum" if name.startswith("records.") else "mean"
+    return analytics.aggregate(name, TREND_RESOLUTIONS[resolution], how, start, end).dropna().to_frame(how)
+
+def get_summary(manager):
+    """Record and condition counts for the current data version"""
+    return cached_summary(manager, manager.instance_id, manager.version)
+
+def get_records_page(manager, page: int, sort: str = "date", descending: bool = True,
+                     category: str = None, unlinked: bool = False, page_size: int = RECORDS_PER_PAGE):
+    """One page of sorted records and the total count, for the current data version"""
+    return cached_records_page(manager, manager.instance_id, manager.version, page, page_size,
+                               sort, descending, category, unlinked)
+
+def page_selector(total: int, key: str, page_size: int = RECORDS_PER_PAGE) -> int:
+    """Page picker for a list of `total` items, returns the 0-based page"""
+    pages = max(1, math.ceil(total / page_size))
+    if pages == 1:
+        return 0
+    # Keep the selected page valid when the list shrinks
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = pages
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key=key)
+    return int(page) - 1
+
 # Main app
 def main():
     st.title("🏥 Medical Helper - Personal Health Tracker")
@@ -48,7 +143,7 @@ def main():
             st.session_state.current_page = st.session_state.force_page
             del st.session_state.force_page
         
-        pages = ["Dashboard", "My Conditions", "Add New Record", "View All Records", "Search Records", "Unlinked Records"]
+        pages = ["Dashboard", "My Conditions", "Add New Record", "View All Records", "Search Records", "Unlinked Records", "Health Trends", "Import / Export"]
         
         # Get current page index
         try:
@@ -56,7 +151,7 @@ def main():
         except ValueError:
             default_index = 0
             st.session_state.current_page = "Dashboard"
-            
+        
         page = st.radio(
             "Choose a page:",
             pages,
@@ -70,9 +165,10 @@ def main():
         # Show some statistics
         st.markdown("### 📊 Quick Stats")
         manager = st.session_state.health_manager
-        total_records = len(manager.get_all_records())
-        total_conditions = len(manager.get_all_conditions())
-        unlinked_records = len(manager.get_unlinked_records())
+        summary = get_summary(manager)
+        total_records = summary["records"]
+        total_conditions = summary["conditions"]
+        unlinked_records = summary["unlinked"]
         
         col1, col2 = st.columns(2)
         with col1:
@@ -84,9 +180,7 @@ def main():
         
         if total_records > 0:
             # Count by category
-            categories = {}
-            for record in manager.get_all_records():
-                categories[record.category] = categories.get(record.category, 0) + 1
+            categories = summary["by_category"]
             
             st.markdown("**By Category:**")
             for category, count in categories.items():
@@ -110,15 +204,20 @@ def main():
         show_search_records()
     elif current_page == "Unlinked Records":
         show_unlinked_records()
+    elif current_page == "Health Trends":
+        show_health_trends()
+    elif current_page == "Import / Export":
+        show_import_export()
 
 def show_dashboard():
     st.header("📊 Dashboard")
     
     manager = st.session_state.health_manager
-    records = manager.get_all_records()
+    summary = get_summary(manager)
+    total_records = summary["records"]
     conditions = manager.get_all_conditions()
     
-    if not records and not conditions:
+    if not total_records and not conditions:
         st.info("Welcome to your Personal Health Tracker!")
         st.markdown("### 🚀 Get Started")
         
@@ -157,14 +256,14 @@ def show_dashboard():
                             st.write(f"**Tags:** {tags_to_string(condition.tags)}")
                         
                         # Show related records
-                        related_records = manager.get_records_by_condition(condition.id)
-                        if related_records:
-                            st.write(f"**Related Records:** {len(related_records)}")
-                            for record in related_records[:3]:  # Show first 3
+                        related_count = summary["by_condition"].get(condition.id, 0)
+                        if related_count:
+                            st.write(f"**Related Records:** {related_count}")
+                            for record in manager.get_records_by_condition(condition.id, limit=3):  # Show first 3
                                 info = get_record_type_info(record.category)
                                 st.write(f"• {info['icon']} {record.title}")
-                            if len(related_records) > 3:
-                                st.write(f"... and {len(related_records) - 3} more")
+                            if related_count > 3:
+                                st.write(f"... and {related_count - 3} more")
                     
                     with col2:
                         if st.button(f"View Details", key=f"view_condition_{condition.id}"):
@@ -175,11 +274,11 @@ def show_dashboard():
             st.info("No active conditions. All conditions are resolved or being monitored.")
     
     # Recent records
-    if records:
+    if total_records:
         st.subheader("📝 Recent Records")
         
-        # Sort by created date (most recent first)
-        recent_records = sorted(records, key=lambda x: x.created_at, reverse=True)[:5]
+        # Most recent first
+        recent_records, _ = get_records_page(manager, 0, sort="created", page_size=5)
         
         for record in recent_records:
             with st.expander(f"{record.title} - {format_date(record.created_at)}"):
@@ -220,7 +319,7 @@ def show_dashboard():
             st.rerun()
     
     with col3:
-        unlinked_count = len(manager.get_unlinked_records())
+        unlinked_count = summary["unlinked"]
         if unlinked_count > 0:
             if st.button(f"Link Records ({unlinked_count})", use_container_width=True):
                 st.session_state.current_page = "Unlinked Records"
@@ -319,26 +418,21 @@ def show_unlinked_records():
     st.info("These records are not linked to any condition. Link them to organize your health data better!")
     
     manager = st.session_state.health_manager
-    unlinked_records = manager.get_unlinked_records()
+    summary = get_summary(manager)
     conditions = manager.get_all_conditions()
     
-    if not unlinked_records:
+    if not summary["unlinked"]:
         st.success("🎉 All records are linked to conditions!")
         if st.button("Back to Dashboard"):
             st.session_state.current_page = "Dashboard"
             st.rerun()
         return
     
-    # Group unlinked records by category
-    categories = {}
-    for record in unlinked_records:
-        if record.category not in categories:
-            categories[record.category] = []
-        categories[record.category].append(record)
-    
-    # Display by category
-    for category, records in categories.items():
-        with st.expander(f"{get_record_type_info(category)['icon']} {category.title()} ({len(records)} records)"):
+    # Display by category, one page at a time
+    for category, count in summary["unlinked_by_category"].items():
+        with st.expander(f"{get_record_type_info(category)['icon']} {category.title()} ({count} records)"):
+            page = page_selector(count, key=f"unlinked_page_{category}")
+            records, _ = get_records_page(manager, page, category=category, unlinked=True)
             for record in records:
                 col1, col2 = st.columns([3, 1])
                 
@@ -373,6 +467,133 @@ def show_unlinked_records():
                             st.session_state.current_page = "My Conditions"
                             st.rerun()
 
+def format_series_name(name: str) -> str:
+    """Readable label of a time series ("daily_note.sleep_quality" -> "Daily Note: Sleep Quality")"""
+    category, _, field = name.partition(".")
+    if category == "records":
+        return f"{field.replace('_', ' ').title()}: Number of Records"
+    return f"{category.replace('_', ' ').title()}: {field.replace('_', ' ').title()}"
+
+def show_health_trends():
+    st.header("📈 Health Trends")
+    st.markdown("Numeric values from your records over time: measurements, dosages, mood, sleep and more.")
+    
+    manager = st.session_state.health_manager
+    analytics = manager.get_analytics()
+    series_names = analytics.series_names()
+    
+    if not series_names:
+        st.info("No numeric values found yet. Add daily notes, test results or medications to see trends!")
+        return
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        name = st.selectbox(
+            "Value:",
+            options=list(series_names),
+            format_func=lambda x: f"{format_series_name(x)} ({series_names[x]} entries)"
+        )
+    with col2:
+        resolution = st.selectbox("Resolution:", list(TREND_RESOLUTIONS))
+    
+    first, last = analytics.span(name)
+    date_range = st.date_input(
+        "Period:",
+        value=(date.fromisoformat(first), date.fromisoformat(last)),
+        min_value=date.fromisoformat(first),
+        max_value=date.fromisoformat(last)
+    )
+    # The range is incomplete while the user is picking it
+    if not isinstance(date_range, (tuple, list)) or len(date_range) != 2:
+        return
+    start, end = (d.isoformat() for d in date_range)
+    
+    trend = cached_trend(manager, manager.instance_id, manager.version, name, resolution, start, end)
+    if trend.empty:
+        st.info("No values in this period.")
+        return
+    
+    values = trend.iloc[:, 0]
+    lowest = trend["min"] if "min" in trend else values
+    highest = trend["max"] if "max" in trend else values
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Latest", f"{values.iloc[-1]:g}")
+    with col2:
+        st.metric("Average", f"{values.mean():.2f}")
+    with col3:
+        st.metric("Lowest", f"{lowest.min():g}")
+    with col4:
+        st.metric("Highest", f"{highest.max():g}")
+    
+    st.line_chart(trend)
+    if resolution == "Auto" and len(trend) < series_names[name]:
+        st.caption(f"Each point summarizes a period: mean, lowest and highest value ({len(trend)} points shown).")
+
+def show_import_export():
+    st.header("🔄 Import / Export")
+    
+    manager = st.session_state.health_manager
+    
+    st.markdown("### 📥 Import")
+    st.markdown(
+        "Import a history from other apps: **CSV** (one record per row with category, title and date columns; "
+        "other columns are kept as details), **FHIR** bundles (`.json`) or bulk data files (`.ndjson`), "
+        "or a **JSONL/ZIP** export of this app (ZIP exports include attachments)."
+    )
+    uploaded_file = st.file_uploader("Choose a file to import", type=['csv', 'jsonl', 'json', 'ndjson', 'zip'])
+    
+    if uploaded_file is not None and st.button("Import", type="primary"):
+        # The importer reads from disk (ZIP attachments are copied in parallel)
+        suffix = Path(uploaded_file.name).suffix
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+            shutil.copyfileobj(uploaded_file, f)
+            temp_path = f.name
+        try:
+            with st.spinner("Importing..."):
+                report = import_file(manager, temp_path)
+        except Exception as e:
+            st.error(f"Import failed: {e}")
+            report = None
+        finally:
+            os.remove(temp_path)
+        
+        if report is not None:
+            st.success(f"Imported {report.records} records, {report.conditions} conditions "
+                       f"and {report.attachments} files.")
+            if report.skipped:
+                st.info(f"Skipped {report.skipped} items of unsupported types.")
+            if report.errors:
+                st.warning(f"{len(report.errors)} items could not be imported:")
+                with st.expander("Show details"):
+                    for error in report.errors[:200]:
+                        st.write(f"- {error}")
+                    if len(report.errors) > 200:
+                        st.write(f"... and {len(report.errors) - 200} more")
+    
+    st.markdown("---")
+    st.markdown("### 📤 Export")
+    st.markdown("Download all your conditions and records, as JSONL or as a ZIP archive with the attached files.")
+    
+    col1, col2 = st.columns(2)
+    export_dir = os.path.join(manager.data_dir, "exports")
+    for column, label, extension, export in ((col1, "JSONL", "jsonl", export_jsonl), (col2, "ZIP with attachments", "zip", export_zip)):
+        with column:
+            if st.button(f"Prepare {label} export"):
+                os.makedirs(export_dir, exist_ok=True)
+                path = os.path.join(export_dir, f"medical_helper_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}")
+                with st.spinner("Exporting..."):
+                    export(manager, path)
+                # Keep only the latest export of each kind
+                previous = st.session_state.get(f"export_{extension}")
+                if previous and os.path.exists(previous):
+                    os.remove(previous)
+                st.session_state[f"export_{extension}"] = path
+            path = st.session_state.get(f"export_{extension}")
+            if path and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    st.download_button(f"Download {os.path.basename(path)}", f, file_name=os.path.basename(path))
+
 def show_record_type_selection():
     st.markdown("### What would you like to track today?")
     st.markdown("Choose the type of health information you want to add:")
@@ -509,23 +730,16 @@ def show_medication_form():
             if uploaded_files:
                 ensure_upload_directory()
                 for uploaded_file in uploaded_files:
-                    file_path = save_uploaded_file(uploaded_file)
-                    if file_path:
-                        attachment_paths.append(file_path)
-                        
-                        # Create file attachment record
-                        file_attachment = FileAttachment(
-                            id=generate_id(),
-                            filename=Path(file_path).name,
-                            original_name=uploaded_file.name,
-                            file_path=file_path,
-                            file_type=get_file_type(uploaded_file.name),
-                            size=get_file_size(file_path),
-                            uploaded_at=get_current_timestamp(),
-                            description=f"Attachment for {medication_name}",
-                            tags=parse_tags(tags_input)
-                        )
-                        st.session_state.health_manager.add_attachment(file_attachment)
+                    # Stored once per content; re-uploading a file reuses its attachment
+                    file_attachment = st.session_state.health_manager.save_upload(
+                        uploaded_file,
+                        description=f"Attachment for {medication_name}",
+                        tags=parse_tags(tags_input)
+                    )
+                    if file_attachment:
+                        attachment_paths.append(file_attachment.file_path)
+                    else:
+                        st.error(f"Error saving file: {uploaded_file.name}")
             
             # Create health record
             full_description = f"Reason: {reason}"
@@ -623,22 +837,16 @@ def show_symptoms_form():
             if uploaded_files:
                 ensure_upload_directory()
                 for uploaded_file in uploaded_files:
-                    file_path = save_uploaded_file(uploaded_file)
-                    if file_path:
-                        attachment_paths.append(file_path)
-                        
-                        file_attachment = FileAttachment(
-                            id=generate_id(),
-                            filename=Path(file_path).name,
-                            original_name=uploaded_file.name,
-                            file_path=file_path,
-                            file_type=get_file_type(uploaded_file.name),
-                            size=get_file_size(file_path),
-                            uploaded_at=get_current_timestamp(),
-                            description=f"Attachment for {symptom_name}",
-                            tags=parse_tags(tags_input)
-                        )
-                        st.session_state.health_manager.add_attachment(file_attachment)
+                    # Stored once per content; re-uploading a file reuses its attachment
+                    file_attachment = st.session_state.health_manager.save_upload(
+                        uploaded_file,
+                        description=f"Attachment for {symptom_name}",
+                        tags=parse_tags(tags_input)
+                    )
+                    if file_attachment:
+                        attachment_paths.append(file_attachment.file_path)
+                    else:
+                        st.error(f"Error saving file: {uploaded_file.name}")
             
             # Create health record
             full_description = f"Description: {description}"
@@ -717,22 +925,16 @@ def show_analysis_form():
             if uploaded_files:
                 ensure_upload_directory()
                 for uploaded_file in uploaded_files:
-                    file_path = save_uploaded_file(uploaded_file)
-                    if file_path:
-                        attachment_paths.append(file_path)
-                        
-                        file_attachment = FileAttachment(
-                            id=generate_id(),
-                            filename=Path(file_path).name,
-                            original_name=uploaded_file.name,
-                            file_path=file_path,
-                            file_type=get_file_type(uploaded_file.name),
-                            size=get_file_size(file_path),
-                            uploaded_at=get_current_timestamp(),
-                            description=f"Attachment for {test_name}",
-                            tags=parse_tags(tags_input)
-                        )
-                        st.session_state.health_manager.add_attachment(file_attachment)
+                    # Stored once per content; re-uploading a file reuses its attachment
+                    file_attachment = st.session_state.health_manager.save_upload(
+                        uploaded_file,
+                        description=f"Attachment for {test_name}",
+                        tags=parse_tags(tags_input)
+                    )
+                    if file_attachment:
+                        attachment_paths.append(file_attachment.file_path)
+                    else:
+                        st.error(f"Error saving file: {uploaded_file.name}")
             
             # Create health record
             full_description = f"Results: {results}"
@@ -813,22 +1015,16 @@ def show_appointment_form():
             if uploaded_files:
                 ensure_upload_directory()
                 for uploaded_file in uploaded_files:
-                    file_path = save_uploaded_file(uploaded_file)
-                    if file_path:
-                        attachment_paths.append(file_path)
-                        
-                        file_attachment = FileAttachment(
-                            id=generate_id(),
-                            filename=Path(file_path).name,
-                            original_name=uploaded_file.name,
-                            file_path=file_path,
-                            file_type=get_file_type(uploaded_file.name),
-                            size=get_file_size(file_path),
-                            uploaded_at=get_current_timestamp(),
-                            description=f"Attachment for appointment with {doctor_name}",
-                            tags=parse_tags(tags_input)
-                        )
-                        st.session_state.health_manager.add_attachment(file_attachment)
+                    # Stored once per content; re-uploading a file reuses its attachment
+                    file_attachment = st.session_state.health_manager.save_upload(
+                        uploaded_file,
+                        description=f"Attachment for appointment with {doctor_name}",
+                        tags=parse_tags(tags_input)
+                    )
+                    if file_attachment:
+                        attachment_paths.append(file_attachment.file_path)
+                    else:
+                        st.error(f"Error saving file: {uploaded_file.name}")
             
             # Create health record
             full_description = f"Reason: {reason}"
@@ -908,22 +1104,16 @@ def show_daily_note_form():
             if uploaded_files:
                 ensure_upload_directory()
                 for uploaded_file in uploaded_files:
-                    file_path = save_uploaded_file(uploaded_file)
-                    if file_path:
-                        attachment_paths.append(file_path)
-                        
-                        file_attachment = FileAttachment(
-                            id=generate_id(),
-                            filename=Path(file_path).name,
-                            original_name=uploaded_file.name,
-                            file_path=file_path,
-                            file_type=get_file_type(uploaded_file.name),
-                            size=get_file_size(file_path),
-                            uploaded_at=get_current_timestamp(),
-                            description=f"Attachment for daily note",
-                            tags=parse_tags(tags_input)
-                        )
-                        st.session_state.health_manager.add_attachment(file_attachment)
+                    # Stored once per content; re-uploading a file reuses its attachment
+                    file_attachment = st.session_state.health_manager.save_upload(
+                        uploaded_file,
+                        description=f"Attachment for daily note",
+                        tags=parse_tags(tags_input)
+                    )
+                    if file_attachment:
+                        attachment_paths.append(file_attachment.file_path)
+                    else:
+                        st.error(f"Error saving file: {uploaded_file.name}")
             
             metadata = {
                 'mood': mood,
@@ -994,22 +1184,16 @@ def show_treatment_form():
             if uploaded_files:
                 ensure_upload_directory()
                 for uploaded_file in uploaded_files:
-                    file_path = save_uploaded_file(uploaded_file)
-                    if file_path:
-                        attachment_paths.append(file_path)
-                        
-                        file_attachment = FileAttachment(
-                            id=generate_id(),
-                            filename=Path(file_path).name,
-                            original_name=uploaded_file.name,
-                            file_path=file_path,
-                            file_type=get_file_type(uploaded_file.name),
-                            size=get_file_size(file_path),
-                            uploaded_at=get_current_timestamp(),
-                            description=f"Attachment for {treatment_name}",
-                            tags=parse_tags(tags_input)
-                        )
-                        st.session_state.health_manager.add_attachment(file_attachment)
+                    # Stored once per content; re-uploading a file reuses its attachment
+                    file_attachment = st.session_state.health_manager.save_upload(
+                        uploaded_file,
+                        description=f"Attachment for {treatment_name}",
+                        tags=parse_tags(tags_input)
+                    )
+                    if file_attachment:
+                        attachment_paths.append(file_attachment.file_path)
+                    else:
+                        st.error(f"Error saving file: {uploaded_file.name}")
             
             # Create health record
             full_description = f"Description: {description}"
@@ -1051,9 +1235,9 @@ def show_all_records():
     st.header("📋 All Health Records")
     
     manager = st.session_state.health_manager
-    records = manager.get_all_records()
+    total_records = get_summary(manager)["records"]
     
-    if not records:
+    if not total_records:
         st.info("No health records found. Add your first record to get started!")
         return
     
@@ -1062,18 +1246,14 @@ def show_all_records():
     with col1:
         sort_by = st.selectbox(
             "Sort by:",
-            ["Date (newest first)", "Date (oldest first)", "Title", "Category"]
+            list(SORT_OPTIONS.keys())
         )
+    with col2:
+        page = page_selector(total_records, key="all_records_page")
     
-    # Sort records
-    if sort_by == "Date (newest first)":
-        records = sorted(records, key=lambda x: x.date, reverse=True)
-    elif sort_by == "Date (oldest first)":
-        records = sorted(records, key=lambda x: x.date)
-    elif sort_by == "Title":
-        records = sorted(records, key=lambda x: x.title.lower())
-    elif sort_by == "Category":
-        records = sorted(records, key=lambda x: x.category)
+    # Sorted page of records (sorting is cached until the data changes)
+    sort, descending = SORT_OPTIONS[sort_by]
+    records, _ = get_records_page(manager, page, sort=sort, descending=descending)
     
     # Display records
     for record in records:
@@ -1110,8 +1290,16 @@ def show_all_records():
                     st.markdown("**Attachments:**")
                     for attachment_path in record.attachments:
                         if os.path.exists(attachment_path):
-                            file_size = format_file_size(get_file_size(attachment_path))
-                            st.write(f"📎 {Path(attachment_path).name} ({file_size})")
+                            attachment = manager.get_attachment_by_path(attachment_path)
+                            # Stored size differs from the file size for encrypted files
+                            file_size = format_file_size(attachment.size if attachment else get_file_size(attachment_path))
+                            name = attachment.original_name if attachment else Path(attachment_path).name
+                            # Cached thumbnail only: the full file is never loaded to render the page
+                            preview = manager.get_attachment_preview(attachment_path)
+                            if preview:
+                                st.image(preview, caption=f"{name} ({file_size})")
+                            else:
+                                st.write(f"📎 {name} ({file_size})")
             
             with col2:
                 if st.button(f"Edit", key=f"edit_all_{record.id}"):
@@ -1137,10 +1325,10 @@ def show_search_records():
     
     with col1:
         search_query = st.text_input(
-            "Search in title and description:",
+            "Search in title, description, tags and notes:",
             placeholder="Enter keywords..."
         )
-        
+    
     with col2:
         category_filter = st.selectbox(
             "Filter by category:",
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, Optional, Tuple
+
+from encryption import STREAM_MAGIC, shred_file
+
+# Bytes read and hashed per step while storing a file (memory use is bounded by this)
+CHUNK_SIZE = 1024 * 1024
+
+# Directory levels (two hex characters each) blobs are sharded into
+SHARD_LEVELS = 2
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff']
+DOCUMENT_EXTENSIONS = ['.pdf', '.doc', '.docx', '.txt', '.rtf']
+
+
+def get_file_type(filename: str) -> str:
+    """Determine file type based on extension"""
+    extension = Path(filename).suffix.lower()
+    
+    if extension in IMAGE_EXTENSIONS:
+        return 'image'
+    elif extension in DOCUMENT_EXTENSIONS:
+        return 'document'
+    else:
+        return 'other'
+
+
+class AttachmentStore:
+    """
+    Content-addressed file store for attachments.
+    
+    Files are stored once per content under their SHA-256, sharded as
+    <root>/ab/cd/<sha256><ext>, so the same file uploaded several times
+    takes the space of one. Writes are streamed in chunks through a temporary
+    file and an atomic rename; a blob path never holds partial content.
+    
+    With a cipher (encryption.DataCipher) blobs are encrypted in chunks as
+    they are written and named by a keyed digest; read blobs back through
+    iter_chunks / read_bytes.
+    """
+    
+    def __init__(self, root: str, chunk_size: int = CHUNK_SIZE, cipher: Any = None):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.cipher = cipher
+        self.temp_dir = os.path.join(root, ".tmp")
+        os.makedirs(self.temp_dir, exist_ok=True)
+    
+    def _shard_dir(self, digest: str) -> str:
+        parts = [digest[2 * level:2 * level + 2] for level in range(SHARD_LEVELS)]
+        return os.path.join(self.root, *parts)
+    
+    def blob_path(self, digest: str, extension: str = "") -> str:
+        """Path of the blob for a digest (extension kept for viewers that need it)"""
+        return os.path.join(self._shard_dir(digest), f"{digest}{extension.lower()}")
+    
+    def find(self, digest: str) -> Optional[str]:
+        """Path of the stored blob with this digest, if any"""
+        shard = self._shard_dir(digest)
+        if not os.path.isdir(shard):
+            return None
+        for name in os.listdir(shard):
+            if name.startswith(digest):
+                return os.path.join(shard, name)
+        return None
+    
+    def put(self, source: BinaryIO, filename: str = "") -> Tuple[str, str, int, bool]:
+        """
+        Store the content of a binary file object.
+        
+        The content is copied chunk by chunk into a temporary file while it is
+        hashed, then moved into place unless a blob with the same digest exists.
+        
+        Args:
+            source: Readable binary file object (read from its start if seekable)
+            filename: Original file name, used for the blob extension
+        
+        Returns:
+            Digest, blob path, size in bytes, and whether a new blob was created
+        """
+        if hasattr(source, "seek"):
+            try:
+                source.seek(0)
+            except (OSError, ValueError):
+                pass
+        
+        digest = self.cipher.content_hasher() if self.cipher else hashlib.sha256()
+        size = 0
+        
+        def read_chunks() -> Iterator[bytes]:
+            nonlocal size
+            while True:
+                chunk = source.read(self.chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                yield chunk
+        
+        fd, temp_path = tempfile.mkstemp(dir=self.temp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if self.cipher:
+                    self.cipher.encrypt_stream(read_chunks(), f)
+                else:
+                    for chunk in read_chunks():
+                        f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            
+            hex_digest = digest.hexdigest()
+            existing = self.find(hex_digest)
+            if existing:
+                os.remove(temp_path)
+                return hex_digest, existing, size, False
+            path = self.blob_path(hex_digest, Path(filename).suffix)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            return hex_digest, path, size, True
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
+    def put_file(self, path: str) -> Tuple[str, str, int, bool]:
+        """Store a file from disk (see put)"""
+        with open(path, "rb") as f:
+            return self.put(f, os.path.basename(path))
+    
+    def iter_chunks(self, path: str) -> Iterator[bytes]:
+        """Content of a stored file in chunks (decrypted if it is encrypted)"""
+        with open(path, "rb") as f:
+            if self.cipher and f.read(len(STREAM_MAGIC)) == STREAM_MAGIC:
+                f.seek(0)
+                yield from self.cipher.decrypt_stream(f)
+                return
+            # Plaintext blob (stored before encryption was turned on)
+            f.seek(0)
+            yield from iter(lambda: f.read(self.chunk_size), b"")
+    
+    def read_bytes(self, path: str) -> bytes:
+        """Whole content of a stored file (decrypted if it is encrypted)"""
+        return b"".join(self.iter_chunks(path))
+    
+    def contains(self, path: str) -> bool:
+        """Whether a path lies inside the store directory"""
+        root = os.path.abspath(self.root)
+        return os.path.commonpath([root, os.path.abspath(path)]) == root
+    
+    def remove(self, path: str, shred: bool = False) -> bool:
+        """Delete a stored file (paths outside the store are left alone), overwriting it first if `shred`"""
+        if not self.contains(path) or not os.path.isfile(path):
+            return False
+        if shred:
+            shred_file(path)
+        else:
+            os.remove(path)
+        # Drop shard directories left empty
+        directory = os.path.dirname(os.path.abspath(path))
+        while directory != os.path.abspath(self.root):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+        return True
+    
+    def iter_files(self) -> Iterator[str]:
+        """Paths of all files in the store (content-addressed and legacy uploads)"""
+        for directory, subdirectories, files in os.walk(self.root):
+            # Skip internal directories (.tmp, .previews)
+            subdirectories[:] = [d for d in subdirectories if not d.startswith(".")]
+            for name in files:
+                yield os.path.join(directory, name)
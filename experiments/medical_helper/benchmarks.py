@@ -0,0 +1,569 @@
+import argparse
+import csv
+import itertools
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from attachment_store import AttachmentStore
+from models import HealthRecord, HealthRecordManager
+from previews import PreviewCache
+from search_index import SearchIndex
+from storage import JournalStorageBackend, create_storage
+
+CATEGORIES = ["medication", "treatment", "diagnosis", "daily_note", "appointment", "symptoms", "analysis"]
+
+
+def make_record(index: int) -> HealthRecord:
+    """Synthetic health record with a realistic amount of text"""
+    now = datetime.now().isoformat()
+    return HealthRecord(
+        id=str(uuid.uuid4()),
+        category=CATEGORIES[index % len(CATEGORIES)],
+        title=f"Record {index}",
+        description=f"Synthetic description for record {index}. " * 4,
+        date=f"2024-{index % 12 + 1:02d}-{index % 28 + 1:02d}",
+        tags=[f"tag{index % 10}"],
+        metadata={"index": index, "notes": "benchmark"},
+        attachments=[],
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def bench_storage_writes(backend: str, sizes: List[int], samples: int = 50) -> List[Dict[str, float]]:
+    """
+    Median add_record / update_record latency at growing record counts.
+    
+    The store is filled in one bulk transaction up to each size, then
+    `samples` single-record writes are timed through the manager.
+    """
+    results = []
+    data_dir = tempfile.mkdtemp(prefix=f"medical_helper_{backend}_")
+    try:
+        manager = HealthRecordManager(data_dir, storage=create_storage(data_dir, backend))
+        for size in sizes:
+            missing = [make_record(len(manager.records) + i) for i in range(size - len(manager.records))]
+            with manager.storage.transaction():
+                manager.storage.put('records', [record.to_dict() for record in missing])
+            manager.load_data()
+            
+            add_times = []
+            for i in range(samples):
+                record = make_record(size + i)
+                started = time.perf_counter()
+                manager.add_record(record)
+                add_times.append(time.perf_counter() - started)
+            
+            update_times = []
+            for record in manager.get_all_records()[-samples:]:
+                record.description += " updated"
+                started = time.perf_counter()
+                manager.update_record(record.id, record)
+                update_times.append(time.perf_counter() - started)
+            
+            results.append({
+                "backend": backend,
+                "records": len(manager.records),
+                "add_ms": statistics.median(add_times) * 1000,
+                "update_ms": statistics.median(update_times) * 1000,
+            })
+        manager.storage.close()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def bench_journal_replay(records: int, updates: int = 0, batch: int = 1) -> Dict[str, float]:
+    """
+    Startup time of the journal backend with every record still in the journal.
+    
+    Appends `records` new records (plus `updates` rewrites of existing ones),
+    `batch` per journal entry, then times a cold load_all replaying the whole
+    journal, a compaction, and a load from the compacted snapshot.
+    """
+    data_dir = tempfile.mkdtemp(prefix="medical_helper_journal_")
+    try:
+        storage = JournalStorageBackend(data_dir, compact_after=records + updates + 1, fsync=False)
+        storage.load_all()
+        items = [make_record(i).to_dict() for i in range(records)]
+        entries = (records + batch - 1) // batch + updates
+        started = time.perf_counter()
+        for i in range(0, records, batch):
+            storage.put('records', items[i:i + batch])
+        for i in range(updates):
+            item = dict(items[i % records], description="updated")
+            storage.put('records', [item])
+        append_seconds = time.perf_counter() - started
+        storage.close()
+        journal_bytes = os.path.getsize(storage.journal_path)
+        
+        started = time.perf_counter()
+        storage = JournalStorageBackend(data_dir, compact_after=records + updates + 1)
+        loaded = storage.load_all()
+        replay_seconds = time.perf_counter() - started
+        assert len(loaded['records']) == records
+        
+        started = time.perf_counter()
+        storage.compact()
+        compact_seconds = time.perf_counter() - started
+        storage.close()
+        
+        started = time.perf_counter()
+        JournalStorageBackend(data_dir).load_all()
+        snapshot_seconds = time.perf_counter() - started
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return {
+        "records": records,
+        "entries": entries,
+        "journal_mb": journal_bytes / 1e6,
+        "append_us": append_seconds / entries * 1e6,
+        "replay_s": replay_seconds,
+        "compact_s": compact_seconds,
+        "snapshot_load_s": snapshot_seconds,
+    }
+
+
+MEDICAL_WORDS = [
+    "blood", "pressure", "glucose", "insulin", "metformin", "dose", "tablet", "morning", "evening", "headache",
+    "migraine", "fatigue", "nausea", "fever", "cough", "allergy", "asthma", "inhaler", "cholesterol", "statin",
+    "cardiology", "checkup", "visit", "doctor", "nurse", "therapy", "physiotherapy", "knee", "shoulder", "back",
+    "pain", "mild", "severe", "chronic", "acute", "diabetes", "hypertension", "thyroid", "vitamin", "deficiency",
+    "ferritin", "hemoglobin", "analysis", "results", "normal", "elevated", "reduced", "follow", "scan", "mri",
+    "xray", "ultrasound", "prescription", "antibiotic", "amoxicillin", "ibuprofen", "paracetamol", "sleep",
+    "insomnia", "anxiety", "exercise", "walking", "diet", "weight", "heart", "rate", "rhythm", "dizziness",
+]
+
+
+def text_vocabulary(size: int = 5000) -> Tuple[List[str], List[float]]:
+    """
+    Generated words with Zipf-like cumulative weights: 100 stopword-like words
+    first, then the medical words, then a long tail.
+    """
+    head = [f"common{i}" for i in range(100)] + MEDICAL_WORDS
+    words = head + [f"term{i}" for i in range(size - len(head))]
+    return words, list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+
+def make_text_record(index: int, rng: random.Random, vocabulary: Tuple[List[str], List[float]]) -> HealthRecord:
+    """Synthetic record with varied text drawn from a vocabulary"""
+    words, cum_weights = vocabulary
+    record = make_record(index)
+    record.title = " ".join(rng.choices(words, cum_weights=cum_weights, k=4))
+    record.description = " ".join(rng.choices(words, cum_weights=cum_weights, k=40)) + f" note{index}"
+    record.tags = rng.sample(MEDICAL_WORDS, 2)
+    record.metadata = {"doctor": f"dr {rng.choice(MEDICAL_WORDS)}", "index": index}
+    return record
+
+
+def bench_search(records: int, queries: List[str], repeat: int = 20, seed: int = 42) -> Dict[str, Any]:
+    """
+    Full-text index build time and query latency over synthetic records.
+    
+    Returns:
+        Build seconds, incremental update microseconds, and per query the
+        number of matches and median latency (all matches, and top 20)
+    """
+    rng = random.Random(seed)
+    vocabulary = text_vocabulary()
+    items = [make_text_record(i, rng, vocabulary) for i in range(records)]
+    index = SearchIndex()
+    started = time.perf_counter()
+    for record in items:
+        index.add_record(record)
+    build_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    for record in items[:1000]:
+        record.description += " updated"
+        index.add_record(record)
+    update_us = (time.perf_counter() - started) / min(1000, records) * 1e6
+    
+    per_query = {}
+    for query in queries:
+        all_times, top_times = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            matches = index.search(query)
+            all_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            index.search(query, limit=20)
+            top_times.append(time.perf_counter() - started)
+        per_query[query] = {
+            "matches": len(matches),
+            "all_ms": statistics.median(all_times) * 1000,
+            "top20_ms": statistics.median(top_times) * 1000,
+        }
+    return {"records": records, "build_s": build_seconds, "update_us": update_us, "queries": per_query}
+
+
+class SyntheticUpload:
+    """Readable file object producing `size` pseudo-random bytes without holding them"""
+    
+    def __init__(self, size: int, seed: int = 0, name: str = "scan.pdf"):
+        self.size = size
+        self.name = name
+        self._position = 0
+        self._block = random.Random(seed).randbytes(64 * 1024)
+    
+    def seek(self, position: int):
+        self._position = position
+    
+    def read(self, size: int = -1) -> bytes:
+        remaining = self.size - self._position
+        size = remaining if size < 0 else min(size, remaining)
+        if size <= 0:
+            return b""
+        offset = self._position % len(self._block)
+        chunk = (self._block[offset:] + self._block * (size // len(self._block) + 1))[:size]
+        self._position += size
+        return chunk
+
+
+def bench_attachment_upload(megabytes: int, copies: int = 3) -> Dict[str, float]:
+    """
+    Throughput and peak Python memory of streamed uploads into the attachment
+    store; the same content is uploaded `copies` times to show deduplication.
+    """
+    root = tempfile.mkdtemp(prefix="medical_helper_uploads_")
+    try:
+        store = AttachmentStore(root)
+        size = megabytes * 1024 * 1024
+        tracemalloc.start()
+        started = time.perf_counter()
+        created = 0
+        for _ in range(copies):
+            _, _, _, is_new = store.put(SyntheticUpload(size))
+            created += is_new
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stored = sum(os.path.getsize(path) for path in store.iter_files())
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {
+        "file_mb": megabytes,
+        "uploads": copies,
+        "blobs_created": created,
+        "stored_mb": stored / 1024 / 1024,
+        "mb_per_s": megabytes * copies / seconds,
+        "peak_memory_mb": peak / 1024 / 1024,
+    }
+
+
+def bench_previews(images: int, width: int = 3000, height: int = 2000, reruns: int = 5) -> Dict[str, float]:
+    """
+    Bytes and time needed to render a page of image attachments per rerun,
+    from the original files versus from the cached previews.
+    
+    Requires Pillow (to create the test images and the previews).
+    """
+    from PIL import Image
+    
+    root = tempfile.mkdtemp(prefix="medical_helper_previews_")
+    try:
+        store = AttachmentStore(root)
+        cache = PreviewCache(os.path.join(root, ".previews"))
+        rng = random.Random(0)
+        files = []
+        for i in range(images):
+            path = os.path.join(root, f"source{i}.jpg")
+            Image.effect_noise((width, height), 64 + rng.random() * 64).convert("RGB").save(path, quality=90)
+            digest, blob, _, _ = store.put_file(path)
+            os.remove(path)
+            files.append((blob, digest))
+        
+        started = time.perf_counter()
+        for blob, digest in files:
+            cache.submit(blob, digest)
+        cache.wait()
+        generate_seconds = time.perf_counter() - started
+        
+        def render(paths: List[str]) -> int:
+            served = 0
+            for path in paths:
+                with open(path, "rb") as f:
+                    served += len(f.read())
+            return served
+        
+        originals = [blob for blob, _ in files]
+        thumbnails = [cache.get(blob, digest) for blob, digest in files]
+        timings = {}
+        for label, paths in (("original", originals), ("preview", thumbnails)):
+            started = time.perf_counter()
+            for _ in range(reruns):
+                served = render(paths)
+            timings[label] = ((time.perf_counter() - started) / reruns, served)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {
+        "images": images,
+        "generate_s": generate_seconds,
+        "original_page_ms": timings["original"][0] * 1000,
+        "original_page_mb": timings["original"][1] / 1024 / 1024,
+        "preview_page_ms": timings["preview"][0] * 1000,
+        "preview_page_mb": timings["preview"][1] / 1024 / 1024,
+    }
+
+
+def make_daily_note(day: datetime, rng: random.Random) -> HealthRecord:
+    """Synthetic daily note with the numeric fields of the daily note form"""
+    now = datetime.now().isoformat()
+    return HealthRecord(
+        id=str(uuid.uuid4()),
+        category="daily_note",
+        title=f"Daily note {day.date().isoformat()}",
+        description="How the day went",
+        date=day.isoformat(),
+        tags=[],
+        metadata={
+            "mood": rng.choice(["Great", "Good", "Okay", "Poor", "Very Poor"]),
+            "energy_level": rng.choice(["Very High", "High", "Normal", "Low", "Very Low"]),
+            "sleep_quality": rng.choice(["Excellent", "Good", "Fair", "Poor", "Very Poor"]),
+            "exercise": f"{rng.randint(0, 90)} min walk",
+        },
+        attachments=[],
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def bench_analytics(years: int, repeat: int = 20, seed: int = 42) -> Dict[str, float]:
+    """
+    Time series build time, incremental update cost and chart query latency
+    over `years` of daily notes.
+    """
+    # numpy and pandas are only needed for this benchmark
+    from analytics import TimeSeriesStore
+    
+    rng = random.Random(seed)
+    first_day = datetime(2015, 1, 1, 21, 0)
+    items = [make_daily_note(first_day + timedelta(days=day), rng) for day in range(365 * years)]
+    store = TimeSeriesStore()
+    started = time.perf_counter()
+    store.add_records(items)
+    build_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    for record in items[-100:]:
+        record.metadata["mood"] = "Great"
+        store.add_record(record)
+    update_us = (time.perf_counter() - started) / 100 * 1e6
+    
+    queries = {
+        "downsample_ms": lambda: store.downsample("daily_note.mood", 500),
+        "weekly_ms": lambda: store.aggregate("daily_note.sleep_quality", "W"),
+        "monthly_ms": lambda: store.aggregate("daily_note.exercise", "MS"),
+        "rolling_30d_ms": lambda: store.rolling("daily_note.energy_level", "30D"),
+        "last_year_ms": lambda: store.downsample("daily_note.mood", 500, start=items[-365].date[:10]),
+    }
+    result = {"records": len(items), "build_s": build_seconds, "update_us": update_us}
+    for key, query in queries.items():
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            times.append(time.perf_counter() - started)
+        result[key] = statistics.median(times) * 1000
+    return result
+
+
+def bench_bulk_import(records: int, backend: str = "sqlite", files: int = 200, workers: int = 8) -> Dict[str, float]:
+    """
+    Time to import `records` CSV rows (`files` of them with a 256 KB attachment)
+    in one transaction, to export everything as a ZIP, and to reload.
+    """
+    # dateutil is only needed for importing
+    from bulk_io import export_zip, import_file
+    
+    root = tempfile.mkdtemp(prefix="medical_helper_bulk_")
+    try:
+        os.makedirs(os.path.join(root, "scans"))
+        for index in range(files):
+            with open(os.path.join(root, "scans", f"scan{index}.pdf"), "wb") as f:
+                f.write(random.Random(index).randbytes(256 * 1024))
+        csv_path = os.path.join(root, "history.csv")
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["category", "title", "date", "description", "tags", "condition", "attachments", "dosage"])
+            for index in range(records):
+                writer.writerow([
+                    CATEGORIES[index % len(CATEGORIES)],
+                    f"Record {index}",
+                    f"{2010 + index % 15}-{index % 12 + 1:02d}-{index % 28 + 1:02d}",
+                    f"Synthetic description for record {index}. " * 4,
+                    f"tag{index % 10};imported",
+                    f"Condition {index % 20}",
+                    f"scans/scan{index}.pdf" if index < files else "",
+                    f"{index % 500}mg",
+                ])
+        
+        data_dir = os.path.join(root, "data")
+        os.makedirs(data_dir)
+        manager = HealthRecordManager(data_dir, storage=create_storage(data_dir, backend))
+        started = time.perf_counter()
+        report = import_file(manager, csv_path, workers=workers)
+        import_seconds = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        export_zip(manager, os.path.join(root, "export.zip"))
+        export_seconds = time.perf_counter() - started
+        manager.storage.close()
+        
+        started = time.perf_counter()
+        reloaded = HealthRecordManager(data_dir, storage=create_storage(data_dir, backend))
+        reload_seconds = time.perf_counter() - started
+        reloaded.storage.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {
+        "records": report.records,
+        "attachments": report.attachments,
+        "errors": len(report.errors),
+        "import_s": import_seconds,
+        "export_zip_s": export_seconds,
+        "reload_s": reload_seconds,
+    }
+
+
+def bench_encryption(records: int, megabytes: int = 64, backend: str = "sqlite", samples: int = 200) -> List[Dict[str, float]]:
+    """
+    Cost of encryption at rest: record write latency, full load time and
+    attachment write/read throughput, without and with a passphrase.
+    """
+    results = []
+    for passphrase in (None, "benchmark passphrase"):
+        root = tempfile.mkdtemp(prefix="medical_helper_encryption_")
+        try:
+            started = time.perf_counter()
+            manager = HealthRecordManager(root, storage=create_storage(root, backend), passphrase=passphrase)
+            unlock_seconds = time.perf_counter() - started
+            with manager.storage.transaction():
+                manager.storage.put('records', [make_record(i).to_dict() for i in range(records)])
+            
+            add_times = []
+            for i in range(samples):
+                record = make_record(records + i)
+                started = time.perf_counter()
+                manager.add_record(record)
+                add_times.append(time.perf_counter() - started)
+            manager.storage.close()
+            
+            # A new manager in the same session reuses the unlocked cipher
+            started = time.perf_counter()
+            manager = HealthRecordManager(root, storage=create_storage(root, backend), cipher=manager.cipher)
+            load_seconds = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            attachment = manager.save_upload(SyntheticUpload(megabytes * 1024 * 1024))
+            write_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            for _ in manager.attachment_store.iter_chunks(attachment.file_path):
+                pass
+            read_seconds = time.perf_counter() - started
+            manager.storage.close()
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        results.append({
+            "mode": "encrypted" if passphrase else "plain",
+            "unlock_ms": unlock_seconds * 1000,
+            "add_ms": statistics.median(add_times) * 1000,
+            "load_s": load_seconds,
+            "write_mb_s": megabytes / write_seconds,
+            "read_mb_s": megabytes / read_seconds,
+        })
+    return results
+
+
+def print_results(results: List[Dict[str, float]]):
+    print(f"{'backend':<8} {'records':>9} {'add ms':>9} {'update ms':>10}")
+    for r in results:
+        print(f"{r['backend']:<8} {r['records']:>9} {r['add_ms']:>9.3f} {r['update_ms']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Medical helper storage benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    
+    writes = subparsers.add_parser("writes", help="Single-record write latency vs record count")
+    writes.add_argument("--backend", action="append", dest="backends", help="sqlite, journal and/or json (repeatable)")
+    writes.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated record counts")
+    writes.add_argument("--samples", type=int, default=50, help="Timed writes per size")
+    
+    replay = subparsers.add_parser("replay", help="Journal replay time at startup")
+    replay.add_argument("--records", type=int, default=100000, help="Records in the journal")
+    replay.add_argument("--updates", type=int, default=0, help="Extra journal entries rewriting existing records")
+    replay.add_argument("--batch", type=int, default=1, help="Records per journal entry")
+    
+    search = subparsers.add_parser("search", help="Full-text search latency")
+    search.add_argument("--records", type=int, default=100000, help="Indexed records")
+    search.add_argument("--query", action="append", dest="queries", help="Query to time (repeatable)")
+    
+    upload = subparsers.add_parser("upload", help="Streamed attachment upload memory and dedup")
+    upload.add_argument("--megabytes", type=int, default=512, help="Size of the uploaded file")
+    upload.add_argument("--copies", type=int, default=3, help="Times the same file is uploaded")
+    
+    preview = subparsers.add_parser("previews", help="Page payload with original images vs cached previews")
+    preview.add_argument("--images", type=int, default=50, help="Image attachments on the page")
+    
+    trends = subparsers.add_parser("analytics", help="Time series aggregation latency for trend charts")
+    trends.add_argument("--years", type=int, default=10, help="Years of daily notes")
+    
+    bulk = subparsers.add_parser("bulk", help="Bulk CSV import, ZIP export and reload time")
+    bulk.add_argument("--records", type=int, default=50000, help="Imported records")
+    bulk.add_argument("--backend", default="sqlite", help="sqlite, journal or json")
+    bulk.add_argument("--files", type=int, default=200, help="Records with an attachment")
+    bulk.add_argument("--workers", type=int, default=8, help="Attachment copy threads")
+    
+    encryption = subparsers.add_parser("encryption", help="Overhead of encryption at rest on records and files")
+    encryption.add_argument("--records", type=int, default=50000, help="Stored records")
+    encryption.add_argument("--megabytes", type=int, default=64, help="Size of the attachment")
+    encryption.add_argument("--backend", default="sqlite", help="sqlite, journal or json")
+    
+    args = parser.parse_args()
+    if args.benchmark == "encryption":
+        results = bench_encryption(args.records, args.megabytes, args.backend)
+        print(f"{'mode':<10} {'unlock ms':>10} {'add ms':>8} {'load s':>8} {'write MB/s':>11} {'read MB/s':>10}")
+        for r in results:
+            print(f"{r['mode']:<10} {r['unlock_ms']:>10.1f} {r['add_ms']:>8.3f} {r['load_s']:>8.2f} {r['write_mb_s']:>11.0f} {r['read_mb_s']:>10.0f}")
+    elif args.benchmark == "bulk":
+        for key, value in bench_bulk_import(args.records, args.backend, args.files, args.workers).items():
+            print(f"{key:<14} {value:>10.2f}" if isinstance(value, float) else f"{key:<14} {value:>10}")
+    elif args.benchmark == "analytics":
+        for key, value in bench_analytics(args.years).items():
+            print(f"{key:<16} {value:>10.2f}" if isinstance(value, float) else f"{key:<16} {value:>10}")
+    elif args.benchmark == "previews":
+        for key, value in bench_previews(args.images).items():
+            print(f"{key:<18} {value:>10.2f}" if isinstance(value, float) else f"{key:<18} {value:>10}")
+    elif args.benchmark == "upload":
+        for key, value in bench_attachment_upload(args.megabytes, args.copies).items():
+            print(f"{key:<16} {value:>10.2f}" if isinstance(value, float) else f"{key:<16} {value:>10}")
+    elif args.benchmark == "search":
+        queries = args.queries or ["note4242", "metformin", "insulin morning", "diab", "blood pressure", "cardio", "term123", "common1"]
+        result = bench_search(args.records, queries)
+        print(f"records {result['records']}, build {result['build_s']:.2f} s, update {result['update_us']:.0f} us/record")
+        print(f"{'query':<28} {'matches':>8} {'all ms':>8} {'top20 ms':>9}")
+        for query, r in result["queries"].items():
+            print(f"{query:<28} {r['matches']:>8} {r['all_ms']:>8.2f} {r['top20_ms']:>9.2f}")
+    elif args.benchmark == "replay":
+        result = bench_journal_replay(args.records, args.updates, args.batch)
+        for key, value in result.items():
+            print(f"{key:<16} {value:>12.3f}" if isinstance(value, float) else f"{key:<16} {value:>12}")
+    elif args.benchmark == "writes":
+        sizes = [int(size) for size in args.sizes.split(",")]
+        results = []
+        for backend in args.backends or ["sqlite", "json"]:
+            results.extend(bench_storage_writes(backend, sizes, args.samples))
+        print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,567 @@
+import csv
+import io
+import json
+import os
+import uuid
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from dateutil import parser as date_parser
+
+from models import Condition, HealthRecord, HealthRecordManager
+
+RECORD_CATEGORIES = ("medication", "treatment", "diagnosis", "daily_note", "appointment", "symptoms", "analysis")
+
+CONDITION_STATUSES = ("active", "resolved", "chronic", "monitoring")
+CONDITION_SEVERITIES = ("mild", "moderate", "severe")
+
+# CSV columns mapped to record fields; any other non-empty column goes to metadata
+CSV_RECORD_COLUMNS = ("id", "category", "title", "description", "date", "tags", "attachments",
+                      "condition", "condition_id", "created_at", "updated_at")
+
+# Name of the data file inside exported archives, and the directory of attachment files
+ARCHIVE_DATA_NAME = "data.jsonl"
+ARCHIVE_FILES_DIR = "files"
+
+# FHIR resources imported as records, by resource type
+FHIR_RECORD_CATEGORIES = {
+    "Observation": "analysis",
+    "DiagnosticReport": "analysis",
+    "MedicationStatement": "medication",
+    "MedicationRequest": "medication",
+    "Procedure": "treatment",
+    "Encounter": "appointment",
+    "Appointment": "appointment",
+}
+
+# FHIR clinical statuses mapped to condition statuses
+FHIR_CONDITION_STATUSES = {
+    "active": "active",
+    "recurrence": "active",
+    "relapse": "active",
+    "inactive": "resolved",
+    "remission": "resolved",
+    "resolved": "resolved",
+}
+
+# Namespace for record and condition ids derived from FHIR resource ids (re-imports update instead of duplicating)
+FHIR_ID_NAMESPACE = uuid.UUID("6f7c3c1e-8d0e-4a8e-9a55-2f4e6f0b7a1d")
+
+FORMATS = ("csv", "jsonl", "fhir", "fhir-ndjson", "zip")
+
+
+@dataclass
+class ImportReport:
+    """Outcome of a bulk import"""
+    records: int = 0
+    conditions: int = 0
+    attachments: int = 0  # Files stored (new content only)
+    skipped: int = 0  # Items of unsupported types (e.g. FHIR Patient resources)
+    errors: List[str] = field(default_factory=list)  # Invalid items and missing files, with their location
+
+
+def detect_format(path: str) -> str:
+    """Import format from a file name"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension == ".zip":
+        return "zip"
+    if extension == ".ndjson":
+        return "fhir-ndjson"
+    if extension == ".json":
+        return "fhir"
+    if extension == ".jsonl":
+        return "jsonl"
+    raise ValueError(f"Unsupported import file type: {extension or path}")
+
+
+def _as_list(value: Any, separators: str = ",;") -> List[str]:
+    """List of non-empty strings from a list or a separated string"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        for separator in separators[1:]:
+            value = value.replace(separator, separators[0])
+        value = value.split(separators[0])
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def normalize_date(value: Any) -> Optional[str]:
+    """ISO format of a date or datetime string (None if empty)"""
+    if value is None or str(value).strip() == "":
+        return None
+    text = str(value).strip()
+    try:
+        datetime.fromisoformat(text.replace('Z', '+00:00'))
+        return text
+    except ValueError:
+        pass
+    try:
+        parsed = date_parser.parse(text, dayfirst=True)
+    except (ValueError, OverflowError):
+        raise ValueError(f"invalid date '{text}'")
+    # Keep plain dates as dates
+    return parsed.date().isoformat() if parsed.time() == datetime.min.time() else parsed.isoformat()
+
+
+def record_from_dict(item: Dict[str, Any], now: str) -> HealthRecord:
+    """Validated HealthRecord from an imported item (raises ValueError)"""
+    title = str(item.get("title") or "").strip()
+    if not title:
+        raise ValueError("missing title")
+    category = str(item.get("category") or "").strip().lower().replace(" ", "_")
+    if category not in RECORD_CATEGORIES:
+        raise ValueError(f"unknown category '{category}'")
+    date = normalize_date(item.get("date"))
+    if date is None:
+        raise ValueError("missing date")
+    metadata = item.get("metadata") or {}
+    if not isinstance(metadata, dict):
+        raise ValueError("metadata must be an object")
+    return HealthRecord(
+        id=str(item.get("id") or uuid.uuid4()),
+        category=category,
+        title=title,
+        description=str(item.get("description") or ""),
+        date=date,
+        tags=_as_list(item.get("tags")),
+        metadata=metadata,
+        attachments=_as_list(item.get("attachments"), separators=";"),
+        created_at=item.get("created_at") or now,
+        updated_at=item.get("updated_at") or now,
+        condition_id=item.get("condition_id") or None,
+        related_records=_as_list(item.get("related_records")),
+    )
+
+
+def condition_from_dict(item: Dict[str, Any], now: str) -> Condition:
+    """Validated Condition from an imported item (raises ValueError)"""
+    name = str(item.get("name") or "").strip()
+    if not name:
+        raise ValueError("missing condition name")
+    status = str(item.get("status") or "active").strip().lower()
+    if status not in CONDITION_STATUSES:
+        raise ValueError(f"unknown condition status '{status}'")
+    severity = str(item.get("severity") or "moderate").strip().lower()
+    if severity not in CONDITION_SEVERITIES:
+        raise ValueError(f"unknown condition severity '{severity}'")
+    return Condition(
+        id=str(item.get("id") or uuid.uuid4()),
+        name=name,
+        description=str(item.get("description") or ""),
+        diagnosed_date=normalize_date(item.get("diagnosed_date")),
+        status=status,
+        severity=severity,
+        tags=_as_list(item.get("tags")),
+        created_at=item.get("created_at") or now,
+        updated_at=item.get("updated_at") or now,
+    )
+
+
+# Readers: yield (location, item) pairs, one per line/row/resource, without loading the whole file.
+# Items are dicts with a "type" ("record", "condition", "attachment", "skip" or "invalid").
+
+def read_jsonl(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Items of a JSONL file (one record, or a {"type": ...} item, per line)"""
+    with open(path, "r", encoding="utf-8") as f:
+        yield from _read_json_lines(f)
+
+
+def _read_json_lines(f: TextIO) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            yield f"line {number}", {"type": "invalid", "error": f"invalid JSON ({e})"}
+            continue
+        if not isinstance(item, dict):
+            item = {"type": "invalid", "error": "expected a JSON object"}
+        yield f"line {number}", item
+
+
+def read_csv(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Records from a CSV file with a header row.
+    
+    Known columns (category, title, description, date, tags, attachments,
+    condition name or condition_id, ...) map to record fields; other columns
+    become metadata. Tags are separated by commas or semicolons, attachment
+    paths by semicolons.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            item: Dict[str, Any] = {"type": "record", "metadata": {}}
+            for column, value in row.items():
+                if column is None or value is None or value == "":
+                    continue
+                key = column.strip().lower().replace(" ", "_")
+                if key in CSV_RECORD_COLUMNS:
+                    item[key] = value
+                else:
+                    item["metadata"][key] = value
+            yield f"row {reader.line_num}", item
+
+
+def _fhir_id(resource_type: str, resource_id: Optional[str]) -> str:
+    if not resource_id:
+        return str(uuid.uuid4())
+    return str(uuid.uuid5(FHIR_ID_NAMESPACE, f"{resource_type}/{resource_id}"))
+
+
+def _fhir_text(concept: Optional[Dict[str, Any]]) -> str:
+    """Display text of a CodeableConcept"""
+    if not concept:
+        return ""
+    if concept.get("text"):
+        return concept["text"]
+    for coding in concept.get("coding", []):
+        if coding.get("display") or coding.get("code"):
+            return coding.get("display") or coding["code"]
+    return ""
+
+
+def _fhir_quantity(resource: Dict[str, Any]) -> str:
+    """Value of an Observation (or component) as text, e.g. "110 mg/dL" """
+    if "valueQuantity" in resource:
+        quantity = resource["valueQuantity"]
+        return f"{quantity.get('value', '')} {quantity.get('unit') or quantity.get('code') or ''}".strip()
+    for key in ("valueString", "valueInteger", "valueBoolean"):
+        if key in resource:
+            return str(resource[key])
+    if "valueCodeableConcept" in resource:
+        return _fhir_text(resource["valueCodeableConcept"])
+    return ""
+
+
+def _fhir_condition_ref(resource: Dict[str, Any], full_urls: Dict[str, str]) -> Optional[str]:
+    """Id of the first condition a resource refers to (reasonReference, Encounter.diagnosis)"""
+    references = list(resource.get("reasonReference") or [])
+    references += [diagnosis.get("condition") or {} for diagnosis in resource.get("diagnosis") or []]
+    for reference in references:
+        # Bundles may refer to entries by fullUrl ("urn:uuid:...")
+        target = full_urls.get(reference.get("reference", ""), reference.get("reference", ""))
+        if target.startswith("Condition/"):
+            return _fhir_id("Condition", target.split("/", 1)[1])
+    return None
+
+
+def fhir_resource_to_item(resource: Dict[str, Any], full_urls: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Map a FHIR R4 resource to a condition or record item (type "skip" if unsupported).
+    
+    Args:
+        resource: FHIR resource
+        full_urls: "<type>/<id>" by Bundle entry fullUrl, to resolve references inside a Bundle
+    """
+    resource_type = resource.get("resourceType", "")
+    resource_id = resource.get("id")
+    if resource_type == "Condition":
+        clinical_status = _fhir_text(resource.get("clinicalStatus")).lower()
+        severity = _fhir_text(resource.get("severity")).lower()
+        return {
+            "type": "condition",
+            "id": _fhir_id(resource_type, resource_id),
+            "name": _fhir_text(resource.get("code")),
+            "description": " ".join(note.get("text", "") for note in resource.get("note", [])),
+            "diagnosed_date": resource.get("onsetDateTime") or resource.get("recordedDate"),
+            "status": FHIR_CONDITION_STATUSES.get(clinical_status, "active"),
+            "severity": severity if severity in CONDITION_SEVERITIES else "moderate",
+            "tags": ["fhir"],
+        }
+    
+    category = FHIR_RECORD_CATEGORIES.get(resource_type)
+    if category is None:
+        return {"type": "skip"}
+    
+    metadata: Dict[str, Any] = {"fhir_id": f"{resource_type}/{resource_id}"} if resource_id else {}
+    period = resource.get("effectivePeriod") or resource.get("performedPeriod") or resource.get("period") or {}
+    date = (resource.get("effectiveDateTime") or resource.get("performedDateTime") or resource.get("authoredOn")
+            or resource.get("issued") or resource.get("start") or period.get("start"))
+    if resource_type == "Observation":
+        title = _fhir_text(resource.get("code"))
+        value = _fhir_quantity(resource)
+        # One "name: value unit" line per measurement (as entered in the analysis form)
+        lines = [f"{title}: {value}"] if value else []
+        for component in resource.get("component", []):
+            value = _fhir_quantity(component)
+            if value:
+                lines.append(f"{_fhir_text(component.get('code'))}: {value}")
+        metadata["results"] = "\n".join(lines)
+        ranges = [reference.get("text") or f"{reference.get('low', {}).get('value', '')}-{reference.get('high', {}).get('value', '')}"
+                  for reference in resource.get("referenceRange", [])]
+        if ranges:
+            metadata["reference_values"] = "; ".join(ranges)
+    elif resource_type == "DiagnosticReport":
+        title = _fhir_text(resource.get("code"))
+        metadata["results"] = resource.get("conclusion", "")
+    elif resource_type in ("MedicationStatement", "MedicationRequest"):
+        title = _fhir_text(resource.get("medicationCodeableConcept")) or \
+            resource.get("medicationReference", {}).get("display", "")
+        dosage = (resource.get("dosage") or resource.get("dosageInstruction") or [{}])[0]
+        metadata["dosage"] = dosage.get("text", "")
+        metadata["start_date"] = period.get("start") or date
+        metadata["end_date"] = period.get("end")
+    elif resource_type == "Procedure":
+        title = _fhir_text(resource.get("code"))
+    else:
+        types = resource.get("type") or resource.get("serviceType") or [{}]
+        title = _fhir_text(types[0]) or resource.get("description") or resource_type
+    return {
+        "type": "record",
+        "id": _fhir_id(resource_type, resource_id),
+        "category": category,
+        "title": title,
+        "description": " ".join(note.get("text", "") for note in resource.get("note", [])),
+        "date": date,
+        "tags": ["fhir"],
+        "metadata": {key: value for key, value in metadata.items() if value},
+        "condition_id": _fhir_condition_ref(resource, full_urls or {}),
+    }
+
+
+def read_fhir_bundle(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Items of a FHIR Bundle (or single resource) JSON file.
+    
+    A Bundle is one JSON document whose entries may reference each other in
+    any order, so the whole file is parsed in memory (several times its size
+    on disk). Very large exports should use FHIR bulk data (.ndjson), which
+    is read one resource at a time.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data.get("entry", []) if data.get("resourceType") == "Bundle" else [{"resource": data}]
+    full_urls = {
+        entry["fullUrl"]: f"{entry['resource'].get('resourceType')}/{entry['resource'].get('id')}"
+        for entry in entries if entry.get("fullUrl") and entry.get("resource")
+    }
+    for index in range(len(entries)):
+        # Release each parsed resource once converted, so the bundle and the items are not both held
+        entry, entries[index] = entries[index], None
+        yield f"entry {index + 1}", fhir_resource_to_item(entry.get("resource") or {}, full_urls)
+
+
+def read_fhir_ndjson(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Items of a FHIR bulk data (NDJSON) file, one resource per line"""
+    for location, resource in read_jsonl(path):
+        yield location, resource if resource.get("type") == "invalid" else fhir_resource_to_item(resource)
+
+
+def read_archive(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Items of an archive written by export_zip"""
+    with zipfile.ZipFile(path) as archive, archive.open(ARCHIVE_DATA_NAME) as f:
+        yield from _read_json_lines(io.TextIOWrapper(f, encoding="utf-8"))
+
+
+READERS = {
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+    "fhir": read_fhir_bundle,
+    "fhir-ndjson": read_fhir_ndjson,
+    "zip": read_archive,
+}
+
+
+def _is_within(path: str, directory: str) -> bool:
+    try:
+        return os.path.commonpath([path, directory]) == directory
+    except ValueError:
+        # Different drives (Windows)
+        return False
+
+
+@contextmanager
+def _open_archive_member(path: str, member: str):
+    # Each caller (thread) reads through its own ZipFile
+    with zipfile.ZipFile(path) as archive, archive.open(member) as f:
+        yield f
+
+
+def import_file(manager: HealthRecordManager, path: str, file_format: Optional[str] = None, workers: int = 8) -> ImportReport:
+    """
+    Import records, conditions and attachments from a file in one transaction.
+    
+    The file is read item by item and every item is validated; invalid items
+    are reported and skipped. Attachment files (paths relative to the
+    imported file, or files inside a ZIP export) are copied into the
+    attachment store in parallel before the data is written; absolute paths
+    and paths leading outside the imported file's folder are reported and
+    not copied.
+    
+    Args:
+        manager: Manager to import into
+        path: CSV, JSONL, FHIR Bundle (.json), FHIR NDJSON or ZIP export file
+        file_format: One of FORMATS (detected from the file name if None)
+        workers: Number of attachment files copied at the same time
+    
+    Returns:
+        Counts of imported items and the errors found
+    """
+    file_format = file_format or detect_format(path)
+    if file_format not in READERS:
+        raise ValueError(f"Unsupported import format: {file_format}")
+    report = ImportReport()
+    now = datetime.now().isoformat()
+    
+    conditions: Dict[str, Condition] = {}
+    conditions_by_name = {condition.name.strip().lower(): condition for condition in manager.get_all_conditions()}
+    records: List[Tuple[str, HealthRecord]] = []
+    archive_files: Dict[str, Tuple[str, str]] = {}  # exported file_path -> (archive member, original name)
+    
+    for location, item in READERS[file_format](path):
+        kind = item.get("type", "record")
+        try:
+            if kind == "invalid":
+                raise ValueError(item.get("error", "invalid item"))
+            elif kind == "skip":
+                report.skipped += 1
+            elif kind == "attachment":
+                if item.get("archive_path"):
+                    archive_files[item["file_path"]] = (item["archive_path"], item.get("original_name") or "")
+            elif kind == "condition":
+                condition = condition_from_dict(item, now)
+                conditions[condition.id] = condition
+                conditions_by_name[condition.name.lower()] = condition
+            elif kind == "record":
+                record = record_from_dict(item, now)
+                # CSV rows name their condition; unknown names create it
+                name = str(item.get("condition") or "").strip()
+                if name and not record.condition_id:
+                    condition = conditions_by_name.get(name.lower())
+                    if condition is None:
+                        condition = condition_from_dict({"name": name}, now)
+                        conditions[condition.id] = condition
+                        conditions_by_name[name.lower()] = condition
+                    record.condition_id = condition.id
+                records.append((location, record))
+            else:
+                raise ValueError(f"unknown item type '{kind}'")
+        except (ValueError, TypeError, AttributeError) as e:
+            report.errors.append(f"{location}: {e}")
+    
+    # Links to conditions neither imported nor existing are dropped
+    for location, record in records:
+        if record.condition_id and record.condition_id not in conditions and not manager.get_condition(record.condition_id):
+            report.errors.append(f"{location}: condition {record.condition_id} not found, record imported unlinked")
+            record.condition_id = None
+    
+    # Attachment files to copy, by the path the records refer to them with
+    base_dir = os.path.realpath(os.path.dirname(os.path.abspath(path)))
+    files: Dict[str, Tuple[str, Any]] = {}
+    missing: Dict[str, str] = {}
+    rejected: Dict[str, str] = {}
+    for location, record in records:
+        for file_path in record.attachments:
+            if file_path in files or file_path in missing or manager.get_attachment_by_path(file_path):
+                continue
+            if file_path in archive_files:
+                member, name = archive_files[file_path]
+                files[file_path] = (name or os.path.basename(file_path), lambda member=member: _open_archive_member(path, member))
+                continue
+            # Only files inside the imported file's directory: an import must not read other local files
+            source = os.path.realpath(os.path.join(base_dir, file_path))
+            if os.path.isabs(file_path) or not _is_within(source, base_dir):
+                rejected[file_path] = location
+            elif os.path.isfile(source):
+                files[file_path] = (os.path.basename(source), lambda source=source: open(source, "rb"))
+            else:
+                missing[file_path] = location
+    
+    stored, new_attachments, failed = manager.store_files(files, workers) if files else ({}, [], {})
+    for file_path, location in missing.items():
+        report.errors.append(f"{location}: attachment {file_path} not found")
+    for file_path, location in rejected.items():
+        report.errors.append(f"{location}: attachment {file_path} is outside the folder of the imported file, skipped")
+    for file_path, error in failed.items():
+        report.errors.append(f"attachment {file_path}: {error}")
+    for _, record in records:
+        record.attachments = list(dict.fromkeys(
+            stored[file_path].file_path if file_path in stored else file_path
+            for file_path in record.attachments
+            if file_path in stored or manager.get_attachment_by_path(file_path)
+        ))
+    
+    if records or conditions:
+        if not manager.add_records_bulk([record for _, record in records], conditions.values(), new_attachments):
+            report.errors.append("Could not save the imported data")
+            return report
+    report.records = len(records)
+    report.conditions = len(conditions)
+    report.attachments = len(new_attachments)
+    return report
+
+
+def iter_export_items(manager: HealthRecordManager, archive_paths: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, Any]]:
+    """Conditions, attachments and records as export items (conditions first, so links resolve on import)"""
+    for condition in manager.get_all_conditions():
+        yield {"type": "condition", **condition.to_dict()}
+    for attachment in manager.attachments.values():
+        item = {"type": "attachment", **attachment.to_dict()}
+        if archive_paths and attachment.file_path in archive_paths:
+            item["archive_path"] = archive_paths[attachment.file_path]
+        yield item
+    for record in manager.get_all_records():
+        yield {"type": "record", **record.to_dict()}
+
+
+def _write_items(f: TextIO, items: Iterator[Dict[str, Any]]) -> int:
+    count = 0
+    for item in items:
+        f.write(json.dumps(item, ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def export_jsonl(manager: HealthRecordManager, path: str) -> int:
+    """
+    Write all data to a JSONL file, one item per line (no attachment files).
+    
+    Returns:
+        Number of items written
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        count = _write_items(f, iter_export_items(manager))
+    os.replace(temp_path, path)
+    return count
+
+
+def export_zip(manager: HealthRecordManager, path: str) -> int:
+    """
+    Write all data and attachment files to a ZIP archive importable with import_file.
+    
+    Items are streamed into data.jsonl and files are copied into files/
+    chunk by chunk, so memory use does not grow with the data. The archive
+    is not encrypted.
+    
+    Returns:
+        Number of items written
+    """
+    archive_paths = {}
+    for attachment in manager.attachments.values():
+        if os.path.isfile(attachment.file_path):
+            extension = os.path.splitext(attachment.file_path)[1].lower()
+            archive_paths[attachment.file_path] = f"{ARCHIVE_FILES_DIR}/{attachment.id}{extension}"
+    
+    temp_path = f"{path}.tmp"
+    with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(ARCHIVE_DATA_NAME, "w", force_zip64=True) as f, io.TextIOWrapper(f, encoding="utf-8") as text:
+            count = _write_items(text, iter_export_items(manager, archive_paths))
+        for file_path, member in archive_paths.items():
+            info = zipfile.ZipInfo.from_file(file_path, member)
+            # Images and PDFs are already compressed
+            info.compress_type = zipfile.ZIP_STORED
+            # Files are exported decrypted in encrypted mode
+            with archive.open(info, "w", force_zip64=True) as f:
+                for chunk in manager.attachment_store.iter_chunks(file_path):
+                    f.write(chunk)
+    os.replace(temp_path, path)
+    return count
@@ -0,0 +1,235 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import struct
+from typing import Any, BinaryIO, Iterable, Iterator, Optional
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None
+    InvalidTag = None
+
+# Passphrase-protected data key of an encrypted data directory
+KEY_FILENAME = "encryption.json"
+
+# Written once the data stored before encryption was turned on has been encrypted
+CONVERTED_FILENAME = "encryption.converted"
+
+# scrypt cost (~0.1 s and 32 MiB per derivation), paid once per session
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+KEY_SIZE = 32
+NONCE_SIZE = 12
+TAG_SIZE = 16
+SALT_SIZE = 16
+
+# Plaintext bytes per authenticated chunk of an encrypted file
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Encrypted file layout: magic, chunk size, salt, nonce prefix, then chunks of
+# (ciphertext + tag); nonce = prefix + chunk counter + last-chunk flag
+STREAM_MAGIC = b"MHE1"
+_STREAM_HEADER = struct.Struct(f">4sI{SALT_SIZE}s7s")
+
+
+class DecryptionError(ValueError):
+    """Wrong passphrase, or encrypted data that was modified or truncated"""
+
+
+def _require_cryptography() -> None:
+    if AESGCM is None:
+        raise RuntimeError("Encryption requires the 'cryptography' package (pip install cryptography)")
+
+
+def derive_key(passphrase: str, salt: bytes, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P) -> bytes:
+    """
+    Key-encryption key from a passphrase (scrypt).
+    
+    Deliberately slow: derive it once (open_cipher) and keep the DataCipher
+    for the session rather than the passphrase.
+    """
+    return hashlib.scrypt(passphrase.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * r * n, dklen=KEY_SIZE)
+
+
+def _subkey(key: bytes, purpose: bytes) -> bytes:
+    return hmac.new(key, purpose, hashlib.sha256).digest()
+
+
+class DataCipher:
+    """
+    Authenticated encryption of records and files with one data key.
+    
+    Records are encrypted whole with AES-GCM, bound to their kind and id so
+    rows cannot be swapped. Files are encrypted as a stream of fixed-size
+    chunks under a per-file key: memory use does not depend on file size,
+    and reordered, dropped or truncated chunks fail authentication.
+    """
+    
+    def __init__(self, key: bytes):
+        _require_cryptography()
+        self._aead = AESGCM(_subkey(key, b"records"))
+        self._file_key = _subkey(key, b"files")
+        # Content digests for deduplication are keyed, so they do not reveal known files
+        self._digest_key = _subkey(key, b"content-digest")
+    
+    def encrypt(self, data: bytes, associated_data: bytes = b"") -> bytes:
+        nonce = os.urandom(NONCE_SIZE)
+        return nonce + self._aead.encrypt(nonce, data, associated_data)
+    
+    def decrypt(self, blob: bytes, associated_data: bytes = b"") -> bytes:
+        try:
+            return self._aead.decrypt(blob[:NONCE_SIZE], blob[NONCE_SIZE:], associated_data)
+        except InvalidTag:
+            raise DecryptionError("Encrypted data was modified or belongs to another key")
+    
+    def encrypt_json(self, data: Any, associated_data: bytes = b"") -> str:
+        """Encrypted JSON serialization of a value, as base64 text"""
+        return base64.b64encode(self.encrypt(json.dumps(data).encode("utf-8"), associated_data)).decode("ascii")
+    
+    def decrypt_json(self, text: str, associated_data: bytes = b"") -> Any:
+        return json.loads(self.decrypt(base64.b64decode(text), associated_data))
+    
+    def content_hasher(self):
+        """Keyed SHA-256 for content digests of stored files (hashlib-like update/hexdigest)"""
+        return hmac.new(self._digest_key, digestmod=hashlib.sha256)
+    
+    def encrypt_stream(self, chunks: Iterable[bytes], target: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        """
+        Write data from an iterable of byte chunks (any sizes) encrypted to `target`.
+        
+        Returns:
+            Number of bytes written
+        """
+        header = _STREAM_HEADER.pack(STREAM_MAGIC, chunk_size, os.urandom(SALT_SIZE), os.urandom(7))
+        _, _, salt, prefix = _STREAM_HEADER.unpack(header)
+        aead = AESGCM(_subkey(self._file_key, salt))
+        target.write(header)
+        written = len(header)
+        
+        counter = 0
+        buffer = bytearray()
+        # One chunk is held back until it is known whether it is the last one
+        pending: Optional[bytes] = None
+        for data in chunks:
+            buffer += data
+            while len(buffer) >= chunk_size:
+                if pending is not None:
+                    written += target.write(aead.encrypt(prefix + struct.pack(">IB", counter, 0), pending, header))
+                    counter += 1
+                pending = bytes(buffer[:chunk_size])
+                del buffer[:chunk_size]
+        if pending is not None and buffer:
+            written += target.write(aead.encrypt(prefix + struct.pack(">IB", counter, 0), pending, header))
+            counter += 1
+            pending = None
+        last = pending if pending is not None else bytes(buffer)
+        written += target.write(aead.encrypt(prefix + struct.pack(">IB", counter, 1), last, header))
+        return written
+    
+    def decrypt_stream(self, source: BinaryIO) -> Iterator[bytes]:
+        """Plaintext chunks of an encrypted file object, authenticated one by one"""
+        header = source.read(_STREAM_HEADER.size)
+        if len(header) != _STREAM_HEADER.size or not header.startswith(STREAM_MAGIC):
+            raise DecryptionError("Not an encrypted file")
+        _, chunk_size, salt, prefix = _STREAM_HEADER.unpack(header)
+        aead = AESGCM(_subkey(self._file_key, salt))
+        
+        block_size = chunk_size + TAG_SIZE
+        counter = 0
+        block = source.read(block_size)
+        while True:
+            # A full block followed by more data is not the last one
+            following = source.read(block_size) if len(block) == block_size else b""
+            last = not following
+            try:
+                yield aead.decrypt(prefix + struct.pack(">IB", counter, int(last)), block, header)
+            except InvalidTag:
+                raise DecryptionError("Encrypted file was modified or truncated")
+            if last:
+                return
+            block = following
+            counter += 1
+
+
+def is_encrypted_file(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(STREAM_MAGIC)) == STREAM_MAGIC
+
+
+def shred_file(path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> None:
+    """
+    Overwrite a file with zeros, then delete it.
+    
+    Best effort: journaling or copy-on-write file systems, SSD wear leveling
+    and backups may still hold the old content.
+    """
+    size = os.path.getsize(path)
+    zeros = bytes(chunk_size)
+    with open(path, "r+b") as f:
+        for offset in range(0, size, chunk_size):
+            f.write(zeros[:min(chunk_size, size - offset)])
+        f.flush()
+        os.fsync(f.fileno())
+    os.remove(path)
+
+
+def encryption_enabled(data_dir: str) -> bool:
+    """Whether a data directory is encrypted (has a key file)"""
+    return os.path.exists(os.path.join(data_dir, KEY_FILENAME))
+
+
+def open_cipher(data_dir: str, passphrase: str) -> DataCipher:
+    """
+    Cipher for an encrypted data directory, creating its key on first use.
+    
+    The data key is random and stored wrapped (AES-GCM) under a key derived
+    from the passphrase, so a wrong passphrase is detected before any data
+    is read.
+    
+    Raises:
+        DecryptionError: If the passphrase is wrong
+    """
+    _require_cryptography()
+    path = os.path.join(data_dir, KEY_FILENAME)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            key_file = json.load(f)
+        salt = base64.b64decode(key_file["salt"])
+        wrapping_key = derive_key(passphrase, salt, key_file["n"], key_file["r"], key_file["p"])
+        wrapped = base64.b64decode(key_file["wrapped_key"])
+        try:
+            key = AESGCM(wrapping_key).decrypt(wrapped[:NONCE_SIZE], wrapped[NONCE_SIZE:], b"data key")
+        except InvalidTag:
+            raise DecryptionError("Wrong passphrase")
+        return DataCipher(key)
+    
+    if not passphrase:
+        raise ValueError("A passphrase is required to encrypt the data directory")
+    salt = os.urandom(SALT_SIZE)
+    key = AESGCM.generate_key(bit_length=KEY_SIZE * 8)
+    nonce = os.urandom(NONCE_SIZE)
+    wrapped = nonce + AESGCM(derive_key(passphrase, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)).encrypt(nonce, key, b"data key")
+    key_file = {
+        "version": 1,
+        "kdf": "scrypt",
+        "n": SCRYPT_N,
+        "r": SCRYPT_R,
+        "p": SCRYPT_P,
+        "salt": base64.b64encode(salt).decode("ascii"),
+        "wrapped_key": base64.b64encode(wrapped).decode("ascii"),
+    }
+    os.makedirs(data_dir, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(key_file, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return DataCipher(key)
@@ -1,8 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Callable, Iterable
 from dataclasses import dataclass, asdict
+import heapq
+import itertools
 import json
 import os
+import uuid
+
+from attachment_store import AttachmentStore, get_file_type
+from encryption import CONVERTED_FILENAME, encryption_enabled, is_encrypted_file, open_cipher, shred_file
+from previews import PreviewCache
+from search_index import SearchIndex
+from storage import EncryptedStorageBackend, StorageBackend, create_storage
+
+# Sort keys for record views
+RECORD_SORT_KEYS = {
+    "date": lambda record: record.date or "",
+    "created": lambda record: record.created_at or "",
+    "title": lambda record: (record.title or "").lower(),
+    "category": lambda record: record.category or "",
+}
 
 @dataclass
 class Condition:
@@ -49,7 +67,13 @@ class HealthRecord:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
-        return asdict(self)
+        # Copies the lists and metadata one level deep: asdict's recursive copy dominates bulk writes
+        data = dict(self.__dict__)
+        data['tags'] = list(self.tags)
+        data['metadata'] = dict(self.metadata)
+        data['attachments'] = list(self.attachments)
+        data['related_records'] = list(self.related_records)
+        return data
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'HealthRecord':
@@ -68,6 +92,9 @@ class FileAttachment:
     uploaded_at: str
     description: str
     tags: List[str]
+    # Content-addressed storage fields
+    sha256: Optional[str] = None  # Content hash (None for files uploaded before deduplication)
+    ref_count: int = 0  # Number of records referencing file_path
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
@@ -81,13 +108,132 @@ class FileAttachment:
 class HealthRecordManager:
     """Manager for health records, conditions, and file attachments"""
     
-    def __init__(self, data_dir: str = "health_data"):
+    def __init__(self, data_dir: str = "health_data", storage: Optional[StorageBackend] = None, passphrase: Optional[str] = None,
+                 cipher: Optional[Any] = None):
+        """
+        Args:
+            data_dir: Directory of the data and uploaded files
+            storage: Storage backend (created from the environment if None)
+            passphrase: Encrypts the data directory (required once it is encrypted);
+                raises encryption.DecryptionError if wrong
+            cipher: Cipher of an already unlocked manager of the same directory,
+                instead of the passphrase (skips the key derivation)
+        """
         self.data_dir = data_dir
-        self.records: List[HealthRecord] = []
-        self.conditions: List[Condition] = []
-        self.attachments: List[FileAttachment] = []
+        # Items by id, in insertion order
+        self.records: Dict[str, HealthRecord] = {}
+        self.conditions: Dict[str, Condition] = {}
+        self.attachments: Dict[str, FileAttachment] = {}
+        # Secondary indexes over records (ordered sets of record ids), kept up to date on every change
+        self._records_by_condition: Dict[Optional[str], Dict[str, None]] = {}
+        self._records_by_category: Dict[str, Dict[str, None]] = {}
+        self._records_by_tag: Dict[str, Dict[str, None]] = {}
+        # Index keys each record is currently filed under (records may be mutated in place)
+        self._record_keys: Dict[str, Tuple[Optional[str], str, Tuple[str, ...]]] = {}
+        # Full-text index over title, description, tags and metadata values (built on first search)
+        self.search_index = SearchIndex()
+        self._search_index_ready = False
+        # Numeric metadata as time series (analytics.TimeSeriesStore, built on first use)
+        self._analytics = None
+        # Attachments by stored file path and by content hash
+        self._attachments_by_path: Dict[str, FileAttachment] = {}
+        self._attachments_by_hash: Dict[str, FileAttachment] = {}
+        # Incremented on every change; derived views are memoized per version
+        self.version = 0
+        self.instance_id = str(uuid.uuid4())
+        self._view_cache: Dict[Any, Any] = {}
+        self._view_cache_version = -1
         self.ensure_data_directory()
+        # Encrypted mode: records, files and previews are encrypted at rest (see encryption.py);
+        # the key is derived from the passphrase once and kept for the life of the manager
+        self.cipher = cipher
+        if self.cipher is None and (passphrase is not None or encryption_enabled(data_dir)):
+            if passphrase is None:
+                raise ValueError(f"{data_dir} is encrypted, a passphrase is required")
+            self.cipher = open_cipher(data_dir, passphrase)
+        self.attachment_store = AttachmentStore(os.path.join(data_dir, "uploads"), cipher=self.cipher)
+        # Thumbnails of image (and PDF) attachments, generated in the background
+        self.previews = PreviewCache(os.path.join(data_dir, "uploads", ".previews"), cipher=self.cipher)
+        # Row-level persistence (SQLite by default, see storage.py)
+        if storage is not None and self.cipher and not isinstance(storage, EncryptedStorageBackend):
+            storage = EncryptedStorageBackend(storage, self.cipher)
+        self.storage = storage or create_storage(data_dir, cipher=self.cipher)
         self.load_data()
+        if self.cipher and not os.path.exists(os.path.join(data_dir, CONVERTED_FILENAME)):
+            self._encrypt_existing_files()
+    
+    def _encrypt_existing_files(self):
+        """
+        Encrypt the files stored before encryption was turned on (runs once).
+        
+        Plaintext attachment files are stored again through the encrypted
+        attachment store, and records and attachments are pointed at the new
+        files in one transaction. The plaintext files, previews and
+        *.json.migrated backups are then overwritten and deleted. Files
+        outside the upload directory are left alone. If anything fails, the
+        plaintext files are kept and the conversion runs again on next start.
+        """
+        try:
+            paths = [attachment.file_path for attachment in self.attachments.values()]
+            for record in self.records.values():
+                paths.extend(record.attachments or [])
+            # Plaintext file path -> (encrypted file path, keyed digest)
+            moved: Dict[str, Tuple[str, str]] = {}
+            for path in dict.fromkeys(paths):
+                if path not in moved and self.attachment_store.contains(path) and os.path.isfile(path) and not is_encrypted_file(path):
+                    digest, new_path, _, _ = self.attachment_store.put_file(path)
+                    moved[path] = (new_path, digest)
+            
+            if moved:
+                records = []
+                for record in self.records.values():
+                    if any(path in moved for path in record.attachments or []):
+                        record.attachments = list(dict.fromkeys(moved[path][0] if path in moved else path for path in record.attachments))
+                        records.append(record)
+                # Copies of the same content stored before deduplication now share one file: keep one attachment
+                by_path: Dict[str, FileAttachment] = {}
+                changed, duplicates = [], []
+                for attachment in self.attachments.values():
+                    if attachment.file_path in moved:
+                        attachment.file_path, attachment.sha256 = moved[attachment.file_path]
+                        attachment.filename = os.path.basename(attachment.file_path)
+                        changed.append(attachment)
+                    if attachment.file_path in by_path:
+                        duplicates.append(attachment)
+                    else:
+                        by_path[attachment.file_path] = attachment
+                for attachment in duplicates:
+                    del self.attachments[attachment.id]
+                changed = [attachment for attachment in changed if attachment.id in self.attachments]
+                if not self._persist_changes([
+                    ('records', records, []),
+                    ('attachments', changed, [attachment.id for attachment in duplicates]),
+                ]):
+                    self.load_data()
+                    return
+                self.version += 1
+                self._attachments_by_path = {att.file_path: att for att in self.attachments.values()}
+                self._attachments_by_hash = {att.sha256: att for att in self.attachments.values() if att.sha256}
+                self._reconcile_ref_counts()
+            
+            # Everything referenced is encrypted now; plaintext files left are unreferenced leftovers
+            files = 0
+            for path in list(self.attachment_store.iter_files()):
+                if not is_encrypted_file(path) and self.attachment_store.remove(path, shred=True):
+                    files += 1
+            previews = self.previews.shred_plaintext()
+            backups = 0
+            for name in os.listdir(self.data_dir):
+                if name.endswith(".json.migrated"):
+                    shred_file(os.path.join(self.data_dir, name))
+                    backups += 1
+            with open(os.path.join(self.data_dir, CONVERTED_FILENAME), "w") as f:
+                f.write(datetime.now().isoformat())
+            if files or previews or backups:
+                print(f"Encrypted existing files: {len(moved)} re-encrypted, {files} plaintext files, "
+                      f"{previews} previews and {backups} backups shredded")
+        except Exception as e:
+            print(f"Error encrypting existing files: {e}")
     
     def ensure_data_directory(self):
         """Ensure data directory exists"""
@@ -95,163 +241,414 @@ class HealthRecordManager:
         os.makedirs(os.path.join(self.data_dir, "uploads"), exist_ok=True)
     
     def load_data(self):
-        """Load data from JSON files"""
+        """Load data from the storage backend"""
         try:
-            # Load records
-            records_file = os.path.join(self.data_dir, "records.json")
-            if os.path.exists(records_file):
-                with open(records_file, 'r') as f:
-                    data = json.load(f)
-                    self.records = [HealthRecord.from_dict(record) for record in data.get('records', [])]
-            
-            # Load conditions
-            conditions_file = os.path.join(self.data_dir, "conditions.json")
-            if os.path.exists(conditions_file):
-                with open(conditions_file, 'r') as f:
-                    data = json.load(f)
-                    self.conditions = [Condition.from_dict(condition) for condition in data.get('conditions', [])]
-            
-            # Load attachments
-            attachments_file = os.path.join(self.data_dir, "attachments.json")
-            if os.path.exists(attachments_file):
-                with open(attachments_file, 'r') as f:
-                    data = json.load(f)
-                    self.attachments = [FileAttachment.from_dict(att) for att in data.get('attachments', [])]
+            data = self.storage.load_all()
+            records = [HealthRecord.from_dict(record) for record in data.get('records', [])]
+            self.conditions = {c['id']: Condition.from_dict(c) for c in data.get('conditions', [])}
+            self.attachments = {att['id']: FileAttachment.from_dict(att) for att in data.get('attachments', [])}
         except Exception as e:
             print(f"Error loading data: {e}")
-            self.records = []
-            self.conditions = []
-            self.attachments = []
+            records = []
+            self.conditions = {}
+            self.attachments = {}
+        self.version += 1
+        self._rebuild_indexes(records)
+        self._attachments_by_path = {att.file_path: att for att in self.attachments.values()}
+        self._attachments_by_hash = {att.sha256: att for att in self.attachments.values() if att.sha256}
+        self._reconcile_ref_counts()
     
     def save_data(self):
-        """Save data to JSON files"""
+        """Save a full snapshot of all data (single changes are written by the methods below)"""
         try:
-            # Save records
-            records_file = os.path.join(self.data_dir, "records.json")
-            with open(records_file, 'w') as f:
-                json.dump({'records': [record.to_dict() for record in self.records]}, f, indent=2)
-            
-            # Save conditions
-            conditions_file = os.path.join(self.data_dir, "conditions.json")
-            with open(conditions_file, 'w') as f:
-                json.dump({'conditions': [condition.to_dict() for condition in self.conditions]}, f, indent=2)
-            
-            # Save attachments
-            attachments_file = os.path.join(self.data_dir, "attachments.json")
-            with open(attachments_file, 'w') as f:
-                json.dump({'attachments': [att.to_dict() for att in self.attachments]}, f, indent=2)
+            self.storage.replace_all({
+                'records': [record.to_dict() for record in self.records.values()],
+                'conditions': [condition.to_dict() for condition in self.conditions.values()],
+                'attachments': [att.to_dict() for att in self.attachments.values()],
+            })
+        except Exception as e:
+            print(f"Error saving data: {e}")
+    
+    def _persist(self, kind: str, items: List[Any] = (), deleted_ids: List[str] = ()) -> bool:
+        """Write changed items and deletions of one kind in a single transaction"""
+        return self._persist_changes([(kind, items, deleted_ids)])
+    
+    def _persist_changes(self, changes: List[Tuple[str, List[Any], List[str]]]) -> bool:
+        """Write (kind, changed items, deleted ids) changes of several kinds in a single transaction"""
+        # Every change goes through here, after the in-memory update
+        self.version += 1
+        try:
+            with self.storage.transaction():
+                for kind, items, deleted_ids in changes:
+                    if items:
+                        self.storage.put(kind, [item.to_dict() for item in items])
+                    if deleted_ids:
+                        self.storage.delete(kind, deleted_ids)
+            return True
         except Exception as e:
             print(f"Error saving data: {e}")
+            return False
+    
+    # Record indexes
+    def _rebuild_indexes(self, records: List[HealthRecord]):
+        """Reset the record store and indexes from a list of records"""
+        self.records = {}
+        self._records_by_condition = {}
+        self._records_by_category = {}
+        self._records_by_tag = {}
+        self._record_keys = {}
+        self.search_index.clear()
+        self._search_index_ready = False
+        self._analytics = None
+        for record in records:
+            self.records[record.id] = record
+            self._index_record(record)
+    
+    def _index_record(self, record: HealthRecord):
+        """File a record under its current condition, category and tags"""
+        keys = (record.condition_id or None, record.category, tuple(dict.fromkeys(record.tags or [])))
+        old_keys = self._record_keys.get(record.id)
+        if old_keys == keys:
+            return
+        if old_keys is not None:
+            self._unindex_record(record.id)
+        self._record_keys[record.id] = keys
+        condition_id, category, tags = keys
+        self._records_by_condition.setdefault(condition_id, {})[record.id] = None
+        self._records_by_category.setdefault(category, {})[record.id] = None
+        for tag in tags:
+            self._records_by_tag.setdefault(tag, {})[record.id] = None
+    
+    def _unindex_record(self, record_id: str):
+        """Remove a record from the indexes it was filed under"""
+        keys = self._record_keys.pop(record_id, None)
+        if keys is None:
+            return
+        condition_id, category, tags = keys
+        for index, key in [(self._records_by_condition, condition_id), (self._records_by_category, category)] + \
+                [(self._records_by_tag, tag) for tag in tags]:
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(record_id, None)
+                if not bucket:
+                    del index[key]
+    
+    def _index_text(self, record: HealthRecord):
+        """Update the full-text index for a new or changed record"""
+        if self._search_index_ready:
+            self.search_index.add_record(record)
+    
+    def _ensure_search_index(self):
+        """Build the full-text index on first use; later changes keep it current"""
+        if not self._search_index_ready:
+            for record in self.records.values():
+                self.search_index.add_record(record)
+            self._search_index_ready = True
+    
+    def _index_series(self, record: HealthRecord):
+        """Update the time series for a new or changed record"""
+        if self._analytics is not None:
+            self._analytics.add_record(record)
+    
+    def get_analytics(self):
+        """
+        Time series of numeric record metadata (see analytics.py).
+        
+        Built from all records on first use, then kept current by every record
+        change. Requires numpy and pandas.
+        """
+        if self._analytics is None:
+            from analytics import TimeSeriesStore
+            analytics = TimeSeriesStore()
+            analytics.add_records(self.records.values())
+            self._analytics = analytics
+        return self._analytics
+    
+    def _records_for(self, ids) -> List[HealthRecord]:
+        return [self.records[record_id] for record_id in ids]
     
     # Health Record methods
     def add_record(self, record: HealthRecord) -> str:
         """Add a new health record"""
-        self.records.append(record)
-        self.save_data()
+        self.records[record.id] = record
+        self._index_record(record)
+        self._index_text(record)
+        self._index_series(record)
+        changed, _ = self._update_ref_counts(record.attachments, [])
+        self._persist_changes([('records', [record], []), ('attachments', changed, [])])
         return record.id
     
     def update_record(self, record_id: str, updated_record: HealthRecord) -> bool:
         """Update an existing health record"""
-        for i, record in enumerate(self.records):
-            if record.id == record_id:
-                self.records[i] = updated_record
-                self.save_data()
-                return True
-        return False
+        previous = self.records.get(record_id)
+        if previous is None:
+            return False
+        self.records[record_id] = updated_record
+        self._index_record(updated_record)
+        self._index_text(updated_record)
+        self._index_series(updated_record)
+        changed, released = self._update_ref_counts(updated_record.attachments, previous.attachments)
+        self._commit_attachment_changes([('records', [updated_record], [])], changed, released)
+        return True
     
     def delete_record(self, record_id: str) -> bool:
         """Delete a health record"""
-        for i, record in enumerate(self.records):
-            if record.id == record_id:
-                del self.records[i]
-                self.save_data()
-                return True
-        return False
+        record = self.records.pop(record_id, None)
+        if record is None:
+            return False
+        self._unindex_record(record_id)
+        if self._search_index_ready:
+            self.search_index.remove(record_id)
+        if self._analytics is not None:
+            self._analytics.remove_record(record_id)
+        # Files no other record uses are deleted with the record
+        changed, released = self._update_ref_counts([], record.attachments)
+        self._commit_attachment_changes([('records', [], [record_id])], changed, released)
+        return True
+    
+    def add_records_bulk(self, records: Iterable[HealthRecord], conditions: Iterable[Condition] = (),
+                         attachments: Iterable[FileAttachment] = ()) -> bool:
+        """
+        Add (or replace) many records at once, with new conditions and attachments.
+        
+        Indexes are updated per record, but everything is written in a single
+        transaction, so importing a large history costs one commit.
+        
+        Args:
+            records: Records to add; records with an existing id replace it
+            conditions: Conditions to add or replace
+            attachments: New attachments (e.g. from store_files) the records may reference
+        
+        Returns:
+            Whether the changes were saved
+        """
+        records, conditions, attachments = list(records), list(conditions), list(attachments)
+        for attachment in attachments:
+            self.attachments[attachment.id] = attachment
+            self._attachments_by_path[attachment.file_path] = attachment
+            if attachment.sha256:
+                self._attachments_by_hash.setdefault(attachment.sha256, attachment)
+        for condition in conditions:
+            self.conditions[condition.id] = condition
+        
+        new_ids = {attachment.id for attachment in attachments}
+        touched: Dict[str, FileAttachment] = {}
+        for record in records:
+            previous = self.records.get(record.id)
+            self.records[record.id] = record
+            self._index_record(record)
+            self._index_text(record)
+            self._index_series(record)
+            changed, released = self._update_ref_counts(record.attachments, previous.attachments if previous else [])
+            for attachment in changed + released:
+                if attachment.id not in new_ids:
+                    touched[attachment.id] = attachment
+        
+        # Counts are final only after all records: a file may be released by one and used by another
+        released = [attachment for attachment in touched.values() if attachment.ref_count == 0]
+        changed = attachments + [attachment for attachment in touched.values() if attachment.ref_count]
+        return self._commit_attachment_changes(
+            [('conditions', conditions, []), ('records', records, [])], changed, released
+        )
     
     def get_record(self, record_id: str) -> Optional[HealthRecord]:
         """Get a specific health record"""
-        for record in self.records:
-            if record.id == record_id:
-                return record
-        return None
+        return self.records.get(record_id)
     
     def get_all_records(self) -> List[HealthRecord]:
         """Get all health records"""
-        return self.records.copy()
+        return list(self.records.values())
+    
+    def count_records(self) -> int:
+        """Number of health records"""
+        return len(self.records)
     
-    def get_records_by_condition(self, condition_id: str) -> List[HealthRecord]:
-        """Get all records linked to a specific condition"""
-        return [r for r in self.records if r.condition_id == condition_id]
+    def get_records_by_condition(self, condition_id: str, limit: Optional[int] = None) -> List[HealthRecord]:
+        """Get records linked to a specific condition (the first `limit` if given)"""
+        ids = self._records_by_condition.get(condition_id or None, {})
+        return self._records_for(itertools.islice(ids, limit))
+    
+    def count_records_by_condition(self, condition_id: str) -> int:
+        """Number of records linked to a specific condition"""
+        return len(self._records_by_condition.get(condition_id or None, {}))
     
     def get_unlinked_records(self, category: str = None) -> List[HealthRecord]:
         """Get records not linked to any condition"""
-        unlinked = [r for r in self.records if not r.condition_id]
-        if category:
-            unlinked = [r for r in unlinked if r.category == category]
-        return unlinked
+        unlinked = self._records_by_condition.get(None, {})
+        if not category:
+            return self._records_for(unlinked)
+        in_category = self._records_by_category.get(category, {})
+        if len(in_category) < len(unlinked):
+            return self._records_for(record_id for record_id in in_category if record_id in unlinked)
+        return self._records_for(record_id for record_id in unlinked if record_id in in_category)
+    
+    def count_unlinked_records(self) -> int:
+        """Number of records not linked to any condition"""
+        return len(self._records_by_condition.get(None, {}))
+    
+    def get_records_by_category(self, category: str) -> List[HealthRecord]:
+        """Get all records of a category"""
+        return self._records_for(self._records_by_category.get(category, {}))
+    
+    def get_records_by_tag(self, tag: str) -> List[HealthRecord]:
+        """Get all records carrying a tag"""
+        return self._records_for(self._records_by_tag.get(tag, {}))
     
-    def search_records(self, query: str = "", category: str = "", tags: List[str] = None, condition_id: str = None) -> List[HealthRecord]:
-        """Search health records"""
-        results = self.records.copy()
+    def get_category_counts(self) -> Dict[str, int]:
+        """Number of records per category"""
+        return {category: len(ids) for category, ids in self._records_by_category.items()}
+    
+    def get_recent_records(self, limit: int = 5) -> List[HealthRecord]:
+        """Most recently created records, newest first"""
+        return heapq.nlargest(limit, self.records.values(), key=lambda r: r.created_at)
+    
+    def _memoized(self, key: Any, compute):
+        """Value of compute() cached until the data version changes"""
+        if self._view_cache_version != self.version:
+            self._view_cache = {}
+            self._view_cache_version = self.version
+        if key not in self._view_cache:
+            self._view_cache[key] = compute()
+        return self._view_cache[key]
+    
+    def get_sorted_record_ids(self, sort: str = "date", descending: bool = False, category: str = None, condition_id: str = None, unlinked: bool = False) -> List[str]:
+        """
+        Ids of the records matching the filters, sorted (memoized until the next change).
         
-        if query:
-            query_lower = query.lower()
-            results = [r for r in results if 
-                      query_lower in r.title.lower() or 
-                      query_lower in r.description.lower()]
+        Args:
+            sort: One of RECORD_SORT_KEYS
+            descending: Reverse the order
+            category: Only records of this category
+            condition_id: Only records linked to this condition
+            unlinked: Only records not linked to any condition
+        """
+        def compute() -> List[str]:
+            buckets = []
+            if category:
+                buckets.append(self._records_by_category.get(category, {}))
+            if condition_id or unlinked:
+                buckets.append(self._records_by_condition.get(None if unlinked else condition_id, {}))
+            if buckets:
+                smallest = min(buckets, key=len)
+                ids = [record_id for record_id in smallest if all(record_id in other for other in buckets)]
+            else:
+                ids = list(self.records)
+            key = RECORD_SORT_KEYS[sort]
+            return sorted(ids, key=lambda record_id: key(self.records[record_id]), reverse=descending)
         
-        if category:
-            results = [r for r in results if r.category == category]
+        return self._memoized(("sorted", sort, descending, category, condition_id, unlinked), compute)
+    
+    def get_records_page(self, page: int = 0, page_size: int = 20, sort: str = "date", descending: bool = False, category: str = None, condition_id: str = None, unlinked: bool = False) -> Tuple[List[HealthRecord], int]:
+        """
+        One page of a sorted record view.
         
-        if tags:
-            results = [r for r in results if any(tag in r.tags for tag in tags)]
+        Returns:
+            Records of the page (0-based) and the total number of matching records
+        """
+        ids = self.get_sorted_record_ids(sort, descending, category, condition_id, unlinked)
+        start = max(0, page) * page_size
+        return self._records_for(ids[start:start + page_size]), len(ids)
+    
+    def get_summary(self) -> Dict[str, Any]:
+        """Record and condition counts for dashboards (memoized until the next change)"""
+        def compute() -> Dict[str, Any]:
+            unlinked = self._records_by_condition.get(None, {})
+            unlinked_by_category = {
+                category: sum(1 for record_id in ids if record_id in unlinked)
+                for category, ids in self._records_by_category.items()
+            } if unlinked else {}
+            conditions_by_status: Dict[str, int] = {}
+            for condition in self.conditions.values():
+                conditions_by_status[condition.status] = conditions_by_status.get(condition.status, 0) + 1
+            return {
+                "records": len(self.records),
+                "conditions": len(self.conditions),
+                "unlinked": len(unlinked),
+                "by_category": self.get_category_counts(),
+                "unlinked_by_category": {c: n for c, n in unlinked_by_category.items() if n},
+                "by_condition": {
+                    condition_id: len(ids) for condition_id, ids in self._records_by_condition.items() if condition_id
+                },
+                "conditions_by_status": conditions_by_status,
+            }
         
+        return self._memoized("summary", compute)
+    
+    def search_records(self, query: str = "", category: str = "", tags: List[str] = None, condition_id: str = None, limit: Optional[int] = None) -> List[HealthRecord]:
+        """
+        Search health records.
+        
+        With a query, records must contain every query word (or a word starting
+        with it) in their title, description, tags or metadata, and are ranked
+        by relevance; otherwise they keep their stored order.
+        """
+        # Index buckets matching the filters
+        candidates = []
+        if category:
+            candidates.append(self._records_by_category.get(category, {}))
         if condition_id:
-            results = [r for r in results if r.condition_id == condition_id]
+            candidates.append(self._records_by_condition.get(condition_id, {}))
+        if tags:
+            tagged: Dict[str, None] = {}
+            for tag in tags:
+                tagged.update(self._records_by_tag.get(tag, {}))
+            candidates.append(tagged)
+        
+        if query:
+            self._ensure_search_index()
+            ranked = self.search_index.search(query, limit=None if candidates else limit)
+            ids = [record_id for record_id, _ in ranked if all(record_id in other for other in candidates)]
+        elif candidates:
+            # Start from the smallest bucket, then check the others
+            smallest = min(candidates, key=len)
+            ids = [record_id for record_id in smallest if all(record_id in other for other in candidates)]
+        else:
+            ids = list(self.records)
         
-        return results
+        return self._records_for(ids[:limit] if limit is not None else ids)
     
     # Condition methods
     def add_condition(self, condition: Condition) -> str:
         """Add a new condition"""
-        self.conditions.append(condition)
-        self.save_data()
+        self.conditions[condition.id] = condition
+        self._persist('conditions', [condition])
         return condition.id
     
     def update_condition(self, condition_id: str, updated_condition: Condition) -> bool:
         """Update an existing condition"""
-        for i, condition in enumerate(self.conditions):
-            if condition.id == condition_id:
-                self.conditions[i] = updated_condition
-                self.save_data()
-                return True
-        return False
+        if condition_id not in self.conditions:
+            return False
+        self.conditions[condition_id] = updated_condition
+        self._persist('conditions', [updated_condition])
+        return True
     
     def delete_condition(self, condition_id: str) -> bool:
         """Delete a condition and unlink all related records"""
         # First, unlink all records from this condition
-        for record in self.records:
-            if record.condition_id == condition_id:
-                record.condition_id = None
+        unlinked = self.get_records_by_condition(condition_id)
+        for record in unlinked:
+            record.condition_id = None
+            self._index_record(record)
         
-        # Then delete the condition
-        for i, condition in enumerate(self.conditions):
-            if condition.id == condition_id:
-                del self.conditions[i]
-                self.save_data()
-                return True
+        # Then delete the condition, together with the unlinks
+        if self.conditions.pop(condition_id, None) is not None:
+            self._persist_changes([('records', unlinked, []), ('conditions', [], [condition_id])])
+            return True
+        if unlinked:
+            self._persist('records', unlinked)
         return False
     
     def get_condition(self, condition_id: str) -> Optional[Condition]:
         """Get a specific condition"""
-        for condition in self.conditions:
-            if condition.id == condition_id:
-                return condition
-        return None
+        return self.conditions.get(condition_id)
     
     def get_all_conditions(self) -> List[Condition]:
         """Get all conditions"""
-        return self.conditions.copy()
+        return list(self.conditions.values())
+    
+    def count_conditions(self) -> int:
+        """Number of conditions"""
+        return len(self.conditions)
     
     def link_record_to_condition(self, record_id: str, condition_id: str) -> bool:
         """Link a record to a condition"""
@@ -260,7 +657,8 @@ class HealthRecordManager:
         
         if record and condition:
             record.condition_id = condition_id
-            self.save_data()
+            self._index_record(record)
+            self._persist('records', [record])
             return True
         return False
     
@@ -269,20 +667,206 @@ class HealthRecordManager:
         record = self.get_record(record_id)
         if record:
             record.condition_id = None
-            self.save_data()
+            self._index_record(record)
+            self._persist('records', [record])
             return True
         return False
     
     # File attachment methods
     def add_attachment(self, attachment: FileAttachment) -> str:
         """Add a file attachment"""
-        self.attachments.append(attachment)
-        self.save_data()
+        self.attachments[attachment.id] = attachment
+        self._attachments_by_path[attachment.file_path] = attachment
+        if attachment.sha256:
+            self._attachments_by_hash[attachment.sha256] = attachment
+        self._persist('attachments', [attachment])
         return attachment.id
     
+    def save_upload(self, uploaded_file, description: str = "", tags: List[str] = None) -> Optional[FileAttachment]:
+        """
+        Store an uploaded file and return its attachment.
+        
+        The file is streamed into the content-addressed store in chunks. If the
+        same content was stored before, its existing attachment is returned and
+        no new file is kept. The attachment is counted as used once a record
+        referencing its file_path is added.
+        """
+        name = getattr(uploaded_file, "name", "") or ""
+        try:
+            digest, path, size, _ = self.attachment_store.put(uploaded_file, name)
+        except Exception as e:
+            print(f"Error saving file: {e}")
+            return None
+        
+        existing = self._attachments_by_hash.get(digest)
+        if existing is not None:
+            self.previews.submit(existing.file_path, existing.sha256)
+            return existing
+        attachment = FileAttachment(
+            id=str(uuid.uuid4()),
+            filename=os.path.basename(path),
+            original_name=name or os.path.basename(path),
+            file_path=path,
+            file_type=get_file_type(name or path),
+            size=size,
+            uploaded_at=datetime.now().isoformat(),
+            description=description,
+            tags=tags or [],
+            sha256=digest,
+        )
+        self.add_attachment(attachment)
+        self.previews.submit(attachment.file_path, attachment.sha256)
+        return attachment
+    
+    def store_files(self, files: Dict[str, Tuple[str, Callable[[], Any]]], workers: int = 8) -> Tuple[Dict[str, FileAttachment], List[FileAttachment], Dict[str, str]]:
+        """
+        Copy many files into the attachment store in parallel.
+        
+        Files are streamed, hashed and deduplicated as in save_upload. New
+        attachments are returned but not added; pass them to add_records_bulk
+        with the records that use them.
+        
+        Args:
+            files: (original name, opener) by source key; the opener returns a
+                context manager over a readable binary file object
+            workers: Number of files copied at the same time
+        
+        Returns:
+            Attachment by source key, the new attachments, and an error
+            message by source key for files that could not be stored
+        """
+        def copy(name: str, opener: Callable[[], Any]) -> Tuple[str, str, int, bool]:
+            with opener() as f:
+                return self.attachment_store.put(f, name)
+        
+        stored: Dict[str, FileAttachment] = {}
+        new: Dict[str, FileAttachment] = {}
+        failed: Dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {key: (name, executor.submit(copy, name, opener)) for key, (name, opener) in files.items()}
+            # Collected in submission order, so duplicate content keeps the first name
+            for key, (name, future) in futures.items():
+                try:
+                    digest, path, size, _ = future.result()
+                except Exception as e:
+                    failed[key] = str(e)
+                    continue
+                attachment = self._attachments_by_hash.get(digest) or new.get(digest)
+                if attachment is None:
+                    attachment = new[digest] = FileAttachment(
+                        id=str(uuid.uuid4()),
+                        filename=os.path.basename(path),
+                        original_name=name or os.path.basename(path),
+                        file_path=path,
+                        file_type=get_file_type(name or path),
+                        size=size,
+                        uploaded_at=datetime.now().isoformat(),
+                        description="",
+                        tags=[],
+                        sha256=digest,
+                    )
+                    self.previews.submit(attachment.file_path, attachment.sha256)
+                stored[key] = attachment
+        return stored, list(new.values()), failed
+    
     def get_attachment(self, attachment_id: str) -> Optional[FileAttachment]:
         """Get a specific file attachment"""
-        for attachment in self.attachments:
-            if attachment.id == attachment_id:
-                return attachment
-        return None 
\ No newline at end of file
+        return self.attachments.get(attachment_id)
+    
+    def get_attachment_by_path(self, file_path: str) -> Optional[FileAttachment]:
+        """Get the attachment stored at a file path (as listed in HealthRecord.attachments)"""
+        return self._attachments_by_path.get(file_path)
+    
+    def get_attachment_preview(self, file_path: str) -> Optional[Any]:
+        """
+        Small preview image of an attachment (a path, or JPEG bytes in encrypted
+        mode), None until it has been generated
+        """
+        attachment = self._attachments_by_path.get(file_path)
+        return self.previews.get(file_path, attachment.sha256 if attachment else None)
+    
+    def _update_ref_counts(self, added_paths: List[str], removed_paths: List[str]) -> Tuple[List[FileAttachment], List[FileAttachment]]:
+        """
+        Adjust attachment reference counts for a change of a record's file paths.
+        
+        Returns:
+            Attachments whose count changed, and those no longer referenced
+        """
+        added, removed = set(added_paths or []), set(removed_paths or [])
+        changed, released = [], []
+        for paths, delta in ((added - removed, 1), (removed - added, -1)):
+            for path in paths:
+                attachment = self._attachments_by_path.get(path)
+                if attachment is None:
+                    continue
+                attachment.ref_count = max(0, attachment.ref_count + delta)
+                (released if attachment.ref_count == 0 else changed).append(attachment)
+        return changed, released
+    
+    def _commit_attachment_changes(self, changes: List[Tuple[str, List[Any], List[str]]], changed: List[FileAttachment], released: List[FileAttachment]):
+        """Persist record changes with their attachment counts, then delete released files"""
+        for attachment in released:
+            self._forget_attachment(attachment)
+        committed = self._persist_changes(changes + [
+            ('attachments', changed, [attachment.id for attachment in released])
+        ])
+        # Files are only removed once nothing in the store points to them
+        if committed:
+            for attachment in released:
+                self._remove_file(attachment.file_path)
+                self.previews.discard(attachment.file_path, attachment.sha256)
+        return committed
+    
+    def _forget_attachment(self, attachment: FileAttachment):
+        self.attachments.pop(attachment.id, None)
+        self._attachments_by_path.pop(attachment.file_path, None)
+        if attachment.sha256 and self._attachments_by_hash.get(attachment.sha256) is attachment:
+            del self._attachments_by_hash[attachment.sha256]
+    
+    def _remove_file(self, file_path: str):
+        try:
+            self.attachment_store.remove(file_path)
+        except OSError as e:
+            print(f"Error deleting file {file_path}: {e}")
+    
+    def _reconcile_ref_counts(self):
+        """Recompute reference counts from the records (fixes data from older versions)"""
+        counts: Dict[str, int] = {}
+        for record in self.records.values():
+            for path in set(record.attachments or []):
+                counts[path] = counts.get(path, 0) + 1
+        stale = []
+        for attachment in self.attachments.values():
+            count = counts.get(attachment.file_path, 0)
+            if attachment.ref_count != count:
+                attachment.ref_count = count
+                stale.append(attachment)
+        if stale:
+            self._persist('attachments', stale)
+    
+    def collect_garbage(self) -> Dict[str, int]:
+        """
+        Delete attachments no record references, stored files no attachment
+        or record points to (e.g. left by an interrupted upload or deletion),
+        and previews of content that is gone.
+        
+        Returns:
+            Number of attachments, files and cached previews removed
+        """
+        unused = [att for att in self.attachments.values() if att.ref_count == 0]
+        for attachment in unused:
+            self._forget_attachment(attachment)
+        if unused and not self._persist('attachments', deleted_ids=[att.id for att in unused]):
+            return {"attachments": 0, "files": 0, "previews": 0}
+        
+        referenced = {os.path.abspath(path) for path in self._attachments_by_path}
+        for record in self.records.values():
+            referenced.update(os.path.abspath(path) for path in record.attachments or [])
+        files = 0
+        for path in list(self.attachment_store.iter_files()):
+            if os.path.abspath(path) not in referenced and self.attachment_store.remove(path):
+                files += 1
+        
+        digests = {self.previews.digest_of(att.file_path, att.sha256) for att in self.attachments.values()}
+        previews = self.previews.prune({digest for digest in digests if digest})
+        return {"attachments": len(unused), "files": files, "previews": previews}
@@ -0,0 +1,217 @@
+import hashlib
+import io
+import os
+import queue
+import tempfile
+import threading
+from typing import Any, Dict, Optional, Set, Union
+
+from encryption import is_encrypted_file, shred_file
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    # Optional: first-page previews of PDFs
+    import fitz
+except ImportError:
+    fitz = None
+
+# Longest side of a preview in pixels
+PREVIEW_SIZE = 256
+
+PREVIEW_QUALITY = 80
+
+PDF_EXTENSIONS = ('.pdf',)
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PreviewCache:
+    """
+    Small JPEG previews of attachments, generated once by a background worker.
+    
+    Previews are stored under <uploads>/.previews/ab/cd/<sha256>-<size>.jpg:
+    keyed by content hash, so a cached preview can never belong to other
+    content, and identical files share one preview. get() only returns
+    previews that exist and queues the missing ones, so pages never wait for
+    image decoding.
+    
+    With a cipher (encryption.DataCipher) encrypted attachments are decrypted
+    in memory to render them, and previews are stored encrypted too.
+    """
+    
+    def __init__(self, root: str, size: int = PREVIEW_SIZE, cipher: Any = None):
+        self.root = root
+        self.size = size
+        self.cipher = cipher
+        self._queue: queue.Queue = queue.Queue()
+        self._pending: Set[str] = set()
+        # Content that cannot be previewed (unsupported format or broken file)
+        self._failed: Set[str] = set()
+        # Digests of files stored before content addressing, by path
+        self._digests: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+    
+    @staticmethod
+    def supports(file_path: str) -> bool:
+        """Whether previews can be generated for a file with this name"""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension in PDF_EXTENSIONS:
+            return Image is not None and fitz is not None
+        return Image is not None and extension in Image.registered_extensions()
+    
+    def preview_path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], f"{sha256}-{self.size}.jpg")
+    
+    def get(self, file_path: str, sha256: Optional[str] = None) -> Optional[Union[str, bytes]]:
+        """
+        Path of the preview of a file (its JPEG bytes if previews are
+        encrypted), or None if it is not available yet.
+        
+        Missing previews are queued for the background worker.
+        
+        Args:
+            file_path: Stored attachment file
+            sha256: Content hash of the file (computed by the worker if unknown)
+        """
+        if not self.supports(file_path):
+            return None
+        sha256 = self.digest_of(file_path, sha256)
+        if sha256:
+            if sha256 in self._failed:
+                return None
+            path = self.preview_path(sha256)
+            if os.path.exists(path):
+                if self.cipher:
+                    with open(path, 'rb') as f:
+                        return b"".join(self.cipher.decrypt_stream(f))
+                return path
+        self.submit(file_path, sha256)
+        return None
+    
+    def submit(self, file_path: str, sha256: Optional[str] = None) -> None:
+        """Queue preview generation for a file (no-op if queued or unsupported)"""
+        if not self.supports(file_path):
+            return
+        key = sha256 or file_path
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="preview-worker", daemon=True)
+                self._worker.start()
+        self._queue.put((file_path, sha256, key))
+    
+    def wait(self) -> None:
+        """Block until all queued previews are generated"""
+        self._queue.join()
+    
+    def digest_of(self, file_path: str, sha256: Optional[str] = None) -> Optional[str]:
+        """Content hash a file's preview is cached under, if known"""
+        return sha256 or self._digests.get(file_path)
+    
+    def discard(self, file_path: str, sha256: Optional[str] = None) -> None:
+        """Delete the preview of a file that is no longer stored"""
+        sha256 = sha256 or self._digests.pop(file_path, None)
+        if not sha256:
+            return
+        path = self.preview_path(sha256)
+        if os.path.exists(path):
+            os.remove(path)
+    
+    def prune(self, keep: Set[str]) -> int:
+        """Delete cached previews of content not in `keep`, returns how many"""
+        removed = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                # Temporary files belong to previews being written
+                if not name.endswith(".tmp") and name.split("-")[0] not in keep:
+                    os.remove(os.path.join(directory, name))
+                    removed += 1
+        return removed
+    
+    def shred_plaintext(self) -> int:
+        """Overwrite and delete previews stored unencrypted (before encryption was turned on), returns how many"""
+        removed = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                if not is_encrypted_file(path):
+                    shred_file(path)
+                    removed += 1
+        return removed
+    
+    def _run(self) -> None:
+        while True:
+            file_path, sha256, key = self._queue.get()
+            try:
+                self._generate(file_path, sha256)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
+    
+    def _generate(self, file_path: str, sha256: Optional[str]) -> None:
+        try:
+            if not sha256:
+                sha256 = self._digests[file_path] = file_sha256(file_path)
+            path = self.preview_path(sha256)
+            if os.path.exists(path) or sha256 in self._failed:
+                return
+            image = self._render(file_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    if self.cipher:
+                        buffer = io.BytesIO()
+                        image.save(buffer, format="JPEG", quality=PREVIEW_QUALITY)
+                        self.cipher.encrypt_stream([buffer.getvalue()], f)
+                    else:
+                        image.save(f, format="JPEG", quality=PREVIEW_QUALITY)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except Exception as e:
+            print(f"Error generating preview for {file_path}: {e}")
+            if sha256:
+                self._failed.add(sha256)
+    
+    def _source(self, file_path: str) -> Union[str, io.BytesIO]:
+        """File to render: the path, or the decrypted content of an encrypted file"""
+        if self.cipher and is_encrypted_file(file_path):
+            with open(file_path, 'rb') as f:
+                return io.BytesIO(b"".join(self.cipher.decrypt_stream(f)))
+        return file_path
+    
+    def _render(self, file_path: str):
+        """Downscaled RGB image of a file (first page for PDFs)"""
+        source = self._source(file_path)
+        if file_path.lower().endswith(PDF_EXTENSIONS):
+            if isinstance(source, io.BytesIO):
+                document = fitz.open(stream=source.getvalue(), filetype="pdf")
+            else:
+                document = fitz.open(source)
+            with document:
+                page = document.load_page(0)
+                zoom = self.size / max(page.rect.width, page.rect.height)
+                pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+                return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+        with Image.open(source) as image:
+            # Let the decoder skip detail it would discard anyway (JPEG)
+            image.draft("RGB", (self.size, self.size))
+            image.thumbnail((self.size, self.size))
+            return image.convert("RGB")
@@ -0,0 +1,220 @@
+import bisect
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Relative weight of a term occurrence per field
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "tags": 2.0,
+    "description": 1.0,
+    "metadata": 1.0,
+}
+
+# Query words shorter than this only match whole terms
+MIN_PREFIX_LENGTH = 2
+
+# Score factor for terms matched by prefix only (e.g. "diab" -> "diabetes")
+PREFIX_MATCH_WEIGHT = 0.7
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip accents (Caffè -> caffe)"""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized word tokens"""
+    return _TOKEN_PATTERN.findall(normalize_text(text)) if text else []
+
+
+def _flatten_values(value: Any) -> Iterable[str]:
+    """String values of a (nested) metadata structure"""
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _flatten_values(item)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            yield from _flatten_values(item)
+    elif value is not None:
+        yield str(value)
+
+
+def record_fields(record: Any) -> Dict[str, str]:
+    """Searchable text per field of a HealthRecord"""
+    return {
+        "title": record.title or "",
+        "description": record.description or "",
+        "tags": " ".join(record.tags or []),
+        "metadata": " ".join(_flatten_values(record.metadata or {})),
+    }
+
+
+class SearchIndex:
+    """
+    In-memory inverted index with BM25 ranking and prefix matching.
+    
+    Every term maps to the documents containing it with a field-weighted
+    term frequency; the sorted vocabulary allows prefix lookups by bisection.
+    Documents are added, replaced and removed one at a time, so the index
+    stays current without rebuilds.
+    """
+    
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # Sorted terms for prefix lookups, merged lazily with the terms added since
+        self._vocabulary: List[str] = []
+        self._new_terms: List[str] = []
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+    
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+    
+    def add(self, doc_id: str, fields: Dict[str, str]) -> None:
+        """Index a document (replacing a previous version with the same id)"""
+        self.remove(doc_id)
+        terms: Dict[str, float] = {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for token, count in Counter(tokenize(text)).items():
+                terms[token] = terms.get(token, 0.0) + count * weight
+        if not terms:
+            return
+        
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._new_terms.append(term)
+            postings[doc_id] = frequency
+        self._doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+    
+    def add_record(self, record: Any) -> None:
+        """Index a HealthRecord"""
+        self.add(record.id, record_fields(record))
+    
+    def remove(self, doc_id: str) -> None:
+        """Drop a document from the index (no-op if it is not indexed)"""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                # Left in the vocabulary until the next merge; lookups skip it
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+    
+    def clear(self) -> None:
+        self._postings = {}
+        self._vocabulary = []
+        self._new_terms = []
+        self._doc_terms = {}
+        self._doc_lengths = {}
+        self._total_length = 0.0
+    
+    def _merge_vocabulary(self) -> None:
+        """Bring the sorted vocabulary up to date with added and removed terms"""
+        if len(self._new_terms) <= 64 and len(self._vocabulary) <= 2 * len(self._postings):
+            for term in self._new_terms:
+                position = bisect.bisect_left(self._vocabulary, term)
+                if position == len(self._vocabulary) or self._vocabulary[position] != term:
+                    self._vocabulary.insert(position, term)
+        else:
+            # Bulk changes (initial load): one sort instead of many inserts
+            self._vocabulary = sorted(self._postings)
+        self._new_terms = []
+    
+    def _expand(self, word: str) -> List[Tuple[str, float]]:
+        """Index terms matching a query word, with their match weight"""
+        matches = [(word, 1.0)] if word in self._postings else []
+        if len(word) >= MIN_PREFIX_LENGTH:
+            if self._new_terms:
+                self._merge_vocabulary()
+            vocabulary = self._vocabulary
+            position = bisect.bisect_right(vocabulary, word)
+            while position < len(vocabulary) and vocabulary[position].startswith(word):
+                if vocabulary[position] in self._postings:
+                    matches.append((vocabulary[position], PREFIX_MATCH_WEIGHT))
+                position += 1
+        return matches
+    
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Documents matching every word of a query, best first.
+        
+        Each query word matches the term itself or, from MIN_PREFIX_LENGTH
+        characters on, any term starting with it. Documents are ranked by
+        BM25 over the field-weighted term frequencies.
+        
+        Args:
+            query: Free text query
+            limit: Maximum number of results (all matches if None)
+        
+        Returns:
+            (document id, score) pairs sorted by decreasing score
+        """
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words or not self._doc_terms:
+            return []
+        
+        expansions = []
+        for word in words:
+            matches = self._expand(word)
+            if not matches:
+                return []
+            size = sum(len(self._postings[term]) for term, _ in matches)
+            expansions.append((size, matches))
+        # Start from the most selective word; the others only check its candidates
+        expansions.sort(key=lambda item: item[0])
+        
+        documents = len(self._doc_terms)
+        doc_lengths = self._doc_lengths
+        # BM25 length normalization: norm = base + per_length * document length
+        base = BM25_K1 * (1 - BM25_B)
+        per_length = BM25_K1 * BM25_B * documents / self._total_length
+        
+        scores: Optional[Dict[str, float]] = None
+        for _, matches in expansions:
+            word_scores: Dict[str, float] = {}
+            for term, weight in matches:
+                postings = self._postings[term]
+                factor = weight * (BM25_K1 + 1) * math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+                if scores is None:
+                    candidates = postings
+                elif len(postings) < len(scores):
+                    candidates = [doc_id for doc_id in postings if doc_id in scores]
+                else:
+                    candidates = [doc_id for doc_id in scores if doc_id in postings]
+                for doc_id in candidates:
+                    frequency = postings[doc_id]
+                    score = factor * frequency / (frequency + base + per_length * doc_lengths[doc_id])
+                    # A word scores by its best matching term in the document
+                    if score > word_scores.get(doc_id, 0.0):
+                        word_scores[doc_id] = score
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {doc_id: scores[doc_id] + score for doc_id, score in word_scores.items()}
+            if not scores:
+                return []
+        
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit] if limit is not None else ranked
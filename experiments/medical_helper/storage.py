@@ -0,0 +1,590 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Entity kinds stored by the backends, in load order
+KINDS = ("records", "conditions", "attachments")
+
+# Legacy JSON file per kind (each holds {"<kind>": [...]})
+JSON_FILES = {kind: f"{kind}.json" for kind in KINDS}
+
+SQLITE_FILENAME = "health.db"
+
+# Append-only change log of the journal backend
+JOURNAL_FILENAME = "journal.log"
+
+# Undo log marker for items that did not exist before a transaction
+_ABSENT = object()
+
+
+class StorageBackend:
+    """Base class for HealthRecordManager persistence (row-level writes)"""
+    
+    name = "none"
+    
+    def load_all(self) -> Dict[str, List[Dict[str, Any]]]:
+        """All stored items as dicts, keyed by kind"""
+        return {kind: [] for kind in KINDS}
+    
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group several puts/deletes so they are applied atomically"""
+        yield
+    
+    def put(self, kind: str, items: Iterable[Dict[str, Any]]) -> None:
+        """Insert or replace items (dicts with an "id")"""
+    
+    def delete(self, kind: str, ids: Iterable[str]) -> None:
+        """Delete items by id"""
+    
+    def replace_all(self, data: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Replace the whole store content"""
+        with self.transaction():
+            existing = self.load_all()
+            for kind in KINDS:
+                self.delete(kind, [item["id"] for item in existing.get(kind, [])])
+                self.put(kind, data.get(kind, []))
+    
+    def vacuum(self) -> None:
+        """Rewrite the store files so replaced or deleted data no longer lingers in them"""
+    
+    def close(self) -> None:
+        pass
+
+
+class JSONStorageBackend(StorageBackend):
+    """
+    Original storage layout: one JSON file per kind, rewritten in full.
+    
+    Writes are O(total data); changed files are rewritten once per
+    transaction through a temporary file and an atomic rename. A transaction
+    that raises is rolled back in memory from an undo log of the items it
+    touched, so nothing of it is written later.
+    """
+    
+    name = "json"
+    
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self._items: Dict[str, Dict[str, Dict[str, Any]]] = {kind: {} for kind in KINDS}
+        self._dirty: set = set()
+        self._depth = 0
+        self._lock = threading.RLock()
+        self._loaded = False
+        # Previous value of each item changed by the open transaction, by (kind, id),
+        # and the item order of kinds it deleted from (restored items keep their place)
+        self._undo: Dict[Tuple[str, str], Any] = {}
+        self._undo_order: Dict[str, List[str]] = {}
+    
+    def _path(self, kind: str) -> str:
+        return os.path.join(self.data_dir, JSON_FILES[kind])
+    
+    def load_all(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            for kind in KINDS:
+                self._items[kind] = {item["id"]: item for item in read_json_file(self._path(kind), kind)}
+            self._loaded = True
+            return {kind: list(items.values()) for kind, items in self._items.items()}
+    
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            if not self._loaded:
+                self.load_all()
+            outermost = self._depth == 0
+            if outermost:
+                self._undo, self._undo_order = {}, {}
+                dirty = set(self._dirty)
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if outermost:
+                    self._rollback(dirty)
+                raise
+            self._depth -= 1
+            if outermost:
+                self._undo, self._undo_order = {}, {}
+                self._flush()
+    
+    def _set(self, kind: str, item: Dict[str, Any]) -> None:
+        self._undo.setdefault((kind, item["id"]), self._items[kind].get(item["id"], _ABSENT))
+        self._items[kind][item["id"]] = item
+    
+    def _pop(self, kind: str, item_id: str) -> None:
+        if item_id in self._items[kind] and kind not in self._undo_order:
+            self._undo_order[kind] = list(self._items[kind])
+        self._undo.setdefault((kind, item_id), self._items[kind].get(item_id, _ABSENT))
+        self._items[kind].pop(item_id, None)
+    
+    def _rollback(self, dirty: set) -> None:
+        """Restore the items changed by a failed transaction"""
+        for (kind, item_id), previous in self._undo.items():
+            if previous is _ABSENT:
+                self._items[kind].pop(item_id, None)
+            else:
+                self._items[kind][item_id] = previous
+        for kind, order in self._undo_order.items():
+            self._items[kind] = {item_id: self._items[kind][item_id] for item_id in order}
+        self._undo, self._undo_order = {}, {}
+        self._dirty = dirty
+    
+    def put(self, kind: str, items: Iterable[Dict[str, Any]]) -> None:
+        with self.transaction():
+            for item in items:
+                self._set(kind, item)
+            self._dirty.add(kind)
+    
+    def delete(self, kind: str, ids: Iterable[str]) -> None:
+        with self.transaction():
+            for item_id in ids:
+                self._pop(kind, item_id)
+            self._dirty.add(kind)
+    
+    def _flush(self) -> None:
+        for kind in list(self._dirty):
+            write_json_file(self._path(kind), kind, list(self._items[kind].values()))
+        self._dirty.clear()
+
+
+class JournalStorageBackend(JSONStorageBackend):
+    """
+    JSON snapshot files plus an append-only journal of changes.
+    
+    Each transaction appends one compact JSON line to journal.log, so a write
+    costs O(size of the change). Loading reads the snapshot files and replays
+    the journal over them. Once the journal holds `compact_after` entries, a
+    background thread folds it into new snapshot files (temporary file and
+    atomic rename). Replaying a change twice gives the same result, so a crash
+    at any point of a compaction loses nothing.
+    """
+    
+    name = "journal"
+    
+    def __init__(self, data_dir: str, compact_after: Optional[int] = None, fsync: bool = True):
+        super().__init__(data_dir)
+        self.compact_after = compact_after or int(os.environ.get("MEDICAL_HELPER_JOURNAL_COMPACT_AFTER", "1000"))
+        self.fsync = fsync
+        self.journal_path = os.path.join(data_dir, JOURNAL_FILENAME)
+        # Journal being folded into the snapshot by a compaction
+        self.compacting_path = f"{self.journal_path}.compacting"
+        self._pending: List[Dict[str, Any]] = []
+        self._journal = None
+        self._entries = 0
+        self._compaction: Optional[threading.Thread] = None
+    
+    def load_all(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            self.wait_for_compaction()
+            for kind in KINDS:
+                self._items[kind] = {item["id"]: item for item in read_json_file(self._path(kind), kind)}
+            interrupted = os.path.exists(self.compacting_path)
+            if interrupted:
+                self._replay(self.compacting_path)
+            self._entries = self._replay(self.journal_path)
+            self._loaded = True
+            if interrupted:
+                # Finish the compaction a crash interrupted before writing anything new
+                self._write_snapshot({kind: list(items.values()) for kind, items in self._items.items()})
+                os.remove(self.compacting_path)
+            return {kind: list(items.values()) for kind, items in self._items.items()}
+    
+    def _replay(self, path: str) -> int:
+        """Apply the entries of a journal file, returns how many were applied"""
+        if not os.path.exists(path):
+            return 0
+        applied = 0
+        valid_bytes = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("missing newline")
+                    entry = json.loads(line)
+                except ValueError:
+                    # Last line cut short by a crash: that transaction never committed.
+                    # Cut it off so the next append starts on a clean line.
+                    print(f"Ignoring incomplete journal entry in {path}")
+                    f.close()
+                    os.truncate(path, valid_bytes)
+                    break
+                valid_bytes += len(line)
+                for op in entry["ops"]:
+                    if op["op"] == "put":
+                        for item in op["items"]:
+                            self._items[op["kind"]][item["id"]] = item
+                    else:
+                        for item_id in op["ids"]:
+                            self._items[op["kind"]].pop(item_id, None)
+                applied += 1
+        return applied
+    
+    def put(self, kind: str, items: Iterable[Dict[str, Any]]) -> None:
+        items = list(items)
+        with self.transaction():
+            for item in items:
+                self._set(kind, item)
+            self._pending.append({"op": "put", "kind": kind, "items": items})
+    
+    def delete(self, kind: str, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        with self.transaction():
+            for item_id in ids:
+                self._pop(kind, item_id)
+            self._pending.append({"op": "delete", "kind": kind, "ids": ids})
+    
+    def _rollback(self, dirty: set) -> None:
+        super()._rollback(dirty)
+        self._pending.clear()
+    
+    def replace_all(self, data: Dict[str, List[Dict[str, Any]]]) -> None:
+        with self._lock:
+            self.wait_for_compaction()
+            self._pending.clear()
+            for kind in KINDS:
+                self._items[kind] = {item["id"]: item for item in data.get(kind, [])}
+            self._loaded = True
+            # A full snapshot supersedes the journal
+            self._write_snapshot({kind: list(items.values()) for kind, items in self._items.items()})
+            self._close_journal()
+            for path in (self.journal_path, self.compacting_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._entries = 0
+    
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        line = json.dumps({"ops": self._pending}, separators=(',', ':'))
+        self._pending = []
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a')
+        self._journal.write(line + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self._entries += 1
+        if self._entries >= self.compact_after and not self._compaction_running():
+            self._start_compaction()
+    
+    def _start_compaction(self) -> None:
+        """Rotate the journal and fold it into the snapshot in a background thread"""
+        self._close_journal()
+        if os.path.exists(self.journal_path):
+            if os.path.exists(self.compacting_path):
+                # A failed compaction left its journal behind: fold both in this time
+                with open(self.journal_path, 'r') as src, open(self.compacting_path, 'a') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.compacting_path)
+        self._entries = 0
+        snapshot = {kind: list(items.values()) for kind, items in self._items.items()}
+        self._compaction = threading.Thread(target=self._compact, args=(snapshot,), name="journal-compaction", daemon=True)
+        self._compaction.start()
+    
+    def _compact(self, snapshot: Dict[str, List[Dict[str, Any]]]) -> None:
+        try:
+            self._write_snapshot(snapshot)
+            os.remove(self.compacting_path)
+        except Exception as e:
+            # The rotated journal is kept and replayed (then compacted) on next load
+            print(f"Journal compaction failed: {e}")
+    
+    def _write_snapshot(self, snapshot: Dict[str, List[Dict[str, Any]]]) -> None:
+        for kind in KINDS:
+            write_json_file(self._path(kind), kind, snapshot[kind])
+    
+    def _compaction_running(self) -> bool:
+        return self._compaction is not None and self._compaction.is_alive()
+    
+    def wait_for_compaction(self) -> None:
+        """Block until a running compaction has finished"""
+        if self._compaction_running():
+            self._compaction.join()
+    
+    def compact(self) -> None:
+        """Fold the journal into the snapshot files now"""
+        with self._lock:
+            if not self._loaded:
+                self.load_all()
+            self.wait_for_compaction()
+            if self._entries or os.path.exists(self.compacting_path):
+                self._start_compaction()
+        self.wait_for_compaction()
+    
+    def vacuum(self) -> None:
+        self.compact()
+    
+    def _close_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+    
+    def close(self) -> None:
+        self.wait_for_compaction()
+        with self._lock:
+            self._close_journal()
+
+
+class SQLiteStorageBackend(StorageBackend):
+    """
+    SQLite storage: one row per item, so every write touches a single row.
+    
+    Items are stored as JSON documents with the columns used for lookups
+    (condition_id, category, date) duplicated and indexed. The database runs
+    in WAL mode; each put/delete (or transaction block) commits atomically,
+    so a crash never leaves a half-written store.
+    """
+    
+    name = "sqlite"
+    
+    # Indexed columns per kind, extracted from the item dict
+    COLUMNS = {
+        "records": ("condition_id", "category", "date"),
+        "conditions": ("status",),
+        "attachments": ("uploaded_at",),
+    }
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+    
+    def _create_schema(self) -> None:
+        with self.transaction():
+            for kind, columns in self.COLUMNS.items():
+                column_defs = "".join(f", {column} TEXT" for column in columns)
+                self._connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {kind} (id TEXT PRIMARY KEY{column_defs}, data TEXT NOT NULL)"
+                )
+                for column in columns:
+                    self._connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{kind}_{column} ON {kind} ({column})"
+                    )
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            outermost = self._depth == 0
+            if outermost:
+                self._connection.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if outermost:
+                    self._connection.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if outermost:
+                self._connection.execute("COMMIT")
+    
+    def load_all(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            return {
+                kind: [json.loads(row[0]) for row in self._connection.execute(f"SELECT data FROM {kind} ORDER BY rowid")]
+                for kind in KINDS
+            }
+    
+    def put(self, kind: str, items: Iterable[Dict[str, Any]]) -> None:
+        columns = self.COLUMNS[kind]
+        placeholders = ", ".join("?" for _ in range(len(columns) + 2))
+        # Keep the original insertion order (rowid) when an existing item is replaced
+        statement = (
+            f"INSERT INTO {kind} (id, {', '.join(columns)}, data) VALUES ({placeholders}) "
+            f"ON CONFLICT(id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columns)}, data = excluded.data"
+        )
+        rows = [
+            (item["id"], *(_column_value(item.get(column)) for column in columns), json.dumps(item))
+            for item in items
+        ]
+        with self.transaction():
+            self._connection.executemany(statement, rows)
+    
+    def delete(self, kind: str, ids: Iterable[str]) -> None:
+        with self.transaction():
+            self._connection.executemany(f"DELETE FROM {kind} WHERE id = ?", [(item_id,) for item_id in ids])
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def set_meta(self, key: str, value: str) -> None:
+        with self.transaction():
+            self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+    
+    def count(self, kind: str) -> int:
+        with self._lock:
+            return self._connection.execute(f"SELECT COUNT(*) FROM {kind}").fetchone()[0]
+    
+    def vacuum(self) -> None:
+        # Rebuild the database without free pages, then move the WAL into it and truncate the WAL
+        with self._lock:
+            self._connection.execute("VACUUM")
+            self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class EncryptedStorageBackend(StorageBackend):
+    """
+    Record-level encryption on top of another backend.
+    
+    Each item is stored as {"id": ..., "encrypted": ...}: the JSON of the
+    item encrypted with AES-GCM (see encryption.DataCipher), authenticated
+    together with its kind and id. Only ids are visible at rest; the search
+    index and the other indexes are built in memory from the decrypted items.
+    Plaintext items found on load (data stored before encryption was turned
+    on) are encrypted in place, then the inner store is vacuumed so their
+    old copies do not stay in its files.
+    """
+    
+    name = "encrypted"
+    
+    def __init__(self, inner: StorageBackend, cipher: Any):
+        self.inner = inner
+        self.cipher = cipher
+        self.name = f"encrypted-{inner.name}"
+    
+    @staticmethod
+    def _associated_data(kind: str, item_id: str) -> bytes:
+        return f"{kind}/{item_id}".encode("utf-8")
+    
+    def _encrypt(self, kind: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {"id": item["id"], "encrypted": self.cipher.encrypt_json(item, self._associated_data(kind, item["id"]))}
+    
+    def load_all(self) -> Dict[str, List[Dict[str, Any]]]:
+        stored = self.inner.load_all()
+        data: Dict[str, List[Dict[str, Any]]] = {}
+        plaintext: Dict[str, List[Dict[str, Any]]] = {}
+        for kind in KINDS:
+            items = []
+            for item in stored.get(kind, []):
+                if "encrypted" in item:
+                    items.append(self.cipher.decrypt_json(item["encrypted"], self._associated_data(kind, item["id"])))
+                else:
+                    items.append(item)
+                    plaintext.setdefault(kind, []).append(item)
+            data[kind] = items
+        if plaintext:
+            with self.transaction():
+                for kind, items in plaintext.items():
+                    self.put(kind, items)
+            self.inner.vacuum()
+            print(f"Encrypted existing health data: { {kind: len(items) for kind, items in plaintext.items()} }")
+        return data
+    
+    def transaction(self):
+        return self.inner.transaction()
+    
+    def put(self, kind: str, items: Iterable[Dict[str, Any]]) -> None:
+        self.inner.put(kind, [self._encrypt(kind, item) for item in items])
+    
+    def delete(self, kind: str, ids: Iterable[str]) -> None:
+        self.inner.delete(kind, ids)
+    
+    def replace_all(self, data: Dict[str, List[Dict[str, Any]]]) -> None:
+        self.inner.replace_all({kind: [self._encrypt(kind, item) for item in items] for kind, items in data.items()})
+    
+    def vacuum(self) -> None:
+        self.inner.vacuum()
+    
+    def close(self) -> None:
+        self.inner.close()
+
+
+def _column_value(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def read_json_file(path: str, kind: str) -> List[Dict[str, Any]]:
+    """Items of a legacy JSON file ({"<kind>": [...]}), empty if missing"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return json.load(f).get(kind, [])
+
+
+def write_json_file(path: str, kind: str, items: List[Dict[str, Any]]) -> None:
+    """Write a JSON file through a temporary file and an atomic rename"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump({kind: items}, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def migrate_json_to_sqlite(data_dir: str, backend: SQLiteStorageBackend) -> Tuple[bool, Dict[str, int]]:
+    """
+    One-time import of the legacy JSON files into a SQLite store.
+    
+    Runs only if the store has never been migrated and is empty. Everything
+    is imported in one transaction; the JSON files are then renamed to
+    *.json.migrated, so they are kept as a backup but not imported again.
+    
+    Returns:
+        Whether a migration ran, and the number of items imported per kind
+    """
+    counts = {kind: 0 for kind in KINDS}
+    if backend.get_meta("migrated_from_json"):
+        return False, counts
+    
+    paths = {kind: os.path.join(data_dir, JSON_FILES[kind]) for kind in KINDS}
+    if not any(os.path.exists(path) for path in paths.values()):
+        backend.set_meta("migrated_from_json", "none")
+        return False, counts
+    if any(backend.count(kind) for kind in KINDS):
+        print("SQLite store already has data, skipping JSON migration")
+        return False, counts
+    
+    data = {kind: read_json_file(path, kind) for kind, path in paths.items()}
+    with backend.transaction():
+        for kind in KINDS:
+            backend.put(kind, data[kind])
+            counts[kind] = len(data[kind])
+        backend.set_meta("migrated_from_json", ",".join(f"{kind}={counts[kind]}" for kind in KINDS))
+    
+    for path in paths.values():
+        if os.path.exists(path):
+            os.replace(path, f"{path}.migrated")
+    print(f"Migrated health data from JSON to SQLite: {counts}")
+    return True, counts
+
+
+def create_storage(data_dir: str, backend: Optional[str] = None, cipher: Any = None) -> StorageBackend:
+    """
+    Create the storage backend for a data directory.
+    
+    The backend defaults to the MEDICAL_HELPER_STORAGE environment variable
+    ("sqlite", "journal" or "json", default "sqlite"). A new SQLite store
+    imports the existing JSON files on first use; the journal backend reads
+    and writes the same snapshot files as the json backend. With a cipher
+    (encryption.DataCipher), items are encrypted before they are stored.
+    """
+    backend = (backend or os.environ.get("MEDICAL_HELPER_STORAGE", "sqlite")).lower()
+    if backend == "json":
+        storage = JSONStorageBackend(data_dir)
+    elif backend == "journal":
+        storage = JournalStorageBackend(data_dir)
+    elif backend == "sqlite":
+        storage = SQLiteStorageBackend(os.path.join(data_dir, SQLITE_FILENAME))
+        migrate_json_to_sqlite(data_dir, storage)
+    else:
+        raise ValueError(f"Unsupported storage backend: {backend}")
+    return EncryptedStorageBackend(storage, cipher) if cipher is not None else storage
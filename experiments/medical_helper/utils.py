@@ -1,11 +1,13 @@
 import os
 import uuid
-import shutil
 from datetime import datetime
-from typing import Optional, List
+from typing import List
 from pathlib import Path
 import streamlit as st
 
+# get_file_type moved to attachment_store; re-exported for existing imports
+from attachment_store import get_file_type  # noqa: F401
+
 def generate_id() -> str:
     """Generate a unique ID"""
     return str(uuid.uuid4())
@@ -35,26 +37,6 @@ def ensure_upload_directory(directory: str = "health_data/uploads") -> str:
     Path(directory).mkdir(parents=True, exist_ok=True)
     return directory
 
-def save_uploaded_file(uploaded_file, upload_dir: str = "health_data/uploads") -> Optional[str]:
-    """Save uploaded file and return the file path"""
-    try:
-        # Ensure upload directory exists
-        ensure_upload_directory(upload_dir)
-        
-        # Generate unique filename
-        file_extension = Path(uploaded_file.name).suffix
-        unique_filename = f"{generate_id()}{file_extension}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.read())
-        
-        return file_path
-    except Exception as e:
-        st.error(f"Error saving file: {str(e)}")
-        return None
-
 def get_file_size(file_path: str) -> int:
     """Get file size in bytes"""
     try:
@@ -62,20 +44,6 @@ def get_file_size(file_path: str) -> int:
     except:
         return 0
 
-def get_file_type(filename: str) -> str:
-    """Determine file type based on extension"""
-    extension = Path(filename).suffix.lower()
-    
-    image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff']
-    document_extensions = ['.pdf', '.doc', '.docx', '.txt', '.rtf']
-    
-    if extension in image_extensions:
-        return 'image'
-    elif extension in document_extensions:
-        return 'document'
-    else:
-        return 'other'
-
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human readable format"""
     if size_bytes == 0: